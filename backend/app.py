@@ -1,25 +1,123 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+import json
 import os
+import re
+import time
 
 # .env 파일 로드
 load_dotenv()
-from validate_api_key import validate_api_key
-from generate_llm_response import generate_llm_response, generate_conversation_prompt
-from config import LLMRequestConfig, LLMResponse
+from validate_api_key import validate_api_key_async, validate_api_keys_async, validation_cache
+from generate_llm_response import generate_llm_response_async, generate_conversation_prompt_async, stream_llm_response
+from config import LLMRequestConfig, LLMResponse, SessionConfig, SimulationConfig
 from estimate_tokens import estimate_simulation_tokens
-from evaluate_conversation import evaluate_conversation_log
+from evaluate_conversation import (
+    evaluate_conversation_log_async, evaluate_conversation_batch_async, EVALUATION_BATCH_MAX_ITEMS,
+    submit_evaluation_batch, get_evaluation_batch
+)
 from kt_chatbot_client import KTChatbotClient
+from simulation_runner import SIMULATION_WAIT_TIMEOUT, SimulationCapacityExceeded, simulation_manager
+from conversation_sessions import SessionConflict, conversation_sessions, validate_messages
+from http_client import run_on_provider_loop
+from circuit_breaker import circuit_breakers
+from model_router import model_router
+from response_cache import response_cache
+from usage_calibration import usage_calibration
+from structured_logging import get_logger, get_request_id, new_request_id, set_request_id
+from retry_policy import request_retries, start_request_retries
+from server_timing import mark_phase, start_request_timing, current_timing
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, METRICS_ENABLED, registry as metrics_registry
+
+logger = get_logger('app')
 
 app = Flask(__name__)
-CORS(app)  # React 앱에서의 요청을 허용
+CORS(app, expose_headers=['X-Request-ID', 'Server-Timing', 'X-Provider-Retries'])  # React 앱에서의 요청을 허용
+
+# 클라이언트가 보낸 X-Request-ID는 이 형식일 때만 그대로 사용
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+@app.before_request
+def assign_request_id():
+    """요청마다 ID를 정해 이 요청에서 남기는 모든 로그 레코드에 기록"""
+    incoming = request.headers.get('X-Request-ID', '')
+    set_request_id(incoming if REQUEST_ID_PATTERN.match(incoming) else new_request_id())
+    g.request_started = time.perf_counter()
+    start_request_timing()
+    start_request_retries()
+    if METRICS_ENABLED:
+        g.in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(_endpoint_label())
+        g.in_flight.inc()
+
+def _endpoint_label() -> str:
+    """메트릭 라벨용 엔드포인트 (경로 변수는 /api/simulations/<job_id>처럼 규칙 그대로 사용)"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.after_request
+def log_request(response):
+    """응답 헤더에 요청 ID와 프로바이더 재시도 횟수를 넣고 접근 로그를 한 줄 기록"""
+    response.headers['X-Request-ID'] = get_request_id() or ''
+    response.headers['X-Provider-Retries'] = str(request_retries())
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    logger.info("%s %s %s", request.method, request.path, response.status_code, extra={
+        'method': request.method,
+        'path': request.path,
+        'status_code': response.status_code,
+        'duration_ms': round(elapsed * 1000, 2),
+    })
+    if METRICS_ENABLED:
+        HTTP_REQUEST_DURATION.labels(request.method, _endpoint_label(), response.status_code).observe(elapsed)
+    return response
+
+@app.after_request
+def add_server_timing(response):
+    """
+    단계별 처리 시간을 Server-Timing 헤더로 전달 (브라우저 개발자 도구 Timing 탭에서 확인)
+    ?server_timing=1이면 JSON 응답 본문에도 server_timing 필드(밀리초)로 포함
+    """
+    timing = current_timing()
+    if timing is None:
+        return response
+    response.headers['Server-Timing'] = timing.header_value()
+    response.headers['Timing-Allow-Origin'] = '*'
+    if request.args.get('server_timing') in ('1', 'true') and response.is_json and not response.is_streamed:
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload['server_timing'] = timing.as_dict()
+            response.set_data(app.json.dumps(payload))
+    return response
+
+@app.teardown_request
+def release_in_flight(exc):
+    """예외로 끝난 요청도 처리 중 요청 수에서 빠지도록 teardown에서 감소"""
+    in_flight = g.pop('in_flight', None)
+    if in_flight is not None:
+        in_flight.dec()
+
+def sse_response(events):
+    """
+    (event, data) 이터레이터를 Server-Sent Events 응답으로 변환
+    done 이벤트는 success: true, error 이벤트는 success: false를 함께 전달
+    """
+    def generate():
+        for event, data in events:
+            if event == 'done':
+                data = {'success': True, **data}
+            elif event == 'error':
+                data = {'success': False, **data}
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 프록시 버퍼링 비활성화
+    })
 
 @app.route('/api/validate-key', methods=['POST'])
-def validate_key():
+async def validate_key():
     """
-    API 키 유효성 검증 엔드포인트
-    Request body: { "api_key": "sk-...", "model_type": "openai" | "anthropic" | "google" }
+    API 키 유효성 검증 엔드포인트 (비동기)
+    Request body: { "api_key": "sk-...", "model_type": "openai" | "anthropic" | "google", "refresh": false }
+    refresh가 true이면 캐시된 검증 결과를 무시하고 다시 검증
     """
     try:
         data = request.get_json()
@@ -39,8 +137,11 @@ def validate_key():
                 'error': 'API 키가 제공되지 않았습니다.'
             }), 400
         
+        mark_phase('validation')
         # API 키 검증
-        result = validate_api_key(api_key, model_type)
+        result = await run_on_provider_loop(
+            validate_api_key_async(api_key, model_type, use_cache=not data.get('refresh', False))
+        )
         
         if result['valid']:
             return jsonify({
@@ -59,15 +160,58 @@ def validate_key():
             'error': f'서버 오류: {str(e)}'
         }), 500
 
+@app.route('/api/validate-keys', methods=['POST'])
+async def validate_keys():
+    """
+    여러 API 키를 동시에 검증하는 엔드포인트 (비동기)
+    Request body: {
+        "keys": [ { "api_key": "sk-...", "model_type": "openai" }, ... ],
+        "refresh": false
+    }
+    Response: { "success": true, "results": [ { "index": 0, "key": "sk-abc...wxyz", "valid": true, ... }, ... ] }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '요청 데이터가 없습니다.'
+            }), 400
+
+        keys = data.get('keys')
+        if not isinstance(keys, list) or not keys:
+            return jsonify({
+                'success': False,
+                'error': '검증할 API 키 목록(keys)이 필요합니다.'
+            }), 400
+
+        mark_phase('validation')
+        results = await run_on_provider_loop(
+            validate_api_keys_async(keys, use_cache=not data.get('refresh', False))
+        )
+
+        return jsonify({
+            'success': True,
+            'results': results
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'서버 오류: {str(e)}'
+        }), 500
+
 @app.route('/api/generate-prompt', methods=['POST'])
-def generate_prompt():
+async def generate_prompt():
     """
-    주제와 페르소나에 맞는 대화 프롬프트를 동적으로 생성하는 엔드포인트
+    주제와 페르소나에 맞는 대화 프롬프트를 동적으로 생성하는 엔드포인트 (비동기)
     Request body: {
         "api_key": "sk-...",
         "topic": "대화 주제",
         "persona1": "페르소나 1",
-        "persona2": "페르소나 2"
+        "persona2": "페르소나 2",
+        "bypass_cache": false (선택, true면 응답 캐시를 사용하지 않음)
     }
     """
     try:
@@ -96,8 +240,11 @@ def generate_prompt():
                 'error': '주제와 페르소나가 필요합니다.'
             }), 400
         
+        mark_phase('validation')
         # 프롬프트 생성
-        generated_prompt = generate_conversation_prompt(api_key, topic, persona1, persona2)
+        generated_prompt = await run_on_provider_loop(
+            generate_conversation_prompt_async(api_key, topic, persona1, persona2, use_cache=not data.get('bypass_cache', False))
+        )
         
         if generated_prompt:
             return jsonify({
@@ -117,9 +264,9 @@ def generate_prompt():
         }), 500
 
 @app.route('/api/generate-response', methods=['POST'])
-def generate_response():
+async def generate_response():
     """
-    LLM을 사용하여 응답 생성 엔드포인트
+    LLM을 사용하여 응답 생성 엔드포인트 (비동기)
     Request body: {
         "api_key": "sk-...",
         "model_type": "openai" | "anthropic" | "google",
@@ -128,7 +275,12 @@ def generate_response():
         "other_persona": "상대방 페르소나 (선택사항)",
         "previous_messages": [{"bot": 1, "text": "..."}, ...],
         "bot_number": 1 or 2,
-        "custom_system_prompt": "동적으로 생성된 프롬프트 (선택사항)"
+        "custom_system_prompt": "동적으로 생성된 프롬프트 (선택사항)",
+        "stream": false,  // true면 text/event-stream으로 delta/done/error 이벤트 전송
+        "hedge": null,  // true/false로 헤지 요청 사용 여부 지정 (생략하면 HEDGE_ENABLED 설정)
+        "tier": "fast" | "standard" | "quality",  // 모델 티어 (생략하면 프로바이더별 기본 티어)
+        "allow_fallback": false,  // true면 프로바이더가 불안정할 때 fallback_api_key의 프로바이더로 대체
+        "fallback_api_key": "sk-ant-..."  // 대체할 다른 프로바이더의 API 키 (선택사항)
     }
     """
     try:
@@ -172,19 +324,35 @@ def generate_response():
             top_p = 0.9  # 기본값으로 설정
         
         # LLMRequestConfig 객체 생성
-        config = LLMRequestConfig(
-            api_key=api_key,
-            model_type=model_type,
-            topic=topic,
-            persona=persona,
-            previous_messages=previous_messages,
-            bot_number=bot_number,
-            temperature=float(temperature),
-            top_p=float(top_p)
-        )
+        try:
+            config = LLMRequestConfig(
+                api_key=api_key,
+                model_type=model_type,
+                topic=topic,
+                persona=persona,
+                previous_messages=previous_messages,
+                bot_number=bot_number,
+                temperature=float(temperature),
+                top_p=float(top_p),
+                hedge=data.get('hedge'),
+                tier=data.get('tier'),
+                fallback_api_key=data.get('fallback_api_key') if data.get('allow_fallback') else None
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        mark_phase('validation')
+        # 스트리밍 모드: 생성된 텍스트 조각을 SSE로 바로 전달
+        if data.get('stream'):
+            return sse_response(stream_llm_response(config, custom_system_prompt, other_persona))
         
         # LLM 응답 생성 (커스텀 프롬프트와 상대방 페르소나 전달)
-        result = generate_llm_response(config, custom_system_prompt, other_persona)
+        result = await run_on_provider_loop(
+            generate_llm_response_async(config, custom_system_prompt, other_persona)
+        )
         
         if result.success:
             return jsonify({
@@ -193,14 +361,22 @@ def generate_response():
                 'tokens': {
                     'prompt_tokens': result.prompt_tokens,
                     'completion_tokens': result.completion_tokens,
-                    'total_tokens': result.total_tokens
-                }
+                    'total_tokens': result.total_tokens,
+                    'cached_tokens': result.cached_tokens,
+                    'cache_creation_tokens': result.cache_creation_tokens
+                },
+                'model': result.model,
+                'retries': request_retries()
             }), 200
         else:
-            return jsonify({
+            response = {
                 'success': False,
-                'error': result.error or '응답 생성에 실패했습니다.'
-            }), 200  # 200으로 반환하여 프론트엔드에서 처리 가능하도록
+                'error': result.error or '응답 생성에 실패했습니다.',
+                'retries': request_retries()
+            }
+            if result.error_code:
+                response['error_code'] = result.error_code
+            return jsonify(response), 200  # 200으로 반환하여 프론트엔드에서 처리 가능하도록
         
     except Exception as e:
         return jsonify({
@@ -219,7 +395,8 @@ def estimate_tokens():
         "persona1": "페르소나 1",
         "persona2": "페르소나 2",
         "turns_per_bot": 3,
-        "number_of_sets": 2
+        "number_of_sets": 2,
+        "use_calibration": true  # 실제 사용량 분포로 보정 (기본값 true)
     }
     """
     try:
@@ -251,6 +428,7 @@ def estimate_tokens():
                 'error': '주제와 페르소나가 필요합니다.'
             }), 400
         
+        mark_phase('validation')
         # 토큰 예측
         estimate = estimate_simulation_tokens(
             model_type1=model_type1,
@@ -265,8 +443,10 @@ def estimate_tokens():
             temperature1=temperature1,
             temperature2=temperature2,
             top_p1=top_p1,
-            top_p2=top_p2
+            top_p2=top_p2,
+            calibration=usage_calibration if data.get('use_calibration', True) else None
         )
+        mark_phase('estimate')
         
         return jsonify({
             'success': True,
@@ -279,16 +459,355 @@ def estimate_tokens():
             'error': f'서버 오류: {str(e)}'
         }), 500
 
+@app.route('/api/usage-calibration', methods=['GET'])
+def usage_calibration_stats():
+    """
+    토큰 예측 보정에 쓰는 실제 사용량 분포의 요약 (키 수, 관측 수)
+    """
+    return jsonify({
+        'success': True,
+        'stats': usage_calibration.stats()
+    }), 200
+
+@app.route('/api/usage-calibration', methods=['DELETE'])
+def clear_usage_calibration():
+    """
+    관측된 사용량 분포 비우기 (이후 예측은 휴리스틱으로 돌아감)
+    """
+    usage_calibration.clear()
+    return jsonify({'success': True}), 200
+
+@app.route('/api/simulations', methods=['POST'])
+def create_simulation():
+    """
+    모든 대화 세트를 서버에서 동시에 실행하는 시뮬레이션 작업 생성 엔드포인트
+    Request body: {
+        "api_key": "sk-..." (또는 챗봇별 "api_key1", "api_key2"),
+        "model_type1": "openai" | "anthropic" | "google",
+        "model_type2": "openai" | "anthropic" | "google",
+        "topic": "대화 주제",
+        "persona1": "페르소나 1",
+        "persona2": "페르소나 2",
+        "turns_per_bot": 3,
+        "number_of_sets": 2,
+        "temperature1": 1.2, "temperature2": 1.2,
+        "top_p1": 0.9, "top_p2": 0.9,
+        "custom_system_prompt": "동적으로 생성된 프롬프트 (선택사항)",
+        "hedge": null,  // 턴마다 헤지 요청 사용 여부 (생략하면 HEDGE_ENABLED 설정)
+        "tier": "fast" | "standard" | "quality",  // 모델 티어 (생략하면 프로바이더별 기본 티어)
+        "allow_fallback": false,  // true면 프로바이더가 불안정할 때 상대 챗봇의 API 키(다른 프로바이더)로 대체
+        "wait": false  // true면 모든 세트가 끝난 뒤 결과와 함께 응답 (SIMULATION_WAIT_TIMEOUT초가 지나면 202로 작업 ID만 반환)
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '요청 데이터가 없습니다.'
+            }), 400
+
+        api_key = data.get('api_key')
+
+        try:
+            config = SimulationConfig(
+                api_key1=data.get('api_key1') or api_key,
+                api_key2=data.get('api_key2') or api_key,
+                topic=data.get('topic'),
+                persona1=data.get('persona1'),
+                persona2=data.get('persona2'),
+                model_type1=data.get('model_type1', 'openai'),
+                model_type2=data.get('model_type2', 'openai'),
+                turns_per_bot=data.get('turns_per_bot', 3),
+                number_of_sets=data.get('number_of_sets', 2),
+                temperature1=float(data.get('temperature1', 1.2)),
+                temperature2=float(data.get('temperature2', 1.2)),
+                top_p1=float(data.get('top_p1', 0.9)),
+                top_p2=float(data.get('top_p2', 0.9)),
+                custom_system_prompt=data.get('custom_system_prompt'),
+                hedge=data.get('hedge'),
+                tier=data.get('tier'),
+                allow_fallback=bool(data.get('allow_fallback', False))
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        mark_phase('validation')
+        try:
+            job = simulation_manager.submit(config)
+        except SimulationCapacityExceeded as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+
+        # 대기 시간을 넘기면 작업은 계속 실행하고 202로 작업 ID를 반환
+        if data.get('wait') and job.wait(SIMULATION_WAIT_TIMEOUT):
+            return jsonify({'success': True, **job.to_dict()}), 200
+
+        return jsonify({'success': True, **job.to_dict()}), 202
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'서버 오류: {str(e)}'
+        }), 500
+
+@app.route('/api/simulations/<job_id>', methods=['GET'])
+def get_simulation(job_id):
+    """시뮬레이션 작업 상태 및 세트별 결과 조회"""
+    job = simulation_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': '시뮬레이션 작업을 찾을 수 없습니다.'
+        }), 404
+    return jsonify({'success': True, **job.to_dict()}), 200
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """
+    대화 세션 생성 엔드포인트 (설정과 프롬프트는 여기서 한 번만 전송)
+    Request body: {
+        "api_key": "sk-..." (또는 챗봇별 "api_key1", "api_key2", 서버가 응답을 만들지 않는 챗봇은 생략 가능),
+        "model_type1": "openai" | "anthropic" | "google",
+        "model_type2": "openai" | "anthropic" | "google",
+        "topic": "대화 주제",
+        "persona1": "페르소나 1",
+        "persona2": "페르소나 2",
+        "temperature1": 1.2, "temperature2": 1.2,
+        "top_p1": 0.9, "top_p2": 0.9,
+        "custom_system_prompt": "동적으로 생성된 프롬프트 (선택사항)",
+        "hedge": null,  // 턴마다 헤지 요청 사용 여부 (생략하면 HEDGE_ENABLED 설정)
+        "tier": "fast" | "standard" | "quality",  // 모델 티어 (생략하면 프로바이더별 기본 티어)
+        "allow_fallback": false,  // true면 프로바이더가 불안정할 때 상대 챗봇의 API 키(다른 프로바이더)로 대체
+        "messages": [{"bot": 1, "text": "..."}, ...]  // 이어서 진행할 기존 대화 (선택사항)
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '요청 데이터가 없습니다.'
+            }), 400
+
+        api_key = data.get('api_key')
+
+        try:
+            config = SessionConfig(
+                api_key1=data.get('api_key1') or api_key,
+                api_key2=data.get('api_key2') or api_key,
+                topic=data.get('topic'),
+                persona1=data.get('persona1'),
+                persona2=data.get('persona2'),
+                model_type1=data.get('model_type1', 'openai'),
+                model_type2=data.get('model_type2', 'openai'),
+                temperature1=float(data.get('temperature1', 1.2)),
+                temperature2=float(data.get('temperature2', 1.2)),
+                top_p1=float(data.get('top_p1', 0.9)),
+                top_p2=float(data.get('top_p2', 0.9)),
+                custom_system_prompt=data.get('custom_system_prompt'),
+                hedge=data.get('hedge'),
+                tier=data.get('tier'),
+                allow_fallback=bool(data.get('allow_fallback', False))
+            )
+            session = conversation_sessions.create(config, validate_messages(data.get('messages')))
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        return jsonify({'success': True, **session.to_dict(include_messages=False)}), 201
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'서버 오류: {str(e)}'
+        }), 500
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """대화 세션 설정(API 키 제외)과 전체 대화 기록 조회"""
+    session = conversation_sessions.get(session_id)
+    if not session:
+        return jsonify({
+            'success': False,
+            'error': '대화 세션을 찾을 수 없습니다. (만료되었거나 삭제됨)'
+        }), 404
+    return jsonify({'success': True, **session.to_dict()}), 200
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """대화 세션 삭제 (보관 중인 API 키와 대화 기록도 함께 삭제)"""
+    if not conversation_sessions.delete(session_id):
+        return jsonify({
+            'success': False,
+            'error': '대화 세션을 찾을 수 없습니다. (만료되었거나 삭제됨)'
+        }), 404
+    return jsonify({'success': True}), 200
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    """보관 중인 대화 세션 수와 크기, 한도, 삭제/충돌 카운터"""
+    return jsonify({
+        'success': True,
+        'stats': conversation_sessions.stats()
+    }), 200
+
+def _session_turn_stream(session, events, appended, bot_number):
+    """스트리밍 턴의 이벤트를 SSE로 전달하고, done 이벤트에서 대화 기록에 응답을 추가"""
+    state = {'finished': False}
+
+    def finish(messages):
+        if not state['finished']:
+            state['finished'] = True
+            conversation_sessions.finish_turn(session, messages)
+
+    def generate():
+        try:
+            for event, data in events:
+                if event == 'done':
+                    message = {'bot': bot_number, 'text': data['text']}
+                    finish(appended + [message])
+                    data = {**data, 'bot': bot_number, 'message_count': len(session.messages)}
+                yield event, data
+        finally:
+            # 오류 이벤트나 클라이언트 연결 끊김이면 기록을 바꾸지 않고 턴만 끝냄
+            finish(None)
+
+    response = sse_response(generate())
+    # 스트림을 시작하기 전에 연결이 닫혀도 턴이 끝나도록
+    response.call_on_close(lambda: finish(None))
+    return response
+
+@app.route('/api/sessions/<session_id>/turns', methods=['POST'])
+async def create_session_turn(session_id):
+    """
+    대화 세션의 다음 턴 생성 엔드포인트 (비동기, 새 메시지만 주고받음)
+    Request body: {
+        "bot_number": 1 or 2,  // 응답할 챗봇 (생략하면 마지막 발언자가 아닌 챗봇, 빈 대화는 1)
+        "messages": [{"bot": 2, "text": "..."}],  // 응답 전에 기록에 추가할 새 메시지 (다른 챗봇 등 서버 밖에서 만든 발언, 선택사항)
+        "message_count": 6,  // 클라이언트가 알고 있는 현재 메시지 수 (선택사항, 다르면 409)
+        "stream": false  // true면 text/event-stream으로 delta/done/error 이벤트 전송
+    }
+    Response: { "success": true, "message": {"bot": 1, "text": "..."}, "tokens": {...}, "model": "...", "retries": 0, "message_count": 8 }
+    응답에 실패하면 대화 기록은 바뀌지 않으므로 같은 요청을 다시 보낼 수 있습니다.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        session = conversation_sessions.get(session_id)
+        if not session:
+            return jsonify({
+                'success': False,
+                'error': '대화 세션을 찾을 수 없습니다. (만료되었거나 삭제됨)'
+            }), 404
+
+        message_count = data.get('message_count')
+        try:
+            new_messages = validate_messages(data.get('messages'))
+            if message_count is not None and not isinstance(message_count, int):
+                raise ValueError("message_count는 정수여야 합니다.")
+            bot_number = data.get('bot_number') or session.next_bot(new_messages)
+            if bot_number not in [1, 2]:
+                raise ValueError("bot_number는 1 또는 2여야 합니다.")
+            settings = session.config.bot_settings(bot_number)
+            if not settings['api_key']:
+                raise ValueError(f"챗봇 {bot_number}의 API 키가 세션에 없습니다.")
+            previous_messages = conversation_sessions.begin_turn(session, new_messages, message_count)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except SessionConflict as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'message_count': e.message_count
+            }), 409
+
+        config = LLMRequestConfig(
+            api_key=settings['api_key'],
+            model_type=settings['model_type'],
+            topic=session.config.topic,
+            persona=settings['persona'],
+            previous_messages=previous_messages,
+            bot_number=bot_number,
+            temperature=float(settings['temperature']),
+            top_p=float(settings['top_p']),
+            hedge=session.config.hedge,
+            tier=session.config.tier,
+            fallback_api_key=settings['fallback_api_key']
+        )
+        custom_system_prompt = session.config.custom_system_prompt
+
+        mark_phase('validation')
+        if data.get('stream'):
+            return _session_turn_stream(
+                session, stream_llm_response(config, custom_system_prompt, settings['other_persona']),
+                new_messages, bot_number
+            )
+
+        result = None
+        try:
+            result = await run_on_provider_loop(
+                generate_llm_response_async(config, custom_system_prompt, settings['other_persona'])
+            )
+        finally:
+            message = {'bot': bot_number, 'text': result.text} if result is not None and result.success else None
+            conversation_sessions.finish_turn(session, new_messages + [message] if message else None)
+
+        if result.success:
+            return jsonify({
+                'success': True,
+                'message': message,
+                'tokens': {
+                    'prompt_tokens': result.prompt_tokens,
+                    'completion_tokens': result.completion_tokens,
+                    'total_tokens': result.total_tokens,
+                    'cached_tokens': result.cached_tokens,
+                    'cache_creation_tokens': result.cache_creation_tokens
+                },
+                'model': result.model,
+                'retries': request_retries(),
+                'message_count': len(session.messages)
+            }), 200
+        else:
+            response = {
+                'success': False,
+                'error': result.error or '응답 생성에 실패했습니다.',
+                'retries': request_retries(),
+                'message_count': len(session.messages)
+            }
+            if result.error_code:
+                response['error_code'] = result.error_code
+            return jsonify(response), 200  # 200으로 반환하여 프론트엔드에서 처리 가능하도록
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'서버 오류: {str(e)}'
+        }), 500
+
 @app.route('/api/evaluate-conversation', methods=['POST'])
-def evaluate_conversation():
+async def evaluate_conversation():
     """
-    Evaluates a conversation using an LLM.
+    Evaluates a conversation using an LLM (async).
     Request body: {
         "topic": "...",
         "persona1": "...",
         "persona2": "...",
         "dialogue_log": [ { "speaker": "...", "text": "..." }, ... ],
-        "provider": "openai" | "anthropic" (optional, default: "openai")
+        "provider": "openai" | "anthropic" (optional, default: "openai"),
+        "bypass_cache": false (optional, true skips the response cache)
     }
     """
     try:
@@ -300,19 +819,132 @@ def evaluate_conversation():
         if provider not in ['openai', 'anthropic']:
             return jsonify({'success': False, 'error': f'Unsupported provider: {provider}. Supported: openai, anthropic'}), 400
 
-        result = evaluate_conversation_log(
+        mark_phase('validation')
+        result = await run_on_provider_loop(evaluate_conversation_log_async(
             topic=data.get('topic', ''),
             persona1=data.get('persona1', ''),
             persona2=data.get('persona2', ''),
             dialogue_log=data.get('dialogue_log', []),
-            provider=provider
-        )
+            provider=provider,
+            use_cache=not data.get('bypass_cache', False)
+        ))
 
         return jsonify(result), 200
 
     except Exception as e:
         return jsonify({'success': False, 'error': f'Server Error: {str(e)}'}), 500
 
+@app.route('/api/evaluate-batch', methods=['POST'])
+async def evaluate_batch():
+    """
+    Evaluates many conversations concurrently (async).
+    Request body: {
+        "items": [ { "id": "...", "topic": "...", "persona1": "...", "persona2": "...", "dialogue_log": [...] }, ... ],
+        "provider": "openai" | "anthropic" (optional, default: "openai"),
+        "concurrency": 8 (optional, capped by EVALUATION_BATCH_MAX_CONCURRENCY),
+        "bypass_cache": false (optional, true skips the response cache)
+    }
+    Response: results in input order; a failed item has success=false and does not stop the batch.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
+
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'items must be a non-empty list'}), 400
+        if len(items) > EVALUATION_BATCH_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'Too many items: {len(items)} (max {EVALUATION_BATCH_MAX_ITEMS})'}), 400
+
+        provider = data.get('provider', 'openai').lower()
+        if provider not in ['openai', 'anthropic']:
+            return jsonify({'success': False, 'error': f'Unsupported provider: {provider}. Supported: openai, anthropic'}), 400
+
+        concurrency = data.get('concurrency')
+        if concurrency is not None and (isinstance(concurrency, bool) or not isinstance(concurrency, int)):
+            return jsonify({'success': False, 'error': 'concurrency must be an integer'}), 400
+
+        mark_phase('validation')
+        results = await run_on_provider_loop(evaluate_conversation_batch_async(
+            items,
+            provider=provider,
+            concurrency=concurrency,
+            use_cache=not data.get('bypass_cache', False)
+        ))
+
+        succeeded = sum(1 for r in results if r.get('success'))
+        return jsonify({
+            'success': True,
+            'results': results,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded
+        }), 200
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Server Error: {str(e)}'}), 500
+
+@app.route('/api/evaluation-batches', methods=['POST'])
+def create_evaluation_batch():
+    """
+    Submits many conversations to the provider Batch API (offline, discounted).
+    Request body: {
+        "items": [ { "id": "...", "topic": "...", "persona1": "...", "persona2": "...", "dialogue_log": [...] }, ... ],
+        "provider": "openai" | "anthropic" (optional, default: "openai")
+    }
+    Response: { "success": true, "batch_id": "...", "provider": "...", "status": "...", "done": false }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
+
+        provider = data.get('provider', 'openai').lower()
+        if provider not in ['openai', 'anthropic']:
+            return jsonify({'success': False, 'error': f'Unsupported provider: {provider}. Supported: openai, anthropic'}), 400
+
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'items must be a non-empty list'}), 400
+
+        mark_phase('validation')
+        result = submit_evaluation_batch(items, provider=provider)
+        return jsonify(result), 202 if result.get('success') else 200
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Server Error: {str(e)}'}), 500
+
+@app.route('/api/evaluation-batches/<batch_id>', methods=['GET'])
+def get_evaluation_batch_status(batch_id):
+    """
+    Polls a provider batch; once done, returns per-item results in input order.
+    Query: ?provider=openai|anthropic (optional for batches submitted by this server)
+    """
+    try:
+        result = get_evaluation_batch(batch_id, provider=request.args.get('provider'))
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Server Error: {str(e)}'}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    응답 캐시(프롬프트 생성/대화 평가)와 API 키 검증 캐시의 적중·실패 카운터와 크기
+    """
+    return jsonify({
+        'success': True,
+        'stats': response_cache.stats(),
+        'validation': validation_cache.stats()
+    }), 200
+
+@app.route('/api/cache', methods=['DELETE'])
+def clear_cache():
+    """
+    응답 캐시 비우기 (메모리 + 디스크)
+    """
+    response_cache.clear()
+    return jsonify({'success': True}), 200
+
 @app.route('/api/kt-chatbot', methods=['POST'])
 def kt_chatbot():
     """
@@ -340,6 +972,7 @@ def kt_chatbot():
                 'error': '메시지가 제공되지 않았습니다.'
             }), 400
         
+        mark_phase('validation')
         # KT 챗봇 클라이언트 생성 (세션 키 전달)
         client = KTChatbotClient()
         if session_key:
@@ -377,10 +1010,29 @@ def kt_chatbot():
             'error': f'서버 오류: {str(e)}'
         }), 500
 
+@app.route('/api/models', methods=['GET'])
+def get_models():
+    """
+    모델 티어 구성과 모델별 라우팅 상태 (지연 시간 EWMA, 오류율, 서킷 상태)
+    """
+    return jsonify({'success': True, **model_router.snapshot()}), 200
+
 @app.route('/health', methods=['GET'])
 def health():
-    """서버 상태 확인"""
-    return jsonify({'status': 'ok'}), 200
+    """
+    서버 상태 확인
+    프로바이더 서킷 중 하나라도 open/half_open이면 status는 'degraded' (서버 자체는 정상이므로 200)
+    """
+    circuits = circuit_breakers.snapshot()
+    degraded = any(circuit['state'] != 'closed' for circuit in circuits)
+    return jsonify({'status': 'degraded' if degraded else 'ok', 'circuits': circuits}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 형식 메트릭 (엔드포인트/프로바이더 지연 시간, 상태 코드, 토큰 사용량 등)"""
+    if not METRICS_ENABLED:
+        return jsonify({'success': False, 'error': '메트릭이 비활성화되어 있습니다.'}), 404
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000, host='0.0.0.0')
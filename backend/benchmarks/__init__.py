@@ -0,0 +1,3 @@
+"""
+백엔드 CPU 경로 마이크로벤치마크 (실행: backend 폴더에서 python -m benchmarks.run_benchmarks)
+"""
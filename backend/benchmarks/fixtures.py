@@ -0,0 +1,97 @@
+"""
+벤치마크용 한국어 고정 데이터
+- 실제 시뮬레이션과 비슷한 주제/페르소나와 대화 메시지
+- LLM 원문 응답 형태(따옴표, 역할 표시, 끊긴 문장 등)를 그대로 담은 응답 샘플
+모든 데이터는 결정적으로 생성되므로 실행마다 같은 입력을 사용합니다.
+"""
+from typing import Dict, List
+
+# 대화 길이 (메시지 수): 첫 턴 직후, 일반 시뮬레이션, 긴 시뮬레이션
+CONVERSATION_LENGTHS = (2, 10, 40)
+
+TOPIC = '휴대폰 요금제 변경과 약정 할인 상담'
+PERSONA1 = '30대 직장인 고객. 데이터를 많이 쓰지만 요금이 부담스러워 더 저렴한 요금제를 찾고 있으며, 위약금에 민감하다.'
+PERSONA2 = '통신사 고객센터 상담사. 친절하지만 정확한 정보를 중시하고, 고객에게 맞는 요금제와 결합 할인을 제안한다.'
+CUSTOM_SYSTEM_PROMPT = (
+    '당신은 통신사 고객센터 상담 시뮬레이션에 참여합니다. 주제는 휴대폰 요금제 변경과 약정 할인입니다. '
+    '각 발화는 한두 문장으로 짧게 말하고, 상대의 질문에 직접 답한 뒤 필요한 정보를 하나씩 확인하세요. '
+    '요금, 약정 기간, 위약금, 결합 할인처럼 구체적인 숫자를 자연스럽게 사용하세요.'
+)
+
+_BOT1_LINES = [
+    '안녕하세요, 지금 쓰는 요금제가 너무 비싼 것 같아서 상담받고 싶어요.',
+    '한 달에 데이터는 보통 30기가 정도 쓰고, 통화는 거의 안 해요.',
+    '약정이 아직 8개월 남았는데 지금 바꾸면 위약금이 얼마나 나오나요?',
+    '그럼 요금제만 바꾸고 약정은 그대로 유지할 수도 있는 건가요?',
+    '집 인터넷도 같은 통신사인데 결합하면 얼마나 더 할인되나요?',
+    '데이터를 다 쓰면 속도 제한이 걸린다고 들었는데 영상 보는 데 문제없을까요?',
+    '가족 중에 동생도 같은 통신사를 쓰는데 같이 묶으면 혜택이 있나요?',
+    '변경하면 이번 달 요금은 일할 계산되는 거죠?',
+    '혹시 온라인으로 변경하면 추가 할인이 있나요?',
+    '알겠습니다, 말씀하신 요금제로 변경하려면 어떻게 하면 되나요?',
+]
+
+_BOT2_LINES = [
+    '안녕하세요 고객님, 현재 이용 중이신 요금제부터 확인해 드리겠습니다.',
+    '사용 패턴을 보면 데이터 30기가 요금제가 월 4만 9천 원으로 가장 알맞아 보입니다.',
+    '약정을 유지하신 채 요금제만 변경하시면 위약금은 발생하지 않습니다.',
+    '네, 선택약정 25% 할인은 그대로 유지되고 남은 기간도 이어집니다.',
+    '인터넷과 결합하시면 매달 5천5백 원이 추가로 할인됩니다.',
+    '기본 제공량을 다 쓰시면 1Mbps로 제한되는데 일반 화질 영상은 보실 수 있습니다.',
+    '가족 결합으로 묶으시면 두 분 모두 회선당 최대 20% 할인을 받으실 수 있습니다.',
+    '네, 이번 달 요금은 변경일 기준으로 일할 계산되어 청구됩니다.',
+    '온라인 다이렉트로 변경하시면 매달 2천 원이 추가 할인됩니다.',
+    '본인 인증 후 앱의 요금제 변경 메뉴에서 바로 신청하실 수 있습니다.',
+]
+
+# LLM 원문 응답 샘플 (clean_response_text / ensure_complete_sentence 입력)
+RAW_RESPONSES: Dict[str, List[str]] = {
+    # 정리할 것이 거의 없는 응답
+    'plain': [
+        '사용 패턴을 보면 데이터 30기가 요금제가 가장 알맞아 보입니다.',
+        '네, 이번 달 요금은 변경일 기준으로 일할 계산되어 청구됩니다.',
+        '약정이 아직 8개월 남았는데 지금 바꾸면 위약금이 얼마나 나오나요?',
+        '인터넷과 결합하시면 매달 5천5백 원이 추가로 할인됩니다!',
+    ],
+    # 따옴표, 역할 표시가 붙은 응답
+    'decorated': [
+        '"통신사 직원: 안녕하세요 고객님, 현재 이용 중이신 요금제부터 확인해 드리겠습니다."',
+        "고객: '한 달에 데이터는 보통 30기가 정도 쓰고, 통화는 거의 안 해요'",
+        '상담사: "가족 결합으로 묶으시면 두 분 모두 회선당 최대 20% 할인을 받으실 수 있습니다',
+        '"봇 2: 온라인 다이렉트로 변경하시면 매달 2천 원이 추가 할인됩니다"',
+    ],
+    # max_tokens에 걸려 문장 중간에 끊긴 응답
+    'truncated': [
+        '기본 제공량을 다 쓰시면 1Mbps로 제한되는데 일반 화질 영상은 보실 수 있고, 고화질 영상은',
+        '네, 선택약정 25% 할인은 그대로 유지되고 남은 기간도 이어집니다. 다만 요금제를 낮추시면 할인 금액도',
+        '그럼 요금제만 바꾸고 약정은 그대로 유지할 수도 있는 건가요? 그리고 혹시 지금 쓰는 부가서비스도',
+        '집 인터넷도 같은 통신사인데 결합하면 얼마나 더 할인되',
+    ],
+    # 여러 문장이 이어진 긴 응답
+    'long': [
+        ' '.join(_BOT2_LINES[:6]) + ' 추가로 궁금하신 점이 있으시면 말씀해 주세요',
+        ' '.join(_BOT1_LINES[:6]) + ' 그리고 혹시 지금 변경하면',
+    ],
+}
+
+
+def conversation(length: int) -> List[Dict]:
+    """previous_messages 형식의 대화 ({'bot': 1|2, 'text': ...}), 1번 챗봇부터 번갈아 발화"""
+    messages = []
+    for index in range(length):
+        lines = _BOT1_LINES if index % 2 == 0 else _BOT2_LINES
+        messages.append({'bot': index % 2 + 1, 'text': lines[(index // 2) % len(lines)]})
+    return messages
+
+
+def dialogue_log(length: int) -> List[Dict]:
+    """평가 API 형식의 대화 로그 ({'speaker': ..., 'text': ...})"""
+    return [
+        {'speaker': f"Bot {message['bot']}", 'text': message['text']}
+        for message in conversation(length)
+    ]
+
+
+def conversation_text(length: int) -> str:
+    """토큰 수 계산용으로 대화를 한 덩어리 텍스트로 합친 것"""
+    return '\n'.join(f"봇{message['bot']}: {message['text']}" for message in conversation(length))
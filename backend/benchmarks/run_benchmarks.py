@@ -0,0 +1,304 @@
+"""
+백엔드 CPU 경로 마이크로벤치마크 실행기
+- 요청마다 실행되는 순수 파이썬 작업(응답 정리, 프롬프트 조립, 토큰 계산/예측, 평가 대화 포맷)을 측정
+- 결과를 JSON으로 저장하고, 저장된 기준값(baseline)과 비교해 느려진 벤치마크가 있으면 종료 코드 1
+
+사용 예 (backend 폴더에서):
+    python -m benchmarks.run_benchmarks                       # 실행 후 benchmarks/baseline.json과 비교
+    python -m benchmarks.run_benchmarks --save-baseline       # 현재 결과를 기준값으로 저장
+    python -m benchmarks.run_benchmarks -k clean_ --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 벤치마크 중에는 로그 파일/콘솔 출력을 하지 않음 (명시적으로 설정한 값은 존중)
+os.environ.setdefault('LOG_DIR', '')
+os.environ.setdefault('LOG_TO_STDOUT', '0')
+
+from benchmarks import fixtures  # noqa: E402
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+RESULT_SCHEMA_VERSION = 1
+
+
+@dataclass
+class Benchmark:
+    """
+    name: 결과 키 (예: 'openai_request[len=10]')
+    setup: 측정할 인자 없는 함수를 반환 (import나 고정 데이터 준비는 측정에서 제외)
+    """
+    name: str
+    group: str
+    setup: Callable[[], Callable[[], Any]]
+
+
+def _clean_response_cases() -> List[Benchmark]:
+    def make(kind: str, func_name: str):
+        def setup():
+            import generate_llm_response
+            func = getattr(generate_llm_response, func_name)
+            samples = fixtures.RAW_RESPONSES[kind]
+            return lambda: [func(text) for text in samples]
+        return setup
+
+    cases = []
+    for func_name in ('clean_response_text', 'ensure_complete_sentence'):
+        for kind in fixtures.RAW_RESPONSES:
+            cases.append(Benchmark(f'{func_name}[{kind}]', 'postprocess', make(kind, func_name)))
+    return cases
+
+
+def _request_config(model_type: str, length: int):
+    from config import LLMRequestConfig
+    return LLMRequestConfig(
+        api_key='sk-benchmark',
+        model_type=model_type,
+        topic=fixtures.TOPIC,
+        persona=fixtures.PERSONA1 if length % 2 == 0 else fixtures.PERSONA2,
+        previous_messages=fixtures.conversation(length),
+        bot_number=1 if length % 2 == 0 else 2
+    )
+
+
+def _prompt_assembly_cases() -> List[Benchmark]:
+    def make(model_type: str, length: int):
+        def setup():
+            import generate_llm_response
+            build = {
+                'openai': generate_llm_response._build_openai_request,
+                'anthropic': generate_llm_response._build_anthropic_request,
+            }[model_type]
+            config = _request_config(model_type, length)
+            other_persona = fixtures.PERSONA2 if config.bot_number == 1 else fixtures.PERSONA1
+            return lambda: build(config, fixtures.CUSTOM_SYSTEM_PROMPT, other_persona)
+        return setup
+
+    return [
+        Benchmark(f'{model_type}_request[len={length}]', 'prompt', make(model_type, length))
+        for model_type in ('openai', 'anthropic')
+        for length in fixtures.CONVERSATION_LENGTHS
+    ]
+
+
+def _token_cases() -> List[Benchmark]:
+    def make_count(length: int):
+        def setup():
+            from estimate_tokens import count_tokens
+            text = fixtures.conversation_text(length)
+            count_tokens(text)  # 인코딩 로드는 측정에서 제외
+            return lambda: count_tokens(text)
+        return setup
+
+    def make_estimate(turns_per_bot: int, cold: bool):
+        def setup():
+            import estimate_tokens
+            kwargs = dict(
+                model_type1='openai', model_type2='anthropic',
+                topic=fixtures.TOPIC, persona1=fixtures.PERSONA1, persona2=fixtures.PERSONA2,
+                turns_per_bot=turns_per_bot, number_of_sets=3
+            )
+            estimate_tokens.estimate_simulation_tokens(**kwargs)
+            if not cold:
+                return lambda: estimate_tokens.estimate_simulation_tokens(**kwargs)
+
+            def run_cold():
+                # 처음 보는 주제/페르소나 요청: 슬롯 토큰 수 캐시가 비어 있는 상태
+                estimate_tokens._count_template_tokens.cache_clear()
+                return estimate_tokens.estimate_simulation_tokens(**kwargs)
+            return run_cold
+        return setup
+
+    cases = [
+        Benchmark(f'count_tokens[len={length}]', 'tokens', make_count(length))
+        for length in fixtures.CONVERSATION_LENGTHS
+    ]
+    for turns_per_bot in (1, 5, 20):
+        cases.append(Benchmark(f'estimate_simulation_tokens[turns={turns_per_bot}]', 'tokens', make_estimate(turns_per_bot, False)))
+    cases.append(Benchmark('estimate_simulation_tokens[turns=5,cold]', 'tokens', make_estimate(5, True)))
+    return cases
+
+
+def _evaluation_cases() -> List[Benchmark]:
+    def make(layout: str, length: int):
+        def setup():
+            from evaluate_conversation import build_evaluation_prompt_parts
+            log = fixtures.dialogue_log(length)
+            return lambda: build_evaluation_prompt_parts(fixtures.TOPIC, fixtures.PERSONA1, fixtures.PERSONA2, log, layout=layout)
+        return setup
+
+    return [
+        Benchmark(f'evaluation_prompt[{layout},len={length}]', 'evaluation', make(layout, length))
+        for layout in ('cached', 'inline')
+        for length in fixtures.CONVERSATION_LENGTHS
+    ]
+
+
+def all_benchmarks() -> List[Benchmark]:
+    return _clean_response_cases() + _prompt_assembly_cases() + _token_cases() + _evaluation_cases()
+
+
+def measure(func: Callable[[], Any], rounds: int, min_time: float) -> Dict[str, Any]:
+    """
+    한 라운드가 min_time초 이상 걸리도록 반복 횟수를 정한 뒤 rounds번 측정 (1회 실행 시간, 마이크로초)
+    timeit은 측정 중 GC를 끄므로 라운드 간 편차가 작음
+    """
+    timer = timeit.Timer(func)
+    loops = 1
+    while True:
+        elapsed = timer.timeit(loops)
+        if elapsed >= min_time:
+            break
+        loops = loops * 10 if elapsed <= 0 else max(loops * 2, int(loops * min_time * 1.2 / elapsed))
+    samples = [timer.timeit(loops) / loops * 1e6 for _ in range(rounds)]
+    return {
+        'min_us': round(min(samples), 3),
+        'median_us': round(statistics.median(samples), 3),
+        'mean_us': round(statistics.fmean(samples), 3),
+        'stdev_us': round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        'loops': loops,
+        'rounds': rounds,
+    }
+
+
+def run(benchmarks: List[Benchmark], rounds: int, min_time: float, verbose: bool = True) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    for benchmark in benchmarks:
+        try:
+            func = benchmark.setup()
+            func()
+        except Exception as e:
+            # 예: tiktoken 인코딩 파일을 받을 수 없는 환경
+            skipped[benchmark.name] = f'{type(e).__name__}: {e}'
+            if verbose:
+                print(f'{benchmark.name:<48} 건너뜀 ({skipped[benchmark.name][:100]})', file=sys.stderr)
+            continue
+        stats = measure(func, rounds, min_time)
+        results[benchmark.name] = {'group': benchmark.group, **stats}
+        if verbose:
+            print(f"{benchmark.name:<48} {stats['median_us']:>12.2f} us  (±{stats['stdev_us']:.2f}, {stats['loops']} loops)", file=sys.stderr)
+    return {
+        'schema': RESULT_SCHEMA_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'benchmarks': results,
+        'skipped': skipped,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    벤치마크별 중앙값 비교
+    Returns:
+        (비교 행 목록, 느려진 벤치마크 이름 목록)
+        ratio = 현재 / 기준값, ratio > 1 + threshold이면 regression
+    """
+    rows = []
+    regressions = []
+    for name, stats in current['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if base is None:
+            rows.append({'name': name, 'current_us': stats['median_us'], 'baseline_us': None, 'ratio': None, 'status': 'new'})
+            continue
+        ratio = stats['median_us'] / base['median_us'] if base['median_us'] > 0 else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({
+            'name': name,
+            'current_us': stats['median_us'],
+            'baseline_us': base['median_us'],
+            'ratio': round(ratio, 3),
+            'status': status,
+        })
+    return rows, regressions
+
+
+def _print_comparison(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'benchmark':<48} {'baseline':>12} {'current':>12} {'ratio':>7}  status")
+    for row in rows:
+        baseline = f"{row['baseline_us']:.2f}" if row['baseline_us'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        print(f"{row['name']:<48} {baseline:>12} {row['current_us']:>12.2f} {ratio:>7}  {row['status']}")
+
+
+def _load_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='백엔드 CPU 경로 마이크로벤치마크')
+    parser.add_argument('-k', '--filter', help='이름에 이 문자열이 포함된 벤치마크만 실행')
+    parser.add_argument('--list', action='store_true', help='벤치마크 목록만 출력')
+    parser.add_argument('--rounds', type=int, default=7, help='측정 라운드 수 (기본값 7)')
+    parser.add_argument('--min-time', type=float, default=0.05, help='라운드 하나의 최소 시간(초, 기본값 0.05)')
+    parser.add_argument('--output', help='결과 JSON을 저장할 경로')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='비교할 기준값 JSON (기본값 benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='비교하지 않고 결과를 --baseline 경로에 저장')
+    parser.add_argument('--threshold', type=float, default=0.2, help='중앙값이 기준값보다 이 비율 이상 느리면 실패 (기본값 0.2)')
+    args = parser.parse_args(argv)
+
+    benchmarks = all_benchmarks()
+    if args.filter:
+        benchmarks = [b for b in benchmarks if args.filter in b.name]
+    if args.list:
+        for benchmark in benchmarks:
+            print(f'{benchmark.group:<12} {benchmark.name}')
+        return 0
+    if not benchmarks:
+        print('실행할 벤치마크가 없습니다.', file=sys.stderr)
+        return 2
+
+    current = run(benchmarks, args.rounds, args.min_time)
+    if args.output:
+        _write_json(args.output, current)
+    if args.save_baseline:
+        _write_json(args.baseline, current)
+        print(f'기준값 저장: {args.baseline}', file=sys.stderr)
+        return 0
+
+    baseline = _load_json(args.baseline)
+    if baseline is None:
+        print(f'기준값 파일이 없어 비교하지 않습니다: {args.baseline} (--save-baseline으로 생성)', file=sys.stderr)
+        if not args.output:
+            print(json.dumps(current, ensure_ascii=False, indent=2))
+        return 0
+
+    rows, regressions = compare(current, baseline, args.threshold)
+    _print_comparison(rows)
+    if regressions:
+        print(f"\n느려진 벤치마크 {len(regressions)}개 (기준 +{args.threshold:.0%} 초과): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
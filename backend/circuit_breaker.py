@@ -0,0 +1,253 @@
+"""
+프로바이더 호출 서킷 브레이커 ((프로바이더, 모델)별)
+- closed: 최근 호출의 오류 비율이나 느린 호출 비율이 기준을 넘으면 open으로 전환
+- open: 호출을 보내지 않고 바로 CircuitOpenError (error_code: circuit_open)로 실패
+- half_open: open 시간이 지나면 제한된 수의 시험 호출만 허용, 모두 성공하면 closed, 하나라도 실패하면 다시 open
+상태는 /health와 chatbot_provider_circuit_state 메트릭으로 확인할 수 있습니다.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from metrics import METRICS_ENABLED, PROVIDER_CIRCUIT_REJECTIONS, PROVIDER_CIRCUIT_STATE, provider_of
+from structured_logging import get_logger
+
+logger = get_logger('circuit_breaker')
+
+CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', '1') not in ('0', 'false', 'False')
+# 상태 판단에 쓰는 최근 구간 (초)과 판단에 필요한 최소 호출 수
+CIRCUIT_WINDOW_SECONDS = float(os.environ.get('CIRCUIT_WINDOW_SECONDS', '60'))
+CIRCUIT_MIN_CALLS = int(os.environ.get('CIRCUIT_MIN_CALLS', '10'))
+# 이 비율 이상이 실패(5xx, 시간 초과, 연결 오류)하면 차단
+CIRCUIT_FAILURE_RATE = float(os.environ.get('CIRCUIT_FAILURE_RATE', '0.5'))
+# 응답 헤더까지 이 시간(초)보다 오래 걸린 호출을 느린 호출로 보고, 이 비율 이상이면 차단
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get('CIRCUIT_SLOW_CALL_SECONDS', '20'))
+CIRCUIT_SLOW_CALL_RATE = float(os.environ.get('CIRCUIT_SLOW_CALL_RATE', '0.5'))
+# 차단 유지 시간 (초)과 반개방 상태에서 허용하는 시험 호출 수
+CIRCUIT_OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', '30'))
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get('CIRCUIT_HALF_OPEN_PROBES', '2'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+# 메트릭 값 (chatbot_provider_circuit_state)
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_OPEN_ERROR_CODE = 'circuit_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷이 열려 있어 호출을 보내지 않고 실패"""
+
+    error_code = CIRCUIT_OPEN_ERROR_CODE
+
+    def __init__(self, provider: str, model: str, retry_after: float):
+        self.provider = provider
+        self.model = model
+        self.retry_after = retry_after
+        target = f'{provider}/{model}' if model else provider
+        super().__init__(
+            f'{target} API가 일시적으로 불안정해 호출을 중단했습니다. 약 {max(1, round(retry_after))}초 후 다시 시도해주세요.'
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """평가 결과 등 dict 형식 실패 응답"""
+        return {'success': False, 'error': str(self), 'error_code': self.error_code, 'retry_after': round(self.retry_after, 1)}
+
+
+class CircuitBreaker:
+    """(프로바이더, 모델) 하나의 서킷 (스레드 안전)"""
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.state = CLOSED
+        # 최근 호출 결과: (시각, 실패 여부, 느린 호출 여부)
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str, reason: str = '') -> None:
+        """상태 전환 (락을 잡은 상태에서 호출)"""
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.trips += 1
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        else:
+            self._outcomes.clear()
+        if METRICS_ENABLED:
+            PROVIDER_CIRCUIT_STATE.labels(self.provider, self.model).set(STATE_VALUES[state])
+        log = logger.warning if state == OPEN else logger.info
+        log(
+            "[서킷 브레이커] %s/%s %s -> %s %s", self.provider, self.model, previous, state, reason,
+            extra={'provider': self.provider, 'model': self.model, 'circuit_state': state, 'reason': reason}
+        )
+
+    def before_call(self) -> bool:
+        """
+        호출 허용 여부 확인
+
+        Returns:
+            시험 호출(half_open)이면 True, 일반 호출이면 False
+
+        Raises:
+            CircuitOpenError: 차단 중이거나 시험 호출이 이미 진행 중인 경우
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN:
+                remaining = CIRCUIT_OPEN_SECONDS - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self._reject(remaining)
+                self._set_state(HALF_OPEN, 'open 시간 경과')
+            if self._probes_in_flight >= CIRCUIT_HALF_OPEN_PROBES:
+                self._reject(1.0)
+            self._probes_in_flight += 1
+            return True
+
+    def _reject(self, retry_after: float) -> None:
+        if METRICS_ENABLED:
+            PROVIDER_CIRCUIT_REJECTIONS.labels(self.provider, self.model).inc()
+        raise CircuitOpenError(self.provider, self.model, retry_after)
+
+    def record(self, probe: bool, failed: bool, slow: bool) -> None:
+        """호출 결과 기록 (before_call이 돌려준 probe 값을 그대로 전달)"""
+        now = time.monotonic()
+        with self._lock:
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self.state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._set_state(OPEN, '시험 호출 실패' if failed else '시험 호출 지연')
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= CIRCUIT_HALF_OPEN_PROBES:
+                    self._set_state(CLOSED, '시험 호출 성공')
+                return
+            if self.state != CLOSED:
+                # 차단 전에 시작된 호출의 결과는 판단에 쓰지 않음
+                return
+            self._outcomes.append((now, failed, slow))
+            self._prune(now)
+            calls = len(self._outcomes)
+            if calls < CIRCUIT_MIN_CALLS:
+                return
+            failures = sum(1 for _, f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, _, s in self._outcomes if s)
+            if failures / calls >= CIRCUIT_FAILURE_RATE:
+                self._set_state(OPEN, f'실패 {failures}/{calls}')
+            elif slow_calls / calls >= CIRCUIT_SLOW_CALL_RATE:
+                self._set_state(OPEN, f'느린 호출 {slow_calls}/{calls}')
+
+    def release(self, probe: bool) -> None:
+        """결과를 판단할 수 없이 끝난 호출 (시험 호출 자리만 반납)"""
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def current_state(self) -> str:
+        """현재 상태 (open 시간이 지났으면 다음 호출에서 half_open이 되므로 half_open으로 취급)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= CIRCUIT_OPEN_SECONDS:
+                return HALF_OPEN
+            return self.state
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - CIRCUIT_WINDOW_SECONDS
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._outcomes)
+            info = {
+                'provider': self.provider,
+                'model': self.model,
+                'state': self.state,
+                'calls': calls,
+                'failure_rate': round(sum(1 for _, f, _ in self._outcomes if f) / calls, 3) if calls else 0.0,
+                'slow_call_rate': round(sum(1 for _, _, s in self._outcomes if s) / calls, 3) if calls else 0.0,
+                'trips': self.trips,
+            }
+            if self.state == OPEN:
+                info['retry_after'] = round(max(0.0, CIRCUIT_OPEN_SECONDS - (time.monotonic() - self._opened_at)), 1)
+            return info
+
+
+class CircuitPermit:
+    """호출 하나의 허가 (http_client가 응답/예외를 받은 뒤 결과를 기록)"""
+
+    __slots__ = ('breaker', 'probe')
+
+    def __init__(self, breaker: CircuitBreaker, probe: bool):
+        self.breaker = breaker
+        self.probe = probe
+
+    def record_response(self, status_code: int, elapsed: float) -> None:
+        # 429는 속도 제한(재시도/속도 제한기가 처리)이고 4xx는 요청 문제이므로 실패로 보지 않음
+        self.breaker.record(self.probe, status_code >= 500, elapsed >= CIRCUIT_SLOW_CALL_SECONDS)
+
+    def record_exception(self, exc: BaseException) -> None:
+        if isinstance(exc, Exception):
+            self.breaker.record(self.probe, True, False)
+        else:
+            self.breaker.release(self.probe)
+
+
+class CircuitBreakerRegistry:
+    """(프로바이더, 모델)별 서킷 모음"""
+
+    def __init__(self):
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker_for(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(key, CircuitBreaker(provider, model))
+        return breaker
+
+    def acquire(self, url: str, payload: Any = None) -> Optional[CircuitPermit]:
+        """
+        호출 전에 서킷 확인 (비활성화되어 있으면 None)
+
+        Raises:
+            CircuitOpenError: 서킷이 열려 있는 경우
+        """
+        if not CIRCUIT_BREAKER_ENABLED:
+            return None
+        model = payload.get('model', '') if isinstance(payload, dict) else ''
+        breaker = self.breaker_for(provider_of(url), model)
+        return CircuitPermit(breaker, breaker.before_call())
+
+    def state_of(self, provider: str, model: str) -> str:
+        """(프로바이더, 모델)의 현재 상태 (호출한 적이 없으면 closed, 서킷을 새로 만들지 않음)"""
+        breaker = self._breakers.get((provider, model))
+        return breaker.current_state() if breaker is not None else CLOSED
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+circuit_breakers = CircuitBreakerRegistry()
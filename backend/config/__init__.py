@@ -2,6 +2,7 @@
 LLM 관련 설정 클래스들을 관리하는 모듈
 """
 from .llm_config import LLMRequestConfig, LLMResponse
+from .simulation_config import SimulationConfig
+from .session_config import SessionConfig
 
-__all__ = ['LLMRequestConfig', 'LLMResponse']
-
+__all__ = ['LLMRequestConfig', 'LLMResponse', 'SimulationConfig', 'SessionConfig']
@@ -22,6 +22,10 @@ class LLMRequestConfig:
     temperature: float = 0.9  # GPT-5.2 권장 범위 (0.7-1.0), 다양성과 일관성의 균형
     top_p: float = 0.95  # GPT-5.2 권장 값, Nucleus sampling (0.0-1.0 범위)
     max_history_messages: int = 4  # 대화 히스토리에 포함할 최대 메시지 수
+    hedge: Optional[bool] = None  # 느린 호출에 헤지 요청 사용 여부 (None이면 HEDGE_ENABLED 설정)
+    tier: Optional[str] = None  # 모델 티어 'fast', 'standard', 'quality' (None이면 프로바이더별 기본 티어)
+    model: Optional[str] = None  # 호출할 모델 (모델 라우터가 정함, None이면 티어의 첫 번째 모델)
+    fallback_api_key: Optional[str] = None  # 다른 프로바이더 API 키 (지정하면 그 프로바이더로 대체 허용)
     
     def __post_init__(self):
         """유효성 검사"""
@@ -31,6 +35,8 @@ class LLMRequestConfig:
             raise ValueError("bot_number는 1 또는 2여야 합니다.")
         if self.model_type not in ['openai', 'anthropic', 'google']:
             raise ValueError("model_type은 'openai', 'anthropic', 'google' 중 하나여야 합니다.")
+        if self.tier is not None and self.tier not in ['fast', 'standard', 'quality']:
+            raise ValueError("tier는 'fast', 'standard', 'quality' 중 하나여야 합니다.")
 
 
 @dataclass
@@ -45,6 +51,10 @@ class LLMResponse:
     prompt_tokens: Optional[int] = None  # 입력(프롬프트) 토큰 수
     completion_tokens: Optional[int] = None  # 출력(생성) 토큰 수
     total_tokens: Optional[int] = None  # 총 토큰 수
+    cached_tokens: Optional[int] = None  # 입력 토큰 중 프롬프트 캐시에서 읽은 토큰 수 (prompt_tokens에 포함)
+    cache_creation_tokens: Optional[int] = None  # 입력 토큰 중 새로 캐시에 기록한 토큰 수 (Anthropic, prompt_tokens에 포함)
+    error_code: Optional[str] = None  # 실패 종류 구분용 코드 (예: 'circuit_open')
+    model: Optional[str] = None  # 응답을 생성한 모델 (모델 라우팅/프로바이더 대체 결과)
     
     def __post_init__(self):
         """유효성 검사"""
@@ -0,0 +1,91 @@
+"""
+서버 측 대화 세션 설정을 관리하는 클래스
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class SessionConfig:
+    """
+    /api/sessions로 만든 대화 세션 하나에 고정되는 설정
+    (/api/simulations와 같은 필드 이름을 사용, 서버가 응답을 생성하지 않는 챗봇은 API 키를 생략할 수 있음)
+    """
+    topic: str
+    persona1: str
+    persona2: str
+    api_key1: Optional[str] = None
+    api_key2: Optional[str] = None
+    model_type1: str = 'openai'
+    model_type2: str = 'openai'
+    temperature1: float = 1.2
+    temperature2: float = 1.2
+    top_p1: float = 0.9
+    top_p2: float = 0.9
+    custom_system_prompt: Optional[str] = None
+    hedge: Optional[bool] = None  # 턴마다 헤지 요청 사용 여부 (None이면 HEDGE_ENABLED 설정)
+    tier: Optional[str] = None  # 모델 티어 'fast', 'standard', 'quality' (None이면 프로바이더별 기본 티어)
+    allow_fallback: bool = False  # 프로바이더가 불안정하면 상대 챗봇의 API 키로 다른 프로바이더 대체 허용
+
+    def __post_init__(self):
+        """유효성 검사"""
+        if not self.api_key1 and not self.api_key2:
+            raise ValueError("API 키는 필수입니다.")
+        if not self.topic or not self.persona1 or not self.persona2:
+            raise ValueError("주제와 페르소나가 필요합니다.")
+        for model_type in (self.model_type1, self.model_type2):
+            if model_type not in ['openai', 'anthropic', 'google']:
+                raise ValueError("model_type은 'openai', 'anthropic', 'google' 중 하나여야 합니다.")
+        if self.tier is not None and self.tier not in ['fast', 'standard', 'quality']:
+            raise ValueError("tier는 'fast', 'standard', 'quality' 중 하나여야 합니다.")
+        for temperature in (self.temperature1, self.temperature2):
+            if temperature < 0.0 or temperature > 2.0:
+                raise ValueError("temperature는 0.0 ~ 2.0 범위여야 합니다.")
+        for top_p in (self.top_p1, self.top_p2):
+            if top_p < 0.0 or top_p > 1.0:
+                raise ValueError("top_p는 0.0 ~ 1.0 범위여야 합니다.")
+
+    def bot_settings(self, bot_number: int) -> dict:
+        """챗봇 번호에 해당하는 API 키/모델/페르소나/샘플링 설정 반환"""
+        if bot_number == 1:
+            return {
+                'api_key': self.api_key1,
+                'model_type': self.model_type1,
+                'persona': self.persona1,
+                'other_persona': self.persona2,
+                'temperature': self.temperature1,
+                'top_p': self.top_p1,
+                'fallback_api_key': self.api_key2 if self.allow_fallback else None,
+            }
+        return {
+            'api_key': self.api_key2,
+            'model_type': self.model_type2,
+            'persona': self.persona2,
+            'other_persona': self.persona1,
+            'temperature': self.temperature2,
+            'top_p': self.top_p2,
+            'fallback_api_key': self.api_key1 if self.allow_fallback else None,
+        }
+
+    def text_size(self) -> int:
+        """세션 메모리 한도 계산용 문자열 크기 (UTF-8 바이트)"""
+        texts = (self.topic, self.persona1, self.persona2, self.custom_system_prompt or '')
+        return sum(len(text.encode('utf-8')) for text in texts)
+
+    def to_dict(self) -> dict:
+        """API 응답용 딕셔너리 (API 키는 포함하지 않음)"""
+        return {
+            'topic': self.topic,
+            'persona1': self.persona1,
+            'persona2': self.persona2,
+            'model_type1': self.model_type1,
+            'model_type2': self.model_type2,
+            'bots_with_api_key': [n for n, key in ((1, self.api_key1), (2, self.api_key2)) if key],
+            'temperature1': self.temperature1,
+            'temperature2': self.temperature2,
+            'top_p1': self.top_p1,
+            'top_p2': self.top_p2,
+            'has_custom_system_prompt': self.custom_system_prompt is not None,
+            'tier': self.tier,
+            'allow_fallback': self.allow_fallback,
+        }
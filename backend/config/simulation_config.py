@@ -0,0 +1,84 @@
+"""
+서버 측 시뮬레이션 설정을 관리하는 클래스
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# 작업 하나에서 실행할 수 있는 최대 세트 수 (세트마다 결과를 메모리에 보관하고 워커 풀을 차지하므로)
+SIMULATION_MAX_SETS = int(os.environ.get('SIMULATION_MAX_SETS', '100'))
+# 챗봇 하나의 최대 턴 수 (세트 하나가 워커 풀 스레드를 차지하는 시간과 프로바이더 호출 수의 상한)
+SIMULATION_MAX_TURNS_PER_BOT = int(os.environ.get('SIMULATION_MAX_TURNS_PER_BOT', '50'))
+
+
+@dataclass
+class SimulationConfig:
+    """
+    /api/simulations 요청 하나에 필요한 모든 설정을 담는 클래스
+    (/api/estimate-tokens와 같은 필드 이름을 사용)
+    """
+    api_key1: str
+    api_key2: str
+    topic: str
+    persona1: str
+    persona2: str
+    model_type1: str = 'openai'
+    model_type2: str = 'openai'
+    turns_per_bot: int = 3
+    number_of_sets: int = 2
+    temperature1: float = 1.2
+    temperature2: float = 1.2
+    top_p1: float = 0.9
+    top_p2: float = 0.9
+    custom_system_prompt: Optional[str] = None
+    hedge: Optional[bool] = None  # 턴마다 헤지 요청 사용 여부 (None이면 HEDGE_ENABLED 설정)
+    tier: Optional[str] = None  # 모델 티어 'fast', 'standard', 'quality' (None이면 프로바이더별 기본 티어)
+    allow_fallback: bool = False  # 프로바이더가 불안정하면 상대 챗봇의 API 키로 다른 프로바이더 대체 허용
+
+    def __post_init__(self):
+        """유효성 검사"""
+        if not self.api_key1 or not self.api_key2:
+            raise ValueError("API 키는 필수입니다.")
+        if not self.topic or not self.persona1 or not self.persona2:
+            raise ValueError("주제와 페르소나가 필요합니다.")
+        for model_type in (self.model_type1, self.model_type2):
+            if model_type not in ['openai', 'anthropic', 'google']:
+                raise ValueError("model_type은 'openai', 'anthropic', 'google' 중 하나여야 합니다.")
+        if self.tier is not None and self.tier not in ['fast', 'standard', 'quality']:
+            raise ValueError("tier는 'fast', 'standard', 'quality' 중 하나여야 합니다.")
+        if not isinstance(self.turns_per_bot, int) or self.turns_per_bot < 1:
+            raise ValueError("turns_per_bot은 1 이상의 정수여야 합니다.")
+        if self.turns_per_bot > SIMULATION_MAX_TURNS_PER_BOT:
+            raise ValueError(f"turns_per_bot은 최대 {SIMULATION_MAX_TURNS_PER_BOT}입니다.")
+        if not isinstance(self.number_of_sets, int) or self.number_of_sets < 1:
+            raise ValueError("number_of_sets는 1 이상의 정수여야 합니다.")
+        if self.number_of_sets > SIMULATION_MAX_SETS:
+            raise ValueError(f"number_of_sets는 최대 {SIMULATION_MAX_SETS}입니다.")
+        for temperature in (self.temperature1, self.temperature2):
+            if temperature < 0.0 or temperature > 2.0:
+                raise ValueError("temperature는 0.0 ~ 2.0 범위여야 합니다.")
+        for top_p in (self.top_p1, self.top_p2):
+            if top_p < 0.0 or top_p > 1.0:
+                raise ValueError("top_p는 0.0 ~ 1.0 범위여야 합니다.")
+
+    def bot_settings(self, bot_number: int) -> dict:
+        """챗봇 번호에 해당하는 API 키/모델/페르소나/샘플링 설정 반환"""
+        if bot_number == 1:
+            return {
+                'api_key': self.api_key1,
+                'model_type': self.model_type1,
+                'persona': self.persona1,
+                'other_persona': self.persona2,
+                'temperature': self.temperature1,
+                'top_p': self.top_p1,
+                'fallback_api_key': self.api_key2 if self.allow_fallback else None,
+            }
+        return {
+            'api_key': self.api_key2,
+            'model_type': self.model_type2,
+            'persona': self.persona2,
+            'other_persona': self.persona1,
+            'temperature': self.temperature2,
+            'top_p': self.top_p2,
+            'fallback_api_key': self.api_key1 if self.allow_fallback else None,
+        }
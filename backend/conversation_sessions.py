@@ -0,0 +1,382 @@
+"""
+서버 측 대화 세션 저장소
+- 세션을 만들 때 주제/페르소나/API 키/프롬프트를 한 번만 보내고, 이후 턴 요청은 새 메시지만 주고받음
+- 대화 기록은 서버가 보관하므로 턴 요청 본문 크기가 대화 길이와 관계없이 일정함
+- 마지막 사용 후 CONVERSATION_SESSION_TTL초가 지나면 만료 (API 키도 함께 삭제)
+- 세션 수(CONVERSATION_SESSION_MAX_SESSIONS)와 보관 문자열 크기(CONVERSATION_SESSION_MAX_BYTES)를 넘으면
+  가장 오래 사용하지 않은 세션부터 삭제
+세션은 SQLite 파일(CONVERSATION_SESSION_PATH)에 보관하므로 여러 워커(serve.py)가 같은 세션을 사용하고,
+워커가 교체되거나 서버를 다시 시작해도 유지됩니다.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+
+from config import SessionConfig
+from metrics import CONVERSATION_SESSION_EVICTIONS, CONVERSATION_SESSIONS, METRICS_ENABLED
+from structured_logging import get_logger
+
+logger = get_logger('sessions')
+
+# 마지막 요청 이후 세션을 유지하는 시간 (초)
+CONVERSATION_SESSION_TTL = float(os.environ.get('CONVERSATION_SESSION_TTL', '1800'))
+# 보관할 최대 세션 수
+CONVERSATION_SESSION_MAX_SESSIONS = int(os.environ.get('CONVERSATION_SESSION_MAX_SESSIONS', '1000'))
+# 모든 세션의 대화 기록/설정 문자열 크기 합계 상한 (UTF-8 바이트)
+CONVERSATION_SESSION_MAX_BYTES = int(os.environ.get('CONVERSATION_SESSION_MAX_BYTES', str(64 * 1024 * 1024)))
+# 세션 하나의 최대 메시지 수
+CONVERSATION_SESSION_MAX_MESSAGES = int(os.environ.get('CONVERSATION_SESSION_MAX_MESSAGES', '500'))
+# 턴 처리 중 표시의 유효 시간 (초, 워커가 턴 도중 종료되어도 세션이 계속 잠겨 있지 않도록)
+CONVERSATION_SESSION_TURN_TIMEOUT = float(os.environ.get('CONVERSATION_SESSION_TURN_TIMEOUT', '300'))
+# 세션을 보관할 SQLite 파일 경로 (API 키가 들어 있으므로 소유자만 읽을 수 있게 만듦)
+# 상대 경로는 실행 위치와 관계없이 이 모듈이 있는 디렉터리 기준,
+# 빈 값이면 프로세스 메모리에 보관 (워커끼리 공유되지 않으므로 워커가 하나일 때만 사용)
+CONVERSATION_SESSION_PATH = os.environ.get('CONVERSATION_SESSION_PATH', 'conversation_sessions.sqlite3')
+if CONVERSATION_SESSION_PATH:
+    CONVERSATION_SESSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), CONVERSATION_SESSION_PATH)
+
+
+class SessionConflict(Exception):
+    """같은 세션의 턴이 이미 처리 중이거나 클라이언트가 알고 있는 대화 길이가 서버와 다를 때"""
+
+    def __init__(self, message: str, message_count: int):
+        super().__init__(message)
+        self.message_count = message_count
+
+
+def _message_size(message: Dict) -> int:
+    return len(message['text'].encode('utf-8'))
+
+
+def validate_messages(messages) -> List[Dict]:
+    """
+    요청의 메시지 목록 검사 후 {'bot', 'text'}만 남긴 복사본 반환
+
+    Raises:
+        ValueError: 형식이 맞지 않을 때
+    """
+    if messages is None:
+        return []
+    if not isinstance(messages, list):
+        raise ValueError("messages는 목록이어야 합니다.")
+    result = []
+    for message in messages:
+        if not isinstance(message, dict) or message.get('bot') not in [1, 2]:
+            raise ValueError("메시지의 bot은 1 또는 2여야 합니다.")
+        if not isinstance(message.get('text'), str) or not message['text']:
+            raise ValueError("메시지의 text가 필요합니다.")
+        result.append({'bot': message['bot'], 'text': message['text']})
+    return result
+
+
+class ConversationSession:
+    """세션 하나의 설정과 대화 기록 (저장소에서 읽은 시점의 복사본)"""
+
+    def __init__(self, config: SessionConfig, messages: List[Dict], session_id: Optional[str] = None,
+                 created_at: Optional[float] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.config = config
+        self.messages = messages
+        self.created_at = created_at if created_at is not None else time.time()
+        self.size = config.text_size() + sum(_message_size(m) for m in messages)
+        # begin_turn에서 받은 턴 ID (finish_turn이 다른 턴의 기록을 바꾸지 않도록)
+        self.turn_id: Optional[str] = None
+
+    def next_bot(self, pending: List[Dict]) -> int:
+        """기록(+ 이번 턴에 추가할 메시지)의 마지막 발언자가 아닌 챗봇 번호 (빈 대화는 1)"""
+        last = pending[-1] if pending else (self.messages[-1] if self.messages else None)
+        return 1 if last is None else 3 - last['bot']
+
+    def to_dict(self, include_messages: bool = True) -> Dict:
+        """API 응답용 딕셔너리 변환 (API 키는 포함하지 않음)"""
+        result = {
+            'session_id': self.session_id,
+            'created_at': self.created_at,
+            'message_count': len(self.messages),
+            'expires_in': CONVERSATION_SESSION_TTL,
+            'config': self.config.to_dict(),
+        }
+        if include_messages:
+            result['messages'] = list(self.messages)
+        return result
+
+
+class ConversationSessionStore:
+    """
+    SQLite 대화 세션 보관소 (스레드/프로세스 안전)
+    여러 워커가 같은 파일을 열고, 턴 시작/종료는 BEGIN IMMEDIATE 트랜잭션으로 처리해 워커 사이에서도 한 번에 하나만 진행됨
+    마지막 사용 시각(last_used) 인덱스 순서로 만료/한도 초과 세션을 지움
+    stats()의 카운터는 요청을 받은 워커의 값이고, 세션 수와 크기는 모든 워커의 합계
+    """
+
+    def __init__(
+        self,
+        ttl: float = CONVERSATION_SESSION_TTL,
+        max_sessions: int = CONVERSATION_SESSION_MAX_SESSIONS,
+        max_bytes: int = CONVERSATION_SESSION_MAX_BYTES,
+        max_messages: int = CONVERSATION_SESSION_MAX_MESSAGES,
+        path: Optional[str] = CONVERSATION_SESSION_PATH,
+        turn_timeout: float = CONVERSATION_SESSION_TURN_TIMEOUT
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.path = path
+        self.turn_timeout = turn_timeout
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        self._counters = {
+            'created': 0,
+            'deleted': 0,
+            'expired': 0,
+            'capacity_evictions': 0,
+            'turns': 0,
+            'conflicts': 0,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        """SQLite 연결 반환 (프로세스마다 처음 호출 시 생성, _lock을 잡은 상태에서 호출)"""
+        if self._db is not None and self._db_pid == os.getpid():
+            return self._db
+        if self.path:
+            # API 키가 저장되므로 소유자만 읽고 쓸 수 있는 파일로 만듦 (WAL 파일도 같은 권한을 따름)
+            os.close(os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600))
+        # 트랜잭션은 직접 시작 (isolation_level=None)
+        db = sqlite3.connect(self.path or ':memory:', check_same_thread=False, timeout=5, isolation_level=None)
+        if self.path:
+            db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, config TEXT NOT NULL, messages TEXT NOT NULL, '
+            'size INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL, '
+            'turn_id TEXT, turn_started REAL)'
+        )
+        db.execute('CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)')
+        self._db = db
+        self._db_pid = os.getpid()
+        return db
+
+    def _row_session(self, row: Tuple) -> ConversationSession:
+        session_id, config, messages, created_at = row
+        return ConversationSession(SessionConfig(**json.loads(config)), json.loads(messages), session_id, created_at)
+
+    def create(self, config: SessionConfig, messages: Optional[List[Dict]] = None) -> ConversationSession:
+        """
+        세션 생성 (messages로 이어서 진행할 기존 대화를 넘길 수 있음)
+
+        Raises:
+            ValueError: 메시지 수나 크기가 한도를 넘을 때
+        """
+        messages = list(messages or [])
+        if len(messages) > self.max_messages:
+            raise ValueError(f"세션의 메시지는 최대 {self.max_messages}개입니다.")
+        session = ConversationSession(config, messages)
+        if session.size > self.max_bytes:
+            raise ValueError("세션 설정과 대화 기록이 너무 큽니다.")
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.execute(
+                    'INSERT INTO sessions (session_id, config, messages, size, created_at, last_used) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (session.session_id, json.dumps(asdict(config), ensure_ascii=False),
+                     json.dumps(messages, ensure_ascii=False), session.size, session.created_at, now)
+                )
+                self._counters['created'] += 1
+                self._evict(db, now)
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """세션 조회 (만료됐거나 없으면 None, 조회하면 유효 시간이 다시 시작됨)"""
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                self._expire(db, now)
+                row = db.execute(
+                    'SELECT session_id, config, messages, created_at FROM sessions WHERE session_id = ?', (session_id,)
+                ).fetchone()
+                if row is not None:
+                    db.execute('UPDATE sessions SET last_used = ? WHERE session_id = ?', (now, session_id))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return self._row_session(row) if row is not None else None
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            db = self._connection()
+            deleted = db.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,)).rowcount > 0
+            if deleted:
+                self._counters['deleted'] += 1
+                self._update_gauge(db)
+            return deleted
+
+    def begin_turn(self, session: ConversationSession, new_messages: List[Dict],
+                   expected_count: Optional[int] = None) -> List[Dict]:
+        """
+        턴 시작: 같은 세션의 다른 턴을 막고(다른 워커 포함), 응답 생성에 쓸 대화 기록(기존 기록 + new_messages)을 반환
+        기록은 finish_turn에서 응답이 성공했을 때만 바뀌므로, 실패한 턴은 같은 요청으로 다시 보낼 수 있음
+        session의 대화 기록은 저장소의 최신 기록으로 바뀜
+
+        Args:
+            new_messages: 이번 턴 전에 추가할 메시지 (다른 챗봇 등 서버 밖에서 만든 발언)
+            expected_count: 클라이언트가 알고 있는 현재 메시지 수 (다르면 SessionConflict)
+
+        Raises:
+            SessionConflict: 턴이 이미 처리 중이거나 expected_count가 다를 때
+            ValueError: 메시지 수가 한도를 넘거나 세션이 그 사이 삭제되었을 때
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute(
+                    'SELECT messages, turn_id, turn_started FROM sessions WHERE session_id = ?', (session.session_id,)
+                ).fetchone()
+                if row is None:
+                    raise ValueError("대화 세션을 찾을 수 없습니다. (만료되었거나 삭제됨)")
+                session.messages = json.loads(row[0])
+                count = len(session.messages)
+                if row[1] is not None and row[2] > now - self.turn_timeout:
+                    self._counters['conflicts'] += 1
+                    raise SessionConflict("이 세션의 이전 턴을 처리 중입니다.", count)
+                if expected_count is not None and expected_count != count:
+                    self._counters['conflicts'] += 1
+                    raise SessionConflict(f"대화 기록이 서버와 다릅니다. (서버 메시지 수: {count})", count)
+                if count + len(new_messages) + 1 > self.max_messages:
+                    raise ValueError(f"세션의 메시지는 최대 {self.max_messages}개입니다.")
+                session.turn_id = uuid.uuid4().hex
+                db.execute(
+                    'UPDATE sessions SET turn_id = ?, turn_started = ?, last_used = ? WHERE session_id = ?',
+                    (session.turn_id, now, now, session.session_id)
+                )
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return session.messages + new_messages
+
+    def finish_turn(self, session: ConversationSession, appended: Optional[List[Dict]]) -> None:
+        """
+        턴 종료: 성공한 턴이면 appended(추가 메시지 + 생성된 응답)를 기록에 붙임 (실패하면 None)
+        턴 처리 중 표시가 시간 초과로 다른 턴에 넘어갔거나 세션이 삭제되었으면 저장소의 기록은 바꾸지 않음
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute(
+                    'SELECT messages, size, turn_id FROM sessions WHERE session_id = ?', (session.session_id,)
+                ).fetchone()
+                owned = row is not None and session.turn_id is not None and row[2] == session.turn_id
+                if owned:
+                    messages, size = json.loads(row[0]), row[1]
+                    if appended:
+                        messages.extend(appended)
+                        size += sum(_message_size(m) for m in appended)
+                    db.execute(
+                        'UPDATE sessions SET messages = ?, size = ?, last_used = ?, turn_id = NULL, turn_started = NULL '
+                        'WHERE session_id = ?',
+                        (json.dumps(messages, ensure_ascii=False), size, now, session.session_id)
+                    )
+                elif row is not None and appended:
+                    logger.warning(
+                        "[세션 턴 무시] %s 턴 처리 시간이 초과되어 응답을 기록하지 않음", session.session_id,
+                        extra={'session_id': session.session_id}
+                    )
+                if appended and (owned or row is None):
+                    # 턴 처리 중에 삭제(만료/한도 초과/DELETE)된 세션도 응답에는 이번 턴까지의 기록을 반영
+                    session.messages.extend(appended)
+                    self._counters['turns'] += 1
+                self._evict(db, now)
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            session.turn_id = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            db = self._connection()
+            sessions, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions').fetchone()
+            return {
+                'sessions': sessions,
+                'bytes': size,
+                'ttl': self.ttl,
+                'max_sessions': self.max_sessions,
+                'max_bytes': self.max_bytes,
+                'max_messages': self.max_messages,
+                **self._counters,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._connection()
+            db.execute('DELETE FROM sessions')
+            self._update_gauge(db)
+
+    def _expire(self, db: sqlite3.Connection, now: float) -> None:
+        """만료된 세션 삭제 (턴을 처리 중인 세션은 건너뜀, 트랜잭션 안에서 호출)"""
+        rows = db.execute(
+            'SELECT session_id FROM sessions WHERE last_used < ? AND (turn_id IS NULL OR turn_started < ?)',
+            (now - self.ttl, now - self.turn_timeout)
+        ).fetchall()
+        self._delete(db, [(row[0], 'expired') for row in rows])
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        """
+        만료된 세션과 한도를 넘는 세션을 오래 사용하지 않은 순서로 삭제 (트랜잭션 안에서 호출)
+        턴을 처리 중인 세션은 건너뜀
+        """
+        self._expire(db, now)
+        count, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions').fetchone()
+        victims = []
+        if count > self.max_sessions or size > self.max_bytes:
+            rows = db.execute(
+                'SELECT session_id, size FROM sessions WHERE turn_id IS NULL OR turn_started < ? ORDER BY last_used',
+                (now - self.turn_timeout,)
+            ).fetchall()
+            for session_id, session_size in rows:
+                if count <= self.max_sessions and size <= self.max_bytes:
+                    break
+                victims.append((session_id, 'capacity'))
+                count -= 1
+                size -= session_size
+        self._delete(db, victims)
+        self._update_gauge(db)
+
+    def _delete(self, db: sqlite3.Connection, victims: List[Tuple[str, str]]) -> None:
+        for session_id, reason in victims:
+            db.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            self._counters['expired' if reason == 'expired' else 'capacity_evictions'] += 1
+            if METRICS_ENABLED:
+                CONVERSATION_SESSION_EVICTIONS.labels(reason).inc()
+            logger.debug(
+                "[세션 삭제] %s (%s)", session_id, reason,
+                extra={'session_id': session_id, 'reason': reason}
+            )
+
+    def _update_gauge(self, db: sqlite3.Connection) -> None:
+        if METRICS_ENABLED:
+            CONVERSATION_SESSIONS.labels().set(db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0])
+
+
+conversation_sessions = ConversationSessionStore()
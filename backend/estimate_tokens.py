@@ -1,10 +1,29 @@
 """
 토큰 사용량 예측을 위한 유틸리티 함수
 """
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
 import tiktoken
-from typing import Dict, List, Optional
+
+from prompt_templates import (
+    CONVERSATION_SYSTEM, OPENAI_IDENTITY_SYSTEM, OPENAI_FIRST_USER, OPENAI_FOLLOWUP_USER,
+    OPENAI_HISTORY_SELF, OPENAI_HISTORY_OTHER, OPENAI_CONTEXT_SELF, OPENAI_CONTEXT_OTHER,
+    OPENAI_RECENT_CONTEXT, OPENAI_MENTIONED_INFO, ANTHROPIC_FIRST_USER, ANTHROPIC_HISTORY_HEADER,
+    ANTHROPIC_HISTORY_SELF, ANTHROPIC_HISTORY_OTHER, ANTHROPIC_TURN_INSTRUCTION,
+    OPENAI_HISTORY_MESSAGES, OPENAI_CONTEXT_MESSAGES, MENTIONED_INFO_CHARS
+)
+from usage_calibration import UsageCalibration
+
+# 토큰 수를 기억해 둘 서로 다른 프롬프트 텍스트의 최대 개수
+TOKEN_COUNT_CACHE_SIZE = 1024
+# Google 요청의 히스토리 메시지 수 (아직 응답 생성을 지원하지 않아 기존 추정값 유지)
+GOOGLE_HISTORY_MESSAGES = 4
+# 예측 여유분 (15% 증가)
+SAFETY_MARGIN = 1.15
 
 
+@lru_cache(maxsize=None)
 def get_encoding_for_model(model_type: str) -> tiktoken.Encoding:
     """
     모델 타입에 맞는 tiktoken 인코딩 반환
@@ -13,7 +32,7 @@ def get_encoding_for_model(model_type: str) -> tiktoken.Encoding:
         model_type: 'openai', 'anthropic', 'google'
     
     Returns:
-        tiktoken.Encoding 객체
+        tiktoken.Encoding 객체 (모델 타입별로 한 번만 생성해서 재사용)
     """
     # OpenAI와 Anthropic은 cl100k_base 인코딩 사용 (GPT-3.5, GPT-4, GPT-4o, GPT-5.1, GPT-5.2, Claude)
     # Google은 별도 인코딩이지만, 대략적인 추정을 위해 cl100k_base 사용
@@ -39,86 +58,46 @@ def count_tokens(text: str, model_type: str = 'openai') -> int:
     return len(encoding.encode(text))
 
 
-def build_system_prompt(topic: str, persona: str, bot_number: int, other_bot_number: int) -> str:
-    """
-    시스템 프롬프트 생성 (실제 generate_llm_response.py와 동일)
-    
-    Args:
-        topic: 주제
-        persona: 페르소나
-        bot_number: 챗봇 번호 (1 or 2)
-        other_bot_number: 상대방 챗봇 번호
-    
-    Returns:
-        시스템 프롬프트 문자열
-    """
-    return f"""당신은 챗봇 {bot_number}입니다. {persona}의 역할을 맡고 있습니다.
-
-현재 상황:
-- 주제: {topic}
-- 당신은 챗봇 {bot_number} ({persona})
-- 상대방은 챗봇 {other_bot_number}
-- 두 챗봇이 {topic}에 대해 대화를 나누고 있습니다.
-
-당신의 역할 (매우 중요):
-- 이것은 단순한 독백이 아닌 **실제 대화**입니다.
-- 상대방(챗봇 {other_bot_number})의 발언에 **반드시 직접적으로 반응**해야 합니다.
-- 상대방의 말에 대해 질문하거나, 공감하거나, 동의하거나, 반대 의견을 제시하거나, 상대방의 말을 인용해야 합니다.
-- 절대로 주제에 대해 독립적으로 말만 하면 안 됩니다. 상대방과의 상호작용이 필수입니다.
-- "그렇긴 하지만", "맞는 말이에요", "그런데", "그렇다면" 같은 연결어를 사용하여 상대방의 말과 연결하세요.
-- {persona}의 관점을 유지하면서도 상대방과 소통해야 합니다.
-
-대화 예시 (올바른 방식):
-- "그 말에 동의해요. 하지만 한 가지 더 생각해볼 점은..."
-- "흥미로운 관점이네요. 그렇다면 ...에 대해서는 어떻게 생각하세요?"
-- "그 부분은 다르게 볼 수도 있을 것 같아요. 예를 들어..."
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def _count_template_tokens(text: str, model_type: str) -> int:
+    """슬롯 값 등 짧은 텍스트의 토큰 수 (같은 텍스트는 한 번만 토큰화)"""
+    return count_tokens(text, model_type)
 
-대화 예시 (잘못된 방식 - 하지 마세요):
-- 주제에 대해 독립적으로 의견만 말하기
-- 상대방의 발언을 무시하고 자신의 생각만 말하기
 
-절대적으로 지켜야 할 규칙:
-1. 반드시 한국어로만 응답하세요. 영어, 일본어, 중국어 등 다른 언어는 절대 사용하지 마세요.
-2. 반드시 완전한 문장으로 끝나야 합니다. 마침표(.), 느낌표(!), 물음표(?) 중 하나로 끝나야 합니다.
-3. 절대로 문장 중간에 끊기면 안 됩니다. 토큰 제한이 있어도 반드시 완전한 문장을 만들어야 합니다.
-4. 한 번에 1-2문장으로만 응답하세요. 더 길게 쓰지 마세요.
-5. **상대방의 발언에 직접적으로 반응하고, 질문하거나 공감하거나 동의하거나 반대하세요.**
-6. {persona}의 관점을 간단히 표현하세요.
-7. 긴 설명이나 나열은 절대 하지 마세요.
+@lru_cache(maxsize=None)
+def _token_counter(model_type: str) -> Callable[[str], int]:
+    """모델 타입별 토큰 카운터 (템플릿의 정적 토큰 수 계산에도 사용)"""
+    return lambda text: _count_template_tokens(text, model_type)
 
-중요: 
-- 응답은 반드시 한국어로만 작성해야 합니다.
-- 응답은 반드시 마침표, 느낌표, 또는 물음표로 끝나야 합니다. 불완전한 문장은 절대 허용되지 않습니다.
-- **상대방과의 실제 대화라는 것을 명확히 인지하고, 상대방의 발언에 반드시 반응하세요.**"""
 
-
-def build_user_message(topic: str, persona: str, is_first: bool, last_message_text: str = "", other_bot: int = 0) -> str:
+def _history_limit(model_type: str, max_history_messages: Optional[int]) -> Optional[int]:
     """
-    사용자 메시지 생성 (실제 generate_llm_response.py와 동일)
-    
-    Args:
-        topic: 주제
-        persona: 페르소나
-        is_first: 첫 메시지인지 여부
-        last_message_text: 마지막 메시지 텍스트 (첫 메시지가 아닐 경우)
-        other_bot: 상대방 챗봇 번호 (첫 메시지가 아닐 경우)
-    
-    Returns:
-        사용자 메시지 문자열
+    요청에 들어가는 히스토리 메시지 수 상한 (None이면 전체 대화)
+    지정하지 않으면 generate_llm_response와 같게: OpenAI는 최근 OPENAI_HISTORY_MESSAGES개, Anthropic은 전체 대화
     """
-    if is_first:
-        return f"주제 '{topic}'에 대해 {persona}로서 첫 번째 발언을 시작하세요. 반드시 한국어로만 1-2문장으로 완전한 문장으로 답하세요. 마침표로 끝나야 합니다."
-    else:
-        return f"""상대방(챗봇 {other_bot})이 방금 '{last_message_text}'라고 말했습니다.
+    if max_history_messages is not None:
+        return max_history_messages
+    if model_type == 'openai':
+        return OPENAI_HISTORY_MESSAGES
+    if model_type == 'anthropic':
+        return None
+    return GOOGLE_HISTORY_MESSAGES
 
-이제 당신이 응답해야 합니다. 다음 중 하나 이상을 반드시 포함하세요:
-- 상대방의 말에 질문하기 (예: "그렇다면 ...에 대해서는 어떻게 생각하세요?")
-- 상대방의 말에 공감하기 (예: "맞는 말이에요", "그렇네요")
-- 상대방의 말에 동의하기 (예: "동의합니다", "그 말이 맞아요")
-- 상대방의 말에 반대 의견 제시하기 (예: "그렇긴 하지만", "다른 관점에서 보면")
-- 상대방의 말을 인용하며 반응하기 (예: "말씀하신 ...에 대해 생각해보면")
 
-절대로 주제에 대해 독립적으로 말만 하지 마세요. 상대방의 발언 '{last_message_text}'에 반드시 직접적으로 반응하세요. 반드시 한국어로만 1-2문장으로 완전한 문장으로 답하세요. 마침표로 끝나야 합니다."""
+def _steady_state_index(model_type: str, history_limit: Optional[int], avg_message_tokens: int) -> int:
+    """
+    이 순서 이후에는 같은 챗봇의 (여유분 적용 전) 프롬프트 토큰 수가 두 메시지마다 일정하게 변하는 메시지 순서
+    - 히스토리 상한이 있으면 상한에 도달한 뒤로 변하지 않음
+    - 전체 대화를 보내면(Anthropic) 첫 메시지 이후로 자신과 상대방 발언 하나씩만큼 늘어남
+    OpenAI/Google은 맥락 요약 메시지 수와 이미 언급된 내용의 길이도 상한에 도달해야 함
+    """
+    saturated = [1]
+    if history_limit is not None:
+        saturated.append(history_limit)
+    if model_type != 'anthropic':
+        mentioned_full = -(-MENTIONED_INFO_CHARS // avg_message_tokens) if avg_message_tokens > 0 else 1
+        saturated.extend([OPENAI_CONTEXT_MESSAGES, mentioned_full])
+    return max(saturated)
 
 
 def estimate_message_tokens(
@@ -126,90 +105,175 @@ def estimate_message_tokens(
     topic: str,
     persona: str,
     previous_messages_count: int,
-    max_history_messages: int = 4,
+    max_history_messages: Optional[int] = None,
     is_first_message: bool = False,
     estimated_response_length: int = 150,  # 예상 응답 길이 (토큰) - 여유있게 설정
     bot_number: int = 1,
     other_bot_number: int = 2,
-    last_message_text: str = ""  # 마지막 메시지 텍스트 (히스토리 추정용)
+    other_persona: str = ""
 ) -> Dict[str, int]:
     """
     단일 메시지의 예상 토큰 수 계산
+    시스템 프롬프트와 지시문은 generate_llm_response와 같은 템플릿(prompt_templates)으로 계산하고,
+    아직 알 수 없는 대화 내용(히스토리, 마지막 발언)만 평균 메시지 길이로 추정합니다.
     
     Args:
         model_type: 모델 타입 ('openai', 'anthropic', 'google')
         topic: 주제
         persona: 페르소나
         previous_messages_count: 이전 메시지 수
-        max_history_messages: 최대 히스토리 메시지 수
+        max_history_messages: 최대 히스토리 메시지 수 (None이면 실제 요청과 같게:
+            OpenAI는 OPENAI_HISTORY_MESSAGES개, Anthropic은 전체 대화)
         is_first_message: 첫 메시지인지 여부
         estimated_response_length: 예상 응답 길이 (토큰)
         bot_number: 챗봇 번호 (1 or 2)
         other_bot_number: 상대방 챗봇 번호
-        last_message_text: 마지막 메시지 텍스트 (히스토리 추정용)
+        other_persona: 상대방 페르소나 (없으면 '알 수 없음'으로 표시됨)
     
     Returns:
         {'prompt_tokens': int, 'completion_tokens': int, 'total_tokens': int}
     """
-    encoding = get_encoding_for_model(model_type)
-    
-    # 시스템 프롬프트 토큰 수 (실제 사용되는 긴 프롬프트)
-    system_prompt = build_system_prompt(topic, persona, bot_number, other_bot_number)
-    system_tokens = len(encoding.encode(system_prompt))
+    prompt_tokens = _base_prompt_tokens(
+        model_type, topic, persona, previous_messages_count, _history_limit(model_type, max_history_messages),
+        is_first_message, estimated_response_length, bot_number, other_bot_number, other_persona
+    )
+    return _with_margin(prompt_tokens, estimated_response_length)
+
+
+def _with_margin(prompt_tokens: float, estimated_response_length: int) -> Dict[str, int]:
+    """여유분을 적용한 메시지 하나의 토큰 수 (출력 토큰은 예상 응답 길이)"""
+    prompt_tokens = int(prompt_tokens * SAFETY_MARGIN)
+    completion_tokens = int(estimated_response_length * SAFETY_MARGIN)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+
+def _base_prompt_tokens(
+    model_type: str,
+    topic: str,
+    persona: str,
+    previous_messages_count: int,
+    history_limit: Optional[int],
+    is_first_message: bool,
+    estimated_response_length: int,
+    bot_number: int,
+    other_bot_number: int,
+    other_persona: str
+) -> int:
+    """여유분을 적용하기 전의 프롬프트 토큰 수 (history_limit가 None이면 전체 대화를 히스토리로 계산)"""
+    counter = _token_counter(model_type)
+    other_persona_info = other_persona if other_persona else "알 수 없음"
     
-    # 사용자 메시지 토큰 수 (실제 사용되는 긴 메시지)
-    user_message = build_user_message(topic, persona, is_first_message, last_message_text, other_bot_number)
-    user_tokens = len(encoding.encode(user_message))
+    # 시스템 프롬프트 토큰 수 (실제 사용되는 기본 프롬프트)
+    system_tokens = CONVERSATION_SYSTEM.count_tokens(
+        counter, bot_number=bot_number, persona=persona, topic=topic, other_bot_number=other_bot_number
+    )
     
     # 대화 히스토리 토큰 수 (평균 메시지 길이 추정)
     # 실제 응답이 max_tokens까지 나올 수 있으므로, 히스토리 메시지도 같은 길이로 추정
     # 여유있게 추정하기 위해 1.2배 적용
     avg_message_tokens = int(estimated_response_length * 1.2)
-    history_messages_count = min(previous_messages_count, max_history_messages)
-    
-    # 히스토리 메시지 포맷팅 (실제 사용되는 형식)
-    # OpenAI/Anthropic: [챗봇 X의 발언] 또는 [당신(챗봇 X)의 이전 발언] 형식
-    # Google: 챗봇 X: [메시지] 형식
-    if model_type == 'openai' or model_type == 'anthropic':
-        # 각 히스토리 메시지마다 role + content 포맷팅
-        # 예: "[챗봇 1의 발언] {메시지}" 또는 "[당신(챗봇 2)의 이전 발언] {메시지}"
-        # 평균적으로 "[챗봇 X의 발언] " 또는 "[당신(챗봇 X)의 이전 발언] " 형식이 약 20 토큰 추가
-        history_prefix_tokens = 20  # "[챗봇 X의 발언] " 또는 "[당신(챗봇 X)의 이전 발언] " 형식
-        history_tokens = history_messages_count * (avg_message_tokens + history_prefix_tokens + 4)  # +4는 role 포맷팅
-    else:  # google
-        # Google: "챗봇 X: {메시지}\n" 형식
-        history_prefix_tokens = 10  # "챗봇 X: " 형식
-        history_tokens = history_messages_count * (avg_message_tokens + history_prefix_tokens)
+    history_messages_count = previous_messages_count if history_limit is None else min(previous_messages_count, history_limit)
+    # 최근 히스토리는 상대방 발언부터 거꾸로 번갈아 나오므로 자신의 발언은 절반(내림)
+    own_count = max(history_messages_count, 0) // 2
+    other_count = max(history_messages_count, 0) - own_count
+    text_tokens = {'text': avg_message_tokens}
     
-    # 모델별 입력 토큰 계산
     if model_type == 'openai':
-        # OpenAI: system + messages (각 메시지마다 role + content)
-        prompt_tokens = system_tokens + user_tokens + history_tokens + 4  # formatting overhead
-    elif model_type == 'anthropic':
-        # Anthropic: system + messages
+        # OpenAI: 시스템 프롬프트 뒤에 정체성 지침이 붙고, 히스토리는 발언마다 별도 메시지 (+4는 role 포맷팅)
+        system_tokens = OPENAI_IDENTITY_SYSTEM.count_tokens(
+            counter, slot_tokens={'system_prompt': system_tokens},
+            bot_number=bot_number, persona=persona, other_bot_number=other_bot_number,
+            other_persona=other_persona_info, other_persona_suffix=f" ({other_persona})" if other_persona else ""
+        )
+        own_tokens = OPENAI_HISTORY_SELF.count_tokens(counter, slot_tokens=text_tokens, bot_number=bot_number, persona=persona)
+        other_tokens = OPENAI_HISTORY_OTHER.count_tokens(
+            counter, slot_tokens=text_tokens, other_bot_number=other_bot_number, other_persona=other_persona_info
+        )
+        history_tokens = own_count * (own_tokens + 4) + other_count * (other_tokens + 4)
+        user_tokens = _openai_user_tokens(
+            counter, is_first_message, topic, persona, previous_messages_count, avg_message_tokens,
+            bot_number, other_bot_number, other_persona_info
+        )
+        # formatting overhead
         prompt_tokens = system_tokens + user_tokens + history_tokens + 4
+    elif model_type == 'anthropic':
+        # Anthropic: system + 사용자 메시지 하나 (히스토리 머리말 + 발언마다 한 줄 + 응답 요청)
+        # 기본값으로는 전체 대화를 보내므로 히스토리가 턴마다 늘어남
+        if is_first_message:
+            user_tokens = ANTHROPIC_FIRST_USER.count_tokens(counter, topic=topic, persona=persona)
+        else:
+            own_tokens = ANTHROPIC_HISTORY_SELF.count_tokens(counter, slot_tokens=text_tokens, bot=bot_number, persona=persona)
+            other_tokens = ANTHROPIC_HISTORY_OTHER.count_tokens(counter, slot_tokens=text_tokens, bot=other_bot_number)
+            user_tokens = (
+                ANTHROPIC_HISTORY_HEADER.count_tokens(counter)
+                + own_count * own_tokens + other_count * other_tokens
+                + ANTHROPIC_TURN_INSTRUCTION.count_tokens(counter, bot_number=bot_number, persona=persona)
+            )
+        prompt_tokens = system_tokens + user_tokens + 4
     else:  # google
-        # Google: context + prompt (단일 텍스트로 합쳐짐)
-        context = system_prompt + "\n\n대화 히스토리:\n"
-        # 히스토리 메시지 포맷팅
-        for _ in range(history_messages_count):
-            context += f"챗봇 1: [메시지]\n챗봇 2: [메시지]\n"
-        context += user_message
-        prompt_tokens = len(encoding.encode(context))
+        # Google: context + prompt (단일 텍스트로 합쳐짐, "챗봇 X: {메시지}\n" 형식의 히스토리)
+        history_prefix_tokens = 10  # "챗봇 X: " 형식
+        history_tokens = max(history_messages_count, 0) * (avg_message_tokens + history_prefix_tokens)
+        user_tokens = _openai_user_tokens(
+            counter, is_first_message, topic, persona, previous_messages_count, avg_message_tokens,
+            bot_number, other_bot_number, other_persona_info
+        )
+        prompt_tokens = system_tokens + counter("\n\n대화 히스토리:\n") + history_tokens + user_tokens
     
-    # 출력 토큰 (예상 응답 길이)
-    completion_tokens = estimated_response_length
+    return prompt_tokens
+
+
+def _openai_user_tokens(
+    counter: Callable[[str], int],
+    is_first_message: bool,
+    topic: str,
+    persona: str,
+    previous_messages_count: int,
+    avg_message_tokens: int,
+    bot_number: int,
+    other_bot_number: int,
+    other_persona_info: str
+) -> int:
+    """OpenAI 응답 요청(마지막 사용자 메시지)의 토큰 수 - 대화 내용은 평균 메시지 길이로 추정"""
+    if is_first_message:
+        return OPENAI_FIRST_USER.count_tokens(counter, topic=topic, persona=persona, bot_number=bot_number)
     
-    # 여유분 추가 (15% 증가)
-    SAFETY_MARGIN = 1.15
-    prompt_tokens = int(prompt_tokens * SAFETY_MARGIN)
-    completion_tokens = int(completion_tokens * SAFETY_MARGIN)
+    # 이전 대화 맥락 요약: 최근 메시지 한 줄씩 (줄바꿈으로 연결)
+    recent_context_tokens = 0
+    if previous_messages_count > 1:
+        context_count = min(previous_messages_count, OPENAI_CONTEXT_MESSAGES)
+        own_count = context_count // 2
+        other_count = context_count - own_count
+        text_tokens = {'text': avg_message_tokens}
+        lines_tokens = (
+            own_count * OPENAI_CONTEXT_SELF.count_tokens(counter, slot_tokens=text_tokens, bot_number=bot_number, persona=persona)
+            + other_count * OPENAI_CONTEXT_OTHER.count_tokens(
+                counter, slot_tokens=text_tokens, other_bot_number=other_bot_number, other_persona=other_persona_info
+            )
+            + context_count - 1
+        )
+        recent_context_tokens = OPENAI_RECENT_CONTEXT.count_tokens(counter, slot_tokens={'lines': lines_tokens})
     
-    return {
-        'prompt_tokens': prompt_tokens,
-        'completion_tokens': completion_tokens,
-        'total_tokens': prompt_tokens + completion_tokens
-    }
+    # 이미 언급된 내용: 이전 발언의 앞 MENTIONED_INFO_CHARS자 (한국어는 글자당 약 1토큰으로 추정)
+    mentioned_tokens = 0
+    if previous_messages_count > 0:
+        mentioned_text_tokens = min(previous_messages_count * max(avg_message_tokens, 0), MENTIONED_INFO_CHARS)
+        mentioned_tokens = OPENAI_MENTIONED_INFO.count_tokens(counter, slot_tokens={'text': mentioned_text_tokens})
+    
+    return OPENAI_FOLLOWUP_USER.count_tokens(
+        counter,
+        slot_tokens={
+            'last_message': avg_message_tokens,
+            'recent_context': recent_context_tokens,
+            'mentioned_info': mentioned_tokens
+        },
+        bot_number=bot_number, persona=persona,
+        other_bot_number=other_bot_number, other_persona=other_persona_info
+    )
 
 
 def estimate_simulation_tokens(
@@ -226,7 +290,8 @@ def estimate_simulation_tokens(
     temperature2: float = 1.2,
     top_p1: float = 0.9,
     top_p2: float = 0.9,
-    max_history_messages: int = 4
+    max_history_messages: Optional[int] = None,
+    calibration: Optional[UsageCalibration] = None
 ) -> Dict[str, any]:
     """
     전체 시뮬레이션의 예상 토큰 수 계산
@@ -245,7 +310,9 @@ def estimate_simulation_tokens(
         temperature2: 챗봇 2의 temperature 설정
         top_p1: 챗봇 1의 top_p 설정
         top_p2: 챗봇 2의 top_p 설정
-        max_history_messages: 최대 히스토리 메시지 수
+        max_history_messages: 최대 히스토리 메시지 수 (None이면 실제 요청과 같게:
+            OpenAI는 OPENAI_HISTORY_MESSAGES개, Anthropic은 전체 대화)
+        calibration: 실제 사용량 분포 (관측이 충분한 턴은 휴리스틱 대신 이 값을 사용)
     
     Returns:
         {
@@ -254,78 +321,151 @@ def estimate_simulation_tokens(
             'total_completion_tokens': int,
             'per_set_tokens': int,
             'per_message_tokens': Dict,
-            'breakdown': List[Dict]
+            'breakdown': List[Dict],
+            'calibrated_messages': int  # calibration을 넘긴 경우만, 세트당 보정값을 사용한 메시지 수
         }
     """
     total_messages_per_set = turns_per_bot * 2
-    total_prompt_tokens = 0
-    total_completion_tokens = 0
-    breakdown = []
     
-    for set_idx in range(number_of_sets):
-        set_prompt_tokens = 0
-        set_completion_tokens = 0
-        
-        for msg_idx in range(total_messages_per_set):
-            bot_number = (msg_idx % 2) + 1
-            other_bot_number = 3 - bot_number
-            is_first = (msg_idx == 0)
-            previous_count = msg_idx
-            
-            model_type = model_type1 if bot_number == 1 else model_type2
-            persona = persona1 if bot_number == 1 else persona2
-            max_tokens = max_tokens1 if bot_number == 1 else max_tokens2
-            temperature = temperature1 if bot_number == 1 else temperature2
-            top_p = top_p1 if bot_number == 1 else top_p2
-            
-            # temperature와 top_p는 응답 길이에 영향을 줄 수 있지만, 
-            # 실제 토큰 수에는 max_tokens가 직접적인 제한이므로 max_tokens를 기준으로 사용
-            # temperature가 높을수록 더 다양한 응답이 나올 수 있지만, max_tokens 제한 내에서
-            estimated_response_length = max_tokens
-            
-            # 마지막 메시지 텍스트 추정 (히스토리 메시지 포맷팅용)
-            # 실제로는 정확한 텍스트를 알 수 없으므로, 평균 응답 길이로 추정
-            last_message_text = "[평균 길이의 메시지]" if not is_first else ""
-            
-            tokens = estimate_message_tokens(
-                model_type=model_type,
-                topic=topic,
-                persona=persona,
-                previous_messages_count=previous_count,
-                max_history_messages=max_history_messages,
-                is_first_message=is_first,
-                estimated_response_length=estimated_response_length,
-                bot_number=bot_number,
-                other_bot_number=other_bot_number,
-                last_message_text=last_message_text
-            )
-            
+    def bot_of(msg_idx: int) -> Dict[str, any]:
+        """msg_idx번째 메시지를 보내는 챗봇의 설정"""
+        bot_number = (msg_idx % 2) + 1
+        if bot_number == 1:
+            return {'bot': 1, 'model_type': model_type1, 'persona': persona1, 'other_persona': persona2, 'max_tokens': max_tokens1}
+        return {'bot': 2, 'model_type': model_type2, 'persona': persona2, 'other_persona': persona1, 'max_tokens': max_tokens2}
+    
+    def base_tokens(msg_idx: int) -> int:
+        """세트 안에서 msg_idx번째 메시지의 여유분 적용 전 프롬프트 토큰 수"""
+        bot = bot_of(msg_idx)
+        # temperature와 top_p는 응답 길이에 영향을 줄 수 있지만, 
+        # 실제 토큰 수에는 max_tokens가 직접적인 제한이므로 max_tokens를 기준으로 사용
+        # temperature가 높을수록 더 다양한 응답이 나올 수 있지만, max_tokens 제한 내에서
+        return _base_prompt_tokens(
+            bot['model_type'], topic, bot['persona'], msg_idx,
+            _history_limit(bot['model_type'], max_history_messages), msg_idx == 0,
+            bot['max_tokens'], bot['bot'], 3 - bot['bot'], bot['other_persona']
+        )
+    
+    def message_tokens(msg_idx: int, base: int) -> Dict[str, int]:
+        """세트 안에서 msg_idx번째 메시지의 예상 토큰 수"""
+        bot = bot_of(msg_idx)
+        return {'bot': bot['bot'], 'model_type': bot['model_type'], **_with_margin(base, bot['max_tokens'])}
+    
+    # 모든 세트는 동일하므로 한 세트만 계산하고 세트 수를 곱함
+    # 또한 히스토리와 맥락 요약이 상한까지 찬 뒤에는 같은 챗봇의 프롬프트가 두 메시지마다 일정하게 변하므로
+    # (히스토리 상한이 있으면 0, Anthropic처럼 전체 대화를 보내면 발언 두 개만큼) 챗봇마다 두 턴씩 더 계산해
+    # 변화량을 구하고 그 이후는 계산 없이 이어서 구함
+    steady_from = max(
+        _steady_state_index(model_type1, _history_limit(model_type1, max_history_messages), int(max_tokens1 * 1.2)),
+        _steady_state_index(model_type2, _history_limit(model_type2, max_history_messages), int(max_tokens2 * 1.2))
+    )
+    explicit_count = max(min(total_messages_per_set, steady_from + 4), 0)
+    explicit_base = [base_tokens(msg_idx) for msg_idx in range(explicit_count)]
+    explicit = [message_tokens(msg_idx, base) for msg_idx, base in enumerate(explicit_base)]
+    
+    set_prompt_tokens = sum(tokens['prompt_tokens'] for tokens in explicit)
+    set_completion_tokens = sum(tokens['completion_tokens'] for tokens in explicit)
+    
+    # 챗봇별 (마지막으로 직접 계산한 메시지 순서, 그 메시지의 여유분 적용 전 프롬프트 토큰 수, 두 메시지마다 변화량)
+    growth: Dict[int, Tuple[int, int, int]] = {}
+    if total_messages_per_set > explicit_count:
+        for msg_idx in (explicit_count - 2, explicit_count - 1):
+            growth[(msg_idx % 2) + 1] = (msg_idx, explicit_base[msg_idx], explicit_base[msg_idx] - explicit_base[msg_idx - 2])
+    
+    def extrapolated_tokens(msg_idx: int) -> Dict[str, int]:
+        last_idx, base, delta = growth[(msg_idx % 2) + 1]
+        return message_tokens(msg_idx, base + (msg_idx - last_idx) // 2 * delta)
+    
+    for last_idx, _, delta in growth.values():
+        later = range(last_idx + 2, total_messages_per_set, 2)
+        if delta == 0:
+            steady = explicit[last_idx]
+            set_prompt_tokens += steady['prompt_tokens'] * len(later)
+            set_completion_tokens += steady['completion_tokens'] * len(later)
+            continue
+        for msg_idx in later:
+            tokens = extrapolated_tokens(msg_idx)
             set_prompt_tokens += tokens['prompt_tokens']
             set_completion_tokens += tokens['completion_tokens']
-            
-            if set_idx == 0:  # 첫 세트만 breakdown 저장
-                breakdown.append({
-                    'set': set_idx + 1,
-                    'message': msg_idx + 1,
-                    'bot': bot_number,
-                    'model_type': model_type,
-                    'prompt_tokens': tokens['prompt_tokens'],
-                    'completion_tokens': tokens['completion_tokens'],
-                    'total_tokens': tokens['total_tokens']
-                })
-        
-        total_prompt_tokens += set_prompt_tokens
-        total_completion_tokens += set_completion_tokens
+    
+    def heuristic_tokens(msg_idx: int) -> Dict[str, int]:
+        if msg_idx < explicit_count:
+            return explicit[msg_idx]
+        return extrapolated_tokens(msg_idx)
+    
+    # 실제 사용량이 관측된 턴은 휴리스틱 대신 관측 분포의 분위수로 교체
+    # (관측된 턴만 조회하므로 세트 수·턴 수와 무관하게 계산량이 일정)
+    calibrated: Dict[int, Dict[str, int]] = {}
+    if calibration is not None:
+        for bot_number, model_type, persona in ((1, model_type1, persona1), (2, model_type2, persona2)):
+            for msg_idx in calibration.observed_turns(model_type, persona):
+                if msg_idx >= total_messages_per_set or msg_idx % 2 != bot_number - 1:
+                    continue
+                tokens = calibration.estimate(model_type, persona, msg_idx)
+                if tokens is None:
+                    continue
+                heuristic = heuristic_tokens(msg_idx)
+                set_prompt_tokens += tokens['prompt_tokens'] - heuristic['prompt_tokens']
+                set_completion_tokens += tokens['completion_tokens'] - heuristic['completion_tokens']
+                calibrated[msg_idx] = {'bot': bot_number, 'model_type': model_type, **tokens}
+    
+    breakdown = []
+    if number_of_sets > 0:  # 첫 세트만 breakdown 저장
+        for msg_idx in range(min(total_messages_per_set, 10)):
+            tokens = calibrated.get(msg_idx) or heuristic_tokens(msg_idx)
+            breakdown.append({
+                'set': 1,
+                'message': msg_idx + 1,
+                'bot': tokens['bot'],
+                'model_type': tokens['model_type'],
+                'prompt_tokens': tokens['prompt_tokens'],
+                'completion_tokens': tokens['completion_tokens'],
+                'total_tokens': tokens['total_tokens']
+            })
+    
+    sets = max(number_of_sets, 0)
+    total_prompt_tokens = set_prompt_tokens * sets
+    total_completion_tokens = set_completion_tokens * sets
     
     per_set_tokens = (total_prompt_tokens + total_completion_tokens) // number_of_sets if number_of_sets > 0 else 0
     per_message_avg = (total_prompt_tokens + total_completion_tokens) // (total_messages_per_set * number_of_sets) if (total_messages_per_set * number_of_sets) > 0 else 0
     
-    return {
+    result = {
         'total_tokens': total_prompt_tokens + total_completion_tokens,
         'total_prompt_tokens': total_prompt_tokens,
         'total_completion_tokens': total_completion_tokens,
         'per_set_tokens': per_set_tokens,
         'per_message_tokens': per_message_avg,
-        'breakdown': breakdown[:10]  # 처음 10개만 반환 (너무 많으면 UI에 부담)
+        'breakdown': breakdown  # 처음 10개만 반환 (너무 많으면 UI에 부담)
     }
+    if calibration is not None:
+        result['calibrated_messages'] = len(calibrated)
+    return result
 
+
+def _content_text(content) -> List[str]:
+    """메시지 content(문자열 또는 Anthropic 텍스트 블록 목록)의 텍스트 조각"""
+    if isinstance(content, str):
+        return [content]
+    if isinstance(content, list):
+        return [block.get('text', '') for block in content if isinstance(block, dict)]
+    return []
+
+
+def estimate_request_tokens(payload: Dict, model_type: str = 'openai') -> int:
+    """
+    프로바이더 요청 본문(OpenAI chat completions / Anthropic messages)의 예상 토큰 수
+    속도 제한기가 호출 전에 TPM을 미리 차감할 때 사용 (입력 토큰 + max_tokens)
+    시스템 프롬프트와 대화 메시지는 턴마다 반복되므로 조각별로 캐시된 토큰 수를 더함
+    """
+    counter = _token_counter(model_type)
+    pieces = _content_text(payload.get('system'))
+    message_count = 0
+    for message in payload.get('messages') or []:
+        if isinstance(message, dict):
+            pieces.extend(_content_text(message.get('content')))
+            message_count += 1
+    # 메시지마다 역할/구분 토큰 약 4개
+    prompt_tokens = sum(counter(piece) for piece in pieces if piece) + 4 * message_count
+    max_tokens = payload.get('max_tokens') or payload.get('max_completion_tokens') or 0
+    return prompt_tokens + int(max_tokens)
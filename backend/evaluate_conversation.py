@@ -1,154 +1,125 @@
 import os
 import json
-import requests
+import asyncio
 import logging
-from datetime import datetime
+import threading
+import time
+import requests
+from collections import OrderedDict
 from dotenv import load_dotenv
 from config import LLMResponse
+from circuit_breaker import CircuitOpenError
+from http_client import connection_pool, get_async_client
+from provider_endpoints import OPENAI_API_BASE, ANTHROPIC_API_BASE
+from response_cache import response_cache
+from rate_limiter import rate_limiter
+from retry_policy import REJECTED_ONLY_RETRY_POLICY
+from generate_llm_response import openai_token_usage, anthropic_token_usage
+from metrics import EVALUATION_PARSE_FAILURES, record_tokens
+from model_router import model_router
+from server_timing import timing_phase
+from structured_logging import get_logger, log_payload
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure separate loggers for each provider
-def get_logger(provider):
-    """Get logger for specific provider"""
-    logger = logging.getLogger(f'evaluation_{provider}')
-    logger.setLevel(logging.INFO)
-    
-    # Remove existing handlers to avoid duplicates
-    logger.handlers = []
-    
-    # Create file handler
-    log_filename = f'evaluation_logs_{provider}.log'
-    handler = logging.FileHandler(log_filename, encoding='utf-8')
-    handler.setLevel(logging.INFO)
-    
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    
-    # Add handler to logger
-    logger.addHandler(handler)
-    
-    return logger
+logger = get_logger('evaluation')
+
+# Provider API roots come from provider_endpoints (OPENAI_API_BASE / ANTHROPIC_API_BASE)
+OPENAI_CHAT_COMPLETIONS_URL = f'{OPENAI_API_BASE}/chat/completions'
+ANTHROPIC_MESSAGES_URL = f'{ANTHROPIC_API_BASE}/messages'
+
+# Batch evaluation: default number of in-flight provider calls and upper bounds per request
+EVALUATION_BATCH_CONCURRENCY = int(os.environ.get('EVALUATION_BATCH_CONCURRENCY', '8'))
+EVALUATION_BATCH_MAX_CONCURRENCY = int(os.environ.get('EVALUATION_BATCH_MAX_CONCURRENCY', '32'))
+EVALUATION_BATCH_MAX_ITEMS = int(os.environ.get('EVALUATION_BATCH_MAX_ITEMS', '1000'))
 
-def evaluate_conversation_log(topic, persona1, persona2, dialogue_log, provider='openai'):
+# Provider Batch API mode (offline, discounted): max items per submission and default poll interval (seconds)
+PROVIDER_BATCH_MAX_ITEMS = int(os.environ.get('PROVIDER_BATCH_MAX_ITEMS', '50000'))
+PROVIDER_BATCH_POLL_INTERVAL = float(os.environ.get('PROVIDER_BATCH_POLL_INTERVAL', '30'))
+
+# Evaluation prompt layout: 'cached' puts the static rubric in a cacheable system prefix
+# and the dialogue last; 'inline' sends the original single prompt with the data in section 3
+EVALUATION_PROMPT_LAYOUT = os.environ.get('EVALUATION_PROMPT_LAYOUT', 'cached')
+
+def _get_provider_api_key(provider):
     """
-    Evaluates a conversation log using LLM API (OpenAI or Anthropic) with a specific prompt.
-    Returns a dict with 'reason' (str) and 'score' (dict of int).
-    
-    Args:
-        topic: Conversation topic
-        persona1: First persona
-        persona2: Second persona
-        dialogue_log: List of dialogue messages
-        provider: 'openai' or 'anthropic' (default: 'openai')
+    Returns (api_key, error_dict) for the provider's server-side API key.
+    error_dict is None when the key is available.
     """
-    provider = provider.lower()
-    
     if provider == 'openai':
         api_key = os.environ.get('OPENAI_API_KEY')
         if not api_key:
             error_msg = 'Server configuration error: OPENAI_API_KEY not found.'
-            logging.error(error_msg)
-            return {'success': False, 'error': error_msg}
+            logger.error(error_msg)
+            return None, {'success': False, 'error': error_msg}
     elif provider == 'anthropic':
         api_key = os.environ.get('ANTHROPIC_API_KEY')
         if not api_key:
             error_msg = 'Server configuration error: ANTHROPIC_API_KEY not found.'
-            logging.error(error_msg)
-            return {'success': False, 'error': error_msg}
+            logger.error(error_msg)
+            return None, {'success': False, 'error': error_msg}
     else:
         error_msg = f'Unsupported provider: {provider}. Supported providers: openai, anthropic'
-        logging.error(error_msg)
-        return {'success': False, 'error': error_msg}
-
-    # Format dialogue log into a single string
-    # Assuming dialogue_log is a list of objects like { 'speaker': 'Bot 1', 'text': '...' }
-    dialogue_text = ""
-    for msg in dialogue_log:
-        dialogue_text += f"{msg.get('speaker', 'Unknown')}: {msg.get('text', '')}\n"
+        logger.error(error_msg)
+        return None, {'success': False, 'error': error_msg}
+    return api_key, None
 
-    # Construct the user provided prompt
-    prompt = f"""### 챗봇 간 대화(Self-Play) 품질 검증 프롬프트
+# Evaluation prompt building blocks. Sections are numbered when the prompt is
+# assembled, so the same text serves both prompt layouts.
+EVALUATION_PROMPT_TITLE = """### 챗봇 간 대화(Self-Play) 품질 검증 프롬프트
 
-당신은 두 AI 챗봇 간의 대화 데이터를 검증하고 품질을 측정하는 **대화형 AI 전문 분석가(Dialogue Analyst)**입니다. 아래의 지침, 평가 척도, 기준을 숙지하여 주어진 대화 로그를 객관적으로 평가하십시오.
+당신은 두 AI 챗봇 간의 대화 데이터를 검증하고 품질을 측정하는 **대화형 AI 전문 분석가(Dialogue Analyst)**입니다. 아래의 지침, 평가 척도, 기준을 숙지하여 주어진 대화 로그를 객관적으로 평가하십시오."""
 
-### 1. 프로젝트 개요
-
-- **검증 목적:** 특정한 주제에 대해 서로 다른 페르소나(Persona)를 가진 두 챗봇(Agent A, Agent B)이 나눈 대화의 자연스러움과 논리적 완결성을 검증합니다.
-- **데이터 특성:** UI 요소 없이 텍스트로만 이루어진 연속된 대화(Multi-turn Dialogue)입니다.
-
-### 2. 역할
-
-- 제공된 `대화 내용`이 `주제`에 부합하는지, 그리고 각 챗봇이 부여받은 `페르소나`를 끝까지 유지하며 자연스럽게 대화를 이어가는지를 평가합니다.
+# Sections that come before the input data in the inline layout
+EVALUATION_OVERVIEW_SECTIONS = [
+    ('프로젝트 개요', """- **검증 목적:** 특정한 주제에 대해 서로 다른 페르소나(Persona)를 가진 두 챗봇(Agent A, Agent B)이 나눈 대화의 자연스러움과 논리적 완결성을 검증합니다.
+- **데이터 특성:** UI 요소 없이 텍스트로만 이루어진 연속된 대화(Multi-turn Dialogue)입니다."""),
+    ('역할', """- 제공된 `대화 내용`이 `주제`에 부합하는지, 그리고 각 챗봇이 부여받은 `페르소나`를 끝까지 유지하며 자연스럽게 대화를 이어가는지를 평가합니다.
 - 3가지 핵심 평가 척도(맥락, 페르소나, 논리)를 종합하여 1~5점 척도로 정량화하고, 그 근거를 작성합니다.
-- **(핵심 목표) 두 챗봇이 서로의 페르소나를 혼동하거나, 상대방의 설정을 자신의 것으로 착각하는 '페르소나 스위칭(Persona Switching)' 현상을 찾아내는 것이 가장 중요합니다.**
+- **(핵심 목표) 두 챗봇이 서로의 페르소나를 혼동하거나, 상대방의 설정을 자신의 것으로 착각하는 '페르소나 스위칭(Persona Switching)' 현상을 찾아내는 것이 가장 중요합니다.**"""),
+]
 
-### 3. 입력 데이터
-
-- **대화 주제:** {topic}
-- **페르소나 A (발화자 A):** {persona1}
-- **페르소나 B (발화자 B):** {persona2}
-- **대화 내용:**
-(참고: 대화 로그의 발화자 이름이 명시되지 않은 경우, 첫 번째 발화자를 A, 두 번째 발화자를 B로 간주하여 분석하십시오.)
-{dialogue_text}
-
-### 4. 핵심 평가 척도 (Evaluation Metrics)
-
-평가 시 아래 세 가지 척도를 기준으로 분석해야 합니다.
+# Rubric and output specification (everything after the input data in the inline layout)
+EVALUATION_RUBRIC_SECTIONS = [
+    ('핵심 평가 척도 (Evaluation Metrics)', """평가 시 아래 세 가지 척도를 기준으로 분석해야 합니다.
 
 1. **맥락 유지 및 흐름 (Context Flow):** 이전 발화의 내용을 정확히 기억하고 이어받고 있는가? 대화가 끊기거나 급작스럽게 화제가 전환되지 않는가?
 2. **페르소나 일관성 (Persona Consistency):** 
    - 각 챗봇이 부여된 역할(성격, 말투, 지식 수준)을 대화 시작부터 끝까지 일관되게 유지하는가?
    - **(Critical Check)**: 상대방의 페르소나를 자신의 것으로 착각하거나, 역할이 뒤바뀌는 모습이 보이지 않는가?
-3. **주제 집중도 (Topic Adherence):** 대화가 주어진 주제에서 벗어나지 않고, 밀도 있게 논의가 진행되는가?
-
-### 5. 평가 원칙
-
-- **전체론적 평가 (Holistic View):** 특정 발화 하나가 아닌, 대화 전체의 흐름(History)을 보고 판단합니다.
+3. **주제 집중도 (Topic Adherence):** 대화가 주어진 주제에서 벗어나지 않고, 밀도 있게 논의가 진행되는가?"""),
+    ('평가 원칙', """- **전체론적 평가 (Holistic View):** 특정 발화 하나가 아닌, 대화 전체의 흐름(History)을 보고 판단합니다.
 - **엄격한 페르소나 검증 (Zero Tolerance for Swapping):** 
    - 챗봇이 자신의 역할을 망각하거나 상대방의 설정을 훔쳐서 말하는 경우(Persona Leakage/Swapping)는 대화 품질의 치명적인 결함입니다.
    - **이러한 혼동이 단 한 번이라도 발견되면, '페르소나 일관성' 점수는 무조건 1점을 부여해야 합니다.**
    - 감점 시, "어떤 발화에서 페르소나 혼동이 일어났는지" 이유에 명시하십시오.
-- **환각(Hallucination) 감지:** 대화 맥락과 상관없는 거짓 정보를 생성하거나, 앞뒤 말이 모순되는 경우 최하점을 부여합니다.
-
-### 6. 금지사항
-
-- 문법적 오류나 오타 등 사소한 텍스트 품질보다는 **'대화의 논리와 캐릭터성'**에 집중하십시오.
-- 주어진 출력 형식 외에 사견이나 추가 정보를 포함하지 마십시오.
-
-### 7. 출력 준수사항 (Strict Rules)
-
-- **점수 표기:** 반드시 1~5 범위의 정수만 사용합니다.
+- **환각(Hallucination) 감지:** 대화 맥락과 상관없는 거짓 정보를 생성하거나, 앞뒤 말이 모순되는 경우 최하점을 부여합니다."""),
+    ('금지사항', """- 문법적 오류나 오타 등 사소한 텍스트 품질보다는 **'대화의 논리와 캐릭터성'**에 집중하십시오.
+- 주어진 출력 형식 외에 사견이나 추가 정보를 포함하지 마십시오."""),
+    ('출력 준수사항 (Strict Rules)', """- **점수 표기:** 반드시 1~5 범위의 정수만 사용합니다.
 - **설명 작성 시 절대 금지:**
     - "X점", "점수", "평점", "만점", "감점" 등 점수를 직접 언급하는 단어 사용 금지.
     - "높은 점수", "낮은 평가", "5점짜리 대화" 등 숫자나 점수를 암시하는 표현 사용 금지.
-- **설명 작성 가이드:** 위에서 정의한 3가지 핵심 평가 척도(맥락, 페르소나, 주제) 중 잘된 점과 부족한 점을 명확히 지적하는 **객관적 분석문**으로만 작성하십시오.
-
-### 8. 평가 점수 기준 (Scoring Rubric)
-
-아래 기준에 따라 종합 점수를 부여하십시오.
+- **설명 작성 가이드:** 위에서 정의한 3가지 핵심 평가 척도(맥락, 페르소나, 주제) 중 잘된 점과 부족한 점을 명확히 지적하는 **객관적 분석문**으로만 작성하십시오."""),
+    ('평가 점수 기준 (Scoring Rubric)', """아래 기준에 따라 종합 점수를 부여하십시오.
 
 - **5점 (Perfect):** 두 페르소나가 완벽하게 구현되었으며, 주제에 대해 깊이 있고 자연스러운 티키타카(Turn-taking)가 이루어진 경우.
 - **4점 (Good):** 대화 흐름과 주제 의식은 명확하나, 페르소나의 매력이 다소 약하거나 아주 경미한 맥락 불일치가 1회 정도 있는 경우.
 - **3점 (Acceptable):** 대화는 진행되으나, 페르소나가 희미하거나 기계적인 답변이 섞여 몰입감을 해치는 경우.
 - **2점 (Poor):** 대화 도중 문맥을 잃고 동문서답(Incoherent)하거나, 페르소나가 붕괴되어 상대방과 구분되지 않는 경우.
-- **1점 (Bad):** **(즉시 낙제)** 서로의 페르소나가 뒤바뀌거나(Swapping), 자신의 역할을 잊어버린 경우. 또는 주제와 무관한 이야기를 하는 경우.
-
-### 9. 출력 예시
-
-반드시 아래 형식을 그대로 따르십시오. **중요: JSON 형식만 출력하고, 설명이나 추가 텍스트는 포함하지 마십시오.**
+- **1점 (Bad):** **(즉시 낙제)** 서로의 페르소나가 뒤바뀌거나(Swapping), 자신의 역할을 잊어버린 경우. 또는 주제와 무관한 이야기를 하는 경우."""),
+    ('출력 예시', """반드시 아래 형식을 그대로 따르십시오. **중요: JSON 형식만 출력하고, 설명이나 추가 텍스트는 포함하지 마십시오.**
 
 ```json
-{{
+{
     "reason": "페르소나 A는 ... 했으나, B의 발화 '...'에서 A의 설정을 언급하며 역할 혼동이 발생했습니다. 따라서 페르소나 일관성에 심각한 문제가 있습니다.",
-    "score": {{
+    "score": {
         "맥락 유지": 0,
         "페르소나 일관성": 0,
         "주제 적합성": 0
-    }}
-}}
+    }
+}
 ```
 
 **출력 규칙:**
@@ -157,37 +128,210 @@ def evaluate_conversation_log(topic, persona1, persona2, dialogue_log, provider=
 - JSON 외의 설명, 주석, 추가 텍스트는 절대 포함하지 마세요
 - reason은 문자열(string)이어야 합니다
 - score의 각 값은 1~5 범위의 정수(integer)여야 합니다
-"""
+"""),
+]
+
+EVALUATION_INPUT_SECTION_TITLE = '입력 데이터'
+
+
+def _format_evaluation_sections(sections, start):
+    """Renders (title, body) sections as '### N. title' blocks numbered from `start`"""
+    return '\n\n'.join(
+        f"### {number}. {title}\n\n{body}" for number, (title, body) in enumerate(sections, start)
+    )
+
+
+def _build_evaluation_input(topic, persona1, persona2, dialogue_log):
+    """Builds the per-dialogue input data section body"""
+    # Format dialogue log into a single string
+    # Assuming dialogue_log is a list of objects like { 'speaker': 'Bot 1', 'text': '...' }
+    dialogue_text = ""
+    for msg in dialogue_log:
+        dialogue_text += f"{msg.get('speaker', 'Unknown')}: {msg.get('text', '')}\n"
+
+    return f"""- **대화 주제:** {topic}
+- **페르소나 A (발화자 A):** {persona1}
+- **페르소나 B (발화자 B):** {persona2}
+- **대화 내용:**
+(참고: 대화 로그의 발화자 이름이 명시되지 않은 경우, 첫 번째 발화자를 A, 두 번째 발화자를 B로 간주하여 분석하십시오.)
+{dialogue_text}"""
+
+
+def build_evaluation_prompt(topic, persona1, persona2, dialogue_log):
+    """
+    Builds the evaluation prompt for a single conversation log (inline layout:
+    the input data sits between the overview and the rubric).
+    """
+    sections = EVALUATION_OVERVIEW_SECTIONS + [
+        (EVALUATION_INPUT_SECTION_TITLE, _build_evaluation_input(topic, persona1, persona2, dialogue_log))
+    ] + EVALUATION_RUBRIC_SECTIONS
+    return f"{EVALUATION_PROMPT_TITLE}\n\n{_format_evaluation_sections(sections, 1)}"
+
+
+# Static part of the cached layout: identical for every dialogue, so providers can
+# serve it from their prompt cache.
+EVALUATION_STATIC_PREFIX = f"{EVALUATION_PROMPT_TITLE}\n\n" + _format_evaluation_sections(
+    EVALUATION_OVERVIEW_SECTIONS + EVALUATION_RUBRIC_SECTIONS, 1
+)
+
+
+def build_cacheable_evaluation_prompt(topic, persona1, persona2, dialogue_log):
+    """
+    Builds the evaluation prompt in the cached layout.
+    Returns (static_prefix, dialogue_prompt): the static prefix (overview, rubric
+    and output spec) goes in the system message / a cached block, and only the
+    topic, personas and dialogue are sent as the user message.
+    """
+    number = len(EVALUATION_OVERVIEW_SECTIONS) + len(EVALUATION_RUBRIC_SECTIONS) + 1
+    dialogue_prompt = _format_evaluation_sections(
+        [(EVALUATION_INPUT_SECTION_TITLE, _build_evaluation_input(topic, persona1, persona2, dialogue_log))], number
+    )
+    return EVALUATION_STATIC_PREFIX, dialogue_prompt
+
+
+@timing_phase('prompt')
+def build_evaluation_prompt_parts(topic, persona1, persona2, dialogue_log, layout=None):
+    """
+    Returns (static_prefix, prompt) for the given layout ('cached' or 'inline',
+    default: EVALUATION_PROMPT_LAYOUT). static_prefix is None for the inline layout.
+    """
+    layout = (layout or EVALUATION_PROMPT_LAYOUT).lower()
+    if layout == 'inline':
+        return None, build_evaluation_prompt(topic, persona1, persona2, dialogue_log)
+    return build_cacheable_evaluation_prompt(topic, persona1, persona2, dialogue_log)
+
+
+def evaluate_conversation_log(topic, persona1, persona2, dialogue_log, provider='openai', use_cache=True):
+    """
+    Evaluates a conversation log using LLM API (OpenAI or Anthropic) with a specific prompt.
+    Returns a dict with 'reason' (str) and 'score' (dict of int).
+    
+    Args:
+        topic: Conversation topic
+        persona1: First persona
+        persona2: Second persona
+        dialogue_log: List of dialogue messages
+        provider: 'openai' or 'anthropic' (default: 'openai')
+        use_cache: When False, skip the response cache lookup and always call the API
+    """
+    provider = provider.lower()
+    api_key, error = _get_provider_api_key(provider)
+    if error:
+        return error
+
+    static_prefix, prompt = build_evaluation_prompt_parts(topic, persona1, persona2, dialogue_log)
 
     try:
         if provider == 'openai':
-            return _evaluate_with_openai(api_key, prompt)
+            return _evaluate_with_openai(api_key, prompt, use_cache, static_prefix)
         elif provider == 'anthropic':
-            return _evaluate_with_anthropic(api_key, prompt)
+            return _evaluate_with_anthropic(api_key, prompt, use_cache, static_prefix)
         else:
             return {'success': False, 'error': f'Unsupported provider: {provider}'}
+    except CircuitOpenError as e:
+        # Fail fast without waiting for the provider timeout
+        return e.to_dict()
     except Exception as e:
         # Use appropriate logger based on provider
-        logger = get_logger(provider)
-        logger.error(f"[{datetime.now()}] Network/Server Error: {str(e)}")
+        logger = get_logger(f'evaluation.{provider}')
+        logger.error(f"Network/Server Error: {str(e)}")
         return {'success': False, 'error': str(e)}
 
 
-def _evaluate_with_openai(api_key, prompt):
-    """Evaluate conversation using OpenAI API"""
-    logger = get_logger('openai')
-    
+async def evaluate_conversation_log_async(topic, persona1, persona2, dialogue_log, provider='openai', use_cache=True):
+    """
+    Coroutine version of evaluate_conversation_log (same return contract).
+    """
+    provider = provider.lower()
+    api_key, error = _get_provider_api_key(provider)
+    if error:
+        return error
+
+    static_prefix, prompt = build_evaluation_prompt_parts(topic, persona1, persona2, dialogue_log)
+
+    try:
+        if provider == 'openai':
+            return await _evaluate_with_openai_async(api_key, prompt, use_cache, static_prefix)
+        elif provider == 'anthropic':
+            return await _evaluate_with_anthropic_async(api_key, prompt, use_cache, static_prefix)
+        else:
+            return {'success': False, 'error': f'Unsupported provider: {provider}'}
+    except CircuitOpenError as e:
+        # Fail fast without waiting for the provider timeout
+        return e.to_dict()
+    except Exception as e:
+        logger = get_logger(f'evaluation.{provider}')
+        logger.error(f"Network/Server Error: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+
+def resolve_batch_concurrency(requested=None):
+    """
+    Returns the concurrency to use for a batch: the requested value (or the
+    EVALUATION_BATCH_CONCURRENCY default), clamped to 1..EVALUATION_BATCH_MAX_CONCURRENCY.
+    """
+    concurrency = EVALUATION_BATCH_CONCURRENCY if requested is None else int(requested)
+    return max(1, min(concurrency, EVALUATION_BATCH_MAX_CONCURRENCY))
+
+
+async def evaluate_conversation_batch_async(items, provider='openai', concurrency=None, use_cache=True):
+    """
+    Evaluates many conversations with at most `concurrency` provider calls in flight.
+    Returns one result per item, in input order. Each result carries the item's
+    'index' and 'id' plus the evaluate_conversation_log contract ('success' and
+    'result' or 'error'); a failing item never stops the rest of the batch.
+
+    Args:
+        items: List of dicts with 'topic', 'persona1', 'persona2', 'dialogue_log' and optional 'id'
+        provider: 'openai' or 'anthropic' (default: 'openai')
+        concurrency: Max in-flight calls (default: EVALUATION_BATCH_CONCURRENCY)
+        use_cache: When False, skip the response cache lookup for every item
+    """
+    semaphore = asyncio.Semaphore(resolve_batch_concurrency(concurrency))
+
+    async def evaluate_item(index, item):
+        item_id = item.get('id', index) if isinstance(item, dict) else index
+        if not isinstance(item, dict):
+            return {'index': index, 'id': item_id, 'success': False, 'error': 'Item must be an object'}
+        async with semaphore:
+            try:
+                result = await evaluate_conversation_log_async(
+                    topic=item.get('topic', ''),
+                    persona1=item.get('persona1', ''),
+                    persona2=item.get('persona2', ''),
+                    dialogue_log=item.get('dialogue_log', []),
+                    provider=provider,
+                    use_cache=use_cache
+                )
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+        return {'index': index, 'id': item_id, **result}
+
+    return await asyncio.gather(*(evaluate_item(i, item) for i, item in enumerate(items)))
+
+
+@timing_phase('prompt')
+def _build_openai_evaluation_request(api_key, prompt, static_prefix=None):
+    """
+    Build (headers, data) for an OpenAI evaluation request.
+    With a static_prefix (cached layout) it is appended to the system message, so
+    every evaluation shares the same leading tokens for OpenAI's prefix caching.
+    """
     headers = {
         'Authorization': f'Bearer {api_key}',
         'Content-Type': 'application/json'
     }
 
+    system_message = '당신은 대화형 AI 전문 분석가입니다. 주어진 대화를 분석하고 JSON 형식으로 평가 결과를 출력하세요.'
+    if static_prefix:
+        system_message = f"{system_message}\n\n{static_prefix}"
+
     data = {
-        'model': 'gpt-4o', # Using GPT-4o for better reasoning on evaluation
+        'model': model_router.select_model('evaluation', 'openai'), # Routed within the evaluation tier (gpt-4o by default)
         'messages': [
             {
                 'role': 'system',
-                'content': '당신은 대화형 AI 전문 분석가입니다. 주어진 대화를 분석하고 JSON 형식으로 평가 결과를 출력하세요.'
+                'content': system_message
             },
             {
                 'role': 'user',
@@ -198,36 +342,40 @@ def _evaluate_with_openai(api_key, prompt):
         'response_format': { "type": "json_object" } # Force JSON output
     }
 
-    logger.info(f"[{datetime.now()}] OpenAI API Request - Model: {data['model']}, Prompt length: {len(prompt)}")
-    
-    response = requests.post(
-        'https://api.openai.com/v1/chat/completions',
-        headers=headers,
-        json=data,
-        timeout=60
-    )
-    
-    logger.info(f"[{datetime.now()}] OpenAI API Response Status: {response.status_code}")
+    return headers, data
+
+
+def _parse_openai_evaluation_response(response, logger):
+    """Handle an OpenAI evaluation response (requests or httpx response object)"""
+    logger.info('OpenAI API Response', extra={'status_code': response.status_code})
     
     if response.status_code == 200:
-        result = response.json()
+        with timing_phase('parse'):
+            result = response.json()
         content = result['choices'][0]['message']['content']
         
         # Log the raw LLM response
-        logger.info(f"[{datetime.now()}] Raw OpenAI Response:\n{content}\n{'='*50}")
+        log_payload(logger, 'Raw OpenAI Response', content)
+        
+        usage = openai_token_usage(result.get('usage', {}))
+        logger.info('OpenAI token usage', extra=usage)
+        record_tokens('openai', result.get('model'), usage)
+        rate_limiter.reconcile(response, usage)
         
         # Parse JSON content
         try:
-            parsed_content = json.loads(content)
-            logger.info(f"[{datetime.now()}] Evaluation completed successfully")
-            return {'success': True, 'result': parsed_content}
+            with timing_phase('parse'):
+                parsed_content = json.loads(content)
+            logger.info('Evaluation completed successfully')
+            return {'success': True, 'result': parsed_content, 'usage': usage}
         except json.JSONDecodeError as e:
-            logger.error(f"[{datetime.now()}] JSON Parse Error: {str(e)}\nContent: {content}")
+            log_payload(logger, f"JSON Parse Error: {str(e)}", content, force=True, level=logging.ERROR)
+            EVALUATION_PARSE_FAILURES.labels('openai').inc()
             return {'success': False, 'error': 'Failed to parse JSON response from LLM', 'raw_content': content}
     elif response.status_code == 401:
         # API key authentication error
         error_msg = '올바르지 않은 API 키입니다. OpenAI API 키를 확인해주세요.'
-        logger.error(f"[{datetime.now()}] OpenAI API Authentication Error: {response.text}")
+        log_payload(logger, 'OpenAI API Authentication Error', response.text, force=True, level=logging.ERROR, status_code=response.status_code)
         return {'success': False, 'error': error_msg, 'auth_error': True}
     else:
         # Parse error response to get meaningful error message
@@ -254,14 +402,67 @@ def _evaluate_with_openai(api_key, prompt):
             error_text = response.text
             error_msg = f'OpenAI API 오류: {error_text}'
         
-        logger.error(f"[{datetime.now()}] OpenAI API Error: {response.text}")
+        log_payload(logger, 'OpenAI API Error', response.text, force=True, level=logging.ERROR, status_code=response.status_code)
         return {'success': False, 'error': error_msg}
 
 
-def _evaluate_with_anthropic(api_key, prompt):
-    """Evaluate conversation using Anthropic API"""
-    logger = get_logger('anthropic')
+def _evaluate_with_openai(api_key, prompt, use_cache=True, static_prefix=None):
+    """Evaluate conversation using OpenAI API"""
+    logger = get_logger('evaluation.openai')
+    headers, data = _build_openai_evaluation_request(api_key, prompt, static_prefix)
+
+    cache_key, cached = response_cache.lookup('openai', data, use_cache)
+    if cached is not None:
+        logger.info('OpenAI evaluation cache hit', extra={'cache_key': cache_key[:12]})
+        return cached
+
+    logger.info('OpenAI API Request', extra={'model': data['model'], 'prompt_length': len(prompt)})
+    
+    response = connection_pool.post(
+        OPENAI_CHAT_COMPLETIONS_URL,
+        headers=headers,
+        json=data,
+        timeout=60
+    )
+    result = _parse_openai_evaluation_response(response, logger)
+    if result.get('success'):
+        # Token usage belongs to this call only; a cache hit costs no tokens
+        response_cache.set(cache_key, {k: v for k, v in result.items() if k != 'usage'})
+    return result
+
+
+async def _evaluate_with_openai_async(api_key, prompt, use_cache=True, static_prefix=None):
+    """Coroutine version of _evaluate_with_openai"""
+    logger = get_logger('evaluation.openai')
+    headers, data = _build_openai_evaluation_request(api_key, prompt, static_prefix)
+
+    cache_key, cached = await response_cache.lookup_async('openai', data, use_cache)
+    if cached is not None:
+        logger.info('OpenAI evaluation cache hit', extra={'cache_key': cache_key[:12]})
+        return cached
+
+    logger.info('OpenAI API Request', extra={'model': data['model'], 'prompt_length': len(prompt)})
     
+    response = await get_async_client().post(
+        OPENAI_CHAT_COMPLETIONS_URL,
+        headers=headers,
+        json=data,
+        timeout=60
+    )
+    result = _parse_openai_evaluation_response(response, logger)
+    if result.get('success'):
+        # Token usage belongs to this call only; a cache hit costs no tokens
+        await response_cache.set_async(cache_key, {k: v for k, v in result.items() if k != 'usage'})
+    return result
+
+
+@timing_phase('prompt')
+def _build_anthropic_evaluation_request(api_key, prompt, static_prefix=None):
+    """
+    Build (headers, data) for an Anthropic evaluation request.
+    With a static_prefix (cached layout) the system prompt becomes a text block
+    marked with cache_control, so later evaluations read it from the prompt cache.
+    """
     headers = {
         'x-api-key': api_key,
         'anthropic-version': '2023-06-01',
@@ -272,7 +473,7 @@ def _evaluate_with_anthropic(api_key, prompt):
     system_message = '당신은 대화형 AI 전문 분석가입니다. 주어진 대화를 분석하고 반드시 유효한 JSON 형식으로만 평가 결과를 출력하세요. JSON 외의 설명, 주석, 마크다운 코드 블록은 포함하지 마세요.'
     
     data = {
-        'model': 'claude-sonnet-4-5', # Using Claude Sonnet 4.5 as per official documentation
+        'model': model_router.select_model('evaluation', 'anthropic'), # Routed within the evaluation tier (claude-sonnet-4-5 by default)
         'max_tokens': 4096,
         'system': system_message,
         'messages': [
@@ -283,20 +484,23 @@ def _evaluate_with_anthropic(api_key, prompt):
         ],
         'temperature': 0.2 # Low temperature for consistent evaluation
     }
+    if static_prefix:
+        data['system'] = [{
+            'type': 'text',
+            'text': f"{system_message}\n\n{static_prefix}",
+            'cache_control': {'type': 'ephemeral'}
+        }]
 
-    logger.info(f"[{datetime.now()}] Anthropic API Request - Model: {data['model']}, Prompt length: {len(prompt)}")
-    
-    response = requests.post(
-        'https://api.anthropic.com/v1/messages',
-        headers=headers,
-        json=data,
-        timeout=60
-    )
-    
-    logger.info(f"[{datetime.now()}] Anthropic API Response Status: {response.status_code}")
+    return headers, data
+
+
+def _parse_anthropic_evaluation_response(response, logger):
+    """Handle an Anthropic evaluation response (requests or httpx response object)"""
+    logger.info('Anthropic API Response', extra={'status_code': response.status_code})
     
     if response.status_code == 200:
-        result = response.json()
+        with timing_phase('parse'):
+            result = response.json()
         
         # Anthropic returns content as a list of content blocks
         content_blocks = result.get('content', [])
@@ -312,7 +516,11 @@ def _evaluate_with_anthropic(api_key, prompt):
             content = ''
         
         # Log the raw LLM response
-        logger.info(f"[{datetime.now()}] Raw Anthropic Response Content:\n{content}\n{'='*50}")
+        log_payload(logger, 'Raw Anthropic Response Content', content)
+        usage = anthropic_token_usage(result.get('usage', {}))
+        logger.info('Anthropic token usage', extra=usage)
+        record_tokens('anthropic', result.get('model'), usage)
+        rate_limiter.reconcile(response, usage)
         
         # Parse JSON content
         try:
@@ -330,16 +538,18 @@ def _evaluate_with_anthropic(api_key, prompt):
                     lines = lines[:-1]
                 json_content = '\n'.join(lines)
             
-            parsed_content = json.loads(json_content)
-            logger.info(f"[{datetime.now()}] Evaluation completed successfully")
-            return {'success': True, 'result': parsed_content}
+            with timing_phase('parse'):
+                parsed_content = json.loads(json_content)
+            logger.info('Evaluation completed successfully')
+            return {'success': True, 'result': parsed_content, 'usage': usage}
         except json.JSONDecodeError as e:
-            logger.error(f"[{datetime.now()}] JSON Parse Error: {str(e)}\nError position: {e.pos if hasattr(e, 'pos') else 'N/A'}\nContent: {content}")
+            log_payload(logger, f"JSON Parse Error: {str(e)}", content, force=True, level=logging.ERROR, error_position=getattr(e, 'pos', None))
+            EVALUATION_PARSE_FAILURES.labels('anthropic').inc()
             return {'success': False, 'error': 'Failed to parse JSON response from LLM', 'raw_content': content}
     elif response.status_code == 401:
         # API key authentication error
         error_msg = '올바르지 않은 API 키입니다. Anthropic API 키를 확인해주세요.'
-        logger.error(f"[{datetime.now()}] Anthropic API Authentication Error: {response.text}")
+        log_payload(logger, 'Anthropic API Authentication Error', response.text, force=True, level=logging.ERROR, status_code=response.status_code)
         return {'success': False, 'error': error_msg, 'auth_error': True}
     else:
         # Parse error response to get meaningful error message
@@ -368,5 +578,425 @@ def _evaluate_with_anthropic(api_key, prompt):
             error_text = response.text
             error_msg = f'Anthropic API 오류: {error_text}'
         
-        logger.error(f"[{datetime.now()}] Anthropic API Error: {response.text}")
+        log_payload(logger, 'Anthropic API Error', response.text, force=True, level=logging.ERROR, status_code=response.status_code)
         return {'success': False, 'error': error_msg}
+
+
+def _evaluate_with_anthropic(api_key, prompt, use_cache=True, static_prefix=None):
+    """Evaluate conversation using Anthropic API"""
+    logger = get_logger('evaluation.anthropic')
+    headers, data = _build_anthropic_evaluation_request(api_key, prompt, static_prefix)
+
+    cache_key, cached = response_cache.lookup('anthropic', data, use_cache)
+    if cached is not None:
+        logger.info('Anthropic evaluation cache hit', extra={'cache_key': cache_key[:12]})
+        return cached
+
+    logger.info('Anthropic API Request', extra={'model': data['model'], 'prompt_length': len(prompt)})
+    
+    response = connection_pool.post(
+        ANTHROPIC_MESSAGES_URL,
+        headers=headers,
+        json=data,
+        timeout=60
+    )
+    result = _parse_anthropic_evaluation_response(response, logger)
+    if result.get('success'):
+        # Token usage belongs to this call only; a cache hit costs no tokens
+        response_cache.set(cache_key, {k: v for k, v in result.items() if k != 'usage'})
+    return result
+
+
+async def _evaluate_with_anthropic_async(api_key, prompt, use_cache=True, static_prefix=None):
+    """Coroutine version of _evaluate_with_anthropic"""
+    logger = get_logger('evaluation.anthropic')
+    headers, data = _build_anthropic_evaluation_request(api_key, prompt, static_prefix)
+
+    cache_key, cached = await response_cache.lookup_async('anthropic', data, use_cache)
+    if cached is not None:
+        logger.info('Anthropic evaluation cache hit', extra={'cache_key': cache_key[:12]})
+        return cached
+
+    logger.info('Anthropic API Request', extra={'model': data['model'], 'prompt_length': len(prompt)})
+    
+    response = await get_async_client().post(
+        ANTHROPIC_MESSAGES_URL,
+        headers=headers,
+        json=data,
+        timeout=60
+    )
+    result = _parse_anthropic_evaluation_response(response, logger)
+    if result.get('success'):
+        # Token usage belongs to this call only; a cache hit costs no tokens
+        await response_cache.set_async(cache_key, {k: v for k, v in result.items() if k != 'usage'})
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Provider Batch API mode
+#
+# Each item is turned into the exact request _evaluate_with_openai /
+# _evaluate_with_anthropic would send, submitted as one provider batch, and the
+# results are mapped back to the items by custom_id ("item-<index>").
+# ---------------------------------------------------------------------------
+
+OPENAI_BATCH_ACTIVE_STATUSES = ('validating', 'in_progress', 'finalizing', 'cancelling')
+
+# batch_id -> {'provider', 'item_ids'}; lets a later poll map results back to item ids
+_MAX_TRACKED_BATCHES = 1000
+_submitted_batches = OrderedDict()
+_submitted_batches_lock = threading.Lock()
+
+
+class _BatchResultResponse:
+    """Minimal response object so batch result bodies reuse the regular response parsers"""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body, ensure_ascii=False)
+
+    def json(self):
+        return self._body
+
+
+def _batch_custom_id(index):
+    return f'item-{index}'
+
+
+def _batch_item_index(custom_id):
+    try:
+        return int(str(custom_id).rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _batch_api_error(provider, response):
+    """Error dict for a failed batch control request (upload/create/poll/results)"""
+    try:
+        error_detail = response.json().get('error', {})
+        if isinstance(error_detail, dict):
+            # Anthropic nests the error object one level deeper
+            error_detail = error_detail.get('error', error_detail)
+            message = error_detail.get('message', response.text)
+        else:
+            message = str(error_detail)
+    except Exception:
+        message = response.text
+    error = {'success': False, 'error': f'{provider} Batch API 오류 ({response.status_code}): {message}'}
+    if response.status_code == 401:
+        error['auth_error'] = True
+    return error
+
+
+def _parse_jsonl(content):
+    """Parses a batch result file; both providers serve it without a charset, so decode the bytes as UTF-8"""
+    return [json.loads(line) for line in content.decode('utf-8').splitlines() if line.strip()]
+
+
+def _track_batch(batch_id, provider, item_ids):
+    with _submitted_batches_lock:
+        _submitted_batches[batch_id] = {'provider': provider, 'item_ids': item_ids}
+        while len(_submitted_batches) > _MAX_TRACKED_BATCHES:
+            _submitted_batches.popitem(last=False)
+
+
+def _tracked_batch(batch_id):
+    with _submitted_batches_lock:
+        return _submitted_batches.get(batch_id)
+
+
+def build_openai_batch_jsonl(items):
+    """
+    Builds the OpenAI Batch API input file: one /v1/chat/completions request per item,
+    with the same body _evaluate_with_openai sends.
+    """
+    lines = []
+    for index, item in enumerate(items):
+        static_prefix, prompt = build_evaluation_prompt_parts(
+            item.get('topic', ''), item.get('persona1', ''),
+            item.get('persona2', ''), item.get('dialogue_log', [])
+        )
+        _, data = _build_openai_evaluation_request(None, prompt, static_prefix)
+        lines.append(json.dumps({
+            'custom_id': _batch_custom_id(index),
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': data
+        }, ensure_ascii=False))
+    return '\n'.join(lines) + '\n'
+
+
+def build_anthropic_batch_requests(items):
+    """
+    Builds the Anthropic Message Batches request list, with the same params
+    _evaluate_with_anthropic sends.
+    """
+    requests_list = []
+    for index, item in enumerate(items):
+        static_prefix, prompt = build_evaluation_prompt_parts(
+            item.get('topic', ''), item.get('persona1', ''),
+            item.get('persona2', ''), item.get('dialogue_log', [])
+        )
+        _, data = _build_anthropic_evaluation_request(None, prompt, static_prefix)
+        requests_list.append({'custom_id': _batch_custom_id(index), 'params': data})
+    return requests_list
+
+
+def _submit_openai_batch(api_key, items):
+    logger = get_logger('evaluation.openai')
+    headers, _ = _build_openai_evaluation_request(api_key, '')
+    auth_headers = {'Authorization': headers['Authorization']}
+
+    upload = connection_pool.post(
+        f'{OPENAI_API_BASE}/files',
+        headers=auth_headers,
+        data={'purpose': 'batch'},
+        files={'file': ('evaluation_batch.jsonl', build_openai_batch_jsonl(items).encode('utf-8'), 'application/jsonl')},
+        timeout=120,
+        retry=REJECTED_ONLY_RETRY_POLICY
+    )
+    if upload.status_code != 200:
+        log_payload(logger, 'OpenAI Batch file upload failed', upload.text, force=True, level=logging.ERROR, status_code=upload.status_code)
+        return _batch_api_error('OpenAI', upload)
+
+    response = connection_pool.post(
+        f'{OPENAI_API_BASE}/batches',
+        headers=headers,
+        json={
+            'input_file_id': upload.json()['id'],
+            'endpoint': '/v1/chat/completions',
+            'completion_window': '24h'
+        },
+        timeout=60,
+        retry=REJECTED_ONLY_RETRY_POLICY
+    )
+    if response.status_code != 200:
+        log_payload(logger, 'OpenAI Batch creation failed', response.text, force=True, level=logging.ERROR, status_code=response.status_code)
+        return _batch_api_error('OpenAI', response)
+
+    batch = response.json()
+    logger.info('OpenAI Batch submitted', extra={'batch_id': batch['id'], 'items': len(items)})
+    return {'success': True, 'batch_id': batch['id'], 'status': batch.get('status', 'validating')}
+
+
+def _submit_anthropic_batch(api_key, items):
+    logger = get_logger('evaluation.anthropic')
+    headers, _ = _build_anthropic_evaluation_request(api_key, '')
+
+    response = connection_pool.post(
+        f'{ANTHROPIC_API_BASE}/messages/batches',
+        headers=headers,
+        json={'requests': build_anthropic_batch_requests(items)},
+        timeout=120,
+        retry=REJECTED_ONLY_RETRY_POLICY
+    )
+    if response.status_code != 200:
+        log_payload(logger, 'Anthropic Batch creation failed', response.text, force=True, level=logging.ERROR, status_code=response.status_code)
+        return _batch_api_error('Anthropic', response)
+
+    batch = response.json()
+    logger.info('Anthropic Batch submitted', extra={'batch_id': batch['id'], 'items': len(items)})
+    return {'success': True, 'batch_id': batch['id'], 'status': batch.get('processing_status', 'in_progress')}
+
+
+def submit_evaluation_batch(items, provider='openai'):
+    """
+    Submits many conversations as one provider batch (OpenAI Batch API or
+    Anthropic Message Batches). Returns immediately with the batch id; use
+    get_evaluation_batch to poll and collect results.
+
+    Args:
+        items: List of dicts with 'topic', 'persona1', 'persona2', 'dialogue_log' and optional 'id'
+        provider: 'openai' or 'anthropic' (default: 'openai')
+    """
+    provider = provider.lower()
+    if not items or not all(isinstance(item, dict) for item in items):
+        return {'success': False, 'error': 'items must be a non-empty list of objects'}
+    if len(items) > PROVIDER_BATCH_MAX_ITEMS:
+        return {'success': False, 'error': f'Too many items: {len(items)} (max {PROVIDER_BATCH_MAX_ITEMS})'}
+
+    api_key, error = _get_provider_api_key(provider)
+    if error:
+        return error
+
+    try:
+        if provider == 'openai':
+            result = _submit_openai_batch(api_key, items)
+        else:
+            result = _submit_anthropic_batch(api_key, items)
+    except Exception as e:
+        get_logger(f'evaluation.{provider}').error(f"Batch submission error: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+    if result.get('success'):
+        item_ids = [item.get('id', index) for index, item in enumerate(items)]
+        _track_batch(result['batch_id'], provider, item_ids)
+        result.update({'provider': provider, 'item_count': len(items), 'done': False})
+    return result
+
+
+def _map_batch_results(parsed_by_index, item_ids):
+    """Orders per-item results by input index and attaches item ids"""
+    if item_ids is None:
+        # Batch submitted by another process: item ids are unknown, fall back to the input index
+        item_ids = list(range(max(parsed_by_index) + 1)) if parsed_by_index else []
+
+    results = []
+    for index, item_id in enumerate(item_ids):
+        result = parsed_by_index.get(index, {'success': False, 'error': 'No result returned for this item'})
+        results.append({'index': index, 'id': item_id, **result})
+    return results
+
+
+def _parse_openai_batch_line(line, logger):
+    """Maps one line of an OpenAI batch output/error file to the evaluation result contract"""
+    response = line.get('response') or {}
+    if line.get('error') and not response:
+        error = line['error']
+        message = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+        return {'success': False, 'error': f'OpenAI Batch 항목 오류: {message}'}
+    return _parse_openai_evaluation_response(
+        _BatchResultResponse(response.get('status_code', 500), response.get('body', {})), logger
+    )
+
+
+def _get_openai_batch(api_key, batch_id, item_ids):
+    logger = get_logger('evaluation.openai')
+    headers, _ = _build_openai_evaluation_request(api_key, '')
+
+    response = connection_pool.get(f'{OPENAI_API_BASE}/batches/{batch_id}', headers=headers, timeout=60)
+    if response.status_code != 200:
+        return _batch_api_error('OpenAI', response)
+
+    batch = response.json()
+    status = batch.get('status')
+    result = {'success': True, 'batch_id': batch_id, 'status': status, 'request_counts': batch.get('request_counts')}
+    if status in OPENAI_BATCH_ACTIVE_STATUSES:
+        result['done'] = False
+        return result
+
+    parsed_by_index = {}
+    for file_key in ('output_file_id', 'error_file_id'):
+        file_id = batch.get(file_key)
+        if not file_id:
+            continue
+        content = connection_pool.get(f'{OPENAI_API_BASE}/files/{file_id}/content', headers=headers, timeout=120)
+        if content.status_code != 200:
+            return _batch_api_error('OpenAI', content)
+        for line in _parse_jsonl(content.content):
+            index = _batch_item_index(line.get('custom_id'))
+            if index is not None:
+                parsed_by_index[index] = _parse_openai_batch_line(line, logger)
+
+    if status != 'completed' and not parsed_by_index:
+        result['success'] = False
+        errors = (batch.get('errors') or {}).get('data') or []
+        result['error'] = f'OpenAI Batch {status}' + (f": {errors[0].get('message')}" if errors else '')
+    result['done'] = True
+    result['results'] = _map_batch_results(parsed_by_index, item_ids)
+    return result
+
+
+def _parse_anthropic_batch_line(line, logger):
+    """Maps one line of an Anthropic batch results file to the evaluation result contract"""
+    result = line.get('result') or {}
+    result_type = result.get('type')
+    if result_type == 'succeeded':
+        return _parse_anthropic_evaluation_response(_BatchResultResponse(200, result.get('message', {})), logger)
+    if result_type == 'errored':
+        error = result.get('error') or {}
+        inner = error.get('error', error) if isinstance(error, dict) else {}
+        status_code = 401 if inner.get('type') == 'authentication_error' else 400
+        return _parse_anthropic_evaluation_response(_BatchResultResponse(status_code, error), logger)
+    return {'success': False, 'error': f'Anthropic Batch 항목이 처리되지 않았습니다: {result_type}'}
+
+
+def _get_anthropic_batch(api_key, batch_id, item_ids):
+    logger = get_logger('evaluation.anthropic')
+    headers, _ = _build_anthropic_evaluation_request(api_key, '')
+
+    response = connection_pool.get(f'{ANTHROPIC_API_BASE}/messages/batches/{batch_id}', headers=headers, timeout=60)
+    if response.status_code != 200:
+        return _batch_api_error('Anthropic', response)
+
+    batch = response.json()
+    status = batch.get('processing_status')
+    result = {'success': True, 'batch_id': batch_id, 'status': status, 'request_counts': batch.get('request_counts')}
+    if status != 'ended':
+        result['done'] = False
+        return result
+
+    results_url = batch.get('results_url') or f'{ANTHROPIC_API_BASE}/messages/batches/{batch_id}/results'
+    content = connection_pool.get(results_url, headers=headers, timeout=120)
+    if content.status_code != 200:
+        return _batch_api_error('Anthropic', content)
+
+    parsed_by_index = {}
+    for line in _parse_jsonl(content.content):
+        index = _batch_item_index(line.get('custom_id'))
+        if index is not None:
+            parsed_by_index[index] = _parse_anthropic_batch_line(line, logger)
+
+    result['done'] = True
+    result['results'] = _map_batch_results(parsed_by_index, item_ids)
+    return result
+
+
+def get_evaluation_batch(batch_id, provider=None):
+    """
+    Polls a submitted provider batch. While it is running, returns its status with
+    done=False; once it has finished, downloads the results and returns them in
+    input order (same per-item shape as the /api/evaluate-batch results).
+
+    Args:
+        batch_id: Id returned by submit_evaluation_batch
+        provider: 'openai' or 'anthropic'; may be omitted for batches submitted by this process
+    """
+    tracked = _tracked_batch(batch_id)
+    if provider is None:
+        if tracked is None:
+            return {'success': False, 'error': f'Unknown batch: {batch_id}. Specify the provider.'}
+        provider = tracked['provider']
+    provider = provider.lower()
+    item_ids = tracked['item_ids'] if tracked and tracked['provider'] == provider else None
+
+    api_key, error = _get_provider_api_key(provider)
+    if error:
+        return error
+
+    try:
+        if provider == 'openai':
+            result = _get_openai_batch(api_key, batch_id, item_ids)
+        else:
+            result = _get_anthropic_batch(api_key, batch_id, item_ids)
+    except Exception as e:
+        get_logger(f'evaluation.{provider}').error(f"Batch poll error: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
+    if 'batch_id' in result:
+        result['provider'] = provider
+    return result
+
+
+def run_evaluation_batch(items, provider='openai', poll_interval=None, timeout=None):
+    """
+    Submits a provider batch and blocks until it finishes (for nightly/offline runs).
+    Returns the final get_evaluation_batch result, or the last status with an
+    error if `timeout` seconds pass first.
+    """
+    submitted = submit_evaluation_batch(items, provider)
+    if not submitted.get('success'):
+        return submitted
+
+    poll_interval = PROVIDER_BATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        result = get_evaluation_batch(submitted['batch_id'], provider)
+        if not result.get('success') or result.get('done'):
+            return result
+        if deadline is not None and time.monotonic() >= deadline:
+            result['success'] = False
+            result['error'] = f"Batch {submitted['batch_id']} did not finish within {timeout} seconds"
+            return result
+        time.sleep(poll_interval)
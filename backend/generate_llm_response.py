@@ -3,9 +3,43 @@ LLM API를 사용하여 실제 응답 생성
 OpenAI, Anthropic, Google 등의 API를 호출합니다.
 """
 import requests
+import httpx
+import json
 import re
-from typing import Dict, List, Optional
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Tuple
 from config import LLMRequestConfig, LLMResponse
+from circuit_breaker import CIRCUIT_OPEN_ERROR_CODE, CircuitOpenError
+from http_client import connection_pool, get_async_client, run_sync
+from hedging import HEDGE_ENABLED, hedged_call
+from model_router import model_router
+from provider_endpoints import OPENAI_API_BASE, ANTHROPIC_API_BASE
+from response_cache import response_cache
+from rate_limiter import rate_limiter
+from retry_policy import start_request_retries
+from usage_calibration import usage_calibration
+from metrics import record_tokens
+from server_timing import timing_phase
+from structured_logging import get_logger, log_payload
+from prompt_templates import (
+    CONVERSATION_SYSTEM, OPENAI_IDENTITY_SYSTEM, OPENAI_FIRST_USER, OPENAI_FOLLOWUP_USER,
+    OPENAI_HISTORY_SELF, OPENAI_HISTORY_OTHER, OPENAI_CONTEXT_SELF, OPENAI_CONTEXT_OTHER,
+    OPENAI_RECENT_CONTEXT, OPENAI_MENTIONED_INFO, ANTHROPIC_FIRST_USER, ANTHROPIC_HISTORY_HEADER,
+    ANTHROPIC_HISTORY_SELF, ANTHROPIC_HISTORY_OTHER, ANTHROPIC_TURN_INSTRUCTION, PROMPT_GENERATION_USER,
+    OPENAI_HISTORY_MESSAGES, OPENAI_CONTEXT_MESSAGES, MENTIONED_INFO_CHARS
+)
+
+logger = get_logger('generation')
+
+OPENAI_CHAT_COMPLETIONS_URL = f'{OPENAI_API_BASE}/chat/completions'
+ANTHROPIC_MESSAGES_URL = f'{ANTHROPIC_API_BASE}/messages'
+
+# 프로바이더별 temperature 상한 (프로바이더 대체 시 같은 비율로 변환, top_p는 둘 다 0 ~ 1)
+PROVIDER_MAX_TEMPERATURE = {'openai': 2.0, 'anthropic': 1.0}
+# temperature와 top_p를 함께 보낼 수 있는 Anthropic 모델 (이후 모델은 둘 중 하나만 허용하므로 temperature만 보냄)
+ANTHROPIC_COMBINED_SAMPLING_PREFIXES = ('claude-3',)
+
+PROMPT_GENERATION_SYSTEM_MESSAGE = '당신은 대화 시뮬레이션을 위한 시스템 프롬프트를 생성하는 전문가입니다. 주어진 주제와 두 페르소나에 맞는 역할과 행동 지침을 담은 프롬프트를 생성하세요.'
 
 def clean_response_text(text: str) -> str:
     """
@@ -43,309 +77,354 @@ def clean_response_text(text: str) -> str:
     
     return text
 
-def generate_conversation_prompt(api_key: str, topic: str, persona1: str, persona2: str) -> str:
+def _is_anthropic_key(api_key: str) -> bool:
+    """API 키 형식이 Anthropic 키인지 확인"""
+    return api_key.startswith('sk-ant-') or api_key.startswith('sk-ant-api')
+
+def generate_conversation_prompt(api_key: str, topic: str, persona1: str, persona2: str, use_cache: bool = True) -> str:
     """
     LLM을 사용하여 주제와 페르소나에 맞는 대화 프롬프트를 동적으로 생성
     API 키 형식에 따라 OpenAI 또는 Anthropic 사용
-    
+
     Args:
         api_key: API 키 (OpenAI 또는 Anthropic)
         topic: 대화 주제
         persona1: 챗봇 1의 페르소나
         persona2: 챗봇 2의 페르소나
-    
+        use_cache: False이면 응답 캐시를 조회하지 않고 항상 API 호출
+
     Returns:
         생성된 프롬프트 문자열 (실패 시 None)
     """
     # API 키 형식에 따라 모델 타입 결정
-    if api_key.startswith('sk-ant-') or api_key.startswith('sk-ant-api'):
+    if _is_anthropic_key(api_key):
         # Anthropic API 사용
         try:
-            result = _try_generate_prompt_with_anthropic(api_key, topic, persona1, persona2)
-            if result:
-                print(f"프롬프트: {result}")
-                return result
-            else:
-                print(f"Anthropic API로 프롬프트 생성 실패")
-                return None
+            result = _try_generate_prompt_with_anthropic(api_key, topic, persona1, persona2, use_cache)
+            return _report_prompt_result(result, 'Anthropic API로')
         except Exception as e:
-            print(f"Anthropic API로 프롬프트 생성 중 오류: {str(e)}")
+            logger.exception("Anthropic API로 프롬프트 생성 중 오류: %s", e)
             return None
     else:
         # OpenAI API 사용 (기본값)
-        model_name = 'gpt-4o'
+        model_name = model_router.select_model('prompt', 'openai')
         try:
-            result = _try_generate_prompt_with_model(api_key, topic, persona1, persona2, model_name)
-            if result:
-                print(f"프롬프트: {result}")
-                return result
-            else:
-                print(f"모델 {model_name}로 프롬프트 생성 실패")
-                return None
+            result = _try_generate_prompt_with_model(api_key, topic, persona1, persona2, model_name, use_cache)
+            return _report_prompt_result(result, f'모델 {model_name}로')
         except Exception as e:
-            print(f"모델 {model_name}로 프롬프트 생성 중 오류: {str(e)}")
+            logger.exception("모델 %s로 프롬프트 생성 중 오류: %s", model_name, e)
             return None
 
-def _try_generate_prompt_with_anthropic(api_key: str, topic: str, persona1: str, persona2: str) -> Optional[str]:
+async def generate_conversation_prompt_async(api_key: str, topic: str, persona1: str, persona2: str, use_cache: bool = True) -> str:
+    """
+    generate_conversation_prompt의 코루틴 버전
+    """
+    if _is_anthropic_key(api_key):
+        try:
+            result = await _try_generate_prompt_with_anthropic_async(api_key, topic, persona1, persona2, use_cache)
+            return _report_prompt_result(result, 'Anthropic API로')
+        except Exception as e:
+            logger.exception("Anthropic API로 프롬프트 생성 중 오류: %s", e)
+            return None
+    else:
+        model_name = model_router.select_model('prompt', 'openai')
+        try:
+            result = await _try_generate_prompt_with_model_async(api_key, topic, persona1, persona2, model_name, use_cache)
+            return _report_prompt_result(result, f'모델 {model_name}로')
+        except Exception as e:
+            logger.exception("모델 %s로 프롬프트 생성 중 오류: %s", model_name, e)
+            return None
+
+def _report_prompt_result(result: Optional[str], source: str) -> Optional[str]:
+    """프롬프트 생성 결과 기록 후 반환"""
+    if result:
+        return result
+    logger.warning("%s 프롬프트 생성 실패", source)
+    return None
+
+def _build_prompt_generation_user_content(topic: str, persona1: str, persona2: str) -> str:
+    """
+    프롬프트 생성 요청 메시지 구성 (OpenAI/Anthropic 공통)
+    """
+    return PROMPT_GENERATION_USER.render(topic=topic, persona1=persona1, persona2=persona2)
+
+def _log_prompt_timeout(label: str):
+    """프롬프트 생성 시간 초과 로그"""
+    logger.error(
+        "[프롬프트 생성 실패] %s - 요청 시간 초과 (60초)", label,
+        extra={'source': label, 'reason': 'timeout'}
+    )
+
+def _log_prompt_exception(label: str, e: Exception):
+    """프롬프트 생성 중 예외 로그"""
+    logger.error(
+        "[프롬프트 생성 실패] %s - 예외 발생: %s: %s", label, type(e).__name__, e,
+        extra={'source': label, 'reason': 'exception', 'exception_type': type(e).__name__}
+    )
+
+@timing_phase('prompt')
+def _build_anthropic_prompt_request(api_key: str, topic: str, persona1: str, persona2: str) -> Tuple[Dict, Dict]:
+    """
+    Anthropic 프롬프트 생성 요청의 (headers, data) 구성
+    """
+    headers = {
+        'x-api-key': api_key,
+        'anthropic-version': '2023-06-01',
+        'Content-Type': 'application/json'
+    }
+
+    data = {
+        'model': model_router.select_model('prompt', 'anthropic'),
+        'max_tokens': 2000,
+        'system': PROMPT_GENERATION_SYSTEM_MESSAGE,
+        'messages': [
+            {'role': 'user', 'content': _build_prompt_generation_user_content(topic, persona1, persona2)}
+        ],
+        'temperature': 0.7
+    }
+    return headers, data
+
+def _parse_anthropic_prompt_response(response) -> Optional[str]:
+    """
+    Anthropic 프롬프트 생성 응답 처리 (requests/httpx 응답 객체 공통)
+    """
+    if response.status_code == 200:
+        with timing_phase('parse'):
+            result = response.json()
+        content_blocks = result.get('content', [])
+
+        if content_blocks and len(content_blocks) > 0:
+            first_block = content_blocks[0]
+            if isinstance(first_block, dict):
+                content = first_block.get('text', '').strip()
+            else:
+                content = str(first_block).strip()
+        else:
+            content = ''
+
+        log_payload(logger, "[프롬프트 생성 성공] Anthropic Claude", content, source='Anthropic Claude')
+        return content
+    else:
+        # 에러 발생
+        error_msg = ""
+        error_details = ""
+        try:
+            error_data = response.json()
+            error_detail = error_data.get('error', {})
+            if isinstance(error_detail, dict):
+                error_msg = error_detail.get('message', '알 수 없는 오류')
+                error_type = error_detail.get('type', '알 수 없음')
+                error_details = f"타입: {error_type}"
+            else:
+                error_msg = str(error_detail)
+        except Exception as parse_error:
+            error_msg = f'응답 파싱 실패: {str(parse_error)}'
+            error_details = f"상태 코드: {response.status_code}, 응답 본문: {response.text[:200]}"
+
+        logger.error(
+            "[프롬프트 생성 실패] Anthropic Claude - %s", error_msg,
+            extra={'source': 'Anthropic Claude', 'status_code': response.status_code, 'details': error_details}
+        )
+        return None
+
+def _try_generate_prompt_with_anthropic(api_key: str, topic: str, persona1: str, persona2: str, use_cache: bool = True) -> Optional[str]:
     """
     Anthropic Claude 모델을 사용하여 주제와 페르소나에 맞는 대화 프롬프트 생성
-    
+
     Args:
         api_key: Anthropic API 키
         topic: 대화 주제
         persona1: 챗봇 1의 페르소나
         persona2: 챗봇 2의 페르소나
-    
+        use_cache: False이면 응답 캐시를 조회하지 않음
+
     Returns:
         생성된 프롬프트 문자열 (실패 시 None)
     """
     try:
-        headers = {
-            'x-api-key': api_key,
-            'anthropic-version': '2023-06-01',
-            'Content-Type': 'application/json'
-        }
-        
-        system_message = '당신은 대화 시뮬레이션을 위한 시스템 프롬프트를 생성하는 전문가입니다. 주어진 주제와 두 페르소나에 맞는 역할과 행동 지침을 담은 프롬프트를 생성하세요.'
-        
-        user_content = f"""다음 정보를 바탕으로 대화 시뮬레이션을 위한 시스템 프롬프트를 생성해주세요:
-
-주제: {topic}
-페르소나 1 (챗봇 1): {persona1}
-페르소나 2 (챗봇 2): {persona2}
-
-[중요] 프롬프트 작성 요구사항:
-1. 각 페르소나의 역할과 책임을 명확히 설명하세요
-   - 페르소나 1이 어떤 역할을 하는지 (예: 정보 제공자, 정보 요청자, 의견 제시자 등)
-   - 페르소나 2가 어떤 역할을 하는지
-   - 각 페르소나가 대화에서 어떤 행동을 해야 하는지
+        headers, data = _build_anthropic_prompt_request(api_key, topic, persona1, persona2)
+        cache_key, cached = response_cache.lookup('anthropic', data, use_cache)
+        if cached is not None:
+            logger.info("[프롬프트 캐시 적중]", extra={'cache_key': cache_key[:12]})
+            return cached
 
-2. 각 페르소나의 특성과 성격을 반영하세요
-   - 페르소나 설명에 명시된 특성들을 대화에 어떻게 반영할지
-   - 말투, 태도, 관점 등
-
-3. 주제에 대한 대화 목적과 방향을 제시하세요
-   - 이 대화의 목적이 무엇인지
-   - 대화가 어떻게 진행되어야 하는지
-
-4. 절대 실제 대화 예시나 대화 내용을 포함하지 마세요
-   - "고객: 안녕하세요..." 같은 실제 대화 예시는 포함하지 마세요
-   - 역할 지침과 행동 규칙만 작성하세요
+        response = connection_pool.post(
+            ANTHROPIC_MESSAGES_URL,
+            headers=headers,
+            json=data,
+            timeout=60
+        )
+        result = _parse_anthropic_prompt_response(response)
+        if result:
+            response_cache.set(cache_key, result)
+        return result
 
-5. 한국어로 작성하세요
+    except requests.exceptions.Timeout:
+        _log_prompt_timeout('Anthropic Claude')
+        return None
+    except Exception as e:
+        _log_prompt_exception('Anthropic Claude', e)
+        return None
 
-6. 프롬프트만 반환하세요 (추가 설명이나 메타 설명 없이)
+async def _try_generate_prompt_with_anthropic_async(api_key: str, topic: str, persona1: str, persona2: str, use_cache: bool = True) -> Optional[str]:
+    """
+    _try_generate_prompt_with_anthropic의 코루틴 버전
+    """
+    try:
+        headers, data = _build_anthropic_prompt_request(api_key, topic, persona1, persona2)
+        cache_key, cached = await response_cache.lookup_async('anthropic', data, use_cache)
+        if cached is not None:
+            logger.info("[프롬프트 캐시 적중]", extra={'cache_key': cache_key[:12]})
+            return cached
 
-생성된 프롬프트:"""
-        
-        data = {
-            'model': 'claude-sonnet-4-5',  # evaluate_conversation.py와 동일한 모델 사용
-            'max_tokens': 2000,
-            'system': system_message,
-            'messages': [
-                {'role': 'user', 'content': user_content}
-            ],
-            'temperature': 0.7
-        }
-        
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
+        response = await get_async_client().post(
+            ANTHROPIC_MESSAGES_URL,
             headers=headers,
             json=data,
             timeout=60
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            content_blocks = result.get('content', [])
-            
-            if content_blocks and len(content_blocks) > 0:
-                first_block = content_blocks[0]
-                if isinstance(first_block, dict):
-                    content = first_block.get('text', '').strip()
-                else:
-                    content = str(first_block).strip()
-            else:
-                content = ''
-            
-            print(f"\n{'='*80}")
-            print(f"[프롬프트 생성 성공] Anthropic Claude")
-            print(f"{'='*80}")
-            print(f"생성된 프롬프트:\n{content}")
-            print(f"{'='*80}\n")
-            return content
-        else:
-            # 에러 발생
-            error_msg = ""
-            error_details = ""
-            try:
-                error_data = response.json()
-                error_detail = error_data.get('error', {})
-                if isinstance(error_detail, dict):
-                    error_msg = error_detail.get('message', '알 수 없는 오류')
-                    error_type = error_detail.get('type', '알 수 없음')
-                    error_details = f"타입: {error_type}"
-                else:
-                    error_msg = str(error_detail)
-            except Exception as parse_error:
-                error_msg = f'응답 파싱 실패: {str(parse_error)}'
-                error_details = f"상태 코드: {response.status_code}, 응답 본문: {response.text[:200]}"
-            
-            print(f"\n{'='*80}")
-            print(f"[프롬프트 생성 실패] Anthropic Claude")
-            print(f"{'='*80}")
-            print(f"실패 이유: {error_msg}")
-            if error_details:
-                print(f"상세 정보: {error_details}")
-            print(f"상태 코드: {response.status_code}")
-            print(f"{'='*80}\n")
-            return None
-            
-    except requests.exceptions.Timeout:
-        print(f"\n{'='*80}")
-        print(f"[프롬프트 생성 실패] Anthropic Claude")
-        print(f"{'='*80}")
-        print(f"실패 이유: 요청 시간 초과 (60초)")
-        print(f"원인: API 서버가 응답하는데 너무 오래 걸렸거나 네트워크 문제가 발생했습니다.")
-        print(f"{'='*80}\n")
+        result = _parse_anthropic_prompt_response(response)
+        if result:
+            await response_cache.set_async(cache_key, result)
+        return result
+
+    except httpx.TimeoutException:
+        _log_prompt_timeout('Anthropic Claude')
         return None
     except Exception as e:
-        print(f"\n{'='*80}")
-        print(f"[프롬프트 생성 실패] Anthropic Claude")
-        print(f"{'='*80}")
-        print(f"실패 이유: 예외 발생")
-        print(f"예외 타입: {type(e).__name__}")
-        print(f"예외 메시지: {str(e)}")
-        print(f"원인: API 호출 중 예상치 못한 오류가 발생했습니다.")
-        print(f"{'='*80}\n")
+        _log_prompt_exception('Anthropic Claude', e)
         return None
 
-def _try_generate_prompt_with_model(api_key: str, topic: str, persona1: str, persona2: str, model_name: str) -> Optional[str]:
+@timing_phase('prompt')
+def _build_openai_prompt_request(api_key: str, topic: str, persona1: str, persona2: str, model_name: str) -> Tuple[Dict, Dict]:
     """
-    GPT-4o 모델을 사용하여 주제와 페르소나에 맞는 대화 프롬프트 생성
-    
+    OpenAI 프롬프트 생성 요청의 (headers, data) 구성
+    """
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+    # GPT-4o에 대화 프롬프트 생성을 요청하는 메시지 구성
+    messages = [
+        {
+            'role': 'system',
+            'content': PROMPT_GENERATION_SYSTEM_MESSAGE
+        },
+        {
+            'role': 'user',
+            'content': _build_prompt_generation_user_content(topic, persona1, persona2)
+        }
+    ]
+
+    data = {
+        'model': model_name,
+        'messages': messages,
+        'max_tokens': 2000,
+        'temperature': 0.7,
+        'top_p': 1.0
+    }
+    return headers, data
+
+def _parse_openai_prompt_response(response, model_name: str) -> Optional[str]:
+    """
+    OpenAI 프롬프트 생성 응답 처리 (requests/httpx 응답 객체 공통)
+    """
+    if response.status_code == 200:
+        with timing_phase('parse'):
+            result = response.json()
+        content = result['choices'][0]['message']['content'].strip()
+        log_payload(logger, f"[프롬프트 생성 성공] 모델: {model_name}", content, model=model_name)
+        return content
+    else:
+        # 에러 발생
+        error_msg = ""
+        error_details = ""
+        try:
+            error_data = response.json()
+            error_message = error_data.get('error', {})
+            error_msg = error_message.get('message', '알 수 없는 오류')
+            error_type = error_message.get('type', '알 수 없음')
+            error_code = error_message.get('code', '알 수 없음')
+            error_details = f"타입: {error_type}, 코드: {error_code}"
+        except Exception as parse_error:
+            error_msg = f'응답 파싱 실패: {str(parse_error)}'
+            error_details = f"상태 코드: {response.status_code}, 응답 본문: {response.text[:200]}"
+
+        logger.error(
+            "[프롬프트 생성 실패] 모델: %s - %s", model_name, error_msg,
+            extra={'model': model_name, 'status_code': response.status_code, 'details': error_details}
+        )
+        return None
+
+def _try_generate_prompt_with_model(api_key: str, topic: str, persona1: str, persona2: str, model_name: str, use_cache: bool = True) -> Optional[str]:
+    """
+    OpenAI 모델을 사용하여 주제와 페르소나에 맞는 대화 프롬프트 생성
+
     Args:
         api_key: OpenAI API 키
         topic: 대화 주제
         persona1: 챗봇 1의 페르소나
         persona2: 챗봇 2의 페르소나
-        model_name: 사용할 모델 이름 (gpt-4o)
-    
+        model_name: 사용할 모델 이름 (모델 라우터가 고른 모델)
+        use_cache: False이면 응답 캐시를 조회하지 않음
+
     Returns:
         생성된 프롬프트 문자열 (실패 시 None)
     """
     try:
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # GPT-4o에 대화 프롬프트 생성을 요청하는 메시지 구성
-        messages = [
-            {
-                'role': 'system',
-                'content': '당신은 대화 시뮬레이션을 위한 시스템 프롬프트를 생성하는 전문가입니다. 주어진 주제와 두 페르소나에 맞는 역할과 행동 지침을 담은 프롬프트를 생성하세요.'
-            },
-            {
-                'role': 'user',
-                'content': f"""다음 정보를 바탕으로 대화 시뮬레이션을 위한 시스템 프롬프트를 생성해주세요:
-
-주제: {topic}
-페르소나 1 (챗봇 1): {persona1}
-페르소나 2 (챗봇 2): {persona2}
-
-[중요] 프롬프트 작성 요구사항:
-1. 각 페르소나의 역할과 책임을 명확히 설명하세요
-   - 페르소나 1이 어떤 역할을 하는지 (예: 정보 제공자, 정보 요청자, 의견 제시자 등)
-   - 페르소나 2가 어떤 역할을 하는지
-   - 각 페르소나가 대화에서 어떤 행동을 해야 하는지
-
-2. 각 페르소나의 특성과 성격을 반영하세요
-   - 페르소나 설명에 명시된 특성들을 대화에 어떻게 반영할지
-   - 말투, 태도, 관점 등
-
-3. 주제에 대한 대화 목적과 방향을 제시하세요
-   - 이 대화의 목적이 무엇인지
-   - 대화가 어떻게 진행되어야 하는지
+        headers, data = _build_openai_prompt_request(api_key, topic, persona1, persona2, model_name)
+        cache_key, cached = response_cache.lookup('openai', data, use_cache)
+        if cached is not None:
+            logger.info("[프롬프트 캐시 적중]", extra={'cache_key': cache_key[:12]})
+            return cached
 
-4. 절대 실제 대화 예시나 대화 내용을 포함하지 마세요
-   - "고객: 안녕하세요..." 같은 실제 대화 예시는 포함하지 마세요
-   - 역할 지침과 행동 규칙만 작성하세요
+        # GPT-4o API 호출
+        response = connection_pool.post(
+            OPENAI_CHAT_COMPLETIONS_URL,
+            headers=headers,
+            json=data,
+            timeout=60
+        )
+        result = _parse_openai_prompt_response(response, model_name)
+        if result:
+            response_cache.set(cache_key, result)
+        return result
 
-5. 한국어로 작성하세요
+    except requests.exceptions.Timeout:
+        _log_prompt_timeout(f'모델: {model_name}')
+        return None
+    except Exception as e:
+        _log_prompt_exception(f'모델: {model_name}', e)
+        return None
 
-6. 프롬프트만 반환하세요 (추가 설명이나 메타 설명 없이)
+async def _try_generate_prompt_with_model_async(api_key: str, topic: str, persona1: str, persona2: str, model_name: str, use_cache: bool = True) -> Optional[str]:
+    """
+    _try_generate_prompt_with_model의 코루틴 버전
+    """
+    try:
+        headers, data = _build_openai_prompt_request(api_key, topic, persona1, persona2, model_name)
+        cache_key, cached = await response_cache.lookup_async('openai', data, use_cache)
+        if cached is not None:
+            logger.info("[프롬프트 캐시 적중]", extra={'cache_key': cache_key[:12]})
+            return cached
 
-생성된 프롬프트:"""
-            }
-        ]
-        
-        # GPT-4o API 호출
-        data = {
-            'model': model_name,
-            'messages': messages,
-            'max_tokens': 2000,
-            'temperature': 0.7,
-            'top_p': 1.0
-        }
-        
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
+        response = await get_async_client().post(
+            OPENAI_CHAT_COMPLETIONS_URL,
             headers=headers,
             json=data,
             timeout=60
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-            print(f"\n{'='*80}")
-            print(f"[프롬프트 생성 성공] 모델: {model_name}")
-            print(f"{'='*80}")
-            print(f"생성된 프롬프트:\n{content}")
-            print(f"{'='*80}\n")
-            return content
-        else:
-            # 에러 발생
-            error_msg = ""
-            error_details = ""
-            try:
-                error_data = response.json()
-                error_message = error_data.get('error', {})
-                error_msg = error_message.get('message', '알 수 없는 오류')
-                error_type = error_message.get('type', '알 수 없음')
-                error_code = error_message.get('code', '알 수 없음')
-                error_details = f"타입: {error_type}, 코드: {error_code}"
-            except Exception as parse_error:
-                error_msg = f'응답 파싱 실패: {str(parse_error)}'
-                error_details = f"상태 코드: {response.status_code}, 응답 본문: {response.text[:200]}"
-            
-            print(f"\n{'='*80}")
-            print(f"[프롬프트 생성 실패] 모델: {model_name}")
-            print(f"{'='*80}")
-            print(f"실패 이유: {error_msg}")
-            print(f"상세 정보: {error_details}")
-            print(f"상태 코드: {response.status_code}")
-            print(f"{'='*80}\n")
-            return None
-            
-    except requests.exceptions.Timeout:
-        print(f"\n{'='*80}")
-        print(f"[프롬프트 생성 실패] 모델: {model_name}")
-        print(f"{'='*80}")
-        print(f"실패 이유: 요청 시간 초과 (60초)")
-        print(f"원인: API 서버가 응답하는데 너무 오래 걸렸거나 네트워크 문제가 발생했습니다.")
-        print(f"{'='*80}\n")
+        result = _parse_openai_prompt_response(response, model_name)
+        if result:
+            await response_cache.set_async(cache_key, result)
+        return result
+
+    except httpx.TimeoutException:
+        _log_prompt_timeout(f'모델: {model_name}')
         return None
     except Exception as e:
-        print(f"\n{'='*80}")
-        print(f"[프롬프트 생성 실패] 모델: {model_name}")
-        print(f"{'='*80}")
-        print(f"실패 이유: 예외 발생")
-        print(f"예외 타입: {type(e).__name__}")
-        print(f"예외 메시지: {str(e)}")
-        print(f"원인: API 호출 중 예상치 못한 오류가 발생했습니다.")
-        print(f"{'='*80}\n")
+        _log_prompt_exception(f'모델: {model_name}', e)
         return None
 
 
@@ -404,357 +483,538 @@ def ensure_complete_sentence(text: str) -> str:
     
     return text
 
-def generate_openai_response(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
+# 스트리밍 시 역할 표시("고객:" 등)를 찾는 응답 앞부분 범위 (문자 수)
+STREAM_HEAD_WINDOW = 20
+_ROLE_PREFIX_PATTERN = re.compile(r'^[^:\n]+:\s*["\']?\s*')
+_SENTENCE_TERMINATORS = ('.', '!', '?')
+
+class StreamingTextCleaner:
     """
-    OpenAI API를 사용하여 응답 생성
+    스트리밍 응답에 clean_response_text/ensure_complete_sentence 규칙을 점진적으로 적용
+    - 앞부분: 따옴표와 역할 표시는 STREAM_HEAD_WINDOW 안에서만 판단하여 제거
+    - 본문: 마지막 문장 종결 부호(. ! ?)까지만 내보내고 나머지는 보류
+      (ensure_complete_sentence는 마지막 종결 부호 앞을 자르지 않으므로 이미 보낸 텍스트는 바뀌지 않음)
+    - 끝: 남은 텍스트의 뒤 따옴표를 제거하고 ensure_complete_sentence 적용
+    feed()/finish()가 반환한 조각을 이어 붙이면 최종 텍스트(text)와 같습니다.
     """
-    try:
-        headers = {
-            'Authorization': f'Bearer {config.api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # 대화 히스토리 구성
-        messages = []
-        
-        # 커스텀 프롬프트가 없으면 기본 프롬프트 생성
-        other_bot_number = 3 - config.bot_number
-        if not custom_system_prompt:
-            # 기본 프롬프트 생성
-            system_prompt = f"""당신은 챗봇 {config.bot_number}입니다. {config.persona}의 역할을 맡고 있습니다.
-
-현재 상황:
-- 주제: {config.topic}
-- 당신은 챗봇 {config.bot_number} ({config.persona})
-- 상대방은 챗봇 {other_bot_number}
-- 두 챗봇이 {config.topic}에 대해 대화를 나누고 있습니다.
-
-당신의 역할 (매우 중요):
-- 이것은 단순한 독백이 아닌 **실제 대화**입니다.
-- 상대방(챗봇 {other_bot_number})의 발언에 **반드시 직접적으로 반응**해야 합니다.
-- 상대방의 말에 대해 질문하거나, 공감하거나, 동의하거나, 반대 의견을 제시하거나, 상대방의 말을 인용해야 합니다.
-- 절대로 주제에 대해 독립적으로 말만 하면 안 됩니다. 상대방과의 상호작용이 필수입니다.
-- "{config.persona}"의 관점을 유지하면서도 상대방과 소통해야 합니다.
-
-절대적으로 지켜야 할 규칙:
-1. 반드시 한국어로만 응답하세요.
-2. 반드시 완전한 문장으로 끝나야 합니다.
-3. 한 번에 1-2문장으로만 응답하세요.
-4. **상대방의 발언에 직접적으로 반응하세요.**"""
+
+    def __init__(self):
+        self._raw = ''
+        self._head_offset: Optional[int] = None
+        self._emitted = ''
+
+    @property
+    def text(self) -> str:
+        return self._emitted
+
+    def _resolve_head(self, final: bool = False) -> bool:
+        """앞부분 제거 범위 확정 (확정되면 True)"""
+        if self._head_offset is not None:
+            return True
+        stripped = self._raw.lstrip()
+        offset = len(self._raw) - len(stripped)
+        if stripped[:1] in ('"', "'"):
+            offset += 1
+            stripped = stripped[1:]
+        match = _ROLE_PREFIX_PATTERN.match(stripped)
+        if match and match.group(0).index(':') < STREAM_HEAD_WINDOW:
+            # 역할 표시 뒤의 공백/따옴표까지 도착해야 제거 범위가 확정됨
+            if match.end() < len(stripped) or final:
+                self._head_offset = offset + match.end()
+                return True
+            return False
+        if len(stripped) >= STREAM_HEAD_WINDOW or final:
+            rest = stripped.lstrip()
+            self._head_offset = offset + (len(stripped) - len(rest))
+            return True
+        return False
+
+    def _body(self) -> str:
+        return self._raw[self._head_offset:]
+
+    def feed(self, delta: str) -> str:
+        """새 조각을 받아 지금 내보낼 수 있는 텍스트 반환"""
+        self._raw += delta
+        if not self._resolve_head():
+            return ''
+        body = self._body()
+        last_complete = max(body.rfind(t) for t in _SENTENCE_TERMINATORS)
+        if last_complete < 0:
+            return ''
+        ready = body[:last_complete + 1]
+        if len(ready) <= len(self._emitted) or not ready.startswith(self._emitted):
+            return ''
+        chunk = ready[len(self._emitted):]
+        self._emitted = ready
+        return chunk
+
+    def finish(self) -> str:
+        """스트림 종료 시 남은 텍스트를 정리하여 반환"""
+        self._resolve_head(final=True)
+        body = self._body().rstrip()
+        if body.endswith('"') or body.endswith("'"):
+            body = body[:-1].rstrip()
+        final_text = ensure_complete_sentence(body)
+        if final_text.startswith(self._emitted):
+            chunk = final_text[len(self._emitted):]
         else:
-            # 커스텀 프롬프트에서 {persona} 변수를 실제 페르소나로 치환
-            system_prompt = custom_system_prompt.replace('{persona}', config.persona)
+            chunk = ''
+        self._emitted = final_text
+        return chunk
+
+@timing_phase('prompt')
+def _build_openai_request(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> Tuple[Dict, Dict]:
+    """
+    OpenAI 응답 생성 요청의 (headers, data) 구성
+    """
+    headers = {
+        'Authorization': f'Bearer {config.api_key}',
+        'Content-Type': 'application/json'
+    }
+    
+    # 커스텀 프롬프트가 없으면 기본 프롬프트 생성
+    other_bot_number = 3 - config.bot_number
+    if not custom_system_prompt:
+        # 기본 프롬프트 생성
+        system_prompt = CONVERSATION_SYSTEM.render(
+            bot_number=config.bot_number, persona=config.persona,
+            topic=config.topic, other_bot_number=other_bot_number
+        )
+    else:
+        # 커스텀 프롬프트에서 {persona} 변수를 실제 페르소나로 치환
+        system_prompt = custom_system_prompt.replace('{persona}', config.persona)
+    
+    # 상대방 페르소나 정보 (other_persona가 있으면 사용)
+    other_persona_text = f" ({other_persona})" if other_persona else ""
+    other_persona_info = other_persona if other_persona else "알 수 없음"
+    
+    # 역할 구분 정보 추가 (페르소나 정보 강조)
+    system_prompt = OPENAI_IDENTITY_SYSTEM.render(
+        system_prompt=system_prompt, bot_number=config.bot_number, persona=config.persona,
+        other_bot_number=other_bot_number, other_persona=other_persona_info,
+        other_persona_suffix=other_persona_text
+    )
+
+    # 시스템 프롬프트(정적 내용)를 항상 맨 앞에 둠
+    # 같은 챗봇의 턴마다 바이트 단위로 동일한 접두사가 되어 OpenAI 프롬프트 캐시가 적용됨
+    messages = [{
+        'role': 'system',
+        'content': system_prompt
+    }]
+
+    # 현재 챗봇의 응답 요청
+    if not config.previous_messages:
+        # 첫 메시지: 대화 시작
+        user_message = OPENAI_FIRST_USER.render(topic=config.topic, bot_number=config.bot_number, persona=config.persona)
+    else:
+        last_message = config.previous_messages[-1]
+        other_bot = last_message['bot']
         
-        # 상대방 페르소나 정보 (other_persona가 있으면 사용)
-        other_persona_text = f" ({other_persona})" if other_persona else ""
+        # 이전 대화 히스토리를 messages 배열에 role로 구분하여 추가
+        # 최근 메시지들을 messages 배열에 추가 (assistant는 자신의 발언, user는 상대방의 발언)
+        history_messages = config.previous_messages[-OPENAI_HISTORY_MESSAGES:]
         
-        # 역할 구분 정보 추가 (페르소나 정보 강조)
-        system_prompt = f"""{system_prompt}
-
-[매우 중요] 당신의 정체성과 역할:
-- 당신은 챗봇 {config.bot_number}이며, 페르소나는 "{config.persona}"입니다
-- 상대방은 챗봇 {other_bot_number}이며, 페르소나는 "{other_persona or '알 수 없음'}"입니다
-- 당신은 절대 상대방의 페르소나나 역할로 말하지 마세요
-- 당신은 오직 "{config.persona}"의 페르소나로만 대화해야 합니다
-- 대화 히스토리에서 "당신(챗봇 {config.bot_number}, {config.persona})"이라고 표시된 것은 당신이 말한 내용입니다
-- "상대방(챗봇 {other_bot_number}{other_persona_text})"이라고 표시된 것은 상대방이 말한 내용입니다
-- 절대 자신과 상대방의 발언을 혼동하지 마세요
-- 절대 상대방의 페르소나, 역할, 말투를 모방하거나 따라하지 마세요
-
-[매우 중요] 응답 길이 제한:
-- 짧고 간결하게, 일상 대화하듯이 자연스럽게 말하세요
-- 긴 설명, 복잡한 문장 구조, 여러 문장으로 나누어 말하는 것을 절대 금지합니다
-- 핵심만 간단히 전달하세요"""
-
-
-        # 현재 챗봇의 응답 요청
-        if not config.previous_messages:
-            # 첫 메시지: 대화 시작
-            user_message = f"""
-            주제 '{config.topic}'에 대해 대화를 시작합니다.
-
-            [매우 중요] 당신의 정체성:
-            - 당신은 챗봇 {config.bot_number}이며, 페르소나는 "{config.persona}"입니다
-            - 당신은 오직 이 페르소나의 역할과 특성으로만 대화해야 합니다
-            - 시스템 프롬프트에 명시된 역할과 "{config.persona}"의 특성을 정확히 따르세요
-            - 절대 다른 페르소나나 역할로 말하지 마세요
-
-            [매우 중요] 응답 길이:
-            - 긴 설명이나 여러 문장 사용 금지
-            """
-        else:
-            last_message = config.previous_messages[-1]
-            other_bot = last_message['bot']
-            
-            # 이전 대화 히스토리를 messages 배열에 role로 구분하여 추가
-            # 최근 메시지들을 messages 배열에 추가 (assistant는 자신의 발언, user는 상대방의 발언)
-            history_messages = config.previous_messages[-6:] if len(config.previous_messages) >= 6 else config.previous_messages
-            
-            for msg in history_messages:
+        for msg in history_messages:
+            if msg['bot'] == config.bot_number:
+                # 자신의 발언은 assistant role로 추가 (페르소나 정보 포함)
+                messages.append({
+                    'role': 'assistant',
+                    'content': OPENAI_HISTORY_SELF.render(bot_number=config.bot_number, persona=config.persona, text=msg['text'])
+                })
+            else:
+                # 상대방의 발언은 user role로 추가 (페르소나 정보 포함)
+                messages.append({
+                    'role': 'user',
+                    'content': OPENAI_HISTORY_OTHER.render(other_bot_number=other_bot_number, other_persona=other_persona_info, text=msg['text'])
+                })
+        
+        # 이전 대화 맥락 요약 (최근 2-3개 메시지) - 참고용으로만 사용
+        recent_context = ""
+        if len(config.previous_messages) > 1:
+            context_messages = config.previous_messages[-OPENAI_CONTEXT_MESSAGES:]
+            context_texts = []
+            for msg in context_messages:
                 if msg['bot'] == config.bot_number:
-                    # 자신의 발언은 assistant role로 추가 (페르소나 정보 포함)
-                    messages.append({
-                        'role': 'assistant',
-                        'content': f"[당신(챗봇 {config.bot_number}, {config.persona})의 이전 발언] {msg['text']}"
-                    })
+                    context_texts.append(OPENAI_CONTEXT_SELF.render(bot_number=config.bot_number, persona=config.persona, text=msg['text']))
                 else:
-                    # 상대방의 발언은 user role로 추가 (페르소나 정보 포함)
-                    other_persona_info = other_persona if other_persona else "알 수 없음"
-                    messages.append({
-                        'role': 'user',
-                        'content': f"[상대방(챗봇 {other_bot_number}, {other_persona_info})의 발언] {msg['text']}"
-                    })
-            
-            # 이전 대화 맥락 요약 (최근 2-3개 메시지) - 참고용으로만 사용
-            recent_context = ""
-            if len(config.previous_messages) > 1:
-                context_messages = config.previous_messages[-3:] if len(config.previous_messages) >= 3 else config.previous_messages
-                context_texts = []
-                for msg in context_messages:
-                    if msg['bot'] == config.bot_number:
-                        context_texts.append(f"당신(챗봇 {config.bot_number}, {config.persona}): {msg['text']}")
-                    else:
-                        other_persona_info = other_persona if other_persona else "알 수 없음"
-                        context_texts.append(f"상대방(챗봇 {other_bot_number}, {other_persona_info}): {msg['text']}")
-                recent_context = "\n\n[중요] 이전 대화 맥락 요약 (참고용):\n" + "\n".join(context_texts) + "\n\n위 대화에서 이미 언급된 내용을 다시 물어보지 마세요. 이미 말한 정보를 활용하여 대화를 진행하세요.\n"
-            
-            # 이미 언급된 내용 추출 (간단한 요약)
-            mentioned_info = ""
-            if len(config.previous_messages) > 0:
-                all_previous_text = " ".join([msg['text'] for msg in config.previous_messages])
-                # 간단한 키워드 추출 (더 정교한 방법은 나중에 개선 가능)
-                mentioned_info = f"\n[참고] 이전 대화에서 이미 언급된 내용: {all_previous_text[:200]}...\n위 내용을 다시 물어보지 말고, 이를 바탕으로 대화를 진행하세요.\n"
-            
-            other_persona_info = other_persona if other_persona else "알 수 없음"
-            user_message = f"""
-            [매우 중요] 당신의 정체성 (절대 잊지 마세요):
-            - 당신은 챗봇 {config.bot_number}이며, 페르소나는 "{config.persona}"입니다
-            - 상대방은 챗봇 {other_bot_number}이며, 페르소나는 "{other_persona_info}"입니다
-            - 당신은 오직 "{config.persona}"의 페르소나로만 대화해야 합니다
-            - 절대 상대방의 페르소나("{other_persona_info}")나 역할로 말하지 마세요
-            - 절대 상대방의 말투, 태도, 관점을 모방하거나 따라하지 마세요
-
-            상대방(챗봇 {other_bot_number}, {other_persona_info})이 방금 한 말입니다:
-
-            "{last_message['text']}"
-            {recent_context}
-            {mentioned_info}
-            
-            [중요 지시사항]:
-            1. 위의 대화 히스토리를 참고하되, "당신(챗봇 {config.bot_number}, {config.persona})"이라고 표시된 것은 당신이 말한 것이고, "상대방(챗봇 {other_bot_number}, {other_persona_info})"이라고 표시된 것은 상대방이 말한 것입니다
-            2. 절대 자신과 상대방의 발언을 혼동하지 마세요
-            3. 당신은 "{config.persona}"의 페르소나를 유지해야 합니다 - 절대 상대방의 페르소나로 말하지 마세요
-            4. 상대방의 말에 직접적으로 반응하되, 이미 말한 내용을 다시 물어보지 마세요
-            5. 이전 대화 맥락을 활용하여 새로운 정보나 다음 단계를 제시하세요
-            6. 대화를 한 단계 더 구체적이고 진전된 방향으로 이끌어가세요
-            7. 시스템 프롬프트에 명시된 역할과 "{config.persona}"의 특성을 정확히 따르세요
-            8. 절대 역할 표시("통신사 고객:", "고객:", "직원:" 등)를 포함하지 마세요
-            9. 따옴표나 인용 부호를 사용하지 마세요
-            10. 역할을 직접 말하지 말고, 자연스럽게 대화하세요
-            
-            [매우 중요] 응답 길이 제한 (절대 지키세요):
-            - 짧고 간결하게, 일상 대화하듯이 자연스럽게 말하세요
-            - 긴 설명, 복잡한 문장 구조, 여러 문장으로 나누어 말하는 것을 절대 금지합니다
-            - 핵심만 간단히 전달하세요
-            """
-
-        # 시스템 프롬프트 추가
-        messages.append({
-            'role': 'system',
-            'content': system_prompt
-        })
+                    context_texts.append(OPENAI_CONTEXT_OTHER.render(other_bot_number=other_bot_number, other_persona=other_persona_info, text=msg['text']))
+            recent_context = OPENAI_RECENT_CONTEXT.render(lines="\n".join(context_texts))
         
-        # 사용자 메시지 추가
-        messages.append({
-            'role': 'user',
-            'content': user_message
-        })
+        # 이미 언급된 내용 추출 (간단한 요약)
+        mentioned_info = ""
+        if len(config.previous_messages) > 0:
+            all_previous_text = " ".join([msg['text'] for msg in config.previous_messages])
+            # 간단한 키워드 추출 (더 정교한 방법은 나중에 개선 가능)
+            mentioned_info = OPENAI_MENTIONED_INFO.render(text=all_previous_text[:MENTIONED_INFO_CHARS])
         
-        # 멀티턴 대화는 GPT-4o만 사용
-        model_name = 'gpt-4o'
+        user_message = OPENAI_FOLLOWUP_USER.render(
+            bot_number=config.bot_number, persona=config.persona,
+            other_bot_number=other_bot_number, other_persona=other_persona_info,
+            last_message=last_message['text'], recent_context=recent_context, mentioned_info=mentioned_info
+        )
+
+    # 사용자 메시지 추가
+    messages.append({
+        'role': 'user',
+        'content': user_message
+    })
+    
+    # 모델 라우터가 고른 모델 (없으면 티어의 기본 모델)
+    model_name = config.model or model_router.default_model('generation', 'openai', config.tier)
+    
+    data = {
+        'model': model_name,
+        'messages': messages,
+        'temperature': config.temperature,
+        'top_p': config.top_p,
+        'max_tokens': config.max_tokens,
+        'stop': None  # stop sequence 제거
+    }
+    
+    return headers, data
+
+def openai_token_usage(usage: Dict) -> Dict:
+    """
+    OpenAI usage 필드를 LLMResponse 토큰 필드로 변환 (캐시 적중 토큰은 prompt_tokens_details에 있음)
+    """
+    return {
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+        'total_tokens': usage.get('total_tokens'),
+        'cached_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+    }
+
+def _parse_openai_response(response, model_name: str) -> LLMResponse:
+    """
+    OpenAI 응답 생성 결과 처리 (requests/httpx 응답 객체 공통)
+    """
+    if response.status_code == 200:
+        with timing_phase('parse'):
+            result = response.json()
+        content = result['choices'][0]['message']['content'].strip()
+        with timing_phase('postprocess'):
+            # 응답 정리: 따옴표 제거, 역할 표시 제거
+            content = clean_response_text(content)
+            # 완전한 문장으로 끝나도록 후처리
+            content = ensure_complete_sentence(content)
         
-        data = {
-            'model': model_name,
-            'messages': messages,
-            'temperature': config.temperature,
-            'top_p': config.top_p,
-            'max_tokens': config.max_tokens,
-            'stop': None  # stop sequence 제거
-        }
+        # 토큰 사용량 추출
+        usage = openai_token_usage(result.get('usage', {}))
+        record_tokens('openai', model_name, usage)
+        rate_limiter.reconcile(response, usage)
+        
+        logger.debug("응답 생성 성공", extra={'model': model_name})
+        return LLMResponse(
+            success=True, 
+            text=content,
+            **usage
+        )
+    else:
+        # 에러 발생
+        try:
+            error_data = response.json()
+            error_message = error_data.get('error', {})
+            error_msg = error_message.get('message', '알 수 없는 오류')
+            logger.error("모델 %s로 응답 생성 실패: %s", model_name, error_msg, extra={'status_code': response.status_code})
+        except:
+            error_msg = f'상태 코드: {response.status_code}'
+            logger.error("모델 %s로 응답 생성 실패: %s", model_name, error_msg, extra={'status_code': response.status_code})
+        return LLMResponse(success=False, error=f'OpenAI API 오류: {error_msg}')
+
+def generate_openai_response(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
+    """
+    OpenAI API를 사용하여 응답 생성
+    """
+    try:
+        headers, data = _build_openai_request(config, custom_system_prompt, other_persona)
         
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
+        response = connection_pool.post(
+            OPENAI_CHAT_COMPLETIONS_URL,
             headers=headers,
             json=data,
             timeout=30
         )
+        return _parse_openai_response(response, data['model'])
         
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-            # 응답 정리: 따옴표 제거, 역할 표시 제거
-            content = clean_response_text(content)
-            # 완전한 문장으로 끝나도록 후처리
-            content = ensure_complete_sentence(content)
-            
-            # 토큰 사용량 추출
-            usage = result.get('usage', {})
-            prompt_tokens = usage.get('prompt_tokens')
-            completion_tokens = usage.get('completion_tokens')
-            total_tokens = usage.get('total_tokens')
-            
-            print(f"응답 생성 성공 - 모델: {model_name}")
-            return LLMResponse(
-                success=True, 
-                text=content,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens
-            )
-        else:
-            # 에러 발생
-            try:
-                error_data = response.json()
-                error_message = error_data.get('error', {})
-                error_msg = error_message.get('message', '알 수 없는 오류')
-                print(f"모델 {model_name}로 응답 생성 실패: {error_msg}")
-            except:
-                error_msg = f'상태 코드: {response.status_code}'
-                print(f"모델 {model_name}로 응답 생성 실패: {error_msg}")
-            return LLMResponse(success=False, error=f'OpenAI API 오류: {error_msg}')
-            
+    except CircuitOpenError as e:
+        return LLMResponse(success=False, error=str(e), error_code=e.error_code)
     except requests.exceptions.Timeout:
         return LLMResponse(success=False, error='요청 시간이 초과되었습니다.')
     except Exception as e:
         return LLMResponse(success=False, error=f'오류 발생: {str(e)}')
 
-def generate_anthropic_response(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
+async def generate_openai_response_async(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
     """
-    Anthropic API를 사용하여 응답 생성
+    generate_openai_response의 코루틴 버전
     """
     try:
-        headers = {
-            'x-api-key': config.api_key,
-            'anthropic-version': '2023-06-01',
-            'Content-Type': 'application/json'
-        }
+        headers, data = _build_openai_request(config, custom_system_prompt, other_persona)
         
-        # 기본 프롬프트 생성 (custom_system_prompt가 없으면)
-        other_bot_number = 3 - config.bot_number
-        if not custom_system_prompt:
-            system_prompt = f"""당신은 챗봇 {config.bot_number}입니다. {config.persona}의 역할을 맡고 있습니다.
-
-현재 상황:
-- 주제: {config.topic}
-- 당신은 챗봇 {config.bot_number} ({config.persona})
-- 상대방은 챗봇 {other_bot_number}
-- 두 챗봇이 {config.topic}에 대해 대화를 나누고 있습니다.
-
-당신의 역할 (매우 중요):
-- 이것은 단순한 독백이 아닌 **실제 대화**입니다.
-- 상대방(챗봇 {other_bot_number})의 발언에 **반드시 직접적으로 반응**해야 합니다.
-- 상대방의 말에 대해 질문하거나, 공감하거나, 동의하거나, 반대 의견을 제시하거나, 상대방의 말을 인용해야 합니다.
-- 절대로 주제에 대해 독립적으로 말만 하면 안 됩니다. 상대방과의 상호작용이 필수입니다.
-- "{config.persona}"의 관점을 유지하면서도 상대방과 소통해야 합니다.
-
-절대적으로 지켜야 할 규칙:
-1. 반드시 한국어로만 응답하세요.
-2. 반드시 완전한 문장으로 끝나야 합니다.
-3. 한 번에 1-2문장으로만 응답하세요.
-4. **상대방의 발언에 직접적으로 반응하세요.**"""
-        else:
-            system_prompt = custom_system_prompt.replace('{persona}', config.persona)
+        response = await get_async_client().post(
+            OPENAI_CHAT_COMPLETIONS_URL,
+            headers=headers,
+            json=data,
+            timeout=30
+        )
+        return _parse_openai_response(response, data['model'])
         
-        # 메시지 구성
-        messages = []
-        if not config.previous_messages:
-            user_content = f"주제 '{config.topic}'에 대해 대화를 시작합니다. {config.persona}의 페르소나로 짧고 간결하게 첫 메시지를 작성하세요."
-        else:
-            # 대화 히스토리 구성
-            conversation_text = ""
-            for msg in config.previous_messages:
-                speaker = f"챗봇 {msg['bot']}"
-                if msg['bot'] == config.bot_number:
-                    speaker += f" (당신, {config.persona})"
-                else:
-                    speaker += f" (상대방)"
-                conversation_text += f"{speaker}: {msg['text']}\n"
-            
-            user_content = f"""다음은 지금까지의 대화입니다:
+    except CircuitOpenError as e:
+        return LLMResponse(success=False, error=str(e), error_code=e.error_code)
+    except httpx.TimeoutException:
+        return LLMResponse(success=False, error='요청 시간이 초과되었습니다.')
+    except Exception as e:
+        return LLMResponse(success=False, error=f'오류 발생: {str(e)}')
 
-{conversation_text}
+@timing_phase('prompt')
+def _build_anthropic_request(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> Tuple[Dict, Dict]:
+    """
+    Anthropic 응답 생성 요청의 (headers, data) 구성
+    """
+    headers = {
+        'x-api-key': config.api_key,
+        'anthropic-version': '2023-06-01',
+        'Content-Type': 'application/json'
+    }
+    
+    # 기본 프롬프트 생성 (custom_system_prompt가 없으면)
+    other_bot_number = 3 - config.bot_number
+    if not custom_system_prompt:
+        system_prompt = CONVERSATION_SYSTEM.render(
+            bot_number=config.bot_number, persona=config.persona,
+            topic=config.topic, other_bot_number=other_bot_number
+        )
+    else:
+        system_prompt = custom_system_prompt.replace('{persona}', config.persona)
+    
+    # 메시지 구성
+    if not config.previous_messages:
+        user_content = ANTHROPIC_FIRST_USER.render(topic=config.topic, persona=config.persona)
+    else:
+        # 대화 히스토리 구성: 발언마다 하나의 텍스트 블록으로 만들어 턴이 지나도 앞부분이 그대로 유지되게 함
+        user_content = [{'type': 'text', 'text': ANTHROPIC_HISTORY_HEADER.render()}]
+        for msg in config.previous_messages:
+            if msg['bot'] == config.bot_number:
+                text = ANTHROPIC_HISTORY_SELF.render(bot=msg['bot'], persona=config.persona, text=msg['text'])
+            else:
+                text = ANTHROPIC_HISTORY_OTHER.render(bot=msg['bot'], text=msg['text'])
+            user_content.append({'type': 'text', 'text': text})
+        
+        # 히스토리 끝에 캐시 지점 표시 (다음 턴은 이 지점까지를 캐시에서 읽음)
+        user_content[-1]['cache_control'] = {'type': 'ephemeral'}
+        user_content.append({
+            'type': 'text',
+            'text': ANTHROPIC_TURN_INSTRUCTION.render(bot_number=config.bot_number, persona=config.persona)
+        })
+    
+    model_name = config.model or model_router.default_model('generation', 'anthropic', config.tier)
+    data = {
+        'model': model_name,
+        'max_tokens': 150,
+        # 정적인 시스템 프롬프트를 캐시 지점으로 표시
+        'system': [
+            {'type': 'text', 'text': system_prompt, 'cache_control': {'type': 'ephemeral'}}
+        ],
+        'messages': [
+            {'role': 'user', 'content': user_content}
+        ],
+        'temperature': config.temperature
+    }
+    if model_name.startswith(ANTHROPIC_COMBINED_SAMPLING_PREFIXES):
+        data['top_p'] = config.top_p
+    
+    return headers, data
 
-이제 당신(챗봇 {config.bot_number}, {config.persona})의 차례입니다. 상대방의 발언에 직접적으로 반응하면서 짧고 간결하게 응답하세요."""
+def anthropic_token_usage(usage: Dict) -> Dict:
+    """
+    Anthropic usage 필드를 LLMResponse 토큰 필드로 변환
+    input_tokens에는 캐시 읽기/쓰기 토큰이 빠져 있으므로 합산해서 OpenAI와 같은 의미의 prompt_tokens로 맞춤
+    """
+    cached_tokens = usage.get('cache_read_input_tokens') or 0
+    cache_creation_tokens = usage.get('cache_creation_input_tokens') or 0
+    prompt_tokens = (usage.get('input_tokens') or 0) + cached_tokens + cache_creation_tokens
+    completion_tokens = usage.get('output_tokens') or 0
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'cached_tokens': cached_tokens,
+        'cache_creation_tokens': cache_creation_tokens
+    }
+
+def _parse_anthropic_response(response) -> LLMResponse:
+    """
+    Anthropic 응답 생성 결과 처리 (requests/httpx 응답 객체 공통)
+    """
+    if response.status_code == 200:
+        with timing_phase('parse'):
+            result = response.json()
+        content_blocks = result.get('content', [])
         
-        data = {
-            'model': 'claude-3-5-haiku-20241022',
-            'max_tokens': 150,
-            'system': system_prompt,
-            'messages': [
-                {'role': 'user', 'content': user_content}
-            ],
-            'temperature': config.temperature,
-            'top_p': config.top_p
-        }
+        if content_blocks and len(content_blocks) > 0:
+            first_block = content_blocks[0]
+            if isinstance(first_block, dict):
+                content = first_block.get('text', '')
+            else:
+                content = str(first_block)
+        else:
+            content = ''
+        
+        # 응답 정리
+        with timing_phase('postprocess'):
+            content = clean_response_text(content)
+            content = ensure_complete_sentence(content)
+        
+        # 토큰 사용량
+        usage = anthropic_token_usage(result.get('usage', {}))
+        record_tokens('anthropic', result.get('model'), usage)
+        rate_limiter.reconcile(response, usage)
+        
+        return LLMResponse(
+            success=True,
+            text=content,
+            **usage
+        )
+    else:
+        try:
+            error_data = response.json()
+            error_detail = error_data.get('error', {})
+            if isinstance(error_detail, dict):
+                error_msg = error_detail.get('message', '알 수 없는 오류')
+            else:
+                error_msg = str(error_detail)
+        except:
+            error_msg = f'상태 코드: {response.status_code}'
+        
+        return LLMResponse(success=False, error=f'Anthropic API 오류: {error_msg}')
+
+def generate_anthropic_response(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
+    """
+    Anthropic API를 사용하여 응답 생성
+    """
+    try:
+        headers, data = _build_anthropic_request(config, custom_system_prompt, other_persona)
         
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
+        response = connection_pool.post(
+            ANTHROPIC_MESSAGES_URL,
             headers=headers,
             json=data,
             timeout=30
         )
+        return _parse_anthropic_response(response)
         
-        if response.status_code == 200:
-            result = response.json()
-            content_blocks = result.get('content', [])
-            
-            if content_blocks and len(content_blocks) > 0:
-                first_block = content_blocks[0]
-                if isinstance(first_block, dict):
-                    content = first_block.get('text', '')
-                else:
-                    content = str(first_block)
-            else:
-                content = ''
-            
-            # 응답 정리
-            content = clean_response_text(content)
-            content = ensure_complete_sentence(content)
-            
-            # 토큰 사용량
-            usage = result.get('usage', {})
-            prompt_tokens = usage.get('input_tokens', 0)
-            completion_tokens = usage.get('output_tokens', 0)
-            total_tokens = prompt_tokens + completion_tokens
-            
-            return LLMResponse(
-                success=True,
-                text=content,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens
-            )
-        else:
-            try:
-                error_data = response.json()
-                error_detail = error_data.get('error', {})
-                if isinstance(error_detail, dict):
-                    error_msg = error_detail.get('message', '알 수 없는 오류')
-                else:
-                    error_msg = str(error_detail)
-            except:
-                error_msg = f'상태 코드: {response.status_code}'
-            
-            return LLMResponse(success=False, error=f'Anthropic API 오류: {error_msg}')
-            
+    except CircuitOpenError as e:
+        return LLMResponse(success=False, error=str(e), error_code=e.error_code)
     except requests.exceptions.Timeout:
         return LLMResponse(success=False, error='요청 시간이 초과되었습니다.')
     except Exception as e:
         return LLMResponse(success=False, error=f'오류 발생: {str(e)}')
 
+async def generate_anthropic_response_async(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
+    """
+    generate_anthropic_response의 코루틴 버전
+    """
+    try:
+        headers, data = _build_anthropic_request(config, custom_system_prompt, other_persona)
+        
+        response = await get_async_client().post(
+            ANTHROPIC_MESSAGES_URL,
+            headers=headers,
+            json=data,
+            timeout=30
+        )
+        return _parse_anthropic_response(response)
+        
+    except CircuitOpenError as e:
+        return LLMResponse(success=False, error=str(e), error_code=e.error_code)
+    except httpx.TimeoutException:
+        return LLMResponse(success=False, error='요청 시간이 초과되었습니다.')
+    except Exception as e:
+        return LLMResponse(success=False, error=f'오류 발생: {str(e)}')
+
+def _select_provider(config: LLMRequestConfig) -> Optional[str]:
+    """
+    설정된 모델 타입과 API 키 형식으로 호출할 프로바이더 결정
+    
+    Returns:
+        'openai', 'anthropic', 'google' 또는 None (지원하지 않는 경우)
+    """
+    model_type = config.model_type.lower()
+    
+    # 명시적으로 지정된 모델 타입 우선 사용
+    if model_type == 'anthropic' or _is_anthropic_key(config.api_key):
+        return 'anthropic'
+    elif model_type == 'openai' or (config.api_key.startswith('sk-') and not config.api_key.startswith('sk-ant')):
+        return 'openai'
+    elif model_type == 'google' or config.api_key.startswith('AIza'):
+        return 'google'
+    else:
+        # 기본적으로 API 키 형식으로 자동 감지
+        if _is_anthropic_key(config.api_key):
+            return 'anthropic'
+        elif config.api_key.startswith('sk-'):
+            return 'openai'
+        else:
+            return None
+
+def _record_usage(config: LLMRequestConfig, result: LLMResponse) -> LLMResponse:
+    """
+    성공한 응답의 실제 토큰 사용량을 토큰 예측 보정용 분포에 기록
+    턴 번호는 이전 메시지 수 (estimate_tokens의 메시지 순서와 동일)
+    """
+    if result.success:
+        result.model = config.model
+        usage_calibration.record(
+            config.model_type, config.persona, len(config.previous_messages),
+            result.prompt_tokens, result.completion_tokens
+        )
+    return result
+
+def _key_provider(api_key: str) -> Optional[str]:
+    """API 키 형식으로 프로바이더 판단"""
+    if _is_anthropic_key(api_key):
+        return 'anthropic'
+    if api_key.startswith('sk-'):
+        return 'openai'
+    return None
+
+def _routed_configs(config: LLMRequestConfig, provider: str) -> List[LLMRequestConfig]:
+    """
+    모델 라우터가 고른 (프로바이더, 모델) 후보를 시도할 순서대로 LLMRequestConfig로 반환
+    대체 프로바이더 API 키가 있으면 그 프로바이더의 같은 티어 모델도 후보에 포함
+    """
+    api_keys = {provider: config.api_key}
+    if config.fallback_api_key:
+        fallback_provider = _key_provider(config.fallback_api_key)
+        if fallback_provider is not None and fallback_provider != provider:
+            api_keys[fallback_provider] = config.fallback_api_key
+    routes = model_router.routes('generation', provider, config.tier, [p for p in api_keys if p != provider])
+    routed = []
+    for route in routes:
+        temperature = config.temperature
+        if route.fallback:
+            logger.warning(
+                "[모델 대체] %s 모델이 불안정해 %s/%s 사용", provider, route.provider, route.model,
+                extra={'provider': route.provider, 'model': route.model, 'requested_provider': provider}
+            )
+            # 프로바이더마다 temperature 범위가 다르므로 (OpenAI 0 ~ 2, Anthropic 0 ~ 1) 대체 프로바이더 범위로 변환
+            temperature = _fallback_temperature(config.temperature, provider, route.provider)
+        routed.append(replace(config, model_type=route.provider, model=route.model,
+                              api_key=api_keys[route.provider], temperature=temperature))
+    return routed or [config]
+
+def _fallback_temperature(temperature: float, provider: str, fallback_provider: str) -> float:
+    """
+    요청한 프로바이더 기준의 temperature를 대체 프로바이더 범위의 같은 비율로 변환
+    (예: OpenAI 1.2 -> Anthropic 0.6, 범위를 넘으면 상한으로 맞춤)
+    """
+    source_max = PROVIDER_MAX_TEMPERATURE.get(provider, 1.0)
+    target_max = PROVIDER_MAX_TEMPERATURE.get(fallback_provider, 1.0)
+    return min(target_max, max(0.0, temperature * target_max / source_max))
+
 def generate_llm_response(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
     """
     LLM API를 사용하여 응답 생성하는 메인 함수
+    모델 라우터가 고른 모델로 호출하고, 서킷이 열려 있으면 다음 후보 모델로 다시 호출
     
     Args:
         config: LLMRequestConfig 객체 (모든 설정 포함)
@@ -765,21 +1025,187 @@ def generate_llm_response(config: LLMRequestConfig, custom_system_prompt: Option
     if not config.api_key or not config.api_key.strip():
         return LLMResponse(success=False, error='API 키가 비어있습니다.')
     
-    model_type = config.model_type.lower()
+    provider = _select_provider(config)
+    if provider == 'google':
+        return LLMResponse(success=False, error='Google API는 아직 지원되지 않습니다.')
+    elif provider not in ('anthropic', 'openai'):
+        return LLMResponse(success=False, error=f'지원하지 않는 모델 타입입니다: {config.model_type.lower()}')
+    if _hedge_enabled(config):
+        # 헤지는 중복 호출을 동시에 관리해야 하므로 공유 프로바이더 루프의 코루틴 버전으로 실행
+        return run_sync(generate_llm_response_async(config, custom_system_prompt, other_persona))
     
-    # 명시적으로 지정된 모델 타입 우선 사용
-    if model_type == 'anthropic' or config.api_key.startswith('sk-ant-') or config.api_key.startswith('sk-ant-api'):
-        return generate_anthropic_response(config, custom_system_prompt, other_persona)
-    elif model_type == 'openai' or (config.api_key.startswith('sk-') and not config.api_key.startswith('sk-ant')):
-        return generate_openai_response(config, custom_system_prompt, other_persona)
-    elif model_type == 'google' or config.api_key.startswith('AIza'):
+    for routed in _routed_configs(config, provider):
+        if routed.model_type == 'anthropic':
+            result = generate_anthropic_response(routed, custom_system_prompt, other_persona)
+        else:
+            result = generate_openai_response(routed, custom_system_prompt, other_persona)
+        if result.error_code != CIRCUIT_OPEN_ERROR_CODE:
+            break
+    return _record_usage(routed, result)
+
+def _hedge_enabled(config: LLMRequestConfig) -> bool:
+    """요청에서 지정한 헤지 사용 여부 (지정하지 않으면 HEDGE_ENABLED 설정)"""
+    return HEDGE_ENABLED if config.hedge is None else config.hedge
+
+async def generate_llm_response_async(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> LLMResponse:
+    """
+    generate_llm_response의 코루틴 버전 (같은 LLMResponse 계약을 따름)
+    헤지를 사용하면 느린 호출에 같은 요청을 한 번 더 보내 먼저 성공한 응답을 사용
+    """
+    if not config.api_key or not config.api_key.strip():
+        return LLMResponse(success=False, error='API 키가 비어있습니다.')
+    
+    provider = _select_provider(config)
+    if provider == 'google':
         return LLMResponse(success=False, error='Google API는 아직 지원되지 않습니다.')
-    else:
-        # 기본적으로 API 키 형식으로 자동 감지
-        if config.api_key.startswith('sk-ant-') or config.api_key.startswith('sk-ant-api'):
-            return generate_anthropic_response(config, custom_system_prompt, other_persona)
-        elif config.api_key.startswith('sk-'):
-            return generate_openai_response(config, custom_system_prompt, other_persona)
+    elif provider not in ('anthropic', 'openai'):
+        return LLMResponse(success=False, error=f'지원하지 않는 모델 타입입니다: {config.model_type.lower()}')
+    
+    for routed in _routed_configs(config, provider):
+        if routed.model_type == 'anthropic':
+            make_call = lambda routed=routed: generate_anthropic_response_async(routed, custom_system_prompt, other_persona)
+        else:
+            make_call = lambda routed=routed: generate_openai_response_async(routed, custom_system_prompt, other_persona)
+        if _hedge_enabled(config):
+            model = routed.model or model_router.default_model('generation', routed.model_type, routed.tier)
+            result = await hedged_call(routed.model_type, model, make_call, lambda response: response.success)
         else:
-            return LLMResponse(success=False, error=f'지원하지 않는 모델 타입입니다: {model_type}')
+            result = await make_call()
+        if result.error_code != CIRCUIT_OPEN_ERROR_CODE:
+            break
+    return _record_usage(routed, result)
+
+def _iter_sse_events(response) -> Iterator[Dict]:
+    """
+    프로바이더 SSE 응답 본문에서 data 필드(JSON)를 순서대로 반환
+    """
+    for raw_line in response.iter_lines():
+        line = raw_line.decode('utf-8') if isinstance(raw_line, bytes) else raw_line
+        if not line.startswith('data:'):
+            continue
+        payload = line[5:].strip()
+        if payload == '[DONE]':
+            return
+        yield json.loads(payload)
+
+def _openai_stream_deltas(response, usage: Dict) -> Iterator[str]:
+    """
+    OpenAI 스트리밍 응답에서 텍스트 조각을 반환하고 마지막 청크의 토큰 사용량을 usage에 기록
+    """
+    for event in _iter_sse_events(response):
+        if event.get('usage'):
+            usage.update(openai_token_usage(event['usage']))
+        for choice in event.get('choices') or []:
+            content = (choice.get('delta') or {}).get('content')
+            if content:
+                yield content
+
+def _anthropic_stream_deltas(response, usage: Dict) -> Iterator[str]:
+    """
+    Anthropic 스트리밍 응답에서 텍스트 조각을 반환하고 토큰 사용량을 usage에 기록
+    """
+    raw_usage: Dict = {}
+    for event in _iter_sse_events(response):
+        event_type = event.get('type')
+        if event_type == 'message_start':
+            raw_usage.update(event.get('message', {}).get('usage', {}))
+        elif event_type == 'content_block_delta':
+            text = (event.get('delta') or {}).get('text')
+            if text:
+                yield text
+        elif event_type == 'message_delta':
+            raw_usage['output_tokens'] = (event.get('usage') or {}).get('output_tokens', 0)
+        elif event_type == 'error':
+            error_detail = event.get('error') or {}
+            raise RuntimeError(f"Anthropic API 오류: {error_detail.get('message', '알 수 없는 오류')}")
+    usage.update(anthropic_token_usage(raw_usage))
 
+def stream_llm_response(config: LLMRequestConfig, custom_system_prompt: Optional[str] = None, other_persona: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    LLM 응답을 스트리밍 모드로 생성 (SSE 전달용)
+    응답 정리 규칙은 StreamingTextCleaner로 점진적으로 적용합니다.
+    
+    Args:
+        config: LLMRequestConfig 객체 (모든 설정 포함)
+    
+    Yields:
+        ('delta', {'text': 조각}) 여러 개, 마지막에
+        ('done', {'text': 최종 텍스트, 'tokens': {...}}) 또는 ('error', {'error': 메시지})
+    """
+    if not config.api_key or not config.api_key.strip():
+        yield 'error', {'error': 'API 키가 비어있습니다.'}
+        return
+    
+    provider = _select_provider(config)
+    if provider in ('anthropic', 'openai'):
+        # 스트리밍은 도중에 다른 모델로 바꿀 수 없으므로 라우터가 고른 첫 번째 후보만 사용
+        config = _routed_configs(config, provider)[0]
+        provider = config.model_type
+    if provider == 'openai':
+        headers, data = _build_openai_request(config, custom_system_prompt, other_persona)
+        data['stream'] = True
+        data['stream_options'] = {'include_usage': True}
+        url = OPENAI_CHAT_COMPLETIONS_URL
+        parse_error = lambda response: _parse_openai_response(response, data['model'])
+        stream_deltas = _openai_stream_deltas
+    elif provider == 'anthropic':
+        headers, data = _build_anthropic_request(config, custom_system_prompt, other_persona)
+        data['stream'] = True
+        url = ANTHROPIC_MESSAGES_URL
+        parse_error = _parse_anthropic_response
+        stream_deltas = _anthropic_stream_deltas
+    elif provider == 'google':
+        yield 'error', {'error': 'Google API는 아직 지원되지 않습니다.'}
+        return
+    else:
+        yield 'error', {'error': f'지원하지 않는 모델 타입입니다: {config.model_type.lower()}'}
+        return
+    
+    cleaner = StreamingTextCleaner()
+    usage: Dict = {}
+    # 스트림 본문은 요청 처리가 끝난 뒤 생성되므로 재시도 횟수를 여기서 따로 집계
+    retry_stats = start_request_retries()
+    try:
+        response = connection_pool.post(url, headers=headers, json=data, timeout=30, stream=True)
+        try:
+            if response.status_code != 200:
+                yield 'error', {'error': parse_error(response).error, 'retries': retry_stats.retries}
+                return
+            for delta in stream_deltas(response, usage):
+                chunk = cleaner.feed(delta)
+                if chunk:
+                    yield 'delta', {'text': chunk}
+        finally:
+            response.close()
+            rate_limiter.reconcile(response, usage)
+        
+        chunk = cleaner.finish()
+        if chunk:
+            yield 'delta', {'text': chunk}
+        if not cleaner.text:
+            yield 'error', {'error': '응답 생성에 실패했습니다.'}
+            return
+        
+        usage_calibration.record(
+            config.model_type, config.persona, len(config.previous_messages),
+            usage.get('prompt_tokens'), usage.get('completion_tokens')
+        )
+        record_tokens(provider, data['model'], usage)
+        yield 'done', {
+            'text': cleaner.text,
+            'tokens': {
+                'prompt_tokens': usage.get('prompt_tokens'),
+                'completion_tokens': usage.get('completion_tokens'),
+                'total_tokens': usage.get('total_tokens'),
+                'cached_tokens': usage.get('cached_tokens'),
+                'cache_creation_tokens': usage.get('cache_creation_tokens')
+            },
+            'model': data['model'],
+            'retries': retry_stats.retries
+        }
+    except CircuitOpenError as e:
+        yield 'error', {'error': str(e), 'error_code': e.error_code, 'retries': retry_stats.retries}
+    except requests.exceptions.Timeout:
+        yield 'error', {'error': '요청 시간이 초과되었습니다.'}
+    except Exception as e:
+        yield 'error', {'error': f'오류 발생: {str(e)}'}
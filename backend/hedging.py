@@ -0,0 +1,180 @@
+"""
+헤지 요청 (응답 생성의 꼬리 지연 단축, 선택 사항)
+- 호출이 최근 지연 시간의 HEDGE_PERCENTILE 백분위 안에 끝나지 않으면 같은 요청을 한 번 더 보냄
+- 먼저 성공한 응답을 사용 (원래 호출이 먼저 성공하면 헤지 요청은 취소하고, 헤지 요청이 먼저 성공하면
+  원래 호출은 지연 시간 표본을 위해 끝까지 기다림)
+- 지연 시간 표본은 (프로바이더, 모델)별로 원래 호출이 성공할 때마다 기록
+- 추가 호출은 예산(HEDGE_BUDGET_RATIO: 일반 호출 대비 비율)을 넘지 않음
+- 헤지 발송/승리/예산 부족 횟수는 chatbot_provider_hedges_total 메트릭으로 집계
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from metrics import METRICS_ENABLED, PROVIDER_HEDGES
+from structured_logging import get_logger
+
+logger = get_logger('hedging')
+
+# 요청에서 따로 지정하지 않았을 때 헤지 사용 여부 (기본값: 사용 안 함)
+HEDGE_ENABLED = os.environ.get('HEDGE_ENABLED', '0') not in ('0', 'false', 'False')
+# 최근 지연 시간의 이 백분위를 넘기면 헤지 요청 발송
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', '95'))
+# 헤지 대기 시간 하한 (초, 빠른 호출까지 중복 발송하지 않도록)
+HEDGE_MIN_DELAY = float(os.environ.get('HEDGE_MIN_DELAY', '1.0'))
+# 백분위를 계산할 최근 지연 시간 표본 수와, 헤지를 시작하기 위한 최소 표본 수
+HEDGE_WINDOW_SIZE = int(os.environ.get('HEDGE_WINDOW_SIZE', '200'))
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', '20'))
+# 일반 호출 하나당 쌓이는 헤지 예산 (0.1이면 호출의 최대 약 10%만큼 헤지)과 최대 적립량
+HEDGE_BUDGET_RATIO = float(os.environ.get('HEDGE_BUDGET_RATIO', '0.1'))
+HEDGE_BUDGET_MAX = float(os.environ.get('HEDGE_BUDGET_MAX', '10'))
+
+
+class LatencyWindow:
+    """최근 성공한 호출의 지연 시간 (초) 표본"""
+
+    def __init__(self, size: int = HEDGE_WINDOW_SIZE):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """표본이 HEDGE_MIN_SAMPLES개 미만이면 None"""
+        samples = list(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        samples.sort()
+        index = min(len(samples) - 1, max(0, math.ceil(percentile / 100 * len(samples)) - 1))
+        return samples[index]
+
+
+class HedgePolicy:
+    """(프로바이더, 모델)별 지연 시간 표본과 헤지 예산 (스레드 안전)"""
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, min_delay: float = HEDGE_MIN_DELAY,
+                 budget_ratio: float = HEDGE_BUDGET_RATIO, budget_max: float = HEDGE_BUDGET_MAX):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self._windows: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._budget = 0.0
+        self._lock = threading.Lock()
+
+    def delay_for(self, key: Tuple[str, str]) -> Optional[float]:
+        """헤지 요청을 보내기 전까지 기다릴 시간 (표본이 부족하면 None: 헤지하지 않음)"""
+        with self._lock:
+            window = self._windows.get(key)
+            threshold = window.percentile(self.percentile) if window is not None else None
+        if threshold is None:
+            return None
+        return max(self.min_delay, threshold)
+
+    def record_latency(self, key: Tuple[str, str], seconds: float) -> None:
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = LatencyWindow()
+            window.add(seconds)
+
+    def deposit(self) -> None:
+        """일반 호출 하나만큼 헤지 예산 적립"""
+        with self._lock:
+            self._budget = min(self.budget_max, self._budget + self.budget_ratio)
+
+    def try_spend(self) -> bool:
+        """헤지 예산 1 사용 (부족하면 False)"""
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            return True
+
+
+hedge_policy = HedgePolicy()
+# 헤지 요청에 진 뒤에도 지연 시간 표본을 위해 계속 실행 중인 원래 호출 (태스크가 중간에 회수되지 않도록 참조 유지)
+_background_primaries: Set[asyncio.Future] = set()
+
+
+def _count(provider: str, model: str, event: str) -> None:
+    if METRICS_ENABLED:
+        PROVIDER_HEDGES.labels(provider, model, event).inc()
+
+
+async def hedged_call(
+    provider: str,
+    model: str,
+    make_call: Callable[[], Awaitable[Any]],
+    is_success: Callable[[Any], bool],
+    policy: HedgePolicy = hedge_policy
+) -> Any:
+    """
+    make_call()을 실행하고, 지연 시간 백분위 안에 끝나지 않으면 같은 호출을 한 번 더 보내 먼저 성공한 결과를 반환
+
+    원래 호출의 지연 시간은 성공하면 항상 표본에 넣음 (헤지 예산이 부족해 기다린 경우와 헤지 요청에 진 경우 포함).
+    느린 호출을 빼고 빠른 호출만 표본에 넣으면 백분위가 점점 낮아져 헤지가 필요 이상으로 늘어나기 때문.
+    헤지 요청의 지연 시간은 기준 시점이 다르므로 표본에 넣지 않음
+
+    Args:
+        provider, model: 지연 시간 표본을 나누는 키 (모델마다 응답 시간이 다르므로 함께 구분)
+        make_call: 호출 코루틴을 새로 만드는 함수 (헤지 시 한 번 더 호출됨)
+        is_success: 결과가 성공인지 판단하는 함수 (실패한 결과는 다른 호출이 끝날 때까지 기다림)
+        policy: 지연 시간 표본과 헤지 예산
+    """
+    key = (provider, model)
+    policy.deposit()
+    started = time.monotonic()
+    primary = asyncio.ensure_future(make_call())
+
+    def record_primary(task: asyncio.Future) -> None:
+        if task.cancelled() or task.exception() is not None:
+            return
+        if is_success(task.result()):
+            policy.record_latency(key, time.monotonic() - started)
+
+    primary.add_done_callback(record_primary)
+    delay = policy.delay_for(key)
+    if delay is None:
+        return await primary
+
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    if not policy.try_spend():
+        _count(provider, model, 'budget_exhausted')
+        return await primary
+
+    _count(provider, model, 'fired')
+    logger.info(
+        "[헤지 요청] %s/%s - %.2f초 동안 응답이 없어 같은 요청을 한 번 더 보냄", provider, model, delay,
+        extra={'provider': provider, 'model': model, 'delay_ms': round(delay * 1000, 1)}
+    )
+    hedge = asyncio.ensure_future(make_call())
+    pending = {primary, hedge}
+    result = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # 동시에 끝났으면 원래 호출을 우선
+            for task in sorted(done, key=lambda t: t is not primary):
+                result = task.result()
+                if is_success(result):
+                    if task is hedge:
+                        _count(provider, model, 'won')
+                        if primary in pending:
+                            # 원래 호출은 취소하지 않고 끝나면 지연 시간만 기록 (이미 보낸 요청이라 비용은 같음)
+                            pending.discard(primary)
+                            _background_primaries.add(primary)
+                            primary.add_done_callback(_background_primaries.discard)
+                    return result
+        # 둘 다 실패하면 마지막으로 끝난 결과 반환
+        return result
+    finally:
+        for task in pending:
+            task.cancel()
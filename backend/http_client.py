@@ -0,0 +1,365 @@
+"""
+프로바이더 API 호출용 HTTP 클라이언트 관리 모듈
+- 동기 호출: 호스트별 keep-alive 연결 풀을 공유하는 requests.Session
+- 비동기 호출: 하나의 백그라운드 이벤트 루프에서 공유하는 httpx.AsyncClient
+매 호출마다 TCP/TLS 핸드셰이크를 새로 하지 않고 연결을 재사용합니다.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuit_breaker import circuit_breakers
+from metrics import METRICS_ENABLED, PROVIDER_RETRIES, ProviderCallTracker, provider_of
+from model_router import model_router
+from rate_limiter import rate_limiter
+from retry_policy import DEFAULT_RETRY_POLICY, RetryPolicy, clamp_timeout, record_retry
+from server_timing import UpstreamTrace, current_timing, record_phase, timing_phase
+from structured_logging import get_logger
+
+logger = get_logger('http_client')
+
+# 호스트별 동기 연결 풀 크기 (기본값과 "host=size,host=size" 형식의 개별 설정)
+DEFAULT_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '20'))
+POOL_SIZES = os.environ.get('HTTP_POOL_SIZES', '')
+# 유휴 연결 유지 주기 (초, 0이면 사용하지 않음)
+KEEP_WARM_INTERVAL = float(os.environ.get('HTTP_KEEP_WARM_INTERVAL', '0'))
+
+# 비동기 클라이언트 하나가 유지할 최대 연결 수
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', '200'))
+ASYNC_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('ASYNC_MAX_KEEPALIVE_CONNECTIONS', '50'))
+
+
+def _parse_pool_sizes(spec: str) -> Dict[str, int]:
+    """'api.openai.com=50,api.anthropic.com=30' 형식의 설정을 {host: size}로 변환"""
+    sizes = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        host, size = item.split('=', 1)
+        try:
+            sizes[host.strip()] = int(size)
+        except ValueError:
+            continue
+    return sizes
+
+
+def _log_retry(url: str, attempt: int, delay: float, reason) -> None:
+    """재시도 한 번을 로그, 메트릭, 요청별 재시도 횟수에 기록"""
+    provider = provider_of(url)
+    record_retry()
+    if METRICS_ENABLED:
+        PROVIDER_RETRIES.labels(provider, reason).inc()
+    logger.warning(
+        "[프로바이더 재시도] %s %s - %.2f초 후 %d번째 재시도", provider, reason, delay, attempt + 1,
+        extra={'provider': provider, 'reason': str(reason), 'retry': attempt + 1, 'delay_ms': round(delay * 1000, 1)}
+    )
+
+
+def _origin(url: str) -> str:
+    """URL에서 scheme://host[:port] 부분만 추출"""
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+class ConnectionPoolManager:
+    """
+    호스트(origin)별로 keep-alive 연결 풀을 공유하는 스레드 안전한 관리자
+    - 프로바이더 호출은 호스트별 공유 Session을 사용 (post/get)
+    - 쿠키 등 세션 상태를 분리해야 하는 클라이언트는 mount()로 연결 풀(어댑터)만 공유
+    """
+
+    def __init__(
+        self,
+        default_pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_sizes: Optional[Dict[str, int]] = None,
+        keep_warm_interval: float = KEEP_WARM_INTERVAL
+    ):
+        self.default_pool_maxsize = default_pool_maxsize
+        self.pool_sizes = pool_sizes or {}
+        self.keep_warm_interval = keep_warm_interval
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._keep_warm_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def pool_size_for(self, origin: str) -> int:
+        host = urlsplit(origin).hostname or origin
+        return self.pool_sizes.get(host, self.default_pool_maxsize)
+
+    def adapter_for(self, url: str) -> HTTPAdapter:
+        """URL 호스트의 공유 어댑터(연결 풀) 반환"""
+        origin = _origin(url)
+        with self._lock:
+            adapter = self._adapters.get(origin)
+            if adapter is None:
+                size = self.pool_size_for(origin)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+                self._adapters[origin] = adapter
+            return adapter
+
+    def mount(self, session: requests.Session, url: str) -> requests.Session:
+        """세션에 URL 호스트의 공유 연결 풀을 연결 (쿠키/헤더 등 세션 상태는 분리 유지)"""
+        session.mount(_origin(url), self.adapter_for(url))
+        return session
+
+    def session_for(self, url: str) -> requests.Session:
+        """URL 호스트의 공유 Session 반환 (없으면 생성)"""
+        origin = _origin(url)
+        adapter = self.adapter_for(url)
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                session.mount(origin, adapter)
+                self._sessions[origin] = session
+                self._ensure_keep_warm()
+            self._last_used[origin] = time.monotonic()
+            return session
+
+    def request(self, method: str, url: str, retry: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY, **kwargs) -> requests.Response:
+        """
+        프로바이더 호출 (retry 정책에 따라 429/5xx 응답과 연결 실패를 재시도, None이면 재시도하지 않음)
+        재시도할 응답은 닫고 버리므로 stream=True 호출도 본문을 읽기 전 상태 코드로만 판단
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                response = self._request_once(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # 읽기 시간 초과(ReadTimeout)는 ConnectionError가 아니므로 재시도하지 않음
+                delay = retry.next_delay(attempt, started) if retry is not None else None
+                if delay is None:
+                    raise
+                _log_retry(url, attempt, delay, type(e).__name__)
+            else:
+                delay = retry.next_delay(attempt, started, response.status_code, response.headers) if retry is not None else None
+                if delay is None:
+                    return response
+                response.close()
+                _log_retry(url, attempt, delay, response.status_code)
+            with timing_phase('retry_wait'):
+                time.sleep(delay)
+            attempt += 1
+            kwargs['timeout'] = clamp_timeout(kwargs.get('timeout'), retry.remaining(started))
+
+    def _request_once(self, method: str, url: str, **kwargs) -> requests.Response:
+        # 속도 제한 대기를 마친 뒤에 서킷 허가를 받음 (대기 중에 half_open 시험 호출 자리를 붙잡지 않도록)
+        reservation = rate_limiter.reserve(url, kwargs.get('headers'), kwargs.get('json'))
+        try:
+            if reservation is not None and reservation.wait > 0:
+                with timing_phase('rate_limit_wait'):
+                    time.sleep(reservation.wait)
+            # 서킷이 열려 있으면 CircuitOpenError로 바로 실패
+            permit = circuit_breakers.acquire(url, kwargs.get('json'))
+        except BaseException:
+            rate_limiter.cancel(reservation)
+            raise
+        # requests는 연결 단계 시간을 제공하지 않으므로 응답 헤더까지의 시간(elapsed)과 전체 시간만 기록
+        started = time.perf_counter()
+        try:
+            with ProviderCallTracker(url, kwargs.get('json')) as call:
+                response = self.session_for(url).request(method, url, **kwargs)
+                call.status = response.status_code
+                record_phase('upstream_ttfb', response.elapsed.total_seconds())
+        except BaseException as e:
+            rate_limiter.cancel(reservation)
+            if permit is not None:
+                permit.record_exception(e)
+            if isinstance(e, Exception):
+                # 취소(헤지 요청 등)는 모델 상태와 관계없으므로 기록하지 않음
+                model_router.observe(url, kwargs.get('json'), None, time.perf_counter() - started)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            record_phase('upstream', elapsed)
+        if permit is not None:
+            permit.record_response(response.status_code, elapsed)
+        model_router.observe(url, kwargs.get('json'), response.status_code, elapsed)
+        rate_limiter.observe(reservation, response)
+        response.rate_limit_reservation = reservation
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def _ensure_keep_warm(self) -> None:
+        """keep-warm 스레드 시작 (락을 잡은 상태에서 호출)"""
+        if self.keep_warm_interval <= 0 or self._keep_warm_thread is not None:
+            return
+        self._keep_warm_thread = threading.Thread(target=self._keep_warm_loop, name='http-keep-warm', daemon=True)
+        self._keep_warm_thread.start()
+
+    def _keep_warm_loop(self) -> None:
+        """유휴 상태인 호스트에 가벼운 HEAD 요청을 보내 연결이 끊기지 않도록 유지"""
+        while not self._stop.wait(self.keep_warm_interval):
+            now = time.monotonic()
+            with self._lock:
+                idle = [
+                    (origin, session) for origin, session in self._sessions.items()
+                    if now - self._last_used.get(origin, 0) >= self.keep_warm_interval
+                ]
+            for origin, session in idle:
+                try:
+                    session.head(origin + '/', timeout=5)
+                except requests.exceptions.RequestException:
+                    pass
+
+    def close(self) -> None:
+        """keep-warm 스레드를 멈추고 모든 연결을 닫음"""
+        self._stop.set()
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            for adapter in self._adapters.values():
+                adapter.close()
+            self._sessions.clear()
+            self._adapters.clear()
+
+
+connection_pool = ConnectionPoolManager(pool_sizes=_parse_pool_sizes(POOL_SIZES))
+
+
+# 이벤트 루프마다 하나의 AsyncClient (httpx 클라이언트는 루프 간에 공유할 수 없음)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+class InstrumentedAsyncClient(httpx.AsyncClient):
+    """호출마다 프로바이더 메트릭(시간, 상태, 진행 중 수)과 요청의 업스트림 단계 시간을 기록하는 AsyncClient"""
+
+    async def request(self, method: str, url, retry: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY, **kwargs) -> httpx.Response:
+        """ConnectionPoolManager.request와 같은 재시도 정책을 적용한 호출"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                response = await self._request_once(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                delay = retry.next_delay(attempt, started) if retry is not None else None
+                if delay is None:
+                    raise
+                _log_retry(str(url), attempt, delay, type(e).__name__)
+            else:
+                delay = retry.next_delay(attempt, started, response.status_code, response.headers) if retry is not None else None
+                if delay is None:
+                    return response
+                await response.aclose()
+                _log_retry(str(url), attempt, delay, response.status_code)
+            with timing_phase('retry_wait'):
+                await asyncio.sleep(delay)
+            attempt += 1
+            kwargs['timeout'] = clamp_timeout(kwargs.get('timeout'), retry.remaining(started))
+
+    async def _request_once(self, method: str, url, **kwargs) -> httpx.Response:
+        # 대기 중에 취소(헤지 패배, run_sync 시간 초과, 연결 끊김)되어도 예약과 시험 호출 자리가 남지 않도록
+        # 속도 제한 대기를 마친 뒤에 서킷 허가를 받음
+        reservation = rate_limiter.reserve(str(url), kwargs.get('headers'), kwargs.get('json'))
+        try:
+            if reservation is not None and reservation.wait > 0:
+                with timing_phase('rate_limit_wait'):
+                    await asyncio.sleep(reservation.wait)
+            permit = circuit_breakers.acquire(str(url), kwargs.get('json'))
+        except BaseException:
+            rate_limiter.cancel(reservation)
+            raise
+        timing = current_timing()
+        if timing is not None:
+            kwargs['extensions'] = {**(kwargs.get('extensions') or {}), 'trace': UpstreamTrace(timing)}
+        started = time.perf_counter()
+        try:
+            with ProviderCallTracker(str(url), kwargs.get('json')) as call:
+                response = await super().request(method, url, **kwargs)
+                call.status = response.status_code
+        except BaseException as e:
+            rate_limiter.cancel(reservation)
+            if permit is not None:
+                permit.record_exception(e)
+            if isinstance(e, Exception):
+                # 취소(헤지 요청 등)는 모델 상태와 관계없으므로 기록하지 않음
+                model_router.observe(str(url), kwargs.get('json'), None, time.perf_counter() - started)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            record_phase('upstream', elapsed)
+        if permit is not None:
+            permit.record_response(response.status_code, elapsed)
+        model_router.observe(str(url), kwargs.get('json'), response.status_code, elapsed)
+        rate_limiter.observe(reservation, response)
+        response.rate_limit_reservation = reservation
+        return response
+
+
+_provider_loop: Optional[asyncio.AbstractEventLoop] = None
+_provider_loop_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    현재 실행 중인 이벤트 루프에 연결된 공유 AsyncClient 반환 (없으면 생성)
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = InstrumentedAsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_provider_loop() -> asyncio.AbstractEventLoop:
+    """
+    프로바이더 호출 전용 백그라운드 이벤트 루프 반환 (처음 호출 시 데몬 스레드에서 시작)
+    """
+    global _provider_loop
+    with _provider_loop_lock:
+        if _provider_loop is None or _provider_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='provider-loop', daemon=True)
+            thread.start()
+            _provider_loop = loop
+        return _provider_loop
+
+
+async def _run_in_context(coro: Awaitable[Any], context: contextvars.Context) -> Any:
+    """제출한 쪽의 컨텍스트 변수(요청 ID 등)를 프로바이더 루프의 작업에 복사한 뒤 실행"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def _submit(coro: Awaitable[Any]):
+    return asyncio.run_coroutine_threadsafe(
+        _run_in_context(coro, contextvars.copy_context()), get_provider_loop()
+    )
+
+
+async def run_on_provider_loop(coro: Awaitable[Any]) -> Any:
+    """
+    코루틴을 공유 프로바이더 루프에서 실행하고 결과를 기다림
+    Flask async 뷰는 요청마다 새 이벤트 루프를 만들기 때문에,
+    연결 풀을 재사용하려면 실제 호출은 오래 유지되는 루프에서 실행해야 합니다.
+    """
+    return await asyncio.wrap_future(_submit(coro))
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """동기 코드에서 코루틴을 공유 프로바이더 루프에 제출하고 결과를 기다림"""
+    return _submit(coro).result(timeout)
@@ -11,6 +11,9 @@ from typing import Optional, Dict, Any
 import random
 import string
 
+from http_client import connection_pool
+from metrics import KT_CHATBOT_RESPONSES, ProviderCallTracker
+
 
 class KTChatbotClient:
     """KT 챗봇 API 클라이언트"""
@@ -25,7 +28,8 @@ class KTChatbotClient:
         """
         self.channel_token = channel_token
         self.session_key: Optional[str] = None
-        self.session = requests.Session()
+        # 세션(쿠키) 상태는 클라이언트별로 두고, 연결 풀은 같은 호스트끼리 공유
+        self.session = connection_pool.mount(requests.Session(), self.BASE_URL)
         
         # 기본 헤더 설정
         self.headers = {
@@ -109,12 +113,14 @@ class KTChatbotClient:
         }
         
         try:
-            response = self.session.post(
-                self.TALK_ENDPOINT,
-                headers=self.headers,
-                json=payload,
-                timeout=10
-            )
+            with ProviderCallTracker(self.TALK_ENDPOINT) as call:
+                response = self.session.post(
+                    self.TALK_ENDPOINT,
+                    headers=self.headers,
+                    json=payload,
+                    timeout=10
+                )
+                call.status = response.status_code
             response.raise_for_status()
             
             data = response.json()
@@ -124,20 +130,21 @@ class KTChatbotClient:
                 if "sessionKey" in data["data"]:
                     self.session_key = data["data"]["sessionKey"]
             
-            return data
-            
         except requests.exceptions.RequestException as e:
-            return {
+            data = {
                 "code": "ERROR",
                 "message": f"요청 실패: {str(e)}",
                 "data": None
             }
         except json.JSONDecodeError as e:
-            return {
+            data = {
                 "code": "ERROR",
                 "message": f"JSON 파싱 실패: {str(e)}",
                 "data": None
             }
+        
+        KT_CHATBOT_RESPONSES.labels(data.get("code") or "UNKNOWN").inc()
+        return data
     
     def extract_message_text(self, response: Dict[str, Any]) -> str:
         """
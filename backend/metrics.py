@@ -0,0 +1,373 @@
+"""
+Prometheus 텍스트 형식 메트릭 모듈
+- 외부 의존성 없이 Counter / Gauge / Histogram과 /metrics 출력(text exposition format 0.0.4)을 제공
+- 기록은 라벨 조합별 자식 객체의 작은 락 하나만 잡고, 자식 조회는 락 없이 dict에서 바로 읽음
+  (새 라벨 조합이 처음 나올 때만 메트릭 락을 잡음)
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from provider_endpoints import provider_for_url
+from structured_logging import dropped_records
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') not in ('0', 'false', 'False')
+
+# 지연 시간 히스토그램 버킷 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 호스트 -> 프로바이더 라벨 (설정된 API 기본 URL에 해당하지 않는 호출용, 목록에 없으면 호스트 이름 사용)
+PROVIDER_HOSTS = {
+    'api.openai.com': 'openai',
+    'api.anthropic.com': 'anthropic',
+    'generativelanguage.googleapis.com': 'google',
+    'ibot.kt.com': 'kt',
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # 마지막 칸은 +Inf 버킷
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Metric:
+    """라벨 조합별 자식 객체를 관리하는 메트릭 기본 클래스"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name}: 라벨 {self.labelnames}에 맞는 값이 필요합니다.')
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._items():
+            yield f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def samples(self) -> Iterator[str]:
+        names = self.labelnames + ('le',)
+        for values, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_format_labels(names, values + (_format_value(bound),))} {cumulative}'
+            labels = _format_labels(self.labelnames, values)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class MetricsRegistry:
+    """메트릭 목록과 /metrics 출력 (수집 직전에 호출할 콜백 등록 가능)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collect_hooks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'이미 등록된 메트릭입니다: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collect_hook(self, hook: Callable[[], None]) -> None:
+        """수집 시점에만 값을 읽는 게이지(큐 길이 등)를 갱신하는 콜백 등록"""
+        with self._lock:
+            self._collect_hooks.append(hook)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            hooks = list(self._collect_hooks)
+        for hook in hooks:
+            hook()
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        """모든 메트릭 값 초기화 (메트릭 정의는 유지)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    'chatbot_http_request_duration_seconds',
+    'API 엔드포인트 처리 시간 (스트리밍 응답은 첫 바이트 전까지)',
+    ('method', 'endpoint', 'status')
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    'chatbot_http_requests_in_flight',
+    '처리 중인 API 요청 수',
+    ('endpoint',)
+))
+PROVIDER_REQUEST_DURATION = registry.register(Histogram(
+    'chatbot_provider_request_duration_seconds',
+    '프로바이더 API 호출 시간 (스트리밍 호출은 응답 헤더 수신까지)',
+    ('provider', 'model')
+))
+PROVIDER_REQUESTS = registry.register(Counter(
+    'chatbot_provider_requests_total',
+    '프로바이더 API 호출 수 (status는 HTTP 상태 코드 또는 timeout/error)',
+    ('provider', 'model', 'status')
+))
+PROVIDER_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    'chatbot_provider_requests_in_flight',
+    '응답을 기다리는 프로바이더 API 호출 수',
+    ('provider',)
+))
+PROVIDER_RETRIES = registry.register(Counter(
+    'chatbot_provider_retries_total',
+    '프로바이더 API 재시도 횟수 (reason은 재시도한 상태 코드 또는 연결 오류 이름)',
+    ('provider', 'reason')
+))
+PROVIDER_RATE_LIMIT_WAIT = registry.register(Histogram(
+    'chatbot_provider_rate_limit_wait_seconds',
+    '속도 제한기(RPM/TPM)가 프로바이더 호출 전에 기다리게 한 시간',
+    ('provider',)
+))
+PROVIDER_CIRCUIT_STATE = registry.register(Gauge(
+    'chatbot_provider_circuit_state',
+    '프로바이더 서킷 브레이커 상태 (0: closed, 1: half_open, 2: open)',
+    ('provider', 'model')
+))
+PROVIDER_CIRCUIT_REJECTIONS = registry.register(Counter(
+    'chatbot_provider_circuit_rejections_total',
+    '서킷이 열려 있어 보내지 않고 바로 실패한 호출 수',
+    ('provider', 'model')
+))
+PROVIDER_HEDGES = registry.register(Counter(
+    'chatbot_provider_hedges_total',
+    '응답 생성 헤지 요청 (event: fired 발송, won 헤지가 먼저 성공, budget_exhausted 예산 부족으로 생략)',
+    ('provider', 'model', 'event')
+))
+MODEL_ROUTES = registry.register(Counter(
+    'chatbot_model_routes_total',
+    '모델 라우팅 결과 (purpose: generation/prompt/evaluation, route: primary 요청한 프로바이더, fallback 다른 프로바이더로 대체)',
+    ('purpose', 'provider', 'model', 'route')
+))
+LLM_TOKENS = registry.register(Counter(
+    'chatbot_llm_tokens_total',
+    '프로바이더가 보고한 토큰 사용량 (type: prompt/completion/cached)',
+    ('provider', 'model', 'type')
+))
+EVALUATION_PARSE_FAILURES = registry.register(Counter(
+    'chatbot_evaluation_json_parse_failures_total',
+    '평가 응답을 JSON으로 파싱하지 못한 횟수',
+    ('provider',)
+))
+CONVERSATION_SESSIONS = registry.register(Gauge(
+    'chatbot_conversation_sessions',
+    '서버에 보관 중인 대화 세션 수'
+))
+CONVERSATION_SESSION_EVICTIONS = registry.register(Counter(
+    'chatbot_conversation_session_evictions_total',
+    '삭제된 대화 세션 수 (reason: expired 유효 시간 만료, capacity 세션 수/메모리 한도 초과)',
+    ('reason',)
+))
+KT_CHATBOT_RESPONSES = registry.register(Counter(
+    'chatbot_kt_chatbot_responses_total',
+    'KT 챗봇 응답 코드별 횟수 (0000 외에는 오류, ERROR는 요청/파싱 실패)',
+    ('code',)
+))
+
+LOG_RECORDS_DROPPED = registry.register(Gauge(
+    'chatbot_log_records_dropped',
+    '로그 큐가 가득 차서 버린 레코드 수'
+))
+registry.add_collect_hook(lambda: LOG_RECORDS_DROPPED.labels().set(dropped_records()))
+
+
+def provider_of(url: str) -> str:
+    """URL로 프로바이더 라벨 결정 (설정된 API 기본 URL 우선, 그다음 호스트)"""
+    # 쿼리(Google API 키 등)는 캐시 키에 남기지 않음
+    return _provider_of(url.split('?', 1)[0])
+
+
+@lru_cache(maxsize=64)
+def _provider_of(url: str) -> str:
+    provider = provider_for_url(url)
+    if provider is not None:
+        return provider
+    host = urlsplit(url).hostname or ''
+    return PROVIDER_HOSTS.get(host, host or 'unknown')
+
+
+class ProviderCallTracker:
+    """
+    프로바이더 호출 하나의 시간/상태/진행 중 수를 기록하는 컨텍스트 매니저 (동기/비동기 호출 공통)
+    호출한 쪽에서 응답을 받으면 status에 상태 코드를 넣고, 예외로 끝나면 timeout/error로 기록
+    (헤지 요청 등으로 취소된 호출은 cancelled)
+    """
+
+    __slots__ = ('provider', 'model', 'status', '_started', '_in_flight')
+
+    def __init__(self, url: str, payload: Any = None):
+        self.provider = provider_of(url)
+        self.model = payload.get('model', '') if isinstance(payload, dict) else ''
+        self.status: Optional[int] = None
+
+    def __enter__(self) -> 'ProviderCallTracker':
+        if METRICS_ENABLED:
+            self._in_flight = PROVIDER_REQUESTS_IN_FLIGHT.labels(self.provider)
+            self._in_flight.inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if not METRICS_ENABLED:
+            return False
+        elapsed = time.perf_counter() - self._started
+        self._in_flight.dec()
+        if exc is not None:
+            if isinstance(exc, (requests.exceptions.Timeout, httpx.TimeoutException)):
+                status = 'timeout'
+            elif isinstance(exc, asyncio.CancelledError):
+                status = 'cancelled'
+            else:
+                status = 'error'
+        else:
+            status = self.status if self.status is not None else 'error'
+        PROVIDER_REQUEST_DURATION.labels(self.provider, self.model).observe(elapsed)
+        PROVIDER_REQUESTS.labels(self.provider, self.model, status).inc()
+        return False
+
+
+def record_tokens(provider: str, model: Optional[str], usage: Dict[str, Any]) -> None:
+    """openai_token_usage/anthropic_token_usage 형식의 사용량을 토큰 카운터에 더함"""
+    if not METRICS_ENABLED:
+        return
+    model = model or ''
+    for token_type, key in (('prompt', 'prompt_tokens'), ('completion', 'completion_tokens'), ('cached', 'cached_tokens')):
+        value = usage.get(key)
+        if value:
+            LLM_TOKENS.labels(provider, model, token_type).inc(value)
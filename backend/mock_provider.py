@@ -0,0 +1,773 @@
+"""
+로컬 대체 프로바이더 서버 (부하 테스트/벤치마크용, 실제 API 할당량을 쓰지 않음)
+- OpenAI:    POST /openai/v1/chat/completions, GET /openai/v1/models
+             Batch API: POST /openai/v1/files, GET /openai/v1/files/{id}/content, POST /openai/v1/batches, GET /openai/v1/batches/{id}
+- Anthropic: POST /anthropic/v1/messages, GET /anthropic/v1/models
+             Message Batches: POST /anthropic/v1/messages/batches, GET .../batches/{id}, GET .../batches/{id}/results
+- Google:    GET /google/v1beta/models (키 검증용)
+- 응답 형식과 usage 필드(프롬프트 캐시 토큰 포함)는 실제 API와 같고, stream=true면 SSE로 전송
+- 지연 시간 분포와 오류 비율(429/5xx, Retry-After 포함)을 설정 가능
+- record 모드: 실제 프로바이더로 전달한 응답을 요청 해시별 카세트(JSON 파일)에 저장
+- replay 모드: 카세트에 저장된 응답을 그대로 반환 (API 키는 해시에도 파일에도 들어가지 않음)
+- 배치 작업은 모드와 관계없이 합성 응답으로 처리하고, 제출 후 batch_seconds가 지나 조회하면 완료 (결과 순서는 섞어서 반환)
+
+실행:
+    python mock_provider.py --port 8900 --latency lognormal:800:0.4 --error-rate 0.02
+백엔드 설정 (.env):
+    OPENAI_API_BASE=http://127.0.0.1:8900/openai/v1
+    ANTHROPIC_API_BASE=http://127.0.0.1:8900/anthropic/v1
+    GOOGLE_API_BASE=http://127.0.0.1:8900/google/v1beta
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from flask import Flask, Response, jsonify, request
+
+# 지연 시간 분포 (밀리초): fixed:MS, uniform:LO:HI, normal:MEAN:STDEV, lognormal:MEDIAN:SIGMA, exp:MEAN
+MOCK_PROVIDER_LATENCY = os.environ.get('MOCK_PROVIDER_LATENCY', 'fixed:0')
+# 스트리밍 응답의 청크 사이 지연 (밀리초)
+MOCK_PROVIDER_CHUNK_DELAY_MS = float(os.environ.get('MOCK_PROVIDER_CHUNK_DELAY_MS', '0'))
+# 오류 응답 비율 (0.0~1.0)과 오류로 보낼 상태 코드 목록
+MOCK_PROVIDER_ERROR_RATE = float(os.environ.get('MOCK_PROVIDER_ERROR_RATE', '0'))
+MOCK_PROVIDER_ERROR_STATUSES = os.environ.get('MOCK_PROVIDER_ERROR_STATUSES', '429,500,503')
+# 429/503 응답의 Retry-After 헤더 값 (초, 0이면 보내지 않음)
+MOCK_PROVIDER_RETRY_AFTER = float(os.environ.get('MOCK_PROVIDER_RETRY_AFTER', '1'))
+# mock: 합성 응답, record: 실제 프로바이더 응답을 카세트에 저장, replay: 카세트 응답 반환
+MOCK_PROVIDER_MODE = os.environ.get('MOCK_PROVIDER_MODE', 'mock')
+MOCK_PROVIDER_CASSETTE_DIR = os.environ.get('MOCK_PROVIDER_CASSETTE_DIR', 'cassettes')
+# replay 모드에서 카세트가 없을 때: error (404 응답) 또는 mock (합성 응답)
+MOCK_PROVIDER_REPLAY_MISS = os.environ.get('MOCK_PROVIDER_REPLAY_MISS', 'error')
+MOCK_PROVIDER_SEED = os.environ.get('MOCK_PROVIDER_SEED', '')
+# 배치 작업이 완료되기까지 걸리는 시간 (초, 제출 후 이 시간이 지난 뒤 조회하면 완료)
+MOCK_PROVIDER_BATCH_SECONDS = float(os.environ.get('MOCK_PROVIDER_BATCH_SECONDS', '1'))
+
+# record 모드에서 요청을 전달할 실제 프로바이더 주소
+UPSTREAM_API_BASES = {
+    'openai': os.environ.get('MOCK_UPSTREAM_OPENAI_BASE', 'https://api.openai.com/v1').rstrip('/'),
+    'anthropic': os.environ.get('MOCK_UPSTREAM_ANTHROPIC_BASE', 'https://api.anthropic.com/v1').rstrip('/'),
+    'google': os.environ.get('MOCK_UPSTREAM_GOOGLE_BASE', 'https://generativelanguage.googleapis.com/v1beta').rstrip('/'),
+}
+# record 모드에서 실제 프로바이더로 전달할 요청 헤더
+FORWARDED_HEADERS = ('Authorization', 'x-api-key', 'anthropic-version', 'anthropic-beta', 'Content-Type')
+# 해시 계산에서 제외할 요청 필드 (스트리밍 여부와 관계없이 같은 카세트 사용)
+UNHASHED_FIELDS = ('stream', 'stream_options')
+
+# OpenAI는 1024토큰 이상인 프롬프트 앞부분을 128토큰 단위로 캐시
+OPENAI_CACHE_MIN_TOKENS = 1024
+OPENAI_CACHE_INCREMENT = 128
+
+_REPLY_SENTENCES = [
+    '말씀하신 내용을 확인해 보니 지금 쓰시는 요금제보다 한 단계 낮은 요금제가 더 알맞아 보입니다.',
+    '약정을 유지하신 채 요금제만 변경하시면 위약금은 발생하지 않습니다.',
+    '그럼 데이터를 다 쓰면 속도가 얼마나 느려지는지 먼저 알려 주실 수 있을까요?',
+    '가족 결합으로 묶으시면 회선마다 추가 할인을 받으실 수 있습니다.',
+    '이번 달 요금은 변경일 기준으로 일할 계산되어 청구됩니다.',
+    '혹시 온라인으로 변경하면 따로 받을 수 있는 혜택이 있나요?',
+    '네, 앱에서 본인 인증 후 바로 신청하실 수 있습니다.',
+    '그 부분은 제가 한 번 더 확인해 보고 다시 말씀드리겠습니다.',
+]
+
+_EVALUATION_REASONS = [
+    '두 발화자가 주제에 맞춰 대화를 이어가며 각자의 역할을 끝까지 유지했습니다. 일부 응답이 다소 기계적이지만 맥락 전환은 자연스럽습니다.',
+    '상담사와 고객의 역할 구분이 분명하고 이전 발화의 정보를 이어받아 구체적인 안내가 이루어졌습니다.',
+    '대화 흐름은 자연스러우나 후반부에 같은 안내가 반복되어 주제 논의의 밀도가 떨어집니다.',
+]
+
+
+def approx_tokens(text: str) -> int:
+    """tiktoken 없이 쓰는 대략적인 토큰 수 (한글 등 비ASCII 문자는 1자 1토큰, ASCII는 4자 1토큰)"""
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return max(1, non_ascii + math.ceil((len(text) - non_ascii) / 4))
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """지연 시간 분포 설정을 (난수 생성기 -> 초) 함수로 변환"""
+    name, _, args = spec.partition(':')
+    if not args:
+        name, args = 'fixed', name
+    values = [float(v) for v in args.split(':')]
+    if name == 'fixed':
+        return lambda rng: values[0] / 1000
+    if name == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if name == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if name == 'lognormal':
+        # MEDIAN(밀리초)과 로그 표준편차 SIGMA
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    if name == 'exp':
+        return lambda rng: rng.expovariate(1 / values[0]) / 1000 if values[0] > 0 else 0.0
+    raise ValueError(f'알 수 없는 지연 시간 분포입니다: {spec}')
+
+
+@dataclass
+class MockSettings:
+    latency: str = MOCK_PROVIDER_LATENCY
+    chunk_delay_ms: float = MOCK_PROVIDER_CHUNK_DELAY_MS
+    error_rate: float = MOCK_PROVIDER_ERROR_RATE
+    error_statuses: List[int] = field(default_factory=lambda: [int(s) for s in MOCK_PROVIDER_ERROR_STATUSES.split(',') if s.strip()])
+    retry_after: float = MOCK_PROVIDER_RETRY_AFTER
+    mode: str = MOCK_PROVIDER_MODE
+    cassette_dir: str = MOCK_PROVIDER_CASSETTE_DIR
+    replay_miss: str = MOCK_PROVIDER_REPLAY_MISS
+    seed: Optional[int] = int(MOCK_PROVIDER_SEED) if MOCK_PROVIDER_SEED else None
+    batch_seconds: float = MOCK_PROVIDER_BATCH_SECONDS
+
+    def __post_init__(self):
+        if self.mode not in ('mock', 'record', 'replay'):
+            raise ValueError("mode는 'mock', 'record', 'replay' 중 하나여야 합니다.")
+        if self.replay_miss not in ('error', 'mock'):
+            raise ValueError("replay_miss는 'error' 또는 'mock'이어야 합니다.")
+        if not 0.0 <= self.error_rate <= 1.0:
+            raise ValueError('error_rate는 0.0~1.0 범위여야 합니다.')
+
+
+class CassetteStore:
+    """요청 해시별 카세트 파일 ({cassette_dir}/{provider}/{hash}.json)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(provider: str, path: str, body: Dict[str, Any]) -> str:
+        hashed = {k: v for k, v in body.items() if k not in UNHASHED_FIELDS}
+        canonical = json.dumps({'provider': provider, 'path': path, 'body': hashed}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, provider: str, key: str) -> str:
+        return os.path.join(self.directory, provider, f'{key}.json')
+
+    def load(self, provider: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(provider, key), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, provider: str, key: str, path: str, body: Dict[str, Any], status: int, response_body: Any) -> None:
+        file_path = self._path(provider, key)
+        cassette = {
+            'key': key,
+            'provider': provider,
+            'path': path,
+            'request': {k: v for k, v in body.items() if k not in UNHASHED_FIELDS},
+            'response': {'status': status, 'body': response_body},
+            'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = f'{file_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cassette, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, file_path)
+
+
+def _error_body(provider: str, status: int, message: str) -> Dict[str, Any]:
+    """프로바이더별 오류 응답 본문"""
+    if provider == 'anthropic':
+        error_type = {400: 'invalid_request_error', 401: 'authentication_error', 404: 'not_found_error', 429: 'rate_limit_error', 529: 'overloaded_error'}.get(status, 'api_error')
+        return {'type': 'error', 'error': {'type': error_type, 'message': message}}
+    if provider == 'google':
+        return {'error': {'code': status, 'message': message, 'status': 'UNAVAILABLE' if status >= 500 else 'INVALID_ARGUMENT'}}
+    error_type = {400: 'invalid_request_error', 401: 'invalid_request_error', 404: 'invalid_request_error', 429: 'rate_limit_exceeded'}.get(status, 'server_error')
+    return {'error': {'message': message, 'type': error_type, 'code': None}}
+
+
+def _request_text(body: Dict[str, Any]) -> Tuple[str, str]:
+    """(시스템 프롬프트, 나머지 메시지) 텍스트 (OpenAI/Anthropic 본문 공통)"""
+    system = body.get('system', '')
+    if isinstance(system, list):
+        system = ''.join(block.get('text', '') for block in system if isinstance(block, dict))
+    parts = []
+    for message in body.get('messages', []):
+        content = message.get('content', '')
+        if isinstance(content, list):
+            content = ''.join(block.get('text', '') for block in content if isinstance(block, dict))
+        if message.get('role') == 'system' and not system:
+            system = content
+        else:
+            parts.append(content)
+    return system, '\n'.join(parts)
+
+
+def _is_evaluation_request(body: Dict[str, Any], text: str) -> bool:
+    response_format = body.get('response_format') or {}
+    return response_format.get('type') == 'json_object' or ('"score"' in text and 'JSON' in text)
+
+
+class MockProvider:
+    """합성 응답 생성과 카세트 기록/재생을 담당 (Flask 라우트에서 사용)"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.latency = parse_latency(settings.latency)
+        self.cassettes = CassetteStore(settings.cassette_dir)
+        self._rng = random.Random(settings.seed)
+        self._rng_lock = threading.Lock()
+        # 프롬프트 캐시 흉내: 이미 본 시스템 프롬프트 해시
+        self._seen_prefixes: set = set()
+        self._seen_lock = threading.Lock()
+        self._upstream = requests.Session()
+        self.batches = MockBatchStore(self)
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def wait_latency(self) -> None:
+        with self._rng_lock:
+            delay = self.latency(self._rng)
+        if delay > 0:
+            time.sleep(delay)
+
+    def injected_status(self) -> Optional[int]:
+        """error_rate 확률로 주입할 오류 상태 코드 (주입하지 않으면 None)"""
+        if self.settings.error_rate <= 0 or not self.settings.error_statuses or self._random() >= self.settings.error_rate:
+            return None
+        with self._rng_lock:
+            return self._rng.choice(self.settings.error_statuses)
+
+    def injected_error(self, provider: str) -> Optional[Response]:
+        """error_rate 확률로 오류 응답 반환 (429/503에는 Retry-After 헤더 포함)"""
+        status = self.injected_status()
+        if status is None:
+            return None
+        response = jsonify(_error_body(provider, status, f'Mock provider injected error ({status})'))
+        response.status_code = status
+        if status in (429, 503, 529) and self.settings.retry_after > 0:
+            response.headers['Retry-After'] = f'{self.settings.retry_after:g}'
+        return response
+
+    def _cached_prefix_tokens(self, system: str) -> Tuple[int, bool]:
+        """(시스템 프롬프트 토큰 수, 이전에 본 프롬프트인지)"""
+        if not system:
+            return 0, False
+        digest = hashlib.sha256(system.encode('utf-8')).digest()
+        with self._seen_lock:
+            seen = digest in self._seen_prefixes
+            if not seen:
+                if len(self._seen_prefixes) >= 10000:
+                    self._seen_prefixes.clear()
+                self._seen_prefixes.add(digest)
+        return approx_tokens(system), seen
+
+    def _reply_text(self, body: Dict[str, Any], text: str, key: str) -> Tuple[str, bool]:
+        """(응답 텍스트, max_tokens에서 잘렸는지) - 같은 요청이면 같은 응답"""
+        rng = random.Random(key)
+        if _is_evaluation_request(body, text):
+            reply = json.dumps({
+                'reason': rng.choice(_EVALUATION_REASONS),
+                'score': {
+                    '맥락 유지': rng.randint(3, 5),
+                    '페르소나 일관성': rng.randint(3, 5),
+                    '주제 적합성': rng.randint(3, 5),
+                }
+            }, ensure_ascii=False)
+            return reply, False
+        reply = ' '.join(rng.sample(_REPLY_SENTENCES, rng.randint(1, 3)))
+        max_tokens = body.get('max_tokens') or body.get('max_completion_tokens')
+        if isinstance(max_tokens, int) and approx_tokens(reply) > max_tokens:
+            # 문장 중간에서 끊긴 응답 (finish_reason=length)
+            while reply and approx_tokens(reply) > max_tokens:
+                reply = reply[:-1]
+            return reply.rstrip(), True
+        return reply, False
+
+    def openai_completion(self, body: Dict[str, Any], key: str) -> Dict[str, Any]:
+        system, text = _request_text(body)
+        reply, truncated = self._reply_text(body, system + text, key)
+        system_tokens, seen = self._cached_prefix_tokens(system)
+        prompt_tokens = system_tokens + approx_tokens(text) + 4 * len(body.get('messages', []))
+        cached_tokens = 0
+        if seen and prompt_tokens >= OPENAI_CACHE_MIN_TOKENS:
+            cached_tokens = min(system_tokens, prompt_tokens) // OPENAI_CACHE_INCREMENT * OPENAI_CACHE_INCREMENT
+        completion_tokens = approx_tokens(reply)
+        return {
+            'id': f'chatcmpl-mock-{key[:24]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'mock-model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'length' if truncated else 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens_details': {'cached_tokens': cached_tokens},
+            },
+        }
+
+    def anthropic_message(self, body: Dict[str, Any], key: str) -> Dict[str, Any]:
+        system, text = _request_text(body)
+        reply, truncated = self._reply_text(body, system + text, key)
+        system_tokens, seen = self._cached_prefix_tokens(system)
+        # cache_control이 붙은 시스템 블록만 캐시 (처음에는 기록, 이후에는 읽기)
+        cacheable = isinstance(body.get('system'), list) and any(
+            isinstance(block, dict) and block.get('cache_control') for block in body['system']
+        )
+        cache_read = system_tokens if cacheable and seen else 0
+        cache_creation = system_tokens if cacheable and not seen else 0
+        return {
+            'id': f'msg_mock_{key[:24]}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model', 'mock-model'),
+            'content': [{'type': 'text', 'text': reply}],
+            'stop_reason': 'max_tokens' if truncated else 'end_turn',
+            'stop_sequence': None,
+            'usage': {
+                'input_tokens': system_tokens - cache_read - cache_creation + approx_tokens(text),
+                'output_tokens': approx_tokens(reply),
+                'cache_read_input_tokens': cache_read,
+                'cache_creation_input_tokens': cache_creation,
+            },
+        }
+
+    def forward(self, provider: str, method: str, path: str, body: Dict[str, Any], query: Dict[str, str]) -> Tuple[int, Any]:
+        """record 모드: 실제 프로바이더에 스트리밍 없이 요청을 보내고 (상태 코드, 본문) 반환"""
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        url = UPSTREAM_API_BASES[provider] + path
+        payload = {k: v for k, v in body.items() if k not in UNHASHED_FIELDS}
+        response = self._upstream.request(method, url, headers=headers, params=query, json=payload if method == 'POST' else None, timeout=120)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, response.text
+
+    def _chunks(self, text: str, size: int = 4) -> Iterator[str]:
+        delay = self.settings.chunk_delay_ms / 1000
+        for start in range(0, len(text), size):
+            if delay > 0 and start > 0:
+                time.sleep(delay)
+            yield text[start:start + size]
+
+    def openai_stream(self, completion: Dict[str, Any], include_usage: bool) -> Iterator[str]:
+        base = {'id': completion['id'], 'object': 'chat.completion.chunk', 'created': completion['created'], 'model': completion['model']}
+        choice = completion['choices'][0]
+        yield 'data: ' + json.dumps({**base, 'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}]}) + '\n\n'
+        for piece in self._chunks(choice['message']['content']):
+            yield 'data: ' + json.dumps({**base, 'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}, ensure_ascii=False) + '\n\n'
+        yield 'data: ' + json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': choice['finish_reason']}]}) + '\n\n'
+        if include_usage:
+            yield 'data: ' + json.dumps({**base, 'choices': [], 'usage': completion['usage']}) + '\n\n'
+        yield 'data: [DONE]\n\n'
+
+    def anthropic_stream(self, message: Dict[str, Any]) -> Iterator[str]:
+        def event(name: str, data: Dict[str, Any]) -> str:
+            return f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+        usage = message['usage']
+        start_usage = {**usage, 'output_tokens': 1}
+        yield event('message_start', {'type': 'message_start', 'message': {**message, 'content': [], 'stop_reason': None, 'usage': start_usage}})
+        yield event('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+        text = ''.join(block.get('text', '') for block in message['content'] if isinstance(block, dict))
+        for piece in self._chunks(text):
+            yield event('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': piece}})
+        yield event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        yield event('message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': message['stop_reason'], 'stop_sequence': None},
+            'usage': {'output_tokens': usage['output_tokens']}
+        })
+        yield event('message_stop', {'type': 'message_stop'})
+
+
+class MockBatchStore:
+    """
+    OpenAI Batch API/Anthropic Message Batches 흉내 (업로드 파일과 배치를 메모리에 보관)
+    제출 후 batch_seconds가 지난 뒤 처음 조회할 때 항목마다 합성 응답을 만들고(error_rate로 항목 오류 주입),
+    결과 파일의 줄 순서는 실제 API처럼 입력 순서와 다르게 섞음
+    """
+
+    def __init__(self, mock: 'MockProvider'):
+        self.mock = mock
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f'file-mock-{uuid.uuid4().hex[:24]}'
+        info = {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': filename,
+            'purpose': purpose,
+        }
+        with self._lock:
+            self._files[file_id] = {'info': info, 'content': content}
+        return info
+
+    def file_content(self, file_id: str) -> Optional[bytes]:
+        with self._lock:
+            stored = self._files.get(file_id)
+        return stored['content'] if stored else None
+
+    def create_openai(self, input_file_id: str, endpoint: str) -> Optional[Dict[str, Any]]:
+        """OpenAI 배치 생성 (입력 파일이 없거나 JSONL 형식이 아니면 None)"""
+        content = self.file_content(input_file_id)
+        if content is None:
+            return None
+        try:
+            lines = [json.loads(line) for line in content.decode('utf-8').splitlines() if line.strip()]
+            requests_list = [(line['custom_id'], line['body']) for line in lines]
+        except (ValueError, KeyError, TypeError):
+            return None
+        batch_id = f'batch_mock_{uuid.uuid4().hex[:24]}'
+        view = {
+            'id': batch_id,
+            'object': 'batch',
+            'endpoint': endpoint,
+            'input_file_id': input_file_id,
+            'completion_window': '24h',
+            'status': 'in_progress',
+            'output_file_id': None,
+            'error_file_id': None,
+            'created_at': int(time.time()),
+            'completed_at': None,
+            'errors': None,
+            'request_counts': {'total': len(requests_list), 'completed': 0, 'failed': 0},
+        }
+        return self._add('openai', batch_id, requests_list, view)
+
+    def create_anthropic(self, requests_list: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        batch_id = f'msgbatch_mock_{uuid.uuid4().hex[:24]}'
+        view = {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'in_progress',
+            'request_counts': {'processing': len(requests_list), 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0},
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'ended_at': None,
+            'results_url': None,
+        }
+        return self._add('anthropic', batch_id, requests_list, view)
+
+    def _add(self, provider: str, batch_id: str, requests_list: List[Tuple[str, Dict[str, Any]]], view: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._batches[batch_id] = {
+                'provider': provider,
+                'requests': requests_list,
+                'submitted': time.monotonic(),
+                'view': view,
+                'finished': False,
+                'results': None,
+            }
+        return dict(view)
+
+    def get(self, provider: str, batch_id: str) -> Optional[Dict[str, Any]]:
+        """배치 상태 (완료 시간이 지났으면 이번 조회에서 결과를 만듦)"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None or batch['provider'] != provider:
+                return None
+            if not batch['finished'] and time.monotonic() - batch['submitted'] >= self.mock.settings.batch_seconds:
+                self._finish(batch_id, batch)
+            return dict(batch['view'])
+
+    def anthropic_results(self, batch_id: str) -> Optional[str]:
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None or batch['provider'] != 'anthropic':
+                return None
+            return batch['results']
+
+    def _item_result(self, provider: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        status = self.mock.injected_status()
+        if status is not None:
+            return status, _error_body(provider, status, f'Mock provider injected error ({status})')
+        if provider == 'anthropic':
+            return 200, self.mock.anthropic_message(body, CassetteStore.key(provider, '/messages', body))
+        return 200, self.mock.openai_completion(body, CassetteStore.key(provider, '/chat/completions', body))
+
+    def _finish(self, batch_id: str, batch: Dict[str, Any]) -> None:
+        """항목별 결과 생성 (락을 잡은 상태에서 호출)"""
+        provider, view = batch['provider'], batch['view']
+        batch['finished'] = True
+        order = list(range(len(batch['requests'])))
+        random.Random(batch_id).shuffle(order)
+        succeeded, failed = [], []
+        for index in order:
+            custom_id, body = batch['requests'][index]
+            status, response_body = self._item_result(provider, body)
+            if provider == 'anthropic':
+                if status == 200:
+                    line = {'custom_id': custom_id, 'result': {'type': 'succeeded', 'message': response_body}}
+                else:
+                    line = {'custom_id': custom_id, 'result': {'type': 'errored', 'error': response_body}}
+            else:
+                line = {
+                    'id': f'batch_req_{uuid.uuid4().hex[:24]}',
+                    'custom_id': custom_id,
+                    'response': {'status_code': status, 'request_id': uuid.uuid4().hex, 'body': response_body},
+                    'error': None,
+                }
+            (succeeded if status == 200 else failed).append(json.dumps(line, ensure_ascii=False))
+
+        if provider == 'anthropic':
+            batch['results'] = '\n'.join(succeeded + failed) + '\n'
+            view.update({
+                'processing_status': 'ended',
+                'ended_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'request_counts': {'processing': 0, 'succeeded': len(succeeded), 'errored': len(failed), 'canceled': 0, 'expired': 0},
+            })
+            return
+        # OpenAI는 성공한 항목은 출력 파일, 실패한 항목은 오류 파일로 나눔
+        for key, lines in (('output_file_id', succeeded), ('error_file_id', failed)):
+            if lines:
+                content = ('\n'.join(lines) + '\n').encode('utf-8')
+                file_id = f'file-mock-{uuid.uuid4().hex[:24]}'
+                self._files[file_id] = {
+                    'info': {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                             'filename': f'{batch_id}_{key[:-8]}.jsonl', 'purpose': 'batch_output'},
+                    'content': content,
+                }
+                view[key] = file_id
+        view.update({
+            'status': 'completed',
+            'completed_at': int(time.time()),
+            'request_counts': {'total': len(order), 'completed': len(succeeded), 'failed': len(failed)},
+        })
+
+
+def _model_list(provider: str) -> Dict[str, Any]:
+    if provider == 'anthropic':
+        return {'data': [{'type': 'model', 'id': 'claude-mock', 'display_name': 'Claude (mock)'}], 'has_more': False, 'first_id': 'claude-mock', 'last_id': 'claude-mock'}
+    if provider == 'google':
+        return {'models': [{'name': 'models/gemini-mock', 'displayName': 'Gemini (mock)'}]}
+    return {'object': 'list', 'data': [{'id': 'gpt-mock', 'object': 'model', 'owned_by': 'mock'}]}
+
+
+def _api_key(provider: str) -> str:
+    if provider == 'anthropic':
+        return request.headers.get('x-api-key', '')
+    if provider == 'google':
+        return request.args.get('key', '')
+    return request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+
+
+def _invalid_api_key(api_key: str) -> bool:
+    return not api_key or api_key.startswith(('sk-invalid', 'invalid'))
+
+
+def _error(provider: str, status: int, message: str):
+    return jsonify(_error_body(provider, status, message)), status
+
+
+def create_app(settings: Optional[MockSettings] = None) -> Flask:
+    """대체 프로바이더 Flask 앱 생성"""
+    mock = MockProvider(settings or MockSettings())
+    app = Flask(__name__)
+    app.config['mock_provider'] = mock
+
+    def handle(provider: str, path: str, build: Optional[Callable[[Dict[str, Any], str], Dict[str, Any]]]):
+        """
+        공통 처리 순서: 인증 확인 -> 지연 -> 오류 주입 -> (record/replay/mock) 응답 -> 필요하면 SSE 변환
+        build가 None이면 모델 목록 조회 (GET)
+        """
+        api_key = _api_key(provider)
+        if mock.settings.mode != 'record' and _invalid_api_key(api_key):
+            return _error(provider, 401, 'Invalid API key (mock)')
+
+        mock.wait_latency()
+        error = mock.injected_error(provider)
+        if error is not None:
+            return error
+
+        if build is None:
+            body = {k: v for k, v in request.args.items() if k != 'key'}
+        else:
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return jsonify(_error_body(provider, 400, 'Request body must be a JSON object')), 400
+        key = CassetteStore.key(provider, path, body)
+
+        status, response_body = 200, None
+        if mock.settings.mode == 'record':
+            status, response_body = mock.forward(provider, request.method, path, body, dict(request.args))
+            mock.cassettes.save(provider, key, path, body, status, response_body)
+        elif mock.settings.mode == 'replay':
+            cassette = mock.cassettes.load(provider, key)
+            if cassette is not None:
+                status, response_body = cassette['response']['status'], cassette['response']['body']
+            elif mock.settings.replay_miss == 'error':
+                return jsonify(_error_body(provider, 404, f'No cassette recorded for this request ({key})')), 404
+        if response_body is None:
+            response_body = _model_list(provider) if build is None else build(body, key)
+
+        if status != 200 or build is None or not body.get('stream'):
+            if isinstance(response_body, str):
+                return Response(response_body, status=status, mimetype='text/plain')
+            return jsonify(response_body), status
+        if provider == 'anthropic':
+            events = mock.anthropic_stream(response_body)
+        else:
+            include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+            events = mock.openai_stream(response_body, include_usage)
+        return Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    @app.route('/openai/v1/chat/completions', methods=['POST'])
+    def openai_chat_completions():
+        return handle('openai', '/chat/completions', mock.openai_completion)
+
+    @app.route('/openai/v1/models', methods=['GET'])
+    def openai_models():
+        return handle('openai', '/models', None)
+
+    @app.route('/anthropic/v1/messages', methods=['POST'])
+    def anthropic_messages():
+        return handle('anthropic', '/messages', mock.anthropic_message)
+
+    @app.route('/anthropic/v1/models', methods=['GET'])
+    def anthropic_models():
+        return handle('anthropic', '/models', None)
+
+    def batch_request(provider: str):
+        """배치 요청 공통 처리: 인증 확인 -> 오류 주입 (통과하면 None)"""
+        if _invalid_api_key(_api_key(provider)):
+            return _error(provider, 401, 'Invalid API key (mock)')
+        return mock.injected_error(provider)
+
+    @app.route('/openai/v1/files', methods=['POST'])
+    def openai_upload_file():
+        rejected = batch_request('openai')
+        if rejected is not None:
+            return rejected
+        upload = request.files.get('file')
+        if upload is None:
+            return _error('openai', 400, "Missing required parameter: 'file'")
+        return jsonify(mock.batches.add_file(upload.read(), upload.filename or 'upload.jsonl', request.form.get('purpose', 'batch')))
+
+    @app.route('/openai/v1/files/<file_id>/content', methods=['GET'])
+    def openai_file_content(file_id: str):
+        rejected = batch_request('openai')
+        if rejected is not None:
+            return rejected
+        content = mock.batches.file_content(file_id)
+        if content is None:
+            return _error('openai', 404, f'No such File object: {file_id}')
+        return Response(content, mimetype='application/octet-stream')
+
+    @app.route('/openai/v1/batches', methods=['POST'])
+    def openai_create_batch():
+        rejected = batch_request('openai')
+        if rejected is not None:
+            return rejected
+        body = request.get_json(silent=True) or {}
+        if body.get('endpoint') != '/v1/chat/completions':
+            return _error('openai', 400, 'Only /v1/chat/completions is supported by the mock provider')
+        batch = mock.batches.create_openai(str(body.get('input_file_id', '')), body['endpoint'])
+        if batch is None:
+            return _error('openai', 400, 'input_file_id must be an uploaded JSONL file with custom_id and body on every line')
+        return jsonify(batch)
+
+    @app.route('/openai/v1/batches/<batch_id>', methods=['GET'])
+    def openai_get_batch(batch_id: str):
+        rejected = batch_request('openai')
+        if rejected is not None:
+            return rejected
+        batch = mock.batches.get('openai', batch_id)
+        if batch is None:
+            return _error('openai', 404, f'No batch found with id {batch_id}')
+        return jsonify(batch)
+
+    @app.route('/anthropic/v1/messages/batches', methods=['POST'])
+    def anthropic_create_batch():
+        rejected = batch_request('anthropic')
+        if rejected is not None:
+            return rejected
+        body = request.get_json(silent=True) or {}
+        items = body.get('requests')
+        if not isinstance(items, list) or not items or not all(
+            isinstance(item, dict) and isinstance(item.get('custom_id'), str) and isinstance(item.get('params'), dict)
+            for item in items
+        ):
+            return _error('anthropic', 400, 'requests must be a non-empty list of {custom_id, params}')
+        return jsonify(mock.batches.create_anthropic([(item['custom_id'], item['params']) for item in items]))
+
+    @app.route('/anthropic/v1/messages/batches/<batch_id>', methods=['GET'])
+    def anthropic_get_batch(batch_id: str):
+        rejected = batch_request('anthropic')
+        if rejected is not None:
+            return rejected
+        batch = mock.batches.get('anthropic', batch_id)
+        if batch is None:
+            return _error('anthropic', 404, f'No batch found with id {batch_id}')
+        if batch['processing_status'] == 'ended':
+            batch['results_url'] = f"{request.host_url}anthropic/v1/messages/batches/{batch_id}/results"
+        return jsonify(batch)
+
+    @app.route('/anthropic/v1/messages/batches/<batch_id>/results', methods=['GET'])
+    def anthropic_batch_results(batch_id: str):
+        rejected = batch_request('anthropic')
+        if rejected is not None:
+            return rejected
+        results = mock.batches.anthropic_results(batch_id)
+        if results is None:
+            return _error('anthropic', 404, f'Results for batch {batch_id} are not available yet')
+        return Response(results.encode('utf-8'), mimetype='application/octet-stream')
+
+    @app.route('/google/v1beta/models', methods=['GET'])
+    def google_models():
+        return handle('google', '/models', None)
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify({'status': 'ok', 'mode': mock.settings.mode}), 200
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='로컬 대체 LLM 프로바이더 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MOCK_PROVIDER_PORT', '8900')))
+    parser.add_argument('--mode', default=MOCK_PROVIDER_MODE, choices=['mock', 'record', 'replay'])
+    parser.add_argument('--cassette-dir', default=MOCK_PROVIDER_CASSETTE_DIR)
+    parser.add_argument('--replay-miss', default=MOCK_PROVIDER_REPLAY_MISS, choices=['error', 'mock'])
+    parser.add_argument('--latency', default=MOCK_PROVIDER_LATENCY, help='예: fixed:300, uniform:200:800, normal:500:100, lognormal:600:0.5, exp:400 (밀리초)')
+    parser.add_argument('--chunk-delay-ms', type=float, default=MOCK_PROVIDER_CHUNK_DELAY_MS)
+    parser.add_argument('--error-rate', type=float, default=MOCK_PROVIDER_ERROR_RATE)
+    parser.add_argument('--error-statuses', default=MOCK_PROVIDER_ERROR_STATUSES, help='쉼표로 구분한 상태 코드 (예: 429,500,503,529)')
+    parser.add_argument('--retry-after', type=float, default=MOCK_PROVIDER_RETRY_AFTER)
+    parser.add_argument('--seed', type=int, default=int(MOCK_PROVIDER_SEED) if MOCK_PROVIDER_SEED else None)
+    parser.add_argument('--batch-seconds', type=float, default=MOCK_PROVIDER_BATCH_SECONDS, help='배치 작업이 완료되기까지 걸리는 시간 (초)')
+    args = parser.parse_args(argv)
+
+    settings = MockSettings(
+        latency=args.latency,
+        chunk_delay_ms=args.chunk_delay_ms,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(',') if s.strip()],
+        retry_after=args.retry_after,
+        mode=args.mode,
+        cassette_dir=args.cassette_dir,
+        replay_miss=args.replay_miss,
+        seed=args.seed,
+        batch_seconds=args.batch_seconds
+    )
+    parse_latency(settings.latency)  # 잘못된 설정은 시작 전에 오류
+    create_app(settings).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
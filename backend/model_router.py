@@ -0,0 +1,256 @@
+"""
+모델 레지스트리와 지연 시간 기반 라우팅
+- 프로바이더마다 티어(fast/standard/quality)별 후보 모델 목록 (MODEL_TIERS로 변경 가능)
+- 용도(generation/prompt/evaluation)별 기본 티어는 기존에 쓰던 모델과 같음
+- 프로바이더 호출 결과(http_client)로 모델별 지연 시간 EWMA와 오류율을 갱신하고,
+  같은 티어 안에서 서킷이 닫혀 있고 오류율이 낮은 모델 중 가장 빠른 모델을 선택
+- 요청이 허용하면(대체 프로바이더 API 키 제공) 정상인 모델이 없을 때 다른 프로바이더의 같은 티어로 대체
+"""
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from circuit_breaker import CLOSED, OPEN, circuit_breakers
+from metrics import METRICS_ENABLED, MODEL_ROUTES, provider_of
+
+TIERS = ('fast', 'standard', 'quality')
+
+# 프로바이더별 티어 후보 모델 (앞의 모델일수록 우선, 지연 시간 정보가 쌓이면 가장 빠른 모델 선택)
+DEFAULT_MODEL_TIERS: Dict[str, Dict[str, List[str]]] = {
+    'openai': {
+        'fast': ['gpt-4o-mini'],
+        'standard': ['gpt-4o'],
+        'quality': ['gpt-4.1'],
+    },
+    'anthropic': {
+        'fast': ['claude-3-5-haiku-20241022'],
+        'standard': ['claude-sonnet-4-5'],
+        'quality': ['claude-opus-4-1'],
+    },
+}
+# 티어를 지정하지 않은 요청의 용도별 기본 티어 (응답 생성은 프로바이더마다 기존 모델에 맞춤)
+DEFAULT_PURPOSE_TIERS: Dict[str, Dict[str, str]] = {
+    'generation': {'openai': 'standard', 'anthropic': 'fast'},
+    'prompt': {'openai': 'standard', 'anthropic': 'standard'},
+    'evaluation': {'openai': 'standard', 'anthropic': 'standard'},
+}
+
+MODEL_ROUTING_ENABLED = os.environ.get('MODEL_ROUTING_ENABLED', '1') not in ('0', 'false', 'False')
+# 티어 후보 모델 변경 ("openai.fast=gpt-4o-mini|gpt-4.1-mini,anthropic.quality=claude-opus-4-1")
+MODEL_TIERS = os.environ.get('MODEL_TIERS', '')
+# 용도별 기본 티어 변경 (비어 있으면 DEFAULT_PURPOSE_TIERS)
+MODEL_TIER_GENERATION = os.environ.get('MODEL_TIER_GENERATION', '')
+MODEL_TIER_PROMPT = os.environ.get('MODEL_TIER_PROMPT', '')
+MODEL_TIER_EVALUATION = os.environ.get('MODEL_TIER_EVALUATION', '')
+# 지연 시간 EWMA 가중치 (새 표본의 비중)
+MODEL_ROUTING_EWMA_ALPHA = float(os.environ.get('MODEL_ROUTING_EWMA_ALPHA', '0.2'))
+# 오류율이 절반으로 줄어드는 시간 (초, 호출이 없어도 시간이 지나면 다시 후보가 됨)
+MODEL_ROUTING_ERROR_HALF_LIFE = float(os.environ.get('MODEL_ROUTING_ERROR_HALF_LIFE', '60'))
+# 오류율(429/5xx/시간 초과/연결 오류)이 이 값 이상이면 정상이 아닌 모델로 봄
+MODEL_ROUTING_MAX_ERROR_RATE = float(os.environ.get('MODEL_ROUTING_MAX_ERROR_RATE', '0.3'))
+# 지연 시간으로 비교하기 위한 최소 성공 호출 수
+MODEL_ROUTING_MIN_SAMPLES = int(os.environ.get('MODEL_ROUTING_MIN_SAMPLES', '5'))
+# 후보가 여러 개일 때 가장 빠른 모델 대신 임의의 정상 모델을 고르는 비율 (다른 모델의 지연 시간 갱신용)
+MODEL_ROUTING_EXPLORE_RATE = float(os.environ.get('MODEL_ROUTING_EXPLORE_RATE', '0.05'))
+
+
+def _parse_model_tiers(spec: str) -> Dict[str, Dict[str, List[str]]]:
+    """'openai.fast=a|b,...' 형식의 설정을 DEFAULT_MODEL_TIERS에 덮어쓴 결과 반환"""
+    tiers = {provider: {tier: list(models) for tier, models in provider_tiers.items()}
+             for provider, provider_tiers in DEFAULT_MODEL_TIERS.items()}
+    for item in spec.split(','):
+        if '=' not in item or '.' not in item.split('=', 1)[0]:
+            continue
+        target, models = item.split('=', 1)
+        provider, tier = (part.strip() for part in target.split('.', 1))
+        names = [name.strip() for name in models.split('|') if name.strip()]
+        if tier in TIERS and names:
+            tiers.setdefault(provider, {})[tier] = names
+    return tiers
+
+
+def _parse_purpose_tiers() -> Dict[str, Dict[str, str]]:
+    purpose_tiers = {purpose: dict(tiers) for purpose, tiers in DEFAULT_PURPOSE_TIERS.items()}
+    for purpose, tier in (('generation', MODEL_TIER_GENERATION), ('prompt', MODEL_TIER_PROMPT),
+                          ('evaluation', MODEL_TIER_EVALUATION)):
+        if tier in TIERS:
+            purpose_tiers[purpose] = {provider: tier for provider in purpose_tiers[purpose]}
+    return purpose_tiers
+
+
+class ModelStats:
+    """모델 하나의 지연 시간 EWMA와 시간에 따라 줄어드는 오류율 (잠금은 호출한 쪽에서 관리)"""
+
+    __slots__ = ('latency', 'samples', 'error_rate', 'updated')
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.samples = 0
+        self.error_rate = 0.0
+        self.updated = time.monotonic()
+
+    def error_rate_at(self, now: float) -> float:
+        if MODEL_ROUTING_ERROR_HALF_LIFE <= 0:
+            return self.error_rate
+        return self.error_rate * math.pow(0.5, (now - self.updated) / MODEL_ROUTING_ERROR_HALF_LIFE)
+
+    def record(self, failed: bool, latency: Optional[float], now: float) -> None:
+        self.error_rate = self.error_rate_at(now)
+        self.error_rate += MODEL_ROUTING_EWMA_ALPHA * ((1.0 if failed else 0.0) - self.error_rate)
+        self.updated = now
+        if latency is not None:
+            self.samples += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += MODEL_ROUTING_EWMA_ALPHA * (latency - self.latency)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'samples': self.samples,
+            'error_rate': round(self.error_rate_at(now), 3),
+        }
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """라우팅 결과 (fallback이면 요청한 프로바이더 대신 다른 프로바이더로 대체)"""
+    provider: str
+    model: str
+    tier: str
+    fallback: bool = False
+
+
+class ModelRouter:
+    """티어별 후보 모델 관리와 (프로바이더, 모델)별 지연 시간/오류율 기반 선택 (스레드 안전)"""
+
+    def __init__(self, model_tiers: Optional[Dict[str, Dict[str, List[str]]]] = None,
+                 purpose_tiers: Optional[Dict[str, Dict[str, str]]] = None):
+        self.model_tiers = model_tiers or DEFAULT_MODEL_TIERS
+        self.purpose_tiers = purpose_tiers or DEFAULT_PURPOSE_TIERS
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def tier_for(self, purpose: str, provider: str, tier: Optional[str] = None) -> str:
+        """요청한 티어 (없으면 용도별 기본 티어)"""
+        if tier in TIERS:
+            return tier
+        return self.purpose_tiers.get(purpose, {}).get(provider, 'standard')
+
+    def default_model(self, purpose: str, provider: str, tier: Optional[str] = None) -> str:
+        """통계와 관계없이 티어의 첫 번째 후보 모델"""
+        return self.model_tiers[provider][self.tier_for(purpose, provider, tier)][0]
+
+    def observe(self, url: str, payload: Any, status_code: Optional[int], elapsed: float) -> None:
+        """
+        프로바이더 호출 결과 기록 (http_client가 응답/예외마다 호출, status_code가 None이면 예외)
+        429/5xx와 예외는 오류로, 200 응답은 지연 시간 표본으로 기록
+        """
+        model = payload.get('model') if isinstance(payload, dict) else None
+        if not model:
+            return
+        failed = status_code is None or status_code == 429 or status_code >= 500
+        if not failed and status_code != 200:
+            # 그 밖의 4xx는 요청 문제이므로 모델 상태 판단에 쓰지 않음
+            return
+        key = (provider_of(url), model)
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = ModelStats()
+            stats.record(failed, None if failed else elapsed, now)
+
+    def _healthy(self, provider: str, model: str, now: float) -> bool:
+        """서킷이 열려 있지 않고 오류율이 기준 미만인 모델 (락을 잡은 상태에서 호출)"""
+        if circuit_breakers.state_of(provider, model) == OPEN:
+            return False
+        stats = self._stats.get((provider, model))
+        return stats is None or stats.error_rate_at(now) < MODEL_ROUTING_MAX_ERROR_RATE
+
+    def _rank(self, provider: str, models: Sequence[str], now: float) -> Tuple[List[str], List[str]]:
+        """(정상 모델을 선택 순서대로, 나머지 모델) 반환 (락을 잡은 상태에서 호출)"""
+        healthy = [model for model in models if self._healthy(provider, model, now)]
+        unhealthy = [model for model in models if model not in healthy]
+        if len(healthy) > 1:
+            if self._random.random() < MODEL_ROUTING_EXPLORE_RATE:
+                chosen = self._random.choice(healthy)
+                return [chosen] + [model for model in healthy if model != chosen], unhealthy
+            # 표본이 충분한 모델은 지연 시간 순, 나머지는 설정 순서대로 뒤에 둠
+            measured = [model for model in healthy
+                        if (stats := self._stats.get((provider, model))) is not None
+                        and stats.samples >= MODEL_ROUTING_MIN_SAMPLES]
+            measured.sort(key=lambda model: self._stats[(provider, model)].latency)
+            healthy = measured + [model for model in healthy if model not in measured]
+            # 시험 호출 중(half_open)인 모델은 닫힌 모델 뒤로 (시험 호출 수가 제한되어 있으므로)
+            healthy.sort(key=lambda model: circuit_breakers.state_of(provider, model) != CLOSED)
+        return healthy, unhealthy
+
+    def routes(self, purpose: str, provider: str, tier: Optional[str] = None,
+               fallback_providers: Sequence[str] = ()) -> List[ModelRoute]:
+        """
+        호출할 (프로바이더, 모델) 후보를 시도할 순서대로 반환
+        요청한 프로바이더의 정상 모델 -> 대체 프로바이더의 정상 모델 -> 요청한 프로바이더의 나머지 모델
+        (나머지 모델은 모든 후보가 불안정할 때 서킷 브레이커가 판단하도록 마지막에 둠)
+        """
+        requested_tier = tier
+        tier = self.tier_for(purpose, provider, requested_tier)
+        models = self.model_tiers.get(provider, {}).get(tier, [])
+        if not MODEL_ROUTING_ENABLED:
+            routes = [ModelRoute(provider, models[0], tier)] if models else []
+        else:
+            now = time.monotonic()
+            with self._lock:
+                healthy, unhealthy = self._rank(provider, models, now)
+                routes = [ModelRoute(provider, model, tier) for model in healthy]
+                for other in fallback_providers:
+                    if other == provider:
+                        continue
+                    # 티어를 지정하지 않았으면 대체 프로바이더도 그 프로바이더의 기본 티어 사용
+                    other_tier = self.tier_for(purpose, other, requested_tier)
+                    other_healthy, _ = self._rank(other, self.model_tiers.get(other, {}).get(other_tier, []), now)
+                    routes.extend(ModelRoute(other, model, other_tier, fallback=True) for model in other_healthy)
+                routes.extend(ModelRoute(provider, model, tier) for model in unhealthy)
+        if routes and METRICS_ENABLED:
+            first = routes[0]
+            MODEL_ROUTES.labels(purpose, first.provider, first.model, 'fallback' if first.fallback else 'primary').inc()
+        return routes
+
+    def select_model(self, purpose: str, provider: str, tier: Optional[str] = None) -> str:
+        """대체 없이 요청한 프로바이더에서 모델 하나 선택"""
+        routes = self.routes(purpose, provider, tier)
+        return routes[0].model if routes else self.default_model(purpose, provider, tier)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """티어 구성과 모델별 상태 (GET /api/models)"""
+        now = time.monotonic()
+        with self._lock:
+            stats = {key: value.snapshot(now) for key, value in self._stats.items()}
+        return {
+            'routing_enabled': MODEL_ROUTING_ENABLED,
+            'purpose_tiers': self.purpose_tiers,
+            'providers': {
+                provider: {
+                    tier: [
+                        {'model': model, 'circuit': circuit_breakers.state_of(provider, model),
+                         **stats.get((provider, model), ModelStats().snapshot(now))}
+                        for model in models
+                    ]
+                    for tier, models in tiers.items()
+                }
+                for provider, tiers in self.model_tiers.items()
+            },
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+model_router = ModelRouter(_parse_model_tiers(MODEL_TIERS), _parse_purpose_tiers())
@@ -0,0 +1,232 @@
+"""
+대화 생성과 토큰 예측이 함께 사용하는 프롬프트 템플릿 레지스트리
+- 템플릿은 '{슬롯}' 자리표시자를 가진 문자열이며, 한 번 파싱해서 정적 구간과 슬롯 목록으로 나눠 둡니다.
+- generate_llm_response는 여기서 프롬프트를 렌더링하고, estimate_tokens는 같은 템플릿으로 토큰 수를 계산합니다.
+- 정적 구간의 토큰 수는 템플릿마다 한 번만 계산해 두므로, 렌더링된 프롬프트의 토큰 수는
+  (정적 토큰 수 + 슬롯 값의 토큰 수)로 구합니다.
+"""
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+_SLOT_PATTERN = re.compile(r'\{(\w+)\}')
+
+
+class PromptTemplate:
+    """
+    정적 구간과 슬롯으로 미리 나눠 둔 프롬프트 템플릿
+    슬롯 경계에서 BPE 토큰이 합쳐질 수 있으므로 count_tokens는 슬롯당 ±1 토큰 정도의 근사값입니다.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        parts = _SLOT_PATTERN.split(text)
+        # split 결과는 [정적, 슬롯, 정적, 슬롯, ..., 정적] 순서
+        self.segments: List[str] = parts[0::2]
+        self.slots: List[str] = parts[1::2]
+        self._static_tokens: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def render(self, **values) -> str:
+        """슬롯 값을 채운 프롬프트 문자열 반환 (값은 str()로 변환)"""
+        parts = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            parts.append(str(values[slot]))
+            parts.append(segment)
+        return ''.join(parts)
+
+    def static_tokens(self, counter: Callable[[str], int]) -> int:
+        """정적 구간의 토큰 수 (처음 한 번만 계산)"""
+        if self._static_tokens is None:
+            with self._lock:
+                if self._static_tokens is None:
+                    self._static_tokens = sum(counter(segment) for segment in self.segments if segment)
+        return self._static_tokens
+
+    def count_tokens(self, counter: Callable[[str], int], slot_tokens: Optional[Dict[str, int]] = None, **values) -> int:
+        """
+        렌더링 결과의 토큰 수 (정적 토큰 수 + 슬롯 값의 토큰 수)
+
+        Args:
+            counter: 텍스트의 토큰 수를 세는 함수
+            slot_tokens: 텍스트 대신 토큰 수를 바로 지정할 슬롯 (예: 길이만 아는 대화 히스토리)
+            **values: 나머지 슬롯 값 (str()로 변환해서 토큰 수 계산)
+        """
+        slot_tokens = slot_tokens or {}
+        total = self.static_tokens(counter)
+        for slot in self.slots:
+            if slot in slot_tokens:
+                total += slot_tokens[slot]
+            else:
+                value = str(values[slot])
+                if value:
+                    total += counter(value)
+        return total
+
+
+TEMPLATES: Dict[str, PromptTemplate] = {}
+
+
+def register_template(name: str, text: str) -> PromptTemplate:
+    """템플릿을 레지스트리에 등록하고 반환"""
+    template = PromptTemplate(name, text)
+    TEMPLATES[name] = template
+    return template
+
+
+def get_template(name: str) -> PromptTemplate:
+    return TEMPLATES[name]
+
+
+def precompute_token_counts(counter: Callable[[str], int]) -> None:
+    """등록된 모든 템플릿의 정적 토큰 수를 미리 계산 (서버 시작 시 호출)"""
+    for template in TEMPLATES.values():
+        template.static_tokens(counter)
+
+
+# OpenAI 응답 요청에 넣는 최근 히스토리 메시지 수, 맥락 요약 메시지 수, 이미 언급된 내용의 최대 글자 수
+OPENAI_HISTORY_MESSAGES = 6
+OPENAI_CONTEXT_MESSAGES = 3
+MENTIONED_INFO_CHARS = 200
+
+
+# 대화 응답 생성: 기본 시스템 프롬프트 (OpenAI/Anthropic 공통)
+CONVERSATION_SYSTEM = register_template('conversation_system', """당신은 챗봇 {bot_number}입니다. {persona}의 역할을 맡고 있습니다.
+
+현재 상황:
+- 주제: {topic}
+- 당신은 챗봇 {bot_number} ({persona})
+- 상대방은 챗봇 {other_bot_number}
+- 두 챗봇이 {topic}에 대해 대화를 나누고 있습니다.
+
+당신의 역할 (매우 중요):
+- 이것은 단순한 독백이 아닌 **실제 대화**입니다.
+- 상대방(챗봇 {other_bot_number})의 발언에 **반드시 직접적으로 반응**해야 합니다.
+- 상대방의 말에 대해 질문하거나, 공감하거나, 동의하거나, 반대 의견을 제시하거나, 상대방의 말을 인용해야 합니다.
+- 절대로 주제에 대해 독립적으로 말만 하면 안 됩니다. 상대방과의 상호작용이 필수입니다.
+- "{persona}"의 관점을 유지하면서도 상대방과 소통해야 합니다.
+
+절대적으로 지켜야 할 규칙:
+1. 반드시 한국어로만 응답하세요.
+2. 반드시 완전한 문장으로 끝나야 합니다.
+3. 한 번에 1-2문장으로만 응답하세요.
+4. **상대방의 발언에 직접적으로 반응하세요.**""")
+
+# OpenAI: 시스템 프롬프트(기본 또는 커스텀) 뒤에 붙이는 정체성/응답 길이 지침
+# other_persona는 없으면 '알 수 없음', other_persona_suffix는 없으면 빈 문자열
+OPENAI_IDENTITY_SYSTEM = register_template('openai_identity_system', """{system_prompt}
+
+[매우 중요] 당신의 정체성과 역할:
+- 당신은 챗봇 {bot_number}이며, 페르소나는 "{persona}"입니다
+- 상대방은 챗봇 {other_bot_number}이며, 페르소나는 "{other_persona}"입니다
+- 당신은 절대 상대방의 페르소나나 역할로 말하지 마세요
+- 당신은 오직 "{persona}"의 페르소나로만 대화해야 합니다
+- 대화 히스토리에서 "당신(챗봇 {bot_number}, {persona})"이라고 표시된 것은 당신이 말한 내용입니다
+- "상대방(챗봇 {other_bot_number}{other_persona_suffix})"이라고 표시된 것은 상대방이 말한 내용입니다
+- 절대 자신과 상대방의 발언을 혼동하지 마세요
+- 절대 상대방의 페르소나, 역할, 말투를 모방하거나 따라하지 마세요
+
+[매우 중요] 응답 길이 제한:
+- 짧고 간결하게, 일상 대화하듯이 자연스럽게 말하세요
+- 긴 설명, 복잡한 문장 구조, 여러 문장으로 나누어 말하는 것을 절대 금지합니다
+- 핵심만 간단히 전달하세요""")
+
+# OpenAI: 첫 메시지 요청
+OPENAI_FIRST_USER = register_template('openai_first_user', """
+            주제 '{topic}'에 대해 대화를 시작합니다.
+
+            [매우 중요] 당신의 정체성:
+            - 당신은 챗봇 {bot_number}이며, 페르소나는 "{persona}"입니다
+            - 당신은 오직 이 페르소나의 역할과 특성으로만 대화해야 합니다
+            - 시스템 프롬프트에 명시된 역할과 "{persona}"의 특성을 정확히 따르세요
+            - 절대 다른 페르소나나 역할로 말하지 마세요
+
+            [매우 중요] 응답 길이:
+            - 긴 설명이나 여러 문장 사용 금지
+            """)
+
+# OpenAI: 대화 히스토리 메시지 (자신의 발언은 assistant, 상대방의 발언은 user role)
+OPENAI_HISTORY_SELF = register_template('openai_history_self', "[당신(챗봇 {bot_number}, {persona})의 이전 발언] {text}")
+OPENAI_HISTORY_OTHER = register_template('openai_history_other', "[상대방(챗봇 {other_bot_number}, {other_persona})의 발언] {text}")
+
+# OpenAI: 이전 대화 맥락 요약 (최근 메시지 한 줄씩)
+OPENAI_CONTEXT_SELF = register_template('openai_context_self', "당신(챗봇 {bot_number}, {persona}): {text}")
+OPENAI_CONTEXT_OTHER = register_template('openai_context_other', "상대방(챗봇 {other_bot_number}, {other_persona}): {text}")
+OPENAI_RECENT_CONTEXT = register_template('openai_recent_context', "\n\n[중요] 이전 대화 맥락 요약 (참고용):\n{lines}\n\n위 대화에서 이미 언급된 내용을 다시 물어보지 마세요. 이미 말한 정보를 활용하여 대화를 진행하세요.\n")
+
+# OpenAI: 이전 대화에서 이미 언급된 내용 (앞 200자)
+OPENAI_MENTIONED_INFO = register_template('openai_mentioned_info', "\n[참고] 이전 대화에서 이미 언급된 내용: {text}...\n위 내용을 다시 물어보지 말고, 이를 바탕으로 대화를 진행하세요.\n")
+
+# OpenAI: 두 번째 메시지부터의 응답 요청
+OPENAI_FOLLOWUP_USER = register_template('openai_followup_user', """
+            [매우 중요] 당신의 정체성 (절대 잊지 마세요):
+            - 당신은 챗봇 {bot_number}이며, 페르소나는 "{persona}"입니다
+            - 상대방은 챗봇 {other_bot_number}이며, 페르소나는 "{other_persona}"입니다
+            - 당신은 오직 "{persona}"의 페르소나로만 대화해야 합니다
+            - 절대 상대방의 페르소나("{other_persona}")나 역할로 말하지 마세요
+            - 절대 상대방의 말투, 태도, 관점을 모방하거나 따라하지 마세요
+
+            상대방(챗봇 {other_bot_number}, {other_persona})이 방금 한 말입니다:
+
+            "{last_message}"
+            {recent_context}
+            {mentioned_info}
+            
+            [중요 지시사항]:
+            1. 위의 대화 히스토리를 참고하되, "당신(챗봇 {bot_number}, {persona})"이라고 표시된 것은 당신이 말한 것이고, "상대방(챗봇 {other_bot_number}, {other_persona})"이라고 표시된 것은 상대방이 말한 것입니다
+            2. 절대 자신과 상대방의 발언을 혼동하지 마세요
+            3. 당신은 "{persona}"의 페르소나를 유지해야 합니다 - 절대 상대방의 페르소나로 말하지 마세요
+            4. 상대방의 말에 직접적으로 반응하되, 이미 말한 내용을 다시 물어보지 마세요
+            5. 이전 대화 맥락을 활용하여 새로운 정보나 다음 단계를 제시하세요
+            6. 대화를 한 단계 더 구체적이고 진전된 방향으로 이끌어가세요
+            7. 시스템 프롬프트에 명시된 역할과 "{persona}"의 특성을 정확히 따르세요
+            8. 절대 역할 표시("통신사 고객:", "고객:", "직원:" 등)를 포함하지 마세요
+            9. 따옴표나 인용 부호를 사용하지 마세요
+            10. 역할을 직접 말하지 말고, 자연스럽게 대화하세요
+            
+            [매우 중요] 응답 길이 제한 (절대 지키세요):
+            - 짧고 간결하게, 일상 대화하듯이 자연스럽게 말하세요
+            - 긴 설명, 복잡한 문장 구조, 여러 문장으로 나누어 말하는 것을 절대 금지합니다
+            - 핵심만 간단히 전달하세요
+            """)
+
+# Anthropic: 첫 메시지 요청
+ANTHROPIC_FIRST_USER = register_template('anthropic_first_user', "주제 '{topic}'에 대해 대화를 시작합니다. {persona}의 페르소나로 짧고 간결하게 첫 메시지를 작성하세요.")
+
+# Anthropic: 대화 히스토리 (머리말 + 발언마다 한 블록 + 응답 요청)
+ANTHROPIC_HISTORY_HEADER = register_template('anthropic_history_header', "다음은 지금까지의 대화입니다:\n\n")
+ANTHROPIC_HISTORY_SELF = register_template('anthropic_history_self', "챗봇 {bot} (당신, {persona}): {text}\n")
+ANTHROPIC_HISTORY_OTHER = register_template('anthropic_history_other', "챗봇 {bot} (상대방): {text}\n")
+ANTHROPIC_TURN_INSTRUCTION = register_template('anthropic_turn_instruction', "\n\n이제 당신(챗봇 {bot_number}, {persona})의 차례입니다. 상대방의 발언에 직접적으로 반응하면서 짧고 간결하게 응답하세요.")
+
+# 시스템 프롬프트 생성 요청 (OpenAI/Anthropic 공통)
+PROMPT_GENERATION_USER = register_template('prompt_generation_user', """다음 정보를 바탕으로 대화 시뮬레이션을 위한 시스템 프롬프트를 생성해주세요:
+
+주제: {topic}
+페르소나 1 (챗봇 1): {persona1}
+페르소나 2 (챗봇 2): {persona2}
+
+[중요] 프롬프트 작성 요구사항:
+1. 각 페르소나의 역할과 책임을 명확히 설명하세요
+   - 페르소나 1이 어떤 역할을 하는지 (예: 정보 제공자, 정보 요청자, 의견 제시자 등)
+   - 페르소나 2가 어떤 역할을 하는지
+   - 각 페르소나가 대화에서 어떤 행동을 해야 하는지
+
+2. 각 페르소나의 특성과 성격을 반영하세요
+   - 페르소나 설명에 명시된 특성들을 대화에 어떻게 반영할지
+   - 말투, 태도, 관점 등
+
+3. 주제에 대한 대화 목적과 방향을 제시하세요
+   - 이 대화의 목적이 무엇인지
+   - 대화가 어떻게 진행되어야 하는지
+
+4. 절대 실제 대화 예시나 대화 내용을 포함하지 마세요
+   - "고객: 안녕하세요..." 같은 실제 대화 예시는 포함하지 마세요
+   - 역할 지침과 행동 규칙만 작성하세요
+
+5. 한국어로 작성하세요
+
+6. 프롬프트만 반환하세요 (추가 설명이나 메타 설명 없이)
+
+생성된 프롬프트:""")
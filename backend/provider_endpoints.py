@@ -0,0 +1,30 @@
+"""
+프로바이더 API 기본 URL
+환경 변수로 바꿀 수 있어 mock_provider.py 같은 대체 서버나 프록시를 가리키게 할 수 있습니다.
+(예: OPENAI_API_BASE=http://127.0.0.1:8900/openai/v1)
+"""
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+# 다른 모듈보다 먼저 import될 수 있으므로 .env를 여기서도 읽음
+load_dotenv()
+
+OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
+ANTHROPIC_API_BASE = os.environ.get('ANTHROPIC_API_BASE', 'https://api.anthropic.com/v1').rstrip('/')
+GOOGLE_API_BASE = os.environ.get('GOOGLE_API_BASE', 'https://generativelanguage.googleapis.com/v1beta').rstrip('/')
+
+PROVIDER_API_BASES: Dict[str, str] = {
+    'openai': OPENAI_API_BASE,
+    'anthropic': ANTHROPIC_API_BASE,
+    'google': GOOGLE_API_BASE,
+}
+
+
+def provider_for_url(url: str) -> Optional[str]:
+    """설정된 기본 URL로 시작하는 URL이면 해당 프로바이더 이름, 아니면 None"""
+    for provider, base in PROVIDER_API_BASES.items():
+        if url == base or url.startswith(base + '/') or url.startswith(base + '?'):
+            return provider
+    return None
@@ -0,0 +1,257 @@
+"""
+프로바이더 호출 속도 제한 (API 키 + 모델별 토큰 버킷, RPM/TPM)
+- 호출 전에 요청 1개와 예상 토큰(estimate_tokens.estimate_request_tokens: 입력 + max_tokens)을 미리 차감
+- 버킷이 모자라면 거절하지 않고 채워질 때까지 기다렸다가 호출 (먼저 온 호출이 먼저 나감)
+- 응답의 실제 usage로 차감량을 정산하고, 실패한 호출의 토큰은 돌려줌
+- 한도는 RATE_LIMITS/RATE_LIMIT_DEFAULT_* 설정으로 시작하고, 프로바이더 응답의 rate limit 헤더를 받으면 그 값으로 갱신
+API 키는 해시로만 구분하며 저장하지 않습니다.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from estimate_tokens import estimate_request_tokens
+from metrics import METRICS_ENABLED, PROVIDER_RATE_LIMIT_WAIT, provider_of
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') not in ('0', 'false', 'False')
+# 헤더로 한도를 알기 전까지 쓸 기본 한도 (분당, 0이면 제한 없음)
+RATE_LIMIT_DEFAULT_RPM = int(os.environ.get('RATE_LIMIT_DEFAULT_RPM', '0'))
+RATE_LIMIT_DEFAULT_TPM = int(os.environ.get('RATE_LIMIT_DEFAULT_TPM', '0'))
+# 모델별 한도 ("gpt-4o=500/30000,claude-3-5-haiku-20241022=50/50000", RPM/TPM)
+RATE_LIMITS = os.environ.get('RATE_LIMITS', '')
+# 한도의 이 비율까지만 사용 (다른 클라이언트와 추정 오차 여유)
+RATE_LIMIT_HEADROOM = float(os.environ.get('RATE_LIMIT_HEADROOM', '0.9'))
+# 버킷을 유지할 (API 키, 모델) 조합 수 (넘으면 1분 이상 쓰지 않은 버킷부터 제거)
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', '1000'))
+
+# 프로바이더별 (한도, 남은 양) 응답 헤더 이름
+LIMIT_HEADERS = {
+    'openai': {
+        'requests': ('x-ratelimit-limit-requests', 'x-ratelimit-remaining-requests'),
+        'tokens': ('x-ratelimit-limit-tokens', 'x-ratelimit-remaining-tokens'),
+    },
+    'anthropic': {
+        'requests': ('anthropic-ratelimit-requests-limit', 'anthropic-ratelimit-requests-remaining'),
+        'tokens': ('anthropic-ratelimit-tokens-limit', 'anthropic-ratelimit-tokens-remaining'),
+    },
+}
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """'gpt-4o=500/30000,...' 형식의 설정을 {model: (rpm, tpm)}으로 변환"""
+    limits = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        model, values = item.split('=', 1)
+        rpm, _, tpm = values.partition('/')
+        try:
+            limits[model.strip()] = (int(rpm or 0), int(tpm or 0))
+        except ValueError:
+            continue
+    return limits
+
+
+class TokenBucket:
+    """
+    분당 한도를 초당 일정하게 채우는 버킷 (잠금은 호출한 쪽에서 관리)
+    잔량이 음수가 될 수 있고, 음수만큼을 채우는 데 걸리는 시간이 그 호출의 대기 시간이 됨
+    """
+
+    __slots__ = ('capacity', 'level', 'updated')
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute * RATE_LIMIT_HEADROOM
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """amount를 차감하고 기다려야 할 시간(초) 반환"""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        # 한도보다 큰 요청은 한도만큼만 차감 (영원히 기다리지 않도록)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level * 60 / self.capacity)
+
+    def give(self, amount: float, now: float) -> None:
+        """amount를 돌려줌 (음수면 더 차감)"""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def set_limit(self, per_minute: int, remaining: Optional[int], now: float) -> None:
+        """프로바이더가 알려준 한도로 갱신하고, 남은 양이 더 적으면 잔량을 낮춤"""
+        self._refill(now)
+        capacity = per_minute * RATE_LIMIT_HEADROOM
+        if capacity != self.capacity:
+            if self.unlimited:
+                # 처음 알게 된 한도는 가득 찬 상태에서 시작 (남은 양은 아래에서 반영)
+                self.level = capacity
+            self.capacity = capacity
+            self.level = min(self.level, capacity)
+        if remaining is not None:
+            self.level = min(self.level, remaining * RATE_LIMIT_HEADROOM)
+
+
+class _KeyModelLimits:
+    """API 키 + 모델 하나의 요청/토큰 버킷"""
+
+    __slots__ = ('requests', 'tokens', 'lock', 'last_used')
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class Reservation:
+    """호출 하나가 미리 차감한 양 (응답 객체의 rate_limit_reservation 속성으로 전달)"""
+
+    __slots__ = ('limits', 'provider', 'tokens', 'wait', 'settled')
+
+    def __init__(self, limits: _KeyModelLimits, provider: str, tokens: int, wait: float):
+        self.limits = limits
+        self.provider = provider
+        self.tokens = tokens
+        self.wait = wait
+        self.settled = False
+
+
+def _api_key_of(headers: Optional[Mapping[str, str]]) -> str:
+    if not headers:
+        return ''
+    key = headers.get('x-api-key') or headers.get('Authorization') or ''
+    return key.removeprefix('Bearer ').strip()
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """(API 키, 모델)별 RPM/TPM 토큰 버킷 관리자 (스레드 안전, 동기/비동기 호출 공통)"""
+
+    def __init__(self, default_rpm: int = RATE_LIMIT_DEFAULT_RPM, default_tpm: int = RATE_LIMIT_DEFAULT_TPM,
+                 model_limits: Optional[Dict[str, Tuple[int, int]]] = None, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.model_limits = model_limits or {}
+        self.max_buckets = max_buckets
+        self._limits: Dict[Tuple[str, str], _KeyModelLimits] = {}
+        self._lock = threading.Lock()
+
+    def _limits_for(self, api_key: str, model: str) -> _KeyModelLimits:
+        key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16], model)
+        limits = self._limits.get(key)
+        if limits is None:
+            with self._lock:
+                limits = self._limits.get(key)
+                if limits is None:
+                    if len(self._limits) >= self.max_buckets:
+                        self._evict_idle()
+                    rpm, tpm = self.model_limits.get(model, (self.default_rpm, self.default_tpm))
+                    limits = _KeyModelLimits(rpm, tpm)
+                    self._limits[key] = limits
+        return limits
+
+    def _evict_idle(self) -> None:
+        """1분 이상 쓰지 않은 버킷 제거 (이미 가득 찼으므로 지워도 같은 상태, 락을 잡은 상태에서 호출)"""
+        cutoff = time.monotonic() - 60
+        for key in [key for key, limits in self._limits.items() if limits.last_used < cutoff]:
+            del self._limits[key]
+
+    def reserve(self, url: str, headers: Optional[Mapping[str, str]], payload: Any) -> Optional[Reservation]:
+        """
+        호출 전에 요청 1개와 예상 토큰을 차감 (model이 있는 JSON 본문 호출만 대상)
+
+        Returns:
+            Reservation (wait초만큼 기다린 뒤 호출) 또는 제한 대상이 아니면 None
+        """
+        if not RATE_LIMIT_ENABLED or not isinstance(payload, dict) or not payload.get('model'):
+            return None
+        api_key = _api_key_of(headers)
+        if not api_key:
+            return None
+        provider = provider_of(url)
+        try:
+            tokens = estimate_request_tokens(payload, 'anthropic' if provider == 'anthropic' else 'openai')
+        except Exception:
+            # 토크나이저를 쓸 수 없으면 본문 길이로 대략 추정
+            tokens = len(str(payload.get('messages', ''))) // 2 + int(payload.get('max_tokens') or 0)
+        limits = self._limits_for(api_key, payload['model'])
+        now = time.monotonic()
+        with limits.lock:
+            limits.last_used = now
+            wait = max(limits.requests.take(1, now), limits.tokens.take(tokens, now))
+        if METRICS_ENABLED:
+            PROVIDER_RATE_LIMIT_WAIT.labels(provider).observe(wait)
+        return Reservation(limits, provider, tokens, wait)
+
+    def observe(self, reservation: Optional[Reservation], response) -> None:
+        """응답 헤더로 한도를 갱신하고, 실패한 호출이면 미리 차감한 토큰을 돌려줌"""
+        if reservation is None:
+            return
+        header_names = LIMIT_HEADERS.get(reservation.provider)
+        limits = reservation.limits
+        now = time.monotonic()
+        with limits.lock:
+            if header_names is not None:
+                for bucket, (limit_name, remaining_name) in (
+                    (limits.requests, header_names['requests']),
+                    (limits.tokens, header_names['tokens']),
+                ):
+                    limit = _header_int(response.headers, limit_name)
+                    if limit:
+                        bucket.set_limit(limit, _header_int(response.headers, remaining_name), now)
+            if response.status_code != 200:
+                limits.tokens.give(reservation.tokens, now)
+                reservation.settled = True
+
+    def cancel(self, reservation: Optional[Reservation]) -> None:
+        """응답을 받지 못한 호출의 토큰을 돌려줌"""
+        if reservation is None or reservation.settled:
+            return
+        with reservation.limits.lock:
+            reservation.limits.tokens.give(reservation.tokens, time.monotonic())
+        reservation.settled = True
+
+    def reconcile(self, response, usage: Dict[str, Any]) -> None:
+        """
+        실제 usage(openai_token_usage/anthropic_token_usage 형식)로 미리 차감한 토큰을 정산
+        응답 파서가 토큰 사용량을 기록할 때 호출
+        """
+        reservation: Optional[Reservation] = getattr(response, 'rate_limit_reservation', None)
+        if reservation is None or reservation.settled:
+            return
+        actual = usage.get('total_tokens')
+        if actual is None:
+            return
+        with reservation.limits.lock:
+            reservation.limits.tokens.give(reservation.tokens - actual, time.monotonic())
+        reservation.settled = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._limits.clear()
+
+
+rate_limiter = RateLimiter(model_limits=_parse_rate_limits(RATE_LIMITS))
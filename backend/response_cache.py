@@ -0,0 +1,309 @@
+"""
+결정적인 프로바이더 호출을 위한 내용 주소 기반(content-addressed) 2단계 응답 캐시
+- 키: (프로바이더, 모델, 전체 요청 본문)의 SHA-256 해시 (API 키는 포함하지 않음)
+- 1단계: 프로세스 메모리 LRU
+- 2단계: SQLite 파일 (프로세스 재시작 후에도 유지, 여러 워커가 공유)
+프로바이더 이벤트 루프의 코루틴은 lookup_async/set_async를 사용합니다. 메모리 단계만 루프에서 확인하고
+SQLite 조회/기록은 스레드 풀에서 실행하므로 디스크 I/O가 루프의 다른 호출을 막지 않습니다.
+같은 주제/페르소나로 프롬프트를 다시 만들거나 같은 대화를 다시 평가할 때 LLM 호출을 생략합니다.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') not in ('0', 'false', 'False')
+# 캐시 항목 유효 시간 (초)
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', str(7 * 24 * 3600)))
+# 메모리 LRU 최대 항목 수
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MEMORY_ENTRIES', '1024'))
+# SQLite 파일 경로와 최대 크기 (바이트)
+# 상대 경로는 실행 위치와 관계없이 이 모듈이 있는 디렉터리 기준, 빈 값이면 디스크 캐시를 사용하지 않음
+RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', 'response_cache.sqlite3')
+if RESPONSE_CACHE_PATH:
+    RESPONSE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), RESPONSE_CACHE_PATH)
+RESPONSE_CACHE_DISK_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_DISK_MAX_BYTES', str(256 * 1024 * 1024)))
+# 만료 항목 정리와 SQLite 전체 크기 재계산 주기 (초, 다른 워커가 기록한 양은 이때 반영)
+RESPONSE_CACHE_PURGE_INTERVAL = float(os.environ.get('RESPONSE_CACHE_PURGE_INTERVAL', '60'))
+
+# 최대 크기를 넘으면 이 비율까지 줄임 (기록할 때마다 다시 정리하지 않도록)
+_DISK_EVICT_TARGET = 0.9
+# 정리 한 번에 지우는 최대 항목 수
+_DISK_DELETE_BATCH = 500
+
+
+class ResponseCache:
+    """
+    메모리 LRU + SQLite 2단계 캐시 (스레드 안전)
+    값은 JSON으로 직렬화해서 저장하므로 호출자가 반환값을 수정해도 캐시에는 영향이 없습니다.
+    메모리 단계와 SQLite는 락을 따로 쓰므로 디스크 I/O 중에도 메모리 단계 조회는 기다리지 않습니다.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESPONSE_CACHE_TTL,
+        memory_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES,
+        path: Optional[str] = RESPONSE_CACHE_PATH,
+        disk_max_bytes: int = RESPONSE_CACHE_DISK_MAX_BYTES,
+        enabled: bool = RESPONSE_CACHE_ENABLED
+    ):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.path = path
+        self.disk_max_bytes = disk_max_bytes
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # _lock: 메모리 LRU와 카운터, _db_lock: SQLite 연결
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        # SQLite 항목 크기 합계 (기록/삭제할 때마다 갱신하고 정리 주기마다 다시 계산)
+        self._disk_bytes = 0
+        self._next_purge = 0.0
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'writes': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'expired': 0,
+        }
+
+    @staticmethod
+    def make_key(provider: str, model: Optional[str], payload: Dict) -> str:
+        """(프로바이더, 모델, 요청 본문)의 정규화된 JSON으로 SHA-256 키 생성"""
+        canonical = json.dumps(
+            {'provider': provider, 'model': model, 'payload': payload},
+            sort_keys=True, ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """SQLite 연결 반환 (처음 호출 시 생성, _db_lock을 잡은 상태에서 호출)"""
+        if not self.path:
+            return None
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+            db.execute('CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)')
+            db.commit()
+            self._db = db
+            self._disk_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            self._next_purge = time.monotonic() + RESPONSE_CACHE_PURGE_INTERVAL
+        return self._db
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        """메모리 LRU에 저장하고 초과분을 제거 (_lock을 잡은 상태에서 호출)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters['memory_evictions'] += 1
+
+    def _memory_get(self, key: str, now: float) -> Tuple[bool, Optional[Any], bool]:
+        """메모리 단계 조회: (적중 여부, 값, 만료된 항목이었는지) - 만료된 항목은 지움"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None, False
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return True, json.loads(value), False
+            del self._memory[key]
+            return False, None, True
+
+    def _disk_get(self, key: str, now: float, expired: bool = False) -> Optional[Any]:
+        """SQLite 단계 조회 (적중하면 메모리 단계에도 저장, 실패는 misses로 셈)"""
+        row = None
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                row = db.execute('SELECT value, expires_at, size FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    db.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                    db.commit()
+                elif row is not None:
+                    db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    db.commit()
+                    self._disk_bytes -= row[2]
+                    row, expired = None, True
+        with self._lock:
+            if row is None:
+                if expired:
+                    self._counters['expired'] += 1
+                self._counters['misses'] += 1
+                return None
+            value, expires_at, _ = row
+            self._remember(key, expires_at, value)
+            self._counters['disk_hits'] += 1
+        return json.loads(value)
+
+    def _disk_set(self, key: str, serialized: str, expires_at: float, now: float) -> None:
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                size = len(serialized.encode('utf-8'))
+                replaced = db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+                db.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)',
+                    (key, serialized, size, expires_at, now)
+                )
+                self._disk_bytes += size - (replaced[0] if replaced else 0)
+                self._evict_disk(db, now)
+                db.commit()
+
+    def _memory_set(self, key: str, value: Any) -> Tuple[str, float, float]:
+        """메모리 단계에 저장하고 SQLite에 기록할 (직렬화 값, 만료 시각, 현재 시각) 반환"""
+        serialized = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, serialized)
+            self._counters['writes'] += 1
+        return serialized, expires_at, now
+
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값 반환 (없거나 만료되었으면 None)"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        hit, value, expired = self._memory_get(key, now)
+        if hit:
+            return value
+        return self._disk_get(key, now, expired)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get의 코루틴 버전 (SQLite 조회는 스레드 풀에서 실행)"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        hit, value, expired = self._memory_get(key, now)
+        if hit:
+            return value
+        if not self.path:
+            return self._disk_get(key, now, expired)
+        return await asyncio.to_thread(self._disk_get, key, now, expired)
+
+    def set(self, key: str, value: Any) -> None:
+        """값 저장 (JSON 직렬화 가능해야 함)"""
+        if not self.enabled:
+            return
+        self._disk_set(key, *self._memory_set(key, value))
+
+    async def set_async(self, key: str, value: Any) -> None:
+        """set의 코루틴 버전 (메모리 단계는 바로 저장하고 SQLite 기록은 스레드 풀에서 실행)"""
+        if not self.enabled:
+            return
+        serialized, expires_at, now = self._memory_set(key, value)
+        if self.path:
+            await asyncio.to_thread(self._disk_set, key, serialized, expires_at, now)
+
+    def _evict_disk(self, db: sqlite3.Connection, now: float) -> None:
+        """
+        정리 주기마다 만료 항목을 지우고, 크기 합계가 최대 크기를 넘으면 가장 오래 사용하지 않은 항목부터
+        최대 크기의 _DISK_EVICT_TARGET 비율까지 제거 (_db_lock을 잡은 상태에서 호출)
+        expires_at/last_access 인덱스 순서로 _DISK_DELETE_BATCH개씩만 읽으므로 기록마다 전체 테이블을 훑지 않음
+        """
+        monotonic_now = time.monotonic()
+        if monotonic_now >= self._next_purge:
+            expired = self._delete_rows(db, db.execute(
+                'SELECT key, size FROM responses WHERE expires_at <= ? ORDER BY expires_at LIMIT ?',
+                (now, _DISK_DELETE_BATCH)
+            ).fetchall())
+            with self._lock:
+                self._counters['expired'] += expired
+            # 지울 항목이 더 남았으면 다음 기록에서 이어서 정리
+            if expired < _DISK_DELETE_BATCH:
+                self._next_purge = monotonic_now + RESPONSE_CACHE_PURGE_INTERVAL
+                # 같은 파일을 쓰는 다른 워커의 기록까지 반영
+                self._disk_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+        if self._disk_bytes <= self.disk_max_bytes:
+            return
+        target = int(self.disk_max_bytes * _DISK_EVICT_TARGET)
+        while self._disk_bytes > target:
+            rows = db.execute('SELECT key, size FROM responses ORDER BY last_access LIMIT ?', (_DISK_DELETE_BATCH,)).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            victims = []
+            remaining = self._disk_bytes
+            for key, size in rows:
+                if remaining <= target:
+                    break
+                victims.append((key, size))
+                remaining -= size
+            evicted = self._delete_rows(db, victims)
+            with self._lock:
+                self._counters['disk_evictions'] += evicted
+
+    def _delete_rows(self, db: sqlite3.Connection, rows) -> int:
+        """(key, size) 목록을 지우고 크기 합계에서 뺌 (지운 항목 수 반환)"""
+        if rows:
+            db.executemany('DELETE FROM responses WHERE key = ?', [(key,) for key, _ in rows])
+            self._disk_bytes -= sum(size for _, size in rows)
+        return len(rows)
+
+    def lookup(self, provider: str, payload: Dict, use_cache: bool = True) -> Tuple[str, Optional[Any]]:
+        """
+        요청 본문에 해당하는 (키, 캐시된 값) 반환
+        use_cache가 False이면(요청별 우회) 조회하지 않고 값은 None
+        """
+        key = self._lookup_key(provider, payload, use_cache)
+        return key, self.get(key) if use_cache else None
+
+    async def lookup_async(self, provider: str, payload: Dict, use_cache: bool = True) -> Tuple[str, Optional[Any]]:
+        """lookup의 코루틴 버전 (프로바이더 이벤트 루프에서 사용)"""
+        key = self._lookup_key(provider, payload, use_cache)
+        return key, await self.get_async(key) if use_cache else None
+
+    def _lookup_key(self, provider: str, payload: Dict, use_cache: bool) -> str:
+        if not use_cache:
+            with self._lock:
+                self._counters['bypassed'] += 1
+        return self.make_key(provider, payload.get('model'), payload)
+
+    def stats(self) -> Dict[str, Any]:
+        """적중/실패 카운터와 각 단계의 크기"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['enabled'] = self.enabled
+            stats['memory_entries'] = len(self._memory)
+        with self._db_lock:
+            db = self._connection() if self.enabled else None
+            if db is not None:
+                count, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+                stats['disk_entries'] = count
+                stats['disk_bytes'] = size
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """두 단계 모두 비움"""
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                db.execute('DELETE FROM responses')
+                db.commit()
+                self._disk_bytes = 0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,134 @@
+"""
+프로바이더 호출 재시도 정책 (지수 백오프 + 지터, Retry-After 준수)
+- 429/500/502/503/529 응답과 연결 실패만 재시도 (읽기 시간 초과는 요청이 처리 중일 수 있으므로 재시도하지 않음)
+- 프로바이더가 Retry-After(또는 retry-after-ms)를 보내면 그 시간만큼 기다림
+- 첫 시도부터의 전체 시간이 deadline을 넘게 되면 더 기다리지 않고 마지막 응답을 그대로 반환
+- 요청마다 재시도 횟수를 컨텍스트 변수에 모아 응답(X-Provider-Retries 헤더 등)으로 알려줌
+"""
+import contextvars
+import os
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+# 첫 시도 이후 최대 재시도 횟수 (0이면 재시도하지 않음)
+PROVIDER_RETRY_MAX_RETRIES = int(os.environ.get('PROVIDER_RETRY_MAX_RETRIES', '3'))
+# 백오프 기본 대기 시간과 최대 대기 시간 (초)
+PROVIDER_RETRY_BASE_DELAY = float(os.environ.get('PROVIDER_RETRY_BASE_DELAY', '0.5'))
+PROVIDER_RETRY_MAX_DELAY = float(os.environ.get('PROVIDER_RETRY_MAX_DELAY', '8'))
+# 첫 시도부터 재시도까지 포함한 전체 시간 한도 (초)
+PROVIDER_RETRY_DEADLINE = float(os.environ.get('PROVIDER_RETRY_DEADLINE', '45'))
+
+# 일시적인 오류로 보고 재시도하는 상태 코드 (529: Anthropic 과부하)
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 529})
+# 요청을 처리하지 않았음이 확실한 거절 응답 (멱등하지 않은 호출도 재시도해도 안전)
+REJECTED_STATUSES = frozenset({429, 529})
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """retry-after-ms(OpenAI) 또는 Retry-After(초 또는 HTTP 날짜) 헤더를 초 단위로 변환"""
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """재시도 정책 (http_client의 동기/비동기 호출이 함께 사용)"""
+    max_retries: int = PROVIDER_RETRY_MAX_RETRIES
+    base_delay: float = PROVIDER_RETRY_BASE_DELAY
+    max_delay: float = PROVIDER_RETRY_MAX_DELAY
+    deadline: float = PROVIDER_RETRY_DEADLINE
+    retry_statuses: frozenset = RETRYABLE_STATUSES
+
+    def backoff(self, retry: int) -> float:
+        """retry번째 재시도 전 대기 시간 (full jitter: 0 ~ min(max_delay, base_delay * 2^retry))"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def next_delay(self, retry: int, started: float, status: Optional[int] = None,
+                   headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """
+        retry번째(0부터) 재시도 전에 기다릴 시간 (초), 재시도하지 않아야 하면 None
+
+        Args:
+            retry: 지금까지 한 재시도 횟수
+            started: 첫 시도 시작 시각 (time.monotonic())
+            status: 응답 상태 코드 (연결 실패면 None)
+            headers: 응답 헤더 (Retry-After 확인용)
+        """
+        if retry >= self.max_retries:
+            return None
+        if status is not None and status not in self.retry_statuses:
+            return None
+        retry_after = parse_retry_after(headers) if headers is not None else None
+        if retry_after is not None:
+            # 같은 시각에 몰려 다시 보내지 않도록 최대 10%를 더함
+            delay = retry_after * (1 + random.uniform(0, 0.1))
+        else:
+            delay = self.backoff(retry)
+        if time.monotonic() - started + delay >= self.deadline:
+            return None
+        return delay
+
+    def remaining(self, started: float) -> float:
+        """deadline까지 남은 시간 (초)"""
+        return max(0.0, self.deadline - (time.monotonic() - started))
+
+
+# 기본 정책과, 배치 생성처럼 멱등하지 않은 호출에 쓰는 거절 응답 전용 정책
+DEFAULT_RETRY_POLICY = RetryPolicy()
+REJECTED_ONLY_RETRY_POLICY = RetryPolicy(retry_statuses=REJECTED_STATUSES)
+
+
+class RetryStats:
+    """요청 하나에서 발생한 프로바이더 재시도 횟수"""
+
+    __slots__ = ('retries',)
+
+    def __init__(self):
+        self.retries = 0
+
+
+_current_stats: contextvars.ContextVar[Optional[RetryStats]] = contextvars.ContextVar('retry_stats', default=None)
+
+
+def start_request_retries() -> RetryStats:
+    """요청 시작 시 재시도 집계를 새로 만듦 (app.before_request에서 호출)"""
+    stats = RetryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def record_retry() -> None:
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.retries += 1
+
+
+def request_retries() -> int:
+    """현재 요청에서 지금까지 발생한 재시도 횟수"""
+    stats = _current_stats.get()
+    return stats.retries if stats is not None else 0
+
+
+def clamp_timeout(timeout, remaining: float):
+    """재시도 호출의 timeout을 deadline까지 남은 시간으로 줄임 (숫자 timeout만 조정, 최소 1초)"""
+    if isinstance(timeout, (int, float)) and remaining < timeout:
+        return max(remaining, 1.0)
+    return timeout
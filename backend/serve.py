@@ -0,0 +1,128 @@
+"""
+운영용 서버 실행기 (gunicorn, 멀티 프로세스)
+- 마스터에서 앱을 한 번 불러온 뒤(preload) 워커 프로세스를 fork
+- 워커마다 여러 스레드(gthread)로 요청을 처리 (요청 시간 대부분이 프로바이더 응답 대기이므로 스레드를 넉넉히 둠)
+- 워커는 SERVE_MAX_REQUESTS개(± 지터) 요청을 처리하면 새 워커로 교체 (메모리 상한)
+- 종료 신호(SIGTERM)를 받으면 새 연결을 받지 않고, 처리 중인 요청과 실행 중인 시뮬레이션 세트가
+  끝날 때까지 SERVE_GRACEFUL_TIMEOUT초 기다린 뒤 종료
+gunicorn은 Windows를 지원하지 않으므로 Windows에서는 WSL이나 Docker에서 실행하세요.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# app.py와 같은 .env를 먼저 읽어 SERVE_* 설정과 아래 기본값에 반영
+load_dotenv()
+
+# 요청을 받을 주소
+SERVE_BIND = os.environ.get('SERVE_BIND', '0.0.0.0:5000')
+# 워커 프로세스 수 (0이면 CPU 코어 수, 최소 2: 워커 하나를 교체하는 동안에도 요청을 받도록)
+SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', '0'))
+# 워커당 요청 처리 스레드 수 (동시에 기다릴 수 있는 프로바이더 호출 수,
+# keep-alive 연결이 다음 요청을 기다리는 동안에도 스레드를 점유하므로 예상 동시 연결 수보다 넉넉히)
+SERVE_THREADS = int(os.environ.get('SERVE_THREADS', '64'))
+# 워커 교체 주기 (처리한 요청 수, 0이면 교체하지 않음)와 워커마다 더하는 임의 지터 (동시에 교체되지 않도록)
+SERVE_MAX_REQUESTS = int(os.environ.get('SERVE_MAX_REQUESTS', '5000'))
+SERVE_MAX_REQUESTS_JITTER = int(os.environ.get('SERVE_MAX_REQUESTS_JITTER', '500'))
+# 종료/교체 시 처리 중인 요청을 기다리는 최대 시간 (초, 프로바이더 재시도 기한보다 길게)
+SERVE_GRACEFUL_TIMEOUT = int(os.environ.get('SERVE_GRACEFUL_TIMEOUT', '60'))
+# 워커가 이 시간(초) 동안 응답이 없으면 마스터가 재시작
+SERVE_TIMEOUT = int(os.environ.get('SERVE_TIMEOUT', '120'))
+# keep-alive 연결 유지 시간 (초)
+SERVE_KEEPALIVE = int(os.environ.get('SERVE_KEEPALIVE', '5'))
+
+
+def default_workers() -> int:
+    return max(2, multiprocessing.cpu_count())
+
+
+def post_fork(server, worker) -> None:
+    """fork 직후 워커 프로세스에서 부모의 백그라운드 스레드에 의존하는 상태를 다시 설정"""
+    from structured_logging import reset_after_fork
+    reset_after_fork()
+
+
+def worker_exit(server, worker) -> None:
+    """워커 종료 전에 실행 중인 시뮬레이션 세트를 기다리고 연결과 로그를 정리"""
+    from http_client import connection_pool
+    from simulation_runner import simulation_manager
+    from structured_logging import get_logger, shutdown_logging
+
+    finished = simulation_manager.shutdown(timeout=server.cfg.graceful_timeout)
+    if not finished:
+        get_logger('serve').warning(
+            "[서버 종료] 제한 시간 안에 끝나지 않은 시뮬레이션 작업이 있습니다",
+            extra={'pid': worker.pid, 'graceful_timeout': server.cfg.graceful_timeout}
+        )
+    connection_pool.close()
+    shutdown_logging()
+
+
+def build_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """명령행 인자를 gunicorn 설정으로 변환"""
+    return {
+        'bind': args.bind,
+        'workers': args.workers or default_workers(),
+        'worker_class': 'gthread',
+        'threads': args.threads,
+        'preload_app': True,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'graceful_timeout': args.graceful_timeout,
+        'timeout': args.timeout,
+        'keepalive': SERVE_KEEPALIVE,
+        # 접근 로그는 앱이 요청 ID와 함께 남기므로 gunicorn 접근 로그는 끔
+        'accesslog': None,
+        'errorlog': '-',
+        'loglevel': os.environ.get('LOG_LEVEL', 'INFO').lower(),
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Chatbot Simulator 백엔드 운영 서버 (gunicorn)')
+    parser.add_argument('--bind', default=SERVE_BIND)
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS, help='워커 프로세스 수 (0이면 CPU 코어 수, 최소 2)')
+    parser.add_argument('--threads', type=int, default=SERVE_THREADS, help='워커당 요청 처리 스레드 수')
+    parser.add_argument('--max-requests', type=int, default=SERVE_MAX_REQUESTS, help='워커 교체 주기 (요청 수, 0이면 교체 안 함)')
+    parser.add_argument('--max-requests-jitter', type=int, default=SERVE_MAX_REQUESTS_JITTER)
+    parser.add_argument('--graceful-timeout', type=int, default=SERVE_GRACEFUL_TIMEOUT)
+    parser.add_argument('--timeout', type=int, default=SERVE_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit('gunicorn을 불러올 수 없습니다. Linux/macOS에서 의존성을 설치하거나 Windows에서는 WSL/Docker를 사용하세요.')
+
+    options = build_options(args)
+    if options['workers'] > 1:
+        # 여러 프로세스가 같은 로그 파일을 각자 순환하면 기록이 섞이거나 사라지므로 외부 순환 방식을 기본값으로
+        os.environ.setdefault('LOG_ROTATION', 'watched')
+        if os.environ.get('CONVERSATION_SESSION_PATH') == '':
+            from structured_logging import get_logger
+            get_logger('serve').warning(
+                "[서버 시작] CONVERSATION_SESSION_PATH가 비어 있어 대화 세션이 워커마다 따로 보관됩니다. "
+                "다른 워커로 간 턴 요청은 404를 반환하므로 세션 API를 쓰려면 경로를 지정하거나 --workers 1로 실행하세요",
+                extra={'workers': options['workers']}
+            )
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    ProductionServer().run()
+
+
+if __name__ == '__main__':
+    main()
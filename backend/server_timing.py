@@ -0,0 +1,124 @@
+"""
+요청 단계별 처리 시간 기록 (Server-Timing 헤더)
+- 요청마다 ServerTiming 객체를 컨텍스트 변수에 두고, 각 모듈은 timing_phase()로 단계 시간을 더함
+- 프로바이더 루프의 작업에도 컨텍스트가 복사되므로 업스트림 호출 시간도 같은 요청에 기록됨
+- 같은 단계가 여러 번 실행되면(평가 배치 등) 시간을 합산
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', '1') not in ('0', 'false', 'False')
+
+# 단계 이름 (헤더에는 이 순서대로 기록하고, 목록에 없는 단계는 뒤에 붙임)
+PHASE_ORDER = (
+    'validation',        # 요청 본문 파싱과 입력 검증
+    'prompt',            # 프롬프트/요청 본문 조립
+    'rate_limit_wait',   # RPM/TPM 속도 제한기 대기
+    'upstream_connect',  # 프로바이더 TCP/TLS 연결 (새 연결일 때만)
+    'upstream_ttfb',     # 프로바이더 요청 시작부터 응답 헤더 수신까지
+    'upstream',          # 프로바이더 호출 전체 (재시도한 호출은 모든 시도의 합)
+    'retry_wait',        # 재시도 전 백오프/Retry-After 대기
+    'parse',             # 프로바이더 응답 JSON 디코딩
+    'postprocess',       # clean_response_text / ensure_complete_sentence 등 후처리
+    'estimate',          # 토큰 예측 계산 (/api/estimate-tokens)
+)
+
+
+class ServerTiming:
+    """요청 하나의 단계별 누적 시간 (초)"""
+
+    __slots__ = ('started', 'phases', '_last_mark')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self._last_mark = self.started
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        """직전 mark(없으면 요청 시작) 이후 시간을 name 단계로 기록"""
+        now = time.perf_counter()
+        self.add(name, now - self._last_mark)
+        self._last_mark = now
+
+    def as_dict(self) -> Dict[str, float]:
+        """단계별 시간 (밀리초, total 포함)"""
+        ordered = [name for name in PHASE_ORDER if name in self.phases]
+        ordered += [name for name in self.phases if name not in PHASE_ORDER]
+        result = {name: round(self.phases[name] * 1000, 2) for name in ordered}
+        result['total'] = round((time.perf_counter() - self.started) * 1000, 2)
+        return result
+
+    def header_value(self) -> str:
+        return ', '.join(f'{name};dur={duration}' for name, duration in self.as_dict().items())
+
+
+_current_timing: contextvars.ContextVar[Optional[ServerTiming]] = contextvars.ContextVar('server_timing', default=None)
+
+
+def start_request_timing() -> Optional[ServerTiming]:
+    """현재 컨텍스트(요청)의 시간 기록 시작 (비활성화 상태면 None)"""
+    timing = ServerTiming() if SERVER_TIMING_ENABLED else None
+    _current_timing.set(timing)
+    return timing
+
+
+def current_timing() -> Optional[ServerTiming]:
+    return _current_timing.get()
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+def mark_phase(name: str) -> None:
+    """라우트에서 단계가 끝난 지점에 호출 (예: 입력 검증이 끝나면 mark_phase('validation'))"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.mark(name)
+
+
+@contextmanager
+def timing_phase(name: str) -> Iterator[None]:
+    """with 블록의 실행 시간을 현재 요청의 name 단계에 더함 (요청 밖에서는 아무것도 하지 않음)"""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+class UpstreamTrace:
+    """
+    httpx trace 확장 콜백으로 연결 시간과 첫 응답 바이트(헤더)까지의 시간을 기록
+    연결을 재사용한 호출에는 connect 이벤트가 없으므로 upstream_connect가 더해지지 않음
+    """
+
+    __slots__ = ('timing', 'started', '_connect_started')
+
+    def __init__(self, timing: ServerTiming):
+        self.timing = timing
+        self.started = time.perf_counter()
+        self._connect_started: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: Dict) -> None:
+        now = time.perf_counter()
+        if event_name == 'connection.connect_tcp.started':
+            self._connect_started = now
+        elif event_name in ('connection.connect_tcp.complete', 'connection.start_tls.complete'):
+            if self._connect_started is not None:
+                self.timing.add('upstream_connect', now - self._connect_started)
+                self._connect_started = now
+        elif event_name.endswith('.receive_response_headers.complete'):
+            self.timing.add('upstream_ttfb', now - self.started)
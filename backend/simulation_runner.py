@@ -0,0 +1,212 @@
+"""
+서버 측 시뮬레이션 오케스트레이터
+모든 대화 세트를 제한된 크기의 워커 풀에서 동시에 실행하고,
+작업(job) ID로 세트별 결과를 조회할 수 있도록 보관합니다.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import LLMRequestConfig, SimulationConfig
+from generate_llm_response import generate_llm_response
+from structured_logging import get_logger, set_request_id
+
+logger = get_logger('simulation')
+
+# 동시에 실행할 최대 세트 수 (모든 작업이 하나의 풀을 공유)
+DEFAULT_MAX_WORKERS = int(os.environ.get('SIMULATION_MAX_WORKERS', '16'))
+# 메모리에 보관할 최대 작업 수 (초과 시 가장 오래된 완료 작업부터 삭제, 실행 중인 작업이 이만큼이면 새 작업을 거절)
+DEFAULT_MAX_JOBS = int(os.environ.get('SIMULATION_MAX_JOBS', '100'))
+# wait 요청이 작업 완료를 기다리는 최대 시간 (초, 넘으면 작업 ID만 반환해 요청 처리 스레드를 돌려줌)
+SIMULATION_WAIT_TIMEOUT = float(os.environ.get('SIMULATION_WAIT_TIMEOUT', '60'))
+
+
+class SimulationCapacityExceeded(Exception):
+    """실행 중인 작업 수가 보관 한도에 도달해 새 작업을 받을 수 없을 때"""
+
+
+class SimulationJob:
+    """시뮬레이션 작업 하나의 상태와 세트별 결과"""
+
+    def __init__(self, config: SimulationConfig):
+        self.job_id = uuid.uuid4().hex
+        self.config = config
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.sets: List[Dict] = [
+            {'set': i + 1, 'status': 'pending', 'messages': [], 'error': None}
+            for i in range(config.number_of_sets)
+        ]
+        self._remaining = config.number_of_sets
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def status(self) -> str:
+        if self._done.is_set():
+            if all(s['status'] == 'failed' for s in self.sets):
+                return 'failed'
+            return 'completed'
+        if any(s['status'] != 'pending' for s in self.sets):
+            return 'running'
+        return 'pending'
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """작업이 끝날 때까지 대기 (완료 여부 반환)"""
+        return self._done.wait(timeout)
+
+    def _finish_set(self):
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining == 0:
+                self.finished_at = time.time()
+                self._done.set()
+
+    def to_dict(self) -> Dict:
+        """API 응답용 딕셔너리 변환"""
+        with self._lock:
+            sets = [dict(s, messages=list(s['messages'])) for s in self.sets]
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'number_of_sets': self.config.number_of_sets,
+            'completed_sets': sum(1 for s in sets if s['status'] == 'completed'),
+            'failed_sets': sum(1 for s in sets if s['status'] == 'failed'),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'sets': sets,
+        }
+
+
+def run_conversation_set(config: SimulationConfig, set_result: Dict) -> None:
+    """
+    대화 세트 하나를 턴 순서대로 실행 (프론트엔드의 세트 진행 방식과 동일)
+
+    Args:
+        config: SimulationConfig 객체
+        set_result: 결과를 기록할 세트 딕셔너리 (messages/status/error 갱신)
+    """
+    set_result['status'] = 'running'
+    previous_messages: List[Dict] = []
+    total_messages = config.turns_per_bot * 2
+
+    for message_index in range(total_messages):
+        bot_number = (message_index % 2) + 1
+        settings = config.bot_settings(bot_number)
+
+        llm_config = LLMRequestConfig(
+            api_key=settings['api_key'],
+            model_type=settings['model_type'],
+            topic=config.topic,
+            persona=settings['persona'],
+            previous_messages=previous_messages,
+            bot_number=bot_number,
+            temperature=float(settings['temperature']),
+            top_p=float(settings['top_p']),
+            hedge=config.hedge,
+            tier=config.tier,
+            fallback_api_key=settings['fallback_api_key']
+        )
+        result = generate_llm_response(llm_config, config.custom_system_prompt, settings['other_persona'])
+
+        if not result.success:
+            # 실패한 턴 이후의 대화는 의미가 없으므로 해당 세트만 중단
+            set_result['status'] = 'failed'
+            set_result['error'] = result.error or '응답 생성에 실패했습니다.'
+            return
+
+        previous_messages = previous_messages + [{'bot': bot_number, 'text': result.text}]
+        set_result['messages'].append({
+            'bot': bot_number,
+            'text': result.text,
+            'tokens': {
+                'prompt_tokens': result.prompt_tokens,
+                'completion_tokens': result.completion_tokens,
+                'total_tokens': result.total_tokens,
+                'cached_tokens': result.cached_tokens,
+                'cache_creation_tokens': result.cache_creation_tokens
+            }
+        })
+
+    set_result['status'] = 'completed'
+
+
+class SimulationManager:
+    """
+    시뮬레이션 작업을 생성하고 공유 워커 풀에서 실행하는 관리자
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_jobs: int = DEFAULT_MAX_JOBS):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='simulation')
+        self._jobs: Dict[str, SimulationJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, config: SimulationConfig) -> SimulationJob:
+        """
+        작업을 생성하고 모든 세트를 워커 풀에 제출
+
+        Raises:
+            SimulationCapacityExceeded: 실행 중인 작업이 max_jobs개일 때 (완료된 작업만 삭제할 수 있으므로)
+        """
+        job = SimulationJob(config)
+        with self._lock:
+            self._evict_finished_jobs()
+            if len(self._jobs) >= self.max_jobs:
+                raise SimulationCapacityExceeded(f"실행 중인 시뮬레이션 작업이 최대 {self.max_jobs}개입니다. 잠시 후 다시 시도하세요.")
+            self._jobs[job.job_id] = job
+
+        for set_result in job.sets:
+            self._executor.submit(self._run_set, job, set_result)
+        return job
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run_set(self, job: SimulationJob, set_result: Dict) -> None:
+        # 워커 스레드의 로그는 작업 ID를 요청 ID로 사용
+        set_request_id(job.job_id)
+        try:
+            run_conversation_set(job.config, set_result)
+        except Exception as e:
+            logger.exception("시뮬레이션 세트 실행 중 오류", extra={'job_id': job.job_id, 'set': set_result['set']})
+            set_result['status'] = 'failed'
+            set_result['error'] = f'오류 발생: {str(e)}'
+        finally:
+            job._finish_set()
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        실행 중인 작업이 끝날 때까지 최대 timeout초 기다린 뒤 워커 풀 종료 (서버 종료 시 serve.py에서 호출)
+
+        Returns:
+            모든 작업이 끝났으면 True
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.finished_at is None]
+        finished = True
+        for job in running:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            finished = job.wait(remaining) and finished
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return finished
+
+    def _evict_finished_jobs(self) -> None:
+        """보관 한도를 넘으면 완료된 작업부터 오래된 순으로 삭제 (락을 잡은 상태에서 호출)"""
+        if len(self._jobs) < self.max_jobs:
+            return
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:len(self._jobs) - self.max_jobs + 1]:
+            del self._jobs[job.job_id]
+
+
+simulation_manager = SimulationManager()
@@ -0,0 +1,221 @@
+"""
+백엔드 공통 로깅 설정
+- 요청 스레드는 레코드를 큐에 넣기만 하고, 파일/콘솔 쓰기는 QueueListener 백그라운드 스레드가 담당
+- 로그 파일은 JSON Lines 형식 (한 줄에 레코드 하나), 크기 또는 시간 기준으로 순환
+- 레코드마다 현재 요청 ID(request_id)를 기록
+- LLM 원문 응답 같은 큰 페이로드는 표본 비율만큼만 기록
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# 로그 레벨과 파일 위치 (LOG_DIR이 빈 값이면 파일에 쓰지 않음, 상대 경로는 실행 위치와 관계없이 이 모듈이 있는 디렉터리 기준)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_DIR = os.environ.get('LOG_DIR', 'logs')
+if LOG_DIR:
+    LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), LOG_DIR)
+LOG_FILENAME = os.environ.get('LOG_FILENAME', 'backend.log')
+# 순환 방식: 'size' (LOG_MAX_BYTES마다), 'time' (LOG_ROTATE_WHEN 주기마다),
+# 'watched' (직접 순환하지 않고 logrotate 등이 파일을 바꾸면 다시 엶, 여러 프로세스가 같은 파일에 쓸 때)
+LOG_ROTATION = os.environ.get('LOG_ROTATION', 'size')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN', 'midnight')
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '5'))
+# 콘솔(stdout)에도 출력할지 여부
+LOG_TO_STDOUT = os.environ.get('LOG_TO_STDOUT', '1') not in ('0', 'false', 'False')
+# 대기 큐 최대 크기 (가득 차면 요청 스레드를 막지 않고 레코드를 버림)
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+# 원문 페이로드를 기록할 비율 (0.0~1.0)과 기록할 최대 글자 수
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+LOG_PAYLOAD_MAX_CHARS = int(os.environ.get('LOG_PAYLOAD_MAX_CHARS', '4000'))
+
+# 현재 요청 ID (Flask 요청, 시뮬레이션 작업, 프로바이더 루프의 작업으로 전달됨)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+
+# LogRecord 기본 속성 (이 외의 속성은 extra로 넘긴 구조화 필드로 간주)
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id: Optional[str]) -> contextvars.Token:
+    """현재 컨텍스트의 요청 ID 설정 (반환된 토큰으로 reset 가능)"""
+    return request_id_var.set(request_id)
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """레코드를 JSON 한 줄로 변환 (extra로 넘긴 필드는 최상위 키로 포함)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _RequestIdFilter(logging.Filter):
+    """레코드를 만든 스레드(요청 컨텍스트)에서 요청 ID를 붙임"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 기다리지 않고 레코드를 버리는 QueueHandler"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+_setup_lock = threading.Lock()
+
+
+def _build_file_handler() -> Optional[logging.Handler]:
+    if not LOG_DIR:
+        return None
+    os.makedirs(LOG_DIR, exist_ok=True)
+    path = os.path.join(LOG_DIR, LOG_FILENAME)
+    if LOG_ROTATION == 'watched':
+        handler = logging.handlers.WatchedFileHandler(path, encoding='utf-8')
+    elif LOG_ROTATION == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    handler.setFormatter(JsonLinesFormatter())
+    return handler
+
+
+def setup_logging() -> None:
+    """
+    루트 로거에 비동기 큐 핸들러를 한 번만 설치 (여러 번 호출해도 안전)
+    실제 파일/콘솔 핸들러는 QueueListener 스레드에서만 사용되므로 파일 디스크립터도 하나씩만 열립니다.
+    """
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        handlers = []
+        file_handler = _build_file_handler()
+        if file_handler is not None:
+            handlers.append(file_handler)
+        if LOG_TO_STDOUT:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s'))
+            handlers.append(stream_handler)
+
+        log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+        _queue_handler = _NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(_RequestIdFilter())
+
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """대기 중인 레코드를 모두 쓰고 리스너와 파일을 닫음"""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
+
+
+def reset_after_fork() -> None:
+    """
+    fork된 워커 프로세스에서 로깅을 다시 설정 (serve.py)
+    부모의 QueueListener 스레드는 자식 프로세스에 복사되지 않으므로 큐와 리스너를 새로 만듦
+    """
+    global _listener, _queue_handler, _setup_lock
+    _setup_lock = threading.Lock()
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    if _listener is not None:
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+    _queue_handler = None
+    setup_logging()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """공통 설정이 적용된 로거 반환"""
+    setup_logging()
+    return logging.getLogger(name)
+
+
+def dropped_records() -> int:
+    """큐가 가득 차서 버린 레코드 수"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def log_payload(
+    logger: logging.Logger,
+    message: str,
+    payload: Any,
+    force: bool = False,
+    level: int = logging.INFO,
+    **fields
+) -> None:
+    """
+    LLM 원문 응답 등 큰 페이로드를 표본 비율(LOG_PAYLOAD_SAMPLE_RATE)만큼만 기록
+    force=True(예: 파싱 실패)이면 항상 기록하며, 페이로드는 LOG_PAYLOAD_MAX_CHARS자까지만 남김
+    """
+    if not force and random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    truncated = len(text) > LOG_PAYLOAD_MAX_CHARS
+    logger.log(level, message, extra={
+        **fields,
+        'payload': text[:LOG_PAYLOAD_MAX_CHARS],
+        'payload_truncated': truncated,
+    })
@@ -0,0 +1,24 @@
+"""공통 테스트 준비: 로컬 대체 프로바이더 서버"""
+import os
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from mock_provider import MockSettings, create_app
+
+# 테스트가 작업 디렉터리에 응답 캐시/대화 세션/로그 파일을 남기지 않도록 (백엔드 모듈을 불러오기 전에 설정)
+os.environ.setdefault('RESPONSE_CACHE_PATH', '')
+os.environ.setdefault('LOG_DIR', '')
+os.environ.setdefault('CONVERSATION_SESSION_PATH', '')
+
+
+@pytest.fixture
+def mock_provider_url():
+    """mock_provider.py 앱을 임의 포트로 띄우고 기본 URL (http://127.0.0.1:PORT) 반환"""
+    server = make_server('127.0.0.1', 0, create_app(MockSettings(latency='fixed:0', batch_seconds=0.2)), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    thread.join()
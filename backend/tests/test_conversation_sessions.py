@@ -0,0 +1,68 @@
+"""대화 세션 저장소 (여러 워커 공유, 턴 잠금, 한도) 테스트"""
+import os
+import stat
+
+import pytest
+
+from config import SessionConfig
+from conversation_sessions import ConversationSessionStore, SessionConflict
+
+
+def _config() -> SessionConfig:
+    return SessionConfig(topic='주제', persona1='A', persona2='B', api_key1='sk-test')
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'sessions.sqlite3')
+
+
+def test_sessions_are_shared_between_workers(path):
+    # 같은 파일을 쓰는 저장소 두 개 = gunicorn 워커 두 개
+    worker1, worker2 = ConversationSessionStore(path=path), ConversationSessionStore(path=path)
+    created = worker1.create(_config(), [{'bot': 1, 'text': '안녕'}])
+
+    session = worker2.get(created.session_id)
+    history = worker2.begin_turn(session, [])
+    worker2.finish_turn(session, [{'bot': 2, 'text': '반가워'}])
+
+    assert history == [{'bot': 1, 'text': '안녕'}]
+    assert session.config.api_key1 == 'sk-test'
+    assert [m['text'] for m in worker1.get(created.session_id).messages] == ['안녕', '반가워']
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_turn_in_progress_on_another_worker_conflicts(path):
+    worker1, worker2 = ConversationSessionStore(path=path), ConversationSessionStore(path=path)
+    session_id = worker1.create(_config()).session_id
+    worker1.begin_turn(worker1.get(session_id), [])
+
+    with pytest.raises(SessionConflict):
+        worker2.begin_turn(worker2.get(session_id), [])
+
+
+def test_stale_turn_is_taken_over_and_old_owner_does_not_append(path):
+    worker1 = ConversationSessionStore(path=path, turn_timeout=0)
+    worker2 = ConversationSessionStore(path=path, turn_timeout=0)
+    session_id = worker1.create(_config()).session_id
+    stale = worker1.get(session_id)
+    worker1.begin_turn(stale, [])
+
+    session = worker2.get(session_id)
+    worker2.begin_turn(session, [])
+    worker1.finish_turn(stale, [{'bot': 1, 'text': '늦은 응답'}])
+    worker2.finish_turn(session, [{'bot': 1, 'text': '응답'}])
+
+    assert [m['text'] for m in worker1.get(session_id).messages] == ['응답']
+
+
+def test_capacity_evicts_least_recently_used(path):
+    store = ConversationSessionStore(path=path, max_sessions=2)
+    first = store.create(_config()).session_id
+    second = store.create(_config()).session_id
+    store.get(first)
+    third = store.create(_config()).session_id
+
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.stats()['capacity_evictions'] == 1
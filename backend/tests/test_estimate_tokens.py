@@ -0,0 +1,70 @@
+"""토큰 예측: 프로바이더별 히스토리 길이 (실제 요청 구성과 같게)"""
+import re
+
+import pytest
+
+import estimate_tokens
+from prompt_templates import OPENAI_HISTORY_MESSAGES, TEMPLATES
+
+
+class _WordEncoding:
+    """tiktoken 인코딩 파일 없이 쓰는 결정적인 인코딩 (단어/기호 하나를 토큰 하나로)"""
+
+    def encode(self, text):
+        return re.findall(r'\w+|[^\w\s]', text)
+
+
+@pytest.fixture(autouse=True)
+def word_encoding(monkeypatch):
+    monkeypatch.setattr(estimate_tokens, 'get_encoding_for_model', lambda model_type: _WordEncoding())
+    yield
+    # 템플릿 정적 토큰 수와 슬롯 토큰 수 캐시를 실제 인코딩용으로 되돌림
+    estimate_tokens._count_template_tokens.cache_clear()
+    for template in TEMPLATES.values():
+        template._static_tokens = None
+
+
+def message_prompt_tokens(model_type, previous_messages_count, **kwargs):
+    return estimate_tokens.estimate_message_tokens(
+        model_type, '요금제 변경', '상담사', previous_messages_count,
+        is_first_message=previous_messages_count == 0, other_persona='고객', **kwargs
+    )['prompt_tokens']
+
+
+def test_anthropic_history_grows_every_turn():
+    # 같은 챗봇의 턴마다 (자신 + 상대방) 발언 두 개만큼 늘어남
+    tokens = [message_prompt_tokens('anthropic', count) for count in range(2, 42, 2)]
+    increments = {later - earlier for earlier, later in zip(tokens, tokens[1:])}
+    assert len(increments) <= 2 and min(increments) > 0
+
+
+def test_openai_history_is_capped_at_request_history_length():
+    before_cap = message_prompt_tokens('openai', OPENAI_HISTORY_MESSAGES - 2)
+    at_cap = message_prompt_tokens('openai', OPENAI_HISTORY_MESSAGES)
+    assert before_cap < at_cap
+    assert at_cap == message_prompt_tokens('openai', OPENAI_HISTORY_MESSAGES + 2) == message_prompt_tokens('openai', 40)
+    # 명시한 상한은 그대로 사용
+    assert message_prompt_tokens('openai', 4, max_history_messages=4) == message_prompt_tokens('openai', 10, max_history_messages=4)
+
+
+@pytest.mark.parametrize('model_types', [('anthropic', 'anthropic'), ('openai', 'anthropic'), ('openai', 'openai')])
+def test_simulation_estimate_matches_per_message_sum(model_types):
+    model_type1, model_type2 = model_types
+    turns_per_bot, number_of_sets = 25, 3
+    estimate = estimate_tokens.estimate_simulation_tokens(
+        model_type1, model_type2, '요금제 변경', '상담사', '고객', turns_per_bot, number_of_sets, max_tokens1=120, max_tokens2=300
+    )
+
+    prompt_tokens = completion_tokens = 0
+    for msg_idx in range(turns_per_bot * 2):
+        bot = msg_idx % 2 + 1
+        tokens = estimate_tokens.estimate_message_tokens(
+            model_type1 if bot == 1 else model_type2, '요금제 변경', '상담사' if bot == 1 else '고객', msg_idx,
+            is_first_message=msg_idx == 0, estimated_response_length=120 if bot == 1 else 300,
+            bot_number=bot, other_bot_number=3 - bot, other_persona='고객' if bot == 1 else '상담사'
+        )
+        prompt_tokens += tokens['prompt_tokens']
+        completion_tokens += tokens['completion_tokens']
+
+    assert estimate['total_prompt_tokens'] == prompt_tokens * number_of_sets
+    assert estimate['total_completion_tokens'] == completion_tokens * number_of_sets
@@ -0,0 +1,62 @@
+"""프로바이더 Batch API 평가: 제출 -> 폴링 -> 항목 id 순서대로 결과 매핑"""
+import pytest
+
+import evaluate_conversation
+
+ITEMS = [
+    {
+        'id': f'dialogue-{n}',
+        'topic': '요금제 변경 상담',
+        'persona1': '통신사 상담사',
+        'persona2': '요금제를 바꾸려는 고객',
+        'dialogue_log': [
+            {'speaker': '고객', 'text': f'{n}번째 상담입니다. 데이터를 다 쓰면 어떻게 되나요?'},
+            {'speaker': '상담사', 'text': '속도 제한이 걸리며 추가 요금은 없습니다.'},
+        ],
+    }
+    for n in range(6)
+]
+
+
+@pytest.fixture
+def batch_provider(monkeypatch, mock_provider_url):
+    monkeypatch.setattr(evaluate_conversation, 'OPENAI_API_BASE', f'{mock_provider_url}/openai/v1')
+    monkeypatch.setattr(evaluate_conversation, 'ANTHROPIC_API_BASE', f'{mock_provider_url}/anthropic/v1')
+    monkeypatch.setattr(evaluate_conversation, 'OPENAI_CHAT_COMPLETIONS_URL', f'{mock_provider_url}/openai/v1/chat/completions')
+    monkeypatch.setattr(evaluate_conversation, 'ANTHROPIC_MESSAGES_URL', f'{mock_provider_url}/anthropic/v1/messages')
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'sk-ant-test')
+
+
+@pytest.mark.parametrize('provider', ['openai', 'anthropic'])
+def test_submit_poll_and_map_results_in_item_order(batch_provider, provider):
+    submitted = evaluate_conversation.submit_evaluation_batch(ITEMS, provider)
+    assert submitted['success'], submitted
+    assert submitted['done'] is False and submitted['item_count'] == len(ITEMS)
+
+    # 완료 전 조회는 결과 없이 상태만 반환
+    pending = evaluate_conversation.get_evaluation_batch(submitted['batch_id'])
+    assert pending['success'] and pending['done'] is False and 'results' not in pending
+
+    result = evaluate_conversation.run_evaluation_batch(ITEMS, provider, poll_interval=0.05, timeout=10)
+    assert result['success'] and result['done'], result
+    assert [r['index'] for r in result['results']] == list(range(len(ITEMS)))
+    assert [r['id'] for r in result['results']] == [item['id'] for item in ITEMS]
+
+    # 대체 서버는 같은 요청 본문에 같은 응답을 주므로, 항목별 결과는 같은 대화를 바로 평가한 결과와 같아야 함
+    for item, item_result in zip(ITEMS, result['results']):
+        direct = evaluate_conversation.evaluate_conversation_log(
+            item['topic'], item['persona1'], item['persona2'], item['dialogue_log'], provider=provider, use_cache=False
+        )
+        assert item_result['success'], item_result
+        assert {k: v for k, v in item_result.items() if k not in ('index', 'id', 'usage')} == \
+            {k: v for k, v in direct.items() if k != 'usage'}
+
+
+def test_unfinished_anthropic_results_are_not_served(batch_provider, mock_provider_url):
+    submitted = evaluate_conversation.submit_evaluation_batch(ITEMS[:1], 'anthropic')
+    response = evaluate_conversation.connection_pool.get(
+        f"{mock_provider_url}/anthropic/v1/messages/batches/{submitted['batch_id']}/results",
+        headers={'x-api-key': 'sk-ant-test'}, timeout=10
+    )
+    assert response.status_code == 404
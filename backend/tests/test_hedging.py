@@ -0,0 +1,72 @@
+"""헤지 요청의 지연 시간 표본 기록 테스트"""
+import asyncio
+
+import hedging
+from hedging import HedgePolicy, hedged_call
+
+KEY = ('openai', 'gpt-4o-mini')
+
+
+def _policy(samples: int, seconds: float, budget: float) -> HedgePolicy:
+    """표본 samples개(모두 seconds초)와 헤지 예산 budget을 미리 채운 정책 (헤지 대기 시간 하한 0)"""
+    policy = HedgePolicy(min_delay=0, budget_ratio=0, budget_max=10)
+    for _ in range(samples):
+        policy.record_latency(KEY, seconds)
+    policy._budget = budget
+    return policy
+
+
+def _samples(policy: HedgePolicy, key=KEY):
+    return list(policy._windows[key]._samples)
+
+
+def _calls(*delays):
+    """호출할 때마다 다음 지연 시간(초)만큼 기다린 뒤 True를 반환하는 make_call"""
+    remaining = list(delays)
+
+    async def call():
+        await asyncio.sleep(remaining.pop(0))
+        return True
+
+    return lambda: call()
+
+
+def test_budget_exhausted_primary_latency_is_recorded():
+    policy = _policy(hedging.HEDGE_MIN_SAMPLES, 0.01, budget=0)
+
+    result = asyncio.run(hedged_call(*KEY, _calls(0.1), bool, policy))
+
+    assert result is True
+    samples = _samples(policy)
+    assert len(samples) == hedging.HEDGE_MIN_SAMPLES + 1
+    assert samples[-1] >= 0.1
+
+
+def test_primary_that_loses_to_hedge_is_recorded_when_it_finishes():
+    policy = _policy(hedging.HEDGE_MIN_SAMPLES, 0.01, budget=1)
+
+    async def scenario():
+        result = await hedged_call(*KEY, _calls(0.3, 0.01), bool, policy)
+        recorded_on_return = len(_samples(policy))
+        # 헤지가 이긴 뒤에도 원래 호출은 끝까지 실행되어 자신의 지연 시간을 기록
+        await asyncio.sleep(0.4)
+        return result, recorded_on_return
+
+    result, recorded_on_return = asyncio.run(scenario())
+
+    assert result is True
+    assert recorded_on_return == hedging.HEDGE_MIN_SAMPLES
+    samples = _samples(policy)
+    assert len(samples) == hedging.HEDGE_MIN_SAMPLES + 1
+    assert samples[-1] >= 0.3
+    assert not hedging._background_primaries
+
+
+def test_latency_windows_are_separated_by_model():
+    policy = _policy(hedging.HEDGE_MIN_SAMPLES, 0.01, budget=0)
+
+    asyncio.run(hedged_call('openai', 'gpt-4o', _calls(0.01), bool, policy))
+
+    assert policy.delay_for(KEY) is not None
+    assert policy.delay_for(('openai', 'gpt-4o')) is None
+    assert len(_samples(policy, ('openai', 'gpt-4o'))) == 1
@@ -0,0 +1,68 @@
+"""http_client 호출 전 단계(속도 제한 대기, 서킷 허가) 정리 테스트"""
+import asyncio
+
+import pytest
+
+import http_client
+import rate_limiter as rate_limiter_module
+from circuit_breaker import HALF_OPEN, circuit_breakers
+from rate_limiter import RateLimiter
+
+URL = 'https://api.openai.com/v1/chat/completions'
+MODEL = 'gpt-4o-mini'
+HEADERS = {'Authorization': 'Bearer sk-test'}
+PAYLOAD = {'model': MODEL, 'messages': [{'role': 'user', 'content': 'hi'}]}
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """분당 1회 한도 제한기 (한도를 먼저 써 두면 이후 호출은 모두 속도 제한 대기)"""
+    limiter = RateLimiter(model_limits={MODEL: (1, 100000)})
+    monkeypatch.setattr(http_client, 'rate_limiter', limiter)
+    # 토크나이저 파일을 내려받지 않도록 토큰 추정을 고정
+    monkeypatch.setattr(rate_limiter_module, 'estimate_request_tokens', lambda payload, provider: 100)
+    return limiter
+
+
+@pytest.fixture
+def half_open_breaker():
+    circuit_breakers.clear()
+    breaker = circuit_breakers.breaker_for('openai', MODEL)
+    with breaker._lock:
+        breaker._set_state(HALF_OPEN, 'test')
+    yield breaker
+    circuit_breakers.clear()
+
+
+def test_cancel_during_rate_limit_wait_releases_probe_and_reservation(limiter, half_open_breaker):
+    limiter.reserve(URL, HEADERS, PAYLOAD)
+    reservations = []
+    reserve = limiter.reserve
+
+    def recording_reserve(*args):
+        reservation = reserve(*args)
+        reservations.append(reservation)
+        return reservation
+
+    limiter.reserve = recording_reserve
+
+    async def scenario():
+        async with http_client.InstrumentedAsyncClient() as client:
+            tasks = [
+                asyncio.create_task(client.request('POST', URL, headers=HEADERS, json=PAYLOAD, retry=None))
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0.05)
+            for task in tasks:
+                task.cancel()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert len(reservations) == 2
+    assert all(r.wait > 0 and r.settled for r in reservations)
+    # 대기 중에 취소된 호출은 시험 호출 자리를 잡지 않았으므로 다음 시험 호출을 바로 받을 수 있음
+    assert half_open_breaker.state == HALF_OPEN
+    assert half_open_breaker._probes_in_flight == 0
+    assert half_open_breaker.before_call() is True
@@ -0,0 +1,69 @@
+"""응답 생성 모델 라우팅 (후보 설정, 프로바이더 대체) 테스트"""
+import pytest
+
+import generate_llm_response
+from config import LLMRequestConfig
+from generate_llm_response import _build_anthropic_request, _routed_configs
+from model_router import ModelRoute
+
+OPENAI_KEY = 'sk-test'
+ANTHROPIC_KEY = 'sk-ant-test'
+
+
+def _config(**kwargs) -> LLMRequestConfig:
+    values = dict(api_key=OPENAI_KEY, model_type='openai', topic='주제', persona='A', previous_messages=[], bot_number=1,
+                  temperature=1.2, top_p=0.9)
+    values.update(kwargs)
+    return LLMRequestConfig(**values)
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    """model_router.routes가 돌려줄 후보를 테스트에서 정함"""
+    result = []
+    monkeypatch.setattr(generate_llm_response.model_router, 'routes', lambda *args, **kwargs: list(result))
+    return result
+
+
+def test_fallback_to_anthropic_maps_temperature_and_uses_fallback_key(routes):
+    routes.extend([
+        ModelRoute('openai', 'gpt-4o', 'standard'),
+        ModelRoute('anthropic', 'claude-sonnet-4-5', 'standard', fallback=True),
+    ])
+
+    primary, fallback = _routed_configs(_config(fallback_api_key=ANTHROPIC_KEY), 'openai')
+
+    assert (primary.model_type, primary.model, primary.api_key, primary.temperature) == ('openai', 'gpt-4o', OPENAI_KEY, 1.2)
+    assert (fallback.model_type, fallback.model, fallback.api_key) == ('anthropic', 'claude-sonnet-4-5', ANTHROPIC_KEY)
+    assert fallback.temperature == pytest.approx(0.6)
+    assert fallback.top_p == 0.9
+
+
+def test_fallback_to_openai_scales_temperature_up(routes):
+    routes.append(ModelRoute('openai', 'gpt-4o', 'standard', fallback=True))
+
+    [fallback] = _routed_configs(_config(api_key=ANTHROPIC_KEY, model_type='anthropic', temperature=0.7,
+                                         fallback_api_key=OPENAI_KEY), 'anthropic')
+
+    assert fallback.api_key == OPENAI_KEY
+    assert fallback.temperature == pytest.approx(1.4)
+
+
+def test_no_routes_keeps_request_config(routes):
+    config = _config()
+    assert _routed_configs(config, 'openai') == [config]
+
+
+@pytest.mark.parametrize('model, sends_top_p', [
+    ('claude-3-5-haiku-20241022', True),
+    ('claude-sonnet-4-5', False),
+    ('claude-opus-4-1', False),
+])
+def test_anthropic_request_sampling_parameters(model, sends_top_p):
+    config = _config(api_key=ANTHROPIC_KEY, model_type='anthropic', temperature=0.6, model=model)
+
+    _, data = _build_anthropic_request(config)
+
+    assert data['model'] == model
+    assert data['temperature'] == 0.6
+    assert ('top_p' in data) is sends_top_p
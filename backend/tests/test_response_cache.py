@@ -0,0 +1,92 @@
+"""응답 캐시: 코루틴에서 SQLite 단계 사용"""
+import asyncio
+import threading
+import time
+
+from response_cache import ResponseCache
+
+
+def test_async_disk_lookup_does_not_block_event_loop(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite3'))
+    cache.set('key', {'text': '안녕하세요'})
+    cache._memory.clear()
+
+    # 다른 스레드가 SQLite를 오래 쓰는 동안에도 루프의 다른 작업은 계속 실행되어야 함
+    db_busy = threading.Event()
+
+    def hold_db():
+        with cache._db_lock:
+            db_busy.set()
+            time.sleep(0.3)
+
+    holder = threading.Thread(target=hold_db)
+    holder.start()
+    db_busy.wait()
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        value = await cache.get_async('key')
+        ticking.cancel()
+        return value, ticks
+
+    value, ticks = asyncio.run(scenario())
+    holder.join()
+
+    assert value == {'text': '안녕하세요'}
+    assert ticks >= 10
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_async_set_and_lookup_round_trip(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite3'))
+    payload = {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': 'hi'}]}
+
+    async def scenario():
+        key, cached = await cache.lookup_async('openai', payload)
+        assert cached is None
+        await cache.set_async(key, {'prompt': '생성된 프롬프트'})
+        return key, await cache.lookup_async('openai', payload)
+
+    key, (same_key, cached) = asyncio.run(scenario())
+
+    assert same_key == key and cached == {'prompt': '생성된 프롬프트'}
+    # 다른 프로세스처럼 새 인스턴스에서도 SQLite 단계로 읽을 수 있음
+    assert ResponseCache(path=cache.path).get(key) == {'prompt': '생성된 프롬프트'}
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses'], stats['writes'], stats['disk_entries']) == (1, 1, 1, 1)
+
+
+def test_disk_eviction_keeps_running_total_and_removes_least_recently_used(tmp_path):
+    value = 'x' * 100
+    entry_size = len(f'"{value}"')
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite3'), memory_entries=1, disk_max_bytes=entry_size * 10)
+    for n in range(10):
+        cache.set(f'key-{n}', value)
+    # 최근에 읽은 항목은 제거 대상에서 뒤로 밀림
+    cache._memory.clear()
+    assert cache.get('key-0') == value
+
+    cache.set('key-10', value)
+
+    stats = cache.stats()
+    assert stats['disk_bytes'] == cache._disk_bytes <= entry_size * 10 * 0.9
+    assert stats['disk_evictions'] == 2
+    cache._memory.clear()
+    assert cache.get('key-0') == value
+    assert cache.get('key-1') is None and cache.get('key-2') is None
+    assert cache.get('key-3') == value
+
+
+def test_replacing_an_entry_does_not_double_count_its_size(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite3'))
+    cache.set('key', 'a' * 50)
+    cache.set('key', 'b' * 20)
+    assert cache._disk_bytes == cache.stats()['disk_bytes'] == len('"' + 'b' * 20 + '"')
@@ -0,0 +1,71 @@
+"""시뮬레이션 작업 수/세트 수 한도 테스트"""
+import threading
+
+import pytest
+
+import simulation_runner
+from config import SimulationConfig
+from config.simulation_config import SIMULATION_MAX_SETS, SIMULATION_MAX_TURNS_PER_BOT
+from simulation_runner import SimulationCapacityExceeded, SimulationManager
+
+
+def _config(number_of_sets: int = 1, **kwargs) -> SimulationConfig:
+    return SimulationConfig(api_key1='sk-test', api_key2='sk-test', topic='주제', persona1='A', persona2='B',
+                            number_of_sets=number_of_sets, **kwargs)
+
+
+def test_number_of_sets_is_capped():
+    _config(SIMULATION_MAX_SETS)
+    with pytest.raises(ValueError):
+        _config(SIMULATION_MAX_SETS + 1)
+
+
+def test_turns_per_bot_is_capped():
+    _config(turns_per_bot=SIMULATION_MAX_TURNS_PER_BOT)
+    with pytest.raises(ValueError):
+        _config(turns_per_bot=SIMULATION_MAX_TURNS_PER_BOT + 1)
+
+
+@pytest.mark.parametrize('field, value', [
+    ('temperature1', 2.5), ('temperature2', -0.1), ('top_p1', 1.5), ('top_p2', -0.1),
+])
+def test_sampling_parameters_are_range_checked(field, value):
+    with pytest.raises(ValueError):
+        _config(**{field: value})
+
+
+def test_submit_rejects_when_running_jobs_fill_the_store(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(simulation_runner, 'run_conversation_set', lambda config, set_result: release.wait(5))
+    manager = SimulationManager(max_workers=4, max_jobs=2)
+    try:
+        running = [manager.submit(_config()), manager.submit(_config())]
+        with pytest.raises(SimulationCapacityExceeded):
+            manager.submit(_config())
+
+        # 완료된 작업은 삭제할 수 있으므로 다시 받음
+        release.set()
+        assert all(job.wait(5) for job in running)
+        manager.submit(_config()).wait(5)
+    finally:
+        release.set()
+        manager.shutdown(timeout=5)
+
+
+def test_wait_returns_job_id_when_wait_timeout_expires(monkeypatch):
+    import app as app_module
+
+    release = threading.Event()
+    monkeypatch.setattr(simulation_runner, 'run_conversation_set', lambda config, set_result: release.wait(5))
+    manager = SimulationManager(max_workers=1, max_jobs=2)
+    monkeypatch.setattr(app_module, 'simulation_manager', manager)
+    monkeypatch.setattr(app_module, 'SIMULATION_WAIT_TIMEOUT', 0.1)
+    try:
+        response = app_module.app.test_client().post('/api/simulations', json={
+            'api_key': 'sk-test', 'topic': '주제', 'persona1': 'A', 'persona2': 'B', 'number_of_sets': 1, 'wait': True,
+        })
+        assert response.status_code == 202
+        assert manager.get(response.get_json()['job_id']) is not None
+    finally:
+        release.set()
+        manager.shutdown(timeout=5)
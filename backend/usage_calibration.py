@@ -0,0 +1,180 @@
+"""
+실제 프로바이더 토큰 사용량으로 토큰 예측을 보정하는 모듈
+- 응답 생성 때마다 (모델 타입, 페르소나, 턴 번호)별로 prompt/completion 토큰 수를 기록
+- 값은 로그 간격 버킷의 작은 히스토그램에 누적하고, 일정 개수를 넘으면 절반으로 감쇠시켜 최근 값 위주로 유지
+- /api/estimate-tokens는 데이터가 충분한 턴에 대해 휴리스틱 대신 이 분포의 분위수를 사용
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN_CALIBRATION_ENABLED = os.environ.get('TOKEN_CALIBRATION_ENABLED', '1') not in ('0', 'false', 'False')
+# 예측에 사용할 분위수 (0.9 = 관측값의 90%가 이 값 이하)
+TOKEN_CALIBRATION_QUANTILE = float(os.environ.get('TOKEN_CALIBRATION_QUANTILE', '0.9'))
+# 보정값을 쓰기 위한 최소 관측 수 (그보다 적으면 휴리스틱 사용)
+TOKEN_CALIBRATION_MIN_SAMPLES = int(os.environ.get('TOKEN_CALIBRATION_MIN_SAMPLES', '5'))
+# 히스토그램 하나의 관측 수가 이 값을 넘으면 모든 버킷을 절반으로 감쇠
+TOKEN_CALIBRATION_WINDOW = int(os.environ.get('TOKEN_CALIBRATION_WINDOW', '200'))
+# 보관할 최대 (모델 타입, 페르소나, 턴 번호) 키 수 (초과 시 가장 오래 갱신되지 않은 키부터 삭제)
+TOKEN_CALIBRATION_MAX_KEYS = int(os.environ.get('TOKEN_CALIBRATION_MAX_KEYS', '4096'))
+
+# 버킷 경계는 (1 + BUCKET_GROWTH)^i - 1 이므로 분위수 오차는 최대 약 5%
+BUCKET_GROWTH = 0.05
+_LOG_GROWTH = math.log1p(BUCKET_GROWTH)
+
+
+def _bucket_of(value: int) -> int:
+    return int(math.log1p(max(value, 0)) / _LOG_GROWTH)
+
+
+def _bucket_upper(bucket: int) -> int:
+    """버킷 상한 (보수적으로 올림)"""
+    return math.ceil(math.expm1((bucket + 1) * _LOG_GROWTH))
+
+
+class RollingHistogram:
+    """
+    로그 간격 버킷에 관측 수를 세는 히스토그램 (락은 호출자가 관리)
+    토큰 수가 수천이어도 버킷은 수십~백여 개뿐이라 키마다 작은 dict 하나로 충분합니다.
+    """
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts: Dict[int, float] = {}
+        self.total = 0.0
+
+    def add(self, value: int, window: int = TOKEN_CALIBRATION_WINDOW) -> None:
+        bucket = _bucket_of(value)
+        self.counts[bucket] = self.counts.get(bucket, 0.0) + 1
+        self.total += 1
+        if self.total > window:
+            self._decay()
+
+    def _decay(self) -> None:
+        """모든 버킷을 절반으로 줄이고 거의 비어 있는 버킷은 삭제"""
+        self.counts = {b: c / 2 for b, c in self.counts.items() if c / 2 >= 0.25}
+        self.total = sum(self.counts.values())
+
+    def quantile(self, q: float) -> Optional[int]:
+        if self.total <= 0:
+            return None
+        target = q * self.total
+        cumulative = 0.0
+        for bucket in sorted(self.counts):
+            cumulative += self.counts[bucket]
+            if cumulative >= target:
+                return _bucket_upper(bucket)
+        return _bucket_upper(max(self.counts))
+
+
+class UsageCalibration:
+    """
+    (모델 타입, 페르소나, 턴 번호)별 실제 토큰 사용량 분포 (스레드 안전)
+    턴 번호는 세트 안의 메시지 순서(0부터)이며, 응답 생성 시 이전 메시지 수와 같습니다.
+    """
+
+    def __init__(
+        self,
+        quantile: float = TOKEN_CALIBRATION_QUANTILE,
+        min_samples: int = TOKEN_CALIBRATION_MIN_SAMPLES,
+        window: int = TOKEN_CALIBRATION_WINDOW,
+        max_keys: int = TOKEN_CALIBRATION_MAX_KEYS,
+        enabled: bool = TOKEN_CALIBRATION_ENABLED
+    ):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.window = window
+        self.max_keys = max_keys
+        self.enabled = enabled
+        # 키 -> (prompt 히스토그램, completion 히스토그램, 누적 관측 수)
+        self._entries: "OrderedDict[Tuple[str, str, int], List[Any]]" = OrderedDict()
+        # (모델 타입, 페르소나) -> 관측된 턴 번호 집합 (예측 시 해당 키만 조회하기 위함)
+        self._turns: Dict[Tuple[str, str], set] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        model_type: str,
+        persona: str,
+        turn_index: int,
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int]
+    ) -> None:
+        """응답 하나의 실제 토큰 사용량 기록 (토큰 정보가 없으면 무시)"""
+        if not self.enabled or prompt_tokens is None or completion_tokens is None:
+            return
+        key = (model_type, persona, turn_index)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [RollingHistogram(), RollingHistogram(), 0]
+                self._entries[key] = entry
+                self._turns.setdefault((model_type, persona), set()).add(turn_index)
+                self._evict()
+            else:
+                self._entries.move_to_end(key)
+            entry[0].add(prompt_tokens, self.window)
+            entry[1].add(completion_tokens, self.window)
+            entry[2] += 1
+
+    def _evict(self) -> None:
+        """최대 키 수를 넘으면 가장 오래 갱신되지 않은 키 삭제 (락을 잡은 상태에서 호출)"""
+        while len(self._entries) > self.max_keys:
+            (model_type, persona, turn_index), _ = self._entries.popitem(last=False)
+            turns = self._turns.get((model_type, persona))
+            if turns is not None:
+                turns.discard(turn_index)
+                if not turns:
+                    del self._turns[(model_type, persona)]
+
+    def observed_turns(self, model_type: str, persona: str) -> List[int]:
+        """보정에 쓸 수 있을 만큼 관측된 턴 번호 목록 (오름차순)"""
+        if not self.enabled:
+            return []
+        with self._lock:
+            turns = self._turns.get((model_type, persona), ())
+            return sorted(
+                turn for turn in turns
+                if self._entries[(model_type, persona, turn)][0].total >= self.min_samples
+            )
+
+    def estimate(self, model_type: str, persona: str, turn_index: int) -> Optional[Dict[str, int]]:
+        """
+        관측 분포의 분위수로 계산한 토큰 수
+        관측이 min_samples보다 적으면 None (호출자는 휴리스틱을 사용)
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get((model_type, persona, turn_index))
+            if entry is None or entry[0].total < self.min_samples:
+                return None
+            prompt_tokens = entry[0].quantile(self.quantile)
+            completion_tokens = entry[1].quantile(self.quantile)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'quantile': self.quantile,
+                'min_samples': self.min_samples,
+                'keys': len(self._entries),
+                'calibrated_keys': sum(1 for entry in self._entries.values() if entry[0].total >= self.min_samples),
+                'observations': sum(entry[2] for entry in self._entries.values()),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._turns.clear()
+
+
+usage_calibration = UsageCalibration()
@@ -2,9 +2,153 @@
 API 키 유효성 검증 모듈
 OpenAI, Anthropic, Google 등의 API 키를 검증합니다.
 """
+import asyncio
+import hashlib
+import hmac
 import os
+import secrets
+import threading
+import time
 import requests
-from typing import Dict, Optional
+import httpx
+from typing import Dict, List, Optional, Tuple
+from http_client import connection_pool, get_async_client
+from provider_endpoints import OPENAI_API_BASE, ANTHROPIC_API_BASE, GOOGLE_API_BASE
+
+OPENAI_MODELS_URL = f'{OPENAI_API_BASE}/models'
+# 모델 목록 조회는 과금되지 않음 (limit=1로 응답 크기 최소화)
+ANTHROPIC_MODELS_URL = f'{ANTHROPIC_API_BASE}/models?limit=1'
+GOOGLE_MODELS_URL = f'{GOOGLE_API_BASE}/models'
+
+# 검증 결과 캐시 유효 시간 (초): 유효한 키 / 명확히 거부된 키
+VALIDATION_CACHE_TTL = float(os.environ.get('VALIDATION_CACHE_TTL', '600'))
+VALIDATION_CACHE_NEGATIVE_TTL = float(os.environ.get('VALIDATION_CACHE_NEGATIVE_TTL', '60'))
+VALIDATION_CACHE_MAX_ENTRIES = int(os.environ.get('VALIDATION_CACHE_MAX_ENTRIES', '10000'))
+# 캐시 키 해시용 솔트 (설정하지 않으면 프로세스마다 무작위 생성)
+VALIDATION_CACHE_SALT = os.environ.get('VALIDATION_CACHE_SALT', '')
+# /api/validate-keys 에서 동시에 검증할 최대 키 수
+VALIDATION_MAX_CONCURRENCY = int(os.environ.get('VALIDATION_MAX_CONCURRENCY', '16'))
+
+# 프로바이더가 키를 명확히 거부한 상태 코드 (부정 결과로 캐시)
+NEGATIVE_STATUS_CODES = (400, 401, 403)
+
+
+class ValidationCache:
+    """
+    API 키 검증 결과 캐시 (스레드 안전)
+    키 원문은 저장하지 않고 솔트를 넣은 HMAC-SHA256 해시만 보관합니다.
+    유효한 키는 VALIDATION_CACHE_TTL, 명확히 거부된 키는 VALIDATION_CACHE_NEGATIVE_TTL 동안 유지하며,
+    시간 초과/네트워크 오류/5xx 같은 일시적 실패는 캐시하지 않습니다.
+    """
+
+    def __init__(
+        self,
+        ttl: float = VALIDATION_CACHE_TTL,
+        negative_ttl: float = VALIDATION_CACHE_NEGATIVE_TTL,
+        max_entries: int = VALIDATION_CACHE_MAX_ENTRIES,
+        salt: Optional[bytes] = None
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._salt = salt or secrets.token_bytes(32)
+        self._entries: Dict[str, Tuple[float, Dict[str, any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, provider: str, api_key: str) -> str:
+        return hmac.new(self._salt, f'{provider}:{api_key}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def get(self, provider: str, api_key: str) -> Optional[Dict[str, any]]:
+        key = self._key(provider, api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, provider: str, api_key: str, result: Dict[str, any], status_code: int) -> None:
+        """프로바이더 응답 상태 코드에 따라 결과를 캐시 (일시적 실패는 무시)"""
+        if result.get('valid'):
+            ttl = self.ttl
+        elif status_code in NEGATIVE_STATUS_CODES:
+            ttl = self.negative_ttl
+        else:
+            return
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # 만료된 항목을 먼저 지우고, 그래도 가득 차 있으면 가장 먼저 만료될 항목 제거
+                for expired_key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    del self._entries[expired_key]
+                if len(self._entries) >= self.max_entries:
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[self._key(provider, api_key)] = (now + ttl, dict(result))
+
+    def invalidate(self, provider: str, api_key: str) -> None:
+        with self._lock:
+            self._entries.pop(self._key(provider, api_key), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+validation_cache = ValidationCache(salt=VALIDATION_CACHE_SALT.encode('utf-8') or None)
+
+def _timeout_error() -> Dict[str, any]:
+    return {
+        'valid': False,
+        'error': '요청 시간이 초과되었습니다. 네트워크를 확인해주세요.'
+    }
+
+def _network_error(e: Exception) -> Dict[str, any]:
+    return {
+        'valid': False,
+        'error': f'네트워크 오류: {str(e)}'
+    }
+
+def _unexpected_error(e: Exception) -> Dict[str, any]:
+    return {
+        'valid': False,
+        'error': f'검증 중 오류 발생: {str(e)}'
+    }
+
+def _openai_headers(api_key: str) -> Dict[str, str]:
+    return {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+
+def _remember(provider: str, api_key: str, result: Dict[str, any], response) -> Dict[str, any]:
+    """검증 결과를 캐시에 기록하고 그대로 반환"""
+    validation_cache.put(provider, api_key, result, response.status_code)
+    return result
+
+def _check_openai_response(response) -> Dict[str, any]:
+    """OpenAI 모델 목록 응답으로 검증 결과 생성 (requests/httpx 응답 객체 공통)"""
+    if response.status_code == 200:
+        return {
+            'valid': True,
+            'message': 'OpenAI API 키가 유효합니다.'
+        }
+    elif response.status_code == 401:
+        return {
+            'valid': False,
+            'error': 'API 키가 유효하지 않거나 권한이 없습니다.'
+        }
+    else:
+        return {
+            'valid': False,
+            'error': f'API 요청 실패 (상태 코드: {response.status_code})'
+        }
 
 def validate_openai_key(api_key: str) -> Dict[str, any]:
     """
@@ -12,121 +156,126 @@ def validate_openai_key(api_key: str) -> Dict[str, any]:
     간단한 모델 목록 조회 API를 호출하여 검증
     """
     try:
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
-        
         # OpenAI API의 모델 목록 조회 (비용이 들지 않는 API)
-        response = requests.get(
-            'https://api.openai.com/v1/models',
-            headers=headers,
+        response = connection_pool.get(
+            OPENAI_MODELS_URL,
+            headers=_openai_headers(api_key),
             timeout=10
         )
-        
-        if response.status_code == 200:
-            return {
-                'valid': True,
-                'message': 'OpenAI API 키가 유효합니다.'
-            }
-        elif response.status_code == 401:
-            return {
-                'valid': False,
-                'error': 'API 키가 유효하지 않거나 권한이 없습니다.'
-            }
-        else:
-            return {
-                'valid': False,
-                'error': f'API 요청 실패 (상태 코드: {response.status_code})'
-            }
+        return _remember('openai', api_key, _check_openai_response(response), response)
     except requests.exceptions.Timeout:
+        return _timeout_error()
+    except requests.exceptions.RequestException as e:
+        return _network_error(e)
+    except Exception as e:
+        return _unexpected_error(e)
+
+async def validate_openai_key_async(api_key: str) -> Dict[str, any]:
+    """validate_openai_key의 코루틴 버전"""
+    try:
+        response = await get_async_client().get(
+            OPENAI_MODELS_URL,
+            headers=_openai_headers(api_key),
+            timeout=10
+        )
+        return _remember('openai', api_key, _check_openai_response(response), response)
+    except httpx.TimeoutException:
+        return _timeout_error()
+    except httpx.HTTPError as e:
+        return _network_error(e)
+    except Exception as e:
+        return _unexpected_error(e)
+
+def _anthropic_headers(api_key: str) -> Dict[str, str]:
+    return {
+        'x-api-key': api_key,
+        'anthropic-version': '2023-06-01'
+    }
+
+def _check_anthropic_response(response) -> Dict[str, any]:
+    """Anthropic 모델 목록 응답으로 검증 결과 생성 (requests/httpx 응답 객체 공통)"""
+    if response.status_code == 200:
         return {
-            'valid': False,
-            'error': '요청 시간이 초과되었습니다. 네트워크를 확인해주세요.'
+            'valid': True,
+            'message': 'Anthropic API 키가 유효합니다.'
         }
-    except requests.exceptions.RequestException as e:
+    elif response.status_code == 401:
         return {
             'valid': False,
-            'error': f'네트워크 오류: {str(e)}'
+            'error': 'API 키가 유효하지 않거나 권한이 없습니다.'
         }
-    except Exception as e:
+    else:
+        # 에러 응답 파싱 시도
+        try:
+            error_data = response.json()
+            if isinstance(error_data, dict):
+                error_detail = error_data.get('error', {})
+                if isinstance(error_detail, dict):
+                    error_msg = error_detail.get('message', '알 수 없는 오류')
+                else:
+                    error_msg = str(error_detail)
+            else:
+                error_msg = '알 수 없는 오류'
+        except:
+            # JSON 파싱 실패 시 응답 텍스트 사용
+            error_msg = response.text[:200] if response.text else f'HTTP {response.status_code} 오류'
+
         return {
             'valid': False,
-            'error': f'검증 중 오류 발생: {str(e)}'
+            'error': f'API 요청 실패: {error_msg}'
         }
 
 def validate_anthropic_key(api_key: str) -> Dict[str, any]:
     """
     Anthropic (Claude) API 키 검증
-    메시지 API를 사용하여 검증 (최소 비용)
+    모델 목록 조회 API를 사용하여 검증 (과금되지 않음)
     """
     try:
-        headers = {
-            'x-api-key': api_key,
-            'anthropic-version': '2023-06-01',
-            'Content-Type': 'application/json'
-        }
-        
-        # 간단한 테스트 메시지 (최소 토큰 사용)
-        data = {
-            'model': 'claude-3-5-haiku-20241022',  # 가장 저렴한 최신 모델
-            'max_tokens': 1,
-            'messages': [
-                {'role': 'user', 'content': 'test'}
-            ]
-        }
-        
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers=headers,
-            json=data,
+        response = connection_pool.get(
+            ANTHROPIC_MODELS_URL,
+            headers=_anthropic_headers(api_key),
             timeout=10
         )
-        
-        if response.status_code == 200:
-            return {
-                'valid': True,
-                'message': 'Anthropic API 키가 유효합니다.'
-            }
-        elif response.status_code == 401:
-            return {
-                'valid': False,
-                'error': 'API 키가 유효하지 않거나 권한이 없습니다.'
-            }
-        else:
-            # 에러 응답 파싱 시도
-            try:
-                error_data = response.json()
-                if isinstance(error_data, dict):
-                    error_detail = error_data.get('error', {})
-                    if isinstance(error_detail, dict):
-                        error_msg = error_detail.get('message', '알 수 없는 오류')
-                    else:
-                        error_msg = str(error_detail)
-                else:
-                    error_msg = '알 수 없는 오류'
-            except:
-                # JSON 파싱 실패 시 응답 텍스트 사용
-                error_msg = response.text[:200] if response.text else f'HTTP {response.status_code} 오류'
-            
-            return {
-                'valid': False,
-                'error': f'API 요청 실패: {error_msg}'
-            }
+        return _remember('anthropic', api_key, _check_anthropic_response(response), response)
     except requests.exceptions.Timeout:
+        return _timeout_error()
+    except requests.exceptions.RequestException as e:
+        return _network_error(e)
+    except Exception as e:
+        return _unexpected_error(e)
+
+async def validate_anthropic_key_async(api_key: str) -> Dict[str, any]:
+    """validate_anthropic_key의 코루틴 버전"""
+    try:
+        response = await get_async_client().get(
+            ANTHROPIC_MODELS_URL,
+            headers=_anthropic_headers(api_key),
+            timeout=10
+        )
+        return _remember('anthropic', api_key, _check_anthropic_response(response), response)
+    except httpx.TimeoutException:
+        return _timeout_error()
+    except httpx.HTTPError as e:
+        return _network_error(e)
+    except Exception as e:
+        return _unexpected_error(e)
+
+def _check_google_response(response) -> Dict[str, any]:
+    """Google 모델 목록 응답으로 검증 결과 생성 (requests/httpx 응답 객체 공통)"""
+    if response.status_code == 200:
         return {
-            'valid': False,
-            'error': '요청 시간이 초과되었습니다. 네트워크를 확인해주세요.'
+            'valid': True,
+            'message': 'Google API 키가 유효합니다.'
         }
-    except requests.exceptions.RequestException as e:
+    elif response.status_code == 400:
         return {
             'valid': False,
-            'error': f'네트워크 오류: {str(e)}'
+            'error': 'API 키가 유효하지 않습니다.'
         }
-    except Exception as e:
+    else:
         return {
             'valid': False,
-            'error': f'검증 중 오류 발생: {str(e)}'
+            'error': f'API 요청 실패 (상태 코드: {response.status_code})'
         }
 
 def validate_google_key(api_key: str) -> Dict[str, any]:
@@ -139,51 +288,82 @@ def validate_google_key(api_key: str) -> Dict[str, any]:
         headers = {
             'Content-Type': 'application/json'
         }
-        
+
         # Gemini API 엔드포인트 (예시)
-        url = f'https://generativelanguage.googleapis.com/v1beta/models?key={api_key}'
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return {
-                'valid': True,
-                'message': 'Google API 키가 유효합니다.'
-            }
-        elif response.status_code == 400:
-            return {
-                'valid': False,
-                'error': 'API 키가 유효하지 않습니다.'
-            }
-        else:
-            return {
-                'valid': False,
-                'error': f'API 요청 실패 (상태 코드: {response.status_code})'
-            }
+        url = f'{GOOGLE_MODELS_URL}?key={api_key}'
+
+        response = connection_pool.get(url, headers=headers, timeout=10)
+        return _remember('google', api_key, _check_google_response(response), response)
     except requests.exceptions.Timeout:
-        return {
-            'valid': False,
-            'error': '요청 시간이 초과되었습니다. 네트워크를 확인해주세요.'
-        }
+        return _timeout_error()
     except requests.exceptions.RequestException as e:
-        return {
-            'valid': False,
-            'error': f'네트워크 오류: {str(e)}'
-        }
+        return _network_error(e)
     except Exception as e:
-        return {
-            'valid': False,
-            'error': f'검증 중 오류 발생: {str(e)}'
+        return _unexpected_error(e)
+
+async def validate_google_key_async(api_key: str) -> Dict[str, any]:
+    """validate_google_key의 코루틴 버전"""
+    try:
+        headers = {
+            'Content-Type': 'application/json'
         }
+        url = f'{GOOGLE_MODELS_URL}?key={api_key}'
+
+        response = await get_async_client().get(url, headers=headers, timeout=10)
+        return _remember('google', api_key, _check_google_response(response), response)
+    except httpx.TimeoutException:
+        return _timeout_error()
+    except httpx.HTTPError as e:
+        return _network_error(e)
+    except Exception as e:
+        return _unexpected_error(e)
+
+def _select_validator(api_key: str, model_type: str) -> Optional[str]:
+    """
+    모델 타입과 API 키 형식으로 검증할 프로바이더 결정
+
+    Returns:
+        'openai', 'anthropic', 'google' 또는 None (지원하지 않는 경우)
+    """
+    # 명시적으로 지정된 모델 타입을 최우선으로 사용
+    if model_type in ('anthropic', 'google', 'openai'):
+        return model_type
+    # model_type이 명시되지 않았거나 알 수 없는 경우, API 키 형식으로 자동 감지
+    if api_key.startswith('sk-ant-') or api_key.startswith('sk-ant-api'):
+        return 'anthropic'
+    elif api_key.startswith('AIza'):
+        return 'google'
+    elif api_key.startswith('sk-'):
+        return 'openai'
+    return None
+
+_VALIDATORS = {
+    'openai': validate_openai_key,
+    'anthropic': validate_anthropic_key,
+    'google': validate_google_key,
+}
+
+_ASYNC_VALIDATORS = {
+    'openai': validate_openai_key_async,
+    'anthropic': validate_anthropic_key_async,
+    'google': validate_google_key_async,
+}
+
+def _unsupported_model_type(model_type: str) -> Dict[str, any]:
+    return {
+        'valid': False,
+        'error': f'지원하지 않는 모델 타입입니다: {model_type}. API 키 형식을 확인해주세요.'
+    }
 
-def validate_api_key(api_key: str, model_type: str = 'openai') -> Dict[str, any]:
+def validate_api_key(api_key: str, model_type: str = 'openai', use_cache: bool = True) -> Dict[str, any]:
     """
     API 키 검증 메인 함수
-    
+
     Args:
         api_key: 검증할 API 키
         model_type: 모델 타입 ('openai', 'anthropic', 'google')
-    
+        use_cache: False이면 캐시된 결과를 무시하고 다시 검증
+
     Returns:
         Dict with 'valid' (bool) and 'error'/'message' (str)
     """
@@ -192,27 +372,78 @@ def validate_api_key(api_key: str, model_type: str = 'openai') -> Dict[str, any]
             'valid': False,
             'error': 'API 키가 비어있습니다.'
         }
-    
+
     model_type = model_type.lower()
-    
-    # 명시적으로 지정된 모델 타입을 최우선으로 사용
-    if model_type == 'anthropic':
-        return validate_anthropic_key(api_key)
-    elif model_type == 'google':
-        return validate_google_key(api_key)
-    elif model_type == 'openai':
-        return validate_openai_key(api_key)
-    else:
-        # model_type이 명시되지 않았거나 알 수 없는 경우, API 키 형식으로 자동 감지
-        if api_key.startswith('sk-ant-') or api_key.startswith('sk-ant-api'):
-            return validate_anthropic_key(api_key)
-        elif api_key.startswith('AIza'):
-            return validate_google_key(api_key)
-        elif api_key.startswith('sk-'):
-            return validate_openai_key(api_key)
-        else:
-            return {
-                'valid': False,
-                'error': f'지원하지 않는 모델 타입입니다: {model_type}. API 키 형식을 확인해주세요.'
-            }
+    provider = _select_validator(api_key, model_type)
+    if provider is None:
+        return _unsupported_model_type(model_type)
+    if use_cache:
+        cached = validation_cache.get(provider, api_key)
+        if cached is not None:
+            return {**cached, 'cached': True}
+    return _VALIDATORS[provider](api_key)
+
+async def validate_api_key_async(api_key: str, model_type: str = 'openai', use_cache: bool = True) -> Dict[str, any]:
+    """
+    validate_api_key의 코루틴 버전 (같은 반환 형식)
+    """
+    if not api_key or not api_key.strip():
+        return {
+            'valid': False,
+            'error': 'API 키가 비어있습니다.'
+        }
+
+    model_type = model_type.lower()
+    provider = _select_validator(api_key, model_type)
+    if provider is None:
+        return _unsupported_model_type(model_type)
+    if use_cache:
+        cached = validation_cache.get(provider, api_key)
+        if cached is not None:
+            return {**cached, 'cached': True}
+    return await _ASYNC_VALIDATORS[provider](api_key)
+
+def _mask_api_key(api_key: str) -> str:
+    """응답에 표시할 수 있도록 키의 앞뒤 일부만 남김"""
+    if len(api_key) <= 10:
+        return '*' * len(api_key)
+    return f'{api_key[:6]}...{api_key[-4:]}'
+
+async def validate_api_keys_async(
+    entries: List[Dict[str, str]],
+    use_cache: bool = True,
+    concurrency: int = VALIDATION_MAX_CONCURRENCY
+) -> List[Dict[str, any]]:
+    """
+    여러 API 키를 동시에 검증 (입력 순서대로 결과 반환)
+    같은 요청 안에 중복된 (키, 모델 타입)은 한 번만 검증합니다.
+
+    Args:
+        entries: [{'api_key': '...', 'model_type': 'openai'}, ...]
+        use_cache: False이면 캐시된 결과를 무시하고 다시 검증
+        concurrency: 동시에 진행할 최대 검증 수
+
+    Returns:
+        [{'index': 0, 'key': 'sk-abc...wxyz', 'valid': bool, 'error'/'message': str}, ...]
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    async def validate_one(api_key: str, model_type: str) -> Dict[str, any]:
+        async with semaphore:
+            return await validate_api_key_async(api_key, model_type, use_cache)
+
+    pending = []
+    for entry in entries:
+        api_key = str(entry.get('api_key') or '') if isinstance(entry, dict) else ''
+        model_type = str(entry.get('model_type') or 'openai') if isinstance(entry, dict) else 'openai'
+        dedupe_key = (api_key, model_type.lower())
+        if dedupe_key not in tasks:
+            tasks[dedupe_key] = asyncio.ensure_future(validate_one(api_key, model_type))
+        pending.append((api_key, tasks[dedupe_key]))
 
+    results = []
+    for index, (api_key, task) in enumerate(pending):
+        result = await task
+        results.append({'index': index, 'key': _mask_api_key(api_key), **result})
+    return results
@@ -2,7 +2,7 @@ import { useState } from 'react';
 import { UploadSection } from './UploadSection';
 import { EvaluationItem } from './EvaluationRow';
 import { parseJson, parseCsv, parseTxt } from './parsers';
-import { evaluateConversation } from './evaluationService';
+import { evaluateBatch } from './evaluationService';
 import {
   Card,
   CardContent,
@@ -35,6 +35,9 @@ import {
 } from "lucide-react";
 import { Alert, AlertDescription, AlertTitle } from "../ui/alert";
 
+// 한 번의 /api/evaluate-batch 요청에 담을 항목 수 (묶음마다 진행률 갱신)
+const EVALUATION_BATCH_SIZE = 20;
+
 export function SimulationEvaluation() {
     const [items, setItems] = useState<EvaluationItem[]>([]);
     const [isAnalyzing, setIsAnalyzing] = useState(false);
@@ -59,15 +62,17 @@ export function SimulationEvaluation() {
         // Create a copy of items to update
         const updatedItems = [...initialItems];
 
-        for (let i = 0; i < initialItems.length; i++) {
-            const item = initialItems[i];
+        // 서버의 /api/evaluate-batch가 묶음 안의 항목들을 동시에 평가
+        for (let start = 0; start < initialItems.length; start += EVALUATION_BATCH_SIZE) {
+            const batch = initialItems.slice(start, start + EVALUATION_BATCH_SIZE);
 
             // Call API
-            const result = await evaluateConversation(item, provider);
+            const results = await evaluateBatch(batch, provider);
 
             // Check for any error (API error, auth error, network error, etc.)
-            if (result.isError || result.isAuthError) {
-                setAuthError(result.explanation);
+            const failed = results.find(result => result.isError || result.isAuthError);
+            if (failed) {
+                setAuthError(failed.explanation);
                 setIsAnalyzing(false);
                 setProgress(0); // Reset progress
                 // Clear items to show error message
@@ -75,17 +80,19 @@ export function SimulationEvaluation() {
                 return; // Stop analysis immediately
             }
 
-            // Update item
-            updatedItems[i] = {
-                ...item,
-                grade: result.grade,
-                scores: result.rawScore,
-                explanation: result.explanation,
-                status: 'completed'
-            };
+            // Update items
+            results.forEach((result, offset) => {
+                updatedItems[start + offset] = {
+                    ...batch[offset],
+                    grade: result.grade,
+                    scores: result.rawScore,
+                    explanation: result.explanation,
+                    status: 'completed'
+                };
+            });
 
             // Update State & Progress
-            completedCount++;
+            completedCount += batch.length;
             const currentProgress = (completedCount / initialItems.length) * 100;
             setProgress(currentProgress);
             setItems([...updatedItems]); // spread to trigger re-render